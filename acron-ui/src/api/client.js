@@ -1,3 +1,4 @@
+import { decode, ExtensionCodec } from '@msgpack/msgpack'
 import { API_BASE } from '../utils/constants'
 
 function buildQuery(params = {}) {
@@ -72,18 +73,54 @@ export const api = {
   askTechMate: (message) => request('/api/v1/ai/chat', { method: 'POST', body: JSON.stringify({ message }) }),
 }
 
-export function connectWebSocket(onMessage) {
+const MSGPACK_SUBPROTOCOL = 'acron.msgpack.v1'
+const FLOAT32_ARRAY_EXT = 1
+
+// Zone-temperature arrays arrive as packed little-endian float32 (ext type 1).
+const extensionCodec = new ExtensionCodec()
+extensionCodec.register({
+  type: FLOAT32_ARRAY_EXT,
+  encode: () => null,
+  decode: (data) => {
+    const view = new DataView(data.buffer, data.byteOffset, data.byteLength)
+    return Array.from({ length: data.byteLength / 4 }, (_, i) => view.getFloat32(i * 4, true))
+  },
+})
+
+function decodeFrame(data) {
+  if (typeof data === 'string') return JSON.parse(data)
+  return decode(new Uint8Array(data), { extensionCodec })
+}
+
+// subscription: optional { devices, types, metrics, deadband } -> snapshot + delta frames
+export function connectWebSocket(onMessage, subscription = null) {
   const proto = window.location.protocol === 'https:' ? 'wss' : 'ws'
   const host = API_BASE ? new URL(API_BASE).host : window.location.host
-  const ws = new WebSocket(`${proto}://${host}/ws/andons`)
+  const ws = new WebSocket(`${proto}://${host}/ws/andons`, [MSGPACK_SUBPROTOCOL])
+  ws.binaryType = 'arraybuffer'
+  ws.onopen = () => {
+    if (subscription) ws.send(JSON.stringify({ subscribe: subscription }))
+  }
   ws.onmessage = (event) => {
     try {
-      onMessage(JSON.parse(event.data))
+      onMessage(decodeFrame(event.data))
     } catch {
       // ignore malformed packets
     }
   }
-  ws.onerror = () => setTimeout(() => connectWebSocket(onMessage), 3000)
-  ws.onclose = () => setTimeout(() => connectWebSocket(onMessage), 3000)
+  ws.onerror = () => setTimeout(() => connectWebSocket(onMessage, subscription), 3000)
+  ws.onclose = () => setTimeout(() => connectWebSocket(onMessage, subscription), 3000)
   return ws
 }
+
+// Server-Sent Events alternative for read-only views; EventSource reconnects and resumes by itself.
+export function streamTelemetry(onMessage, { devices = [], types = [], metrics = [] } = {}) {
+  const query = new URLSearchParams()
+  devices.forEach((id) => query.append('device', id))
+  types.forEach((type) => query.append('type', type))
+  metrics.forEach((name) => query.append('metric', name))
+  const source = new EventSource(`${API_BASE}/api/v1/stream/telemetry?${query}`)
+  source.addEventListener('snapshot', (event) => onMessage({ type: 'snapshot', data: JSON.parse(event.data) }))
+  source.addEventListener('telemetry', (event) => onMessage({ type: 'telemetry', data: JSON.parse(event.data) }))
+  return source
+}
@@ -3,9 +3,34 @@ Connector interfaces for GE Pulse edge gateways.
 
 The demo uses SimulatorConnector. Real plants can enable the protocol-specific
 connectors by installing the matching library and providing a tag map.
+
+A tag map entry is either a bare address (``"cycle_time": "D100"``) or an
+object with per-tag options::
+
+    "cycle_time": {"address": "D100", "type": "float32", "word_order": "low", "poll_ms": 1000}
+    "mold_id":    {"address": "D300", "type": "string", "length": 12}
+
+``type`` defaults to int16 (see read_planner for the supported types).
+``deadband`` / ``deadband_pct`` / ``max_silence_ms`` tune report-by-exception
+(see report_by_exception). ``samples`` + ``waveform`` read a high-rate sample
+buffer that is uploaded as windowed summaries, and ``cycle_marker`` marks
+the tag whose change ends a machine cycle (see waveforms).
+Connectors hold one connection open between reads; the poll scheduler in
+``poller.py`` reconnects them after a failure. MC protocol and Modbus reads
+are planned into block reads, so adjacent tags share one round trip.
 """
+import os
 from dataclasses import dataclass
-from typing import Any, Dict
+from typing import Any, Dict, List, Optional
+
+try:
+    from .read_planner import MC_PROTOCOL, MODBUS, TYPE_WORDS, WORD_ORDERS, BlockRead, ProtocolProfile, decode_block, plan_reads
+    from .waveforms import WaveformSpec
+except ImportError:  # run as a script: python gateway.py
+    from read_planner import MC_PROTOCOL, MODBUS, TYPE_WORDS, WORD_ORDERS, BlockRead, ProtocolProfile, decode_block, plan_reads
+    from waveforms import WaveformSpec
+
+EDGE_POLL_DEFAULT_MS = int(os.getenv("EDGE_POLL_DEFAULT_MS", "5000"))
 
 
 @dataclass
@@ -14,76 +39,259 @@ class ConnectorConfig:
     protocol: str
     endpoint: str
     tag_map: Dict[str, Any]
+    device_id: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class TagSpec:
+    name: str
+    address: str
+    poll_ms: int = EDGE_POLL_DEFAULT_MS
+    dtype: str = "int16"
+    word_order: Optional[str] = None
+    length: int = 0
+    deadband: Optional[float] = None
+    deadband_pct: Optional[float] = None
+    max_silence_ms: Optional[int] = None
+    samples: int = 1
+    waveform: Optional[WaveformSpec] = None
+    cycle_marker: bool = False
+
+
+def parse_tag_map(tag_map: Dict[str, Any]) -> List[TagSpec]:
+    """Normalize a tag map into TagSpecs (bare addresses get the default poll rate)."""
+    tags = []
+    for name, entry in tag_map.items():
+        if isinstance(entry, dict):
+            if "address" not in entry:
+                raise ValueError(f"Tag {name!r} has no address")
+            poll_ms = int(entry.get("poll_ms", EDGE_POLL_DEFAULT_MS))
+            if poll_ms <= 0:
+                raise ValueError(f"Tag {name!r} poll_ms must be positive")
+            dtype = entry.get("type", "int16")
+            if dtype not in TYPE_WORDS and dtype != "string":
+                raise ValueError(f"Tag {name!r} has unsupported type {dtype!r}")
+            length = int(entry.get("length", 0))
+            if dtype == "string" and length <= 0:
+                raise ValueError(f"String tag {name!r} needs a positive length")
+            word_order = entry.get("word_order")
+            if word_order is not None and word_order not in WORD_ORDERS:
+                raise ValueError(f"Tag {name!r} word_order must be one of {WORD_ORDERS}")
+            options = {
+                key: cast(entry[key]) for key, cast in (("deadband", float), ("deadband_pct", float), ("max_silence_ms", int))
+                if entry.get(key) is not None
+            }
+            if any(value < 0 for value in options.values()):
+                raise ValueError(f"Tag {name!r} deadband and max_silence_ms must not be negative")
+            samples = int(entry.get("samples", 1))
+            if samples < 1 or (samples > 1 and dtype in ("bit", "string")):
+                raise ValueError(f"Tag {name!r} samples must be >= 1 and only apply to numeric types")
+            waveform = WaveformSpec.parse(name, entry["waveform"]) if entry.get("waveform") else None
+            tags.append(TagSpec(
+                name, str(entry["address"]), poll_ms, dtype, word_order, length, **options,
+                samples=samples, waveform=waveform, cycle_marker=bool(entry.get("cycle_marker", False)),
+            ))
+        else:
+            tags.append(TagSpec(name, str(entry)))
+    return tags
 
 
 class BaseConnector:
     def __init__(self, config: ConnectorConfig):
         self.config = config
+        self.tags = parse_tag_map(config.tag_map)
+        self.round_trips = 0
 
-    def read_tags(self) -> Dict[str, Any]:
+    @property
+    def connected(self) -> bool:
+        return True
+
+    def connect(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+    def read(self, tags: List[TagSpec]) -> Dict[str, Any]:
+        """Read ``tags`` over the open connection (connect() first)."""
         raise NotImplementedError
 
+    def read_tags(self) -> Dict[str, Any]:
+        """One-shot probe: connect, read every tag, close."""
+        self.connect()
+        try:
+            return self.read(self.tags)
+        finally:
+            self.close()
+
 
 class SimulatorConnector(BaseConnector):
-    def read_tags(self) -> Dict[str, Any]:
+    def read(self, tags: List[TagSpec]) -> Dict[str, Any]:
         return {}
 
 
-class MitsubishiMCConnector(BaseConnector):
-    def read_tags(self) -> Dict[str, Any]:
+def _host_port(endpoint: str, default_port: int) -> tuple[str, int]:
+    host, _, port = endpoint.partition(":")
+    return host, int(port or default_port)
+
+
+class BlockReadConnector(BaseConnector):
+    """Reads tags through planned block reads; subclasses implement one block request."""
+
+    profile: ProtocolProfile
+
+    def __init__(self, config: ConnectorConfig):
+        super().__init__(config)
+        self._plans: Dict[tuple, List[BlockRead]] = {}
+        self.plan(self.tags)  # reject bad addresses/types at configuration time
+
+    def plan(self, tags: List[TagSpec]) -> List[BlockRead]:
+        key = tuple(tags)
+        if key not in self._plans:
+            self._plans[key] = plan_reads(tags, self.profile)
+        return self._plans[key]
+
+    def read(self, tags: List[TagSpec]) -> Dict[str, Any]:
+        values = {}
+        for block in self.plan(tags):
+            self.round_trips += 1
+            raw = self.read_block(block)
+            if raw is None:
+                values.update({planned.tag.name: None for planned in block.tags})
+            else:
+                values.update(decode_block(block, raw, self.profile))
+        return values
+
+    def read_block(self, block: BlockRead) -> Optional[List[int]]:
+        """Raw words (or bits) for one block; None if the device rejected the request."""
+        raise NotImplementedError
+
+
+class MitsubishiMCConnector(BlockReadConnector):
+    profile = MC_PROTOCOL
+
+    def __init__(self, config: ConnectorConfig):
+        super().__init__(config)
+        self._plc = None
+
+    @property
+    def connected(self) -> bool:
+        return self._plc is not None
+
+    def connect(self) -> None:
         try:
             import pymcprotocol
         except ImportError as exc:
             raise RuntimeError("Install pymcprotocol to use Mitsubishi MC Protocol") from exc
-        host, _, port = self.config.endpoint.partition(":")
+        host, port = _host_port(self.config.endpoint, 5007)
         plc = pymcprotocol.Type3E()
-        plc.connect(host, int(port or 5007))
-        try:
-            return {
-                metric: plc.batchread_wordunits(address, 1)[0]
-                for metric, address in self.config.tag_map.items()
-            }
-        finally:
-            plc.close()
+        plc.connect(host, port)
+        self._plc = plc
 
+    def close(self) -> None:
+        if self._plc is not None:
+            try:
+                self._plc.close()
+            finally:
+                self._plc = None
 
-class ModbusTCPConnector(BaseConnector):
-    def read_tags(self) -> Dict[str, Any]:
+    def read_block(self, block: BlockRead) -> Optional[List[int]]:
+        if block.bits:
+            return self._plc.batchread_bitunits(block.head(self.profile), block.count)
+        return self._plc.batchread_wordunits(block.head(self.profile), block.count)
+
+
+class ModbusTCPConnector(BlockReadConnector):
+    profile = MODBUS
+    REQUESTS = {
+        "HR": "read_holding_registers",
+        "IR": "read_input_registers",
+        "CO": "read_coils",
+        "DI": "read_discrete_inputs",
+    }
+
+    def __init__(self, config: ConnectorConfig):
+        super().__init__(config)
+        self._client = None
+
+    @property
+    def connected(self) -> bool:
+        return self._client is not None
+
+    def connect(self) -> None:
         try:
             from pymodbus.client import ModbusTcpClient
         except ImportError as exc:
             raise RuntimeError("Install pymodbus to use Modbus TCP") from exc
-        host, _, port = self.config.endpoint.partition(":")
-        client = ModbusTcpClient(host, port=int(port or 502))
-        client.connect()
-        try:
-            values = {}
-            for metric, register in self.config.tag_map.items():
-                result = client.read_holding_registers(int(register), 1)
-                values[metric] = result.registers[0] if not result.isError() else None
-            return values
-        finally:
+        host, port = _host_port(self.config.endpoint, 502)
+        client = ModbusTcpClient(host, port=port)
+        if not client.connect():
             client.close()
+            raise ConnectionError(f"Modbus TCP connect to {self.config.endpoint} failed")
+        self._client = client
+
+    def close(self) -> None:
+        if self._client is not None:
+            try:
+                self._client.close()
+            finally:
+                self._client = None
+
+    def read_block(self, block: BlockRead) -> Optional[List[int]]:
+        request = getattr(self._client, self.REQUESTS[block.area])
+        result = request(block.start, count=block.count)
+        if result.isError():
+            return None
+        return result.bits[:block.count] if block.bits else result.registers
 
 
 class OpcUaConnector(BaseConnector):
-    async def read_tags_async(self) -> Dict[str, Any]:
+    def __init__(self, config: ConnectorConfig):
+        super().__init__(config)
+        self._client = None
+
+    @property
+    def connected(self) -> bool:
+        return self._client is not None
+
+    async def connect_async(self) -> None:
         try:
             from asyncua import Client
         except ImportError as exc:
             raise RuntimeError("Install asyncua to use OPC UA") from exc
-        async with Client(self.config.endpoint) as client:
-            values = {}
-            for metric, node_id in self.config.tag_map.items():
-                values[metric] = await client.get_node(node_id).read_value()
-            return values
+        client = Client(self.config.endpoint)
+        await client.connect()
+        self._client = client
+
+    async def close_async(self) -> None:
+        if self._client is not None:
+            try:
+                await self._client.disconnect()
+            finally:
+                self._client = None
+
+    async def read_async(self, tags: List[TagSpec]) -> Dict[str, Any]:
+        self.round_trips += 1
+        nodes = [self._client.get_node(tag.address) for tag in tags]
+        values = await self._client.read_values(nodes)
+        return {tag.name: value for tag, value in zip(tags, values)}
+
+    async def read_tags_async(self) -> Dict[str, Any]:
+        await self.connect_async()
+        try:
+            return await self.read_async(self.tags)
+        finally:
+            await self.close_async()
+
+    def read(self, tags: List[TagSpec]) -> Dict[str, Any]:
+        raise RuntimeError("Use read_async for OPC UA")
 
     def read_tags(self) -> Dict[str, Any]:
         raise RuntimeError("Use read_tags_async for OPC UA")
 
 
 class MqttConnector(BaseConnector):
-    def read_tags(self) -> Dict[str, Any]:
+    def read(self, tags: List[TagSpec]) -> Dict[str, Any]:
         raise RuntimeError("MQTT connector is event-driven; subscribe and forward messages to telemetry ingestion")
 
 
@@ -1,9 +1,56 @@
-import time
-import json
+"""
+Async edge gateway runtime.
+
+Collection and upload run as separate asyncio tasks so a slow or unreachable
+API never pushes the sampling cadence back:
+
+- the collector samples every device each GATEWAY_INTERVAL_SECONDS and writes
+  the cycle as one gzip-compressed batch to the on-disk outbox;
+- the forwarder drains the outbox oldest-first through one pooled HTTP/1.1
+  keep-alive client (POST /api/v1/telemetry/batch, Content-Encoding: gzip),
+  retrying failures with exponential backoff and full jitter.
+
+Batches survive gateway restarts and are forwarded once the API is back.
+
+With GATEWAY_CONNECTORS_FILE set (a JSON list of connector configs), the
+collector forwards what the PLC poll scheduler read since the last cycle
+instead of simulated devices. Unless GATEWAY_REPORT_BY_EXCEPTION=false, each
+cycle only carries values that changed past their deadband (plus heartbeats).
+GATEWAY_WAVEFORM_HZ > 0 makes simulated IMMs sample vibration at that rate;
+it is uploaded as 1 s window summaries with a raw burst when the peak
+exceeds GATEWAY_VIBRATION_TRIGGER.
+"""
+import asyncio
 import os
 import random
-import requests
+import time
+
+import httpx
+import numpy as np
+
+try:
+    from .outbox import Outbox
+    from .poller import PollScheduler, load_connector_configs
+    from .report_by_exception import ChangeFilter
+    from .waveforms import WaveformSpec, WindowAggregator
+except ImportError:  # run as a script: python gateway.py
+    from outbox import Outbox
+    from poller import PollScheduler, load_connector_configs
+    from report_by_exception import ChangeFilter
+    from waveforms import WaveformSpec, WindowAggregator
+
 API_URL = os.getenv("API_URL", "http://localhost:8000/api/v1/telemetry")
+API_BATCH_URL = os.getenv("API_BATCH_URL", API_URL.rstrip("/") + "/batch")
+GATEWAY_INTERVAL_SECONDS = float(os.getenv("GATEWAY_INTERVAL_SECONDS", "5"))
+GATEWAY_TIMEOUT_SECONDS = float(os.getenv("GATEWAY_TIMEOUT_SECONDS", "10"))
+GATEWAY_BACKOFF_BASE_SECONDS = float(os.getenv("GATEWAY_BACKOFF_BASE_SECONDS", "1"))
+GATEWAY_BACKOFF_MAX_SECONDS = float(os.getenv("GATEWAY_BACKOFF_MAX_SECONDS", "60"))
+GATEWAY_MAX_CONNECTIONS = int(os.getenv("GATEWAY_MAX_CONNECTIONS", "4"))
+GATEWAY_CONNECTORS_FILE = os.getenv("GATEWAY_CONNECTORS_FILE")
+GATEWAY_REPORT_SECONDS = float(os.getenv("GATEWAY_REPORT_SECONDS", "60"))
+GATEWAY_REPORT_BY_EXCEPTION = os.getenv("GATEWAY_REPORT_BY_EXCEPTION", "true").lower() == "true"
+GATEWAY_WAVEFORM_HZ = float(os.getenv("GATEWAY_WAVEFORM_HZ", "0"))
+GATEWAY_VIBRATION_TRIGGER = float(os.getenv("GATEWAY_VIBRATION_TRIGGER", "0.5"))
 DEVICES = []
 for i in range(1, 9):
     DEVICES.append({"id": f"IMM-{i:02d}", "type": "IMM", "state": "RUNNING"})
@@ -82,32 +129,238 @@ def generate_metrics(device):
             "model": PROCESS_MODELS.get(device_id, "UNKNOWN")
         }
     return metrics
-def main():
-    print(f"Starting Edge Gateway for {len(DEVICES)} devices...")
-    print("Batch mode enabled (sending every 5 seconds)")
-    while True:
-        batch_payload = []
-        current_time = time.strftime("%Y-%m-%dT%H:%M:%S")
-        for device in DEVICES:
-            metrics = generate_metrics(device)
-            batch_payload.append({
-                "device_id": device["id"],
-                "ts": current_time,
-                "metrics": metrics,
-                "meta": {"type": device["type"]}
-            })
+def collect_records(devices=DEVICES) -> list[dict]:
+    """One sampling cycle: a telemetry record per device, all sharing the cycle timestamp."""
+    current_time = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+    return [
+        {
+            "device_id": device["id"],
+            "ts": current_time,
+            "metrics": generate_metrics(device),
+            "meta": {"type": device["type"]},
+        }
+        for device in devices
+    ]
+
+
+class SimulatedWaveforms:
+    """Simulated high-rate IMM vibration, summarized per 1 s window instead of sent raw."""
+
+    def __init__(self, sample_rate_hz: float, trigger_peak: float = GATEWAY_VIBRATION_TRIGGER, devices=DEVICES):
+        self.spec = WaveformSpec(sample_rate_hz, 1000, "peak", trigger_peak)
+        self.aggregator = WindowAggregator()
+        self.devices = devices
+        self._rng = np.random.default_rng()
+        self._last = time.time()
+
+    def collect(self) -> list[dict]:
+        now = time.time()
+        count = int((now - self._last) * self.spec.sample_rate_hz)
+        start, self._last = now - count / self.spec.sample_rate_hz, now
+        records = collect_records(self.devices)
+        for record in records:
+            if record["meta"]["type"] != "IMM" or not count:
+                continue
+            record["metrics"].pop("vibration", None)
+            samples = self._rng.normal(0.1, 0.03, count)
+            if self._rng.random() < 0.05:  # occasional bearing knock
+                samples[self._rng.integers(count)] += 0.8
+            self.aggregator.add(record["device_id"], "vibration", samples, start, self.spec)
+        return records + self.aggregator.drain(now)
+
+
+class Backoff:
+    """Exponential backoff with full jitter: sleep uniform(0, min(cap, base * 2**attempt))."""
+
+    def __init__(self, base: float = GATEWAY_BACKOFF_BASE_SECONDS, cap: float = GATEWAY_BACKOFF_MAX_SECONDS):
+        self.base = base
+        self.cap = cap
+        self.attempt = 0
+
+    def next_delay(self) -> float:
+        delay = random.uniform(0, min(self.cap, self.base * 2 ** self.attempt))
+        self.attempt += 1
+        return delay
+
+    def reset(self) -> None:
+        self.attempt = 0
+
+
+class UploadError(RuntimeError):
+    """A batch upload that should be retried later."""
+
+    def __init__(self, message: str, retry_after: float | None = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class GatewayRuntime:
+    """Collector + store-and-forward uploader sharing one outbox and one HTTP client."""
+
+    def __init__(
+        self,
+        outbox: Outbox,
+        client: httpx.AsyncClient | None = None,
+        url: str = API_BATCH_URL,
+        interval: float = GATEWAY_INTERVAL_SECONDS,
+        backoff: Backoff | None = None,
+        collect=collect_records,
+        change_filter: ChangeFilter | None = None,
+    ):
+        self.outbox = outbox
+        self.client = client or httpx.AsyncClient(
+            timeout=GATEWAY_TIMEOUT_SECONDS,
+            limits=httpx.Limits(max_connections=GATEWAY_MAX_CONNECTIONS, max_keepalive_connections=GATEWAY_MAX_CONNECTIONS),
+        )
+        self.url = url
+        self.interval = interval
+        self.backoff = backoff or Backoff()
+        self.collect = collect
+        self.change_filter = change_filter
+        self._pending = asyncio.Event()
+        self.cycles = 0
+        self.sent_batches = 0
+        self.sent_records = 0
+        self.failed_uploads = 0
+        self.rejected_batches = 0
+        self.last_upload_ms = 0.0
+
+    async def run(self) -> None:
         try:
-            with requests.Session() as session:
-                for item in batch_payload:
-                    session.post(API_URL, json=item, timeout=2.0)
-            print(f"Sent batch of {len(batch_payload)} records at {current_time}")
-        except requests.exceptions.ConnectTimeout:
-            print(f"⚠️ Gateway timeout: API at {API_URL} did not respond in 2000ms")
-            # TODO: Implement exponential backoff retry strategy for production resilience
-        except requests.exceptions.ConnectionError:
-            print("❌ Network unreachable. Check API server status or Ethernet connection.")
-        except Exception as e:
-            print(f"Error sending batch: {e}")
-        time.sleep(5)
+            await asyncio.gather(self.collect_forever(), self.forward_forever())
+        finally:
+            await self.client.aclose()
+            self.outbox.close()
+
+    async def collect_forever(self) -> None:
+        """Sample on a fixed schedule; a slow cycle is not allowed to accumulate drift."""
+        next_tick = time.monotonic()
+        while True:
+            await self.collect_once()
+            next_tick += self.interval
+            delay = next_tick - time.monotonic()
+            if delay < 0:
+                next_tick = time.monotonic()
+                delay = 0
+            await asyncio.sleep(delay)
+
+    async def collect_once(self) -> None:
+        records = self.collect()
+        if self.change_filter is not None:
+            records = self.change_filter.filter(records)
+        await asyncio.to_thread(self.outbox.put, records)
+        self.cycles += 1
+        self._pending.set()
+
+    async def forward_forever(self) -> None:
+        while True:
+            if not await self.forward_once():
+                self._pending.clear()
+                if not self.outbox.depth:
+                    await self._pending.wait()
+
+    async def forward_once(self) -> bool:
+        """Upload the oldest queued batch; returns False when the outbox is empty."""
+        batches = await asyncio.to_thread(self.outbox.peek, 1)
+        if not batches:
+            return False
+        batch_id, count, body = batches[0]
+        try:
+            await self.upload(body)
+        except UploadError as e:
+            self.failed_uploads += 1
+            delay = max(self.backoff.next_delay(), e.retry_after or 0)
+            print(f"[WARN] Upload failed ({e}), {self.outbox.depth} records queued, retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
+            return True
+        except ValueError as e:
+            self.rejected_batches += 1
+            print(f"[WARN] API rejected batch {batch_id} ({count} records), dropping it: {e}")
+        else:
+            self.sent_batches += 1
+            self.sent_records += count
+        self.backoff.reset()
+        await asyncio.to_thread(self.outbox.ack, batch_id)
+        return True
+
+    async def upload(self, body: bytes) -> None:
+        """POST one compressed batch. Raises UploadError (retry) or ValueError (permanent reject)."""
+        started = time.perf_counter()
+        try:
+            response = await self.client.post(
+                self.url,
+                content=body,
+                headers={"Content-Type": "application/json", "Content-Encoding": "gzip"},
+            )
+        except httpx.HTTPError as e:
+            raise UploadError(f"{type(e).__name__}: {e}") from e
+        self.last_upload_ms = (time.perf_counter() - started) * 1000
+        if response.status_code < 300:
+            return
+        if response.status_code in (408, 429) or response.status_code >= 500:
+            retry_after = response.headers.get("retry-after")
+            raise UploadError(
+                f"HTTP {response.status_code}",
+                retry_after=float(retry_after) if retry_after and retry_after.isdigit() else None,
+            )
+        raise ValueError(f"HTTP {response.status_code}: {response.text[:200]}")
+
+    def metrics(self) -> dict:
+        return {
+            "cycles": self.cycles,
+            "sent_batches": self.sent_batches,
+            "sent_records": self.sent_records,
+            "failed_uploads": self.failed_uploads,
+            "rejected_batches": self.rejected_batches,
+            "last_upload_ms": round(self.last_upload_ms, 1),
+            "outbox": self.outbox.metrics(),
+            "report_by_exception": self.change_filter.metrics() if self.change_filter else None,
+        }
+
+
+async def serve(runtime: GatewayRuntime, scheduler: PollScheduler | None = None) -> None:
+    """Run the gateway (and the PLC poll scheduler) with a periodic status line."""
+
+    async def report():
+        while True:
+            await asyncio.sleep(GATEWAY_REPORT_SECONDS)
+            status = runtime.metrics()
+            line = (
+                f"[OK] Gateway sent {status['sent_records']} records in {status['sent_batches']} batches, "
+                f"{status['outbox']['depth_records']} queued"
+            )
+            if status["report_by_exception"]:
+                line += f", {status['report_by_exception']['suppressed_ratio']:.0%} of values unchanged"
+            if scheduler is not None:
+                failing = [name for name, device in scheduler.metrics()["devices"].items() if device["consecutive_errors"]]
+                line += f", {len(scheduler.devices) - len(failing)}/{len(scheduler.devices)} PLCs polling"
+                if failing:
+                    line += f" (failing: {', '.join(failing)})"
+            print(line)
+
+    tasks = [runtime.run(), report()]
+    if scheduler is not None:
+        tasks.append(scheduler.run())
+    await asyncio.gather(*tasks)
+
+
+def main():
+    scheduler = None
+    if GATEWAY_CONNECTORS_FILE:
+        scheduler = PollScheduler.from_configs(load_connector_configs(GATEWAY_CONNECTORS_FILE))
+        print(f"Starting Edge Gateway for {len(scheduler.devices)} PLC connectors ({scheduler.workers} poll workers)...")
+        change_filter = ChangeFilter.from_connectors(device.connector for device in scheduler.devices)
+        runtime = GatewayRuntime(Outbox(), collect=scheduler.drain, change_filter=change_filter if GATEWAY_REPORT_BY_EXCEPTION else None)
+    else:
+        print(f"Starting Edge Gateway for {len(DEVICES)} devices...")
+        collect = SimulatedWaveforms(GATEWAY_WAVEFORM_HZ).collect if GATEWAY_WAVEFORM_HZ > 0 else collect_records
+        runtime = GatewayRuntime(Outbox(), collect=collect, change_filter=ChangeFilter() if GATEWAY_REPORT_BY_EXCEPTION else None)
+    print(f"Sampling every {GATEWAY_INTERVAL_SECONDS:g}s, forwarding compressed batches to {API_BATCH_URL}")
+    try:
+        asyncio.run(serve(runtime, scheduler))
+    except KeyboardInterrupt:
+        pass
+
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,140 @@
+"""
+Store-and-forward outbox for the edge gateway.
+
+Every collected batch is written to a local SQLite file before it is
+uploaded, already gzip-compressed and ready to POST. The uploader drains it
+oldest-first and deletes a batch only after the API acknowledged it, so a
+network outage or gateway restart never loses data that made it to disk.
+
+Disk usage is capped at GATEWAY_OUTBOX_MAX_MB of payload: when a new batch
+would exceed it, the oldest batches are evicted (and counted) to make room,
+because on a long outage the most recent readings are the valuable ones.
+"""
+import gzip
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+GATEWAY_OUTBOX_PATH = os.getenv("GATEWAY_OUTBOX_PATH", str(Path(__file__).resolve().parent / "outbox.db"))
+GATEWAY_OUTBOX_MAX_BYTES = int(float(os.getenv("GATEWAY_OUTBOX_MAX_MB", "512")) * 1024 * 1024)
+
+
+def encode_batch(records: list[dict]) -> bytes:
+    """gzip-compressed JSON array, the body format of POST /api/v1/telemetry/batch."""
+    return gzip.compress(json.dumps(records, separators=(",", ":")).encode(), compresslevel=6)
+
+
+class Outbox:
+    """Durable FIFO of compressed telemetry batches backed by SQLite (WAL)."""
+
+    def __init__(self, path: str | Path = GATEWAY_OUTBOX_PATH, max_bytes: int = GATEWAY_OUTBOX_MAX_BYTES):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS outbox ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, created_at REAL NOT NULL, "
+            "records INTEGER NOT NULL, body BLOB NOT NULL)"
+        )
+        self._bytes, self._depth = self._conn.execute(
+            "SELECT COALESCE(SUM(LENGTH(body)), 0), COALESCE(SUM(records), 0) FROM outbox"
+        ).fetchone()
+        self.enqueued_batches = 0
+        self.acked_batches = 0
+        self.evicted_batches = 0
+        self.evicted_records = 0
+        if self._depth:
+            print(f"[OK] Gateway outbox has {self._depth} records to forward from a previous run")
+
+    @property
+    def depth(self) -> int:
+        """Records waiting to be forwarded."""
+        return self._depth
+
+    def put(self, records: list[dict]) -> int | None:
+        """Persist one batch; returns its id (None for an empty batch)."""
+        if not records:
+            return None
+        body = encode_batch(records)
+        if len(body) > self.max_bytes:
+            raise ValueError(f"Batch of {len(body)} bytes exceeds the outbox cap of {self.max_bytes} bytes")
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._evict(self._bytes + len(body) - self.max_bytes)
+                cursor = self._conn.execute(
+                    "INSERT INTO outbox (created_at, records, body) VALUES (?, ?, ?)",
+                    (time.time(), len(records), body),
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._bytes += len(body)
+            self._depth += len(records)
+            self.enqueued_batches += 1
+            return cursor.lastrowid
+
+    def peek(self, limit: int = 1) -> list[tuple[int, int, bytes]]:
+        """Oldest ``limit`` batches as (id, record_count, gzip_body)."""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT id, records, body FROM outbox ORDER BY id LIMIT ?", (limit,)
+            ).fetchall()
+
+    def ack(self, batch_id: int) -> None:
+        """Delete a batch the API accepted (or rejected permanently)."""
+        with self._lock:
+            row = self._conn.execute("SELECT records, LENGTH(body) FROM outbox WHERE id = ?", (batch_id,)).fetchone()
+            if row is None:
+                return
+            self._conn.execute("DELETE FROM outbox WHERE id = ?", (batch_id,))
+            self._depth -= row[0]
+            self._bytes -= row[1]
+            self.acked_batches += 1
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.execute("PRAGMA incremental_vacuum")
+            self._conn.close()
+
+    def metrics(self) -> dict:
+        return {
+            "path": str(self.path),
+            "depth_records": self._depth,
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "enqueued_batches": self.enqueued_batches,
+            "acked_batches": self.acked_batches,
+            "evicted_batches": self.evicted_batches,
+            "evicted_records": self.evicted_records,
+        }
+
+    def _evict(self, overflow: int) -> None:
+        """Drop the oldest batches until ``overflow`` bytes are freed (caller holds the lock)."""
+        if overflow <= 0:
+            return
+        freed = records = batches = 0
+        for batch_id, count, size in self._conn.execute(
+            "SELECT id, records, LENGTH(body) FROM outbox ORDER BY id"
+        ).fetchall():
+            if freed >= overflow:
+                break
+            self._conn.execute("DELETE FROM outbox WHERE id = ?", (batch_id,))
+            freed += size
+            records += count
+            batches += 1
+        self._bytes -= freed
+        self._depth -= records
+        self.evicted_batches += batches
+        self.evicted_records += records
+        self._conn.execute("PRAGMA incremental_vacuum")
+        print(f"[WARN] Gateway outbox full, evicted {records} oldest records ({batches} batches)")
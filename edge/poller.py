@@ -0,0 +1,244 @@
+"""
+Polling scheduler for PLC connectors.
+
+Each device (one ConnectorConfig / endpoint) gets a DevicePoller that keeps
+its connection open and reconnects with capped exponential backoff after a
+failure. Tags are grouped by their ``poll_ms`` so a 1 s cycle_time and a
+60 s counter are read on their own schedules; groups that fall due together
+are read in one call. The blocking protocol libraries run on a shared,
+bounded thread pool (EDGE_POLL_WORKERS), so many PLCs are polled in
+parallel without one thread per device; OPC UA connectors read on the event
+loop through their async client.
+
+Readings are buffered as telemetry records until the gateway collects them
+with ``drain()``. Waveform tags (a PLC sample buffer, see waveforms) are not
+forwarded raw: their samples go to a WindowAggregator, and ``drain()`` adds
+the summaries of windows that have closed. Give a waveform tag a poll_ms of
+samples / sample_rate_hz so consecutive buffer reads line up.
+"""
+import asyncio
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+try:
+    from .connectors import BaseConnector, ConnectorConfig, TagSpec, connector_for
+    from .waveforms import WindowAggregator
+except ImportError:  # run as a script: python gateway.py
+    from connectors import BaseConnector, ConnectorConfig, TagSpec, connector_for
+    from waveforms import WindowAggregator
+
+EDGE_POLL_WORKERS = int(os.getenv("EDGE_POLL_WORKERS", "16"))
+EDGE_RECONNECT_BASE_SECONDS = float(os.getenv("EDGE_RECONNECT_BASE_SECONDS", "1"))
+EDGE_RECONNECT_MAX_SECONDS = float(os.getenv("EDGE_RECONNECT_MAX_SECONDS", "60"))
+LATENCY_WINDOW = 256
+
+
+def load_connector_configs(path: str) -> list[ConnectorConfig]:
+    """Read a JSON list of connector configs (the shape served by GET /api/v1/connectors)."""
+    with open(path) as f:
+        items = json.load(f)
+    return [
+        ConnectorConfig(
+            name=item["name"],
+            protocol=item["protocol"],
+            endpoint=item["endpoint"],
+            tag_map=item.get("tag_map") or {},
+            device_id=item.get("device_id"),
+        )
+        for item in items
+    ]
+
+
+class DevicePoller:
+    """Per-tag-rate polling of one device over a persistent connection."""
+
+    def __init__(
+        self,
+        connector: BaseConnector,
+        pool: ThreadPoolExecutor,
+        emit,
+        reconnect_base: float = EDGE_RECONNECT_BASE_SECONDS,
+        reconnect_max: float = EDGE_RECONNECT_MAX_SECONDS,
+    ):
+        self.connector = connector
+        self.pool = pool
+        self.emit = emit
+        self.reconnect_base = reconnect_base
+        self.reconnect_max = reconnect_max
+        self.device_id = connector.config.device_id or connector.config.name
+        self.groups: dict[int, list[TagSpec]] = {}
+        for tag in connector.tags:
+            self.groups.setdefault(tag.poll_ms, []).append(tag)
+        self._async = hasattr(connector, "read_async")
+        self._latencies: deque[float] = deque(maxlen=LATENCY_WINDOW)
+        self.polls = 0
+        self.tags_read = 0
+        self.errors = 0
+        self.consecutive_errors = 0
+        self.connects = 0
+        self.late_polls = 0
+        self.last_error: str | None = None
+        self.last_poll_at: datetime | None = None
+
+    async def run(self) -> None:
+        if not self.groups:
+            return
+        next_due = {poll_ms: time.monotonic() for poll_ms in self.groups}
+        try:
+            while True:
+                now = time.monotonic()
+                wait = min(next_due.values()) - now
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                    now = time.monotonic()
+                due = [poll_ms for poll_ms, at in next_due.items() if at <= now]
+                for poll_ms in due:
+                    next_due[poll_ms] += poll_ms / 1000.0
+                    if next_due[poll_ms] <= now:
+                        # Missed at least one slot (slow read or reconnecting): skip ahead instead of bursting.
+                        self.late_polls += 1
+                        next_due[poll_ms] = now + poll_ms / 1000.0
+                tags = [tag for poll_ms in due for tag in self.groups[poll_ms]]
+                if not await self.poll(tags):
+                    await asyncio.sleep(self.reconnect_delay())
+        finally:
+            await self._disconnect()
+
+    async def poll(self, tags: list[TagSpec]) -> bool:
+        started = time.perf_counter()
+        try:
+            if self._async:
+                if not self.connector.connected:
+                    await self.connector.connect_async()
+                    self.connects += 1
+                values = await self.connector.read_async(tags)
+            else:
+                values = await asyncio.get_running_loop().run_in_executor(self.pool, self._read, tags)
+        except Exception as e:
+            self.errors += 1
+            self.consecutive_errors += 1
+            self.last_error = f"{type(e).__name__}: {e}"
+            if self.consecutive_errors == 1:
+                print(f"[WARN] Poll of {self.device_id} failed, reconnecting: {self.last_error}")
+            await self._disconnect()
+            return False
+        self._latencies.append((time.perf_counter() - started) * 1000)
+        self.polls += 1
+        self.tags_read += len(tags)
+        self.consecutive_errors = 0
+        self.last_poll_at = datetime.utcnow()
+        if values:
+            self.emit(self.device_id, values, self.connector.config.protocol)
+        return True
+
+    def reconnect_delay(self) -> float:
+        return min(self.reconnect_max, self.reconnect_base * 2 ** max(self.consecutive_errors - 1, 0))
+
+    def metrics(self) -> dict:
+        latencies = sorted(self._latencies)
+
+        def percentile(q: float) -> float | None:
+            return round(latencies[min(len(latencies) - 1, int(q * len(latencies)))], 2) if latencies else None
+
+        return {
+            "protocol": self.connector.config.protocol,
+            "endpoint": self.connector.config.endpoint,
+            "connected": self.connector.connected,
+            "tags": sum(len(tags) for tags in self.groups.values()),
+            "poll_rates_ms": sorted(self.groups),
+            "polls": self.polls,
+            "tags_read": self.tags_read,
+            "round_trips": self.connector.round_trips,
+            "tags_per_round_trip": round(self.tags_read / self.connector.round_trips, 1) if self.connector.round_trips else None,
+            "errors": self.errors,
+            "consecutive_errors": self.consecutive_errors,
+            "connects": self.connects,
+            "late_polls": self.late_polls,
+            "latency_ms": {"p50": percentile(0.5), "p95": percentile(0.95), "max": percentile(1.0)},
+            "last_error": self.last_error,
+            "last_poll_at": self.last_poll_at.isoformat() + "Z" if self.last_poll_at else None,
+        }
+
+    def _read(self, tags: list[TagSpec]) -> dict:
+        if not self.connector.connected:
+            self.connector.connect()
+            self.connects += 1
+        return self.connector.read(tags)
+
+    async def _disconnect(self) -> None:
+        try:
+            if self._async:
+                await self.connector.close_async()
+            else:
+                await asyncio.get_running_loop().run_in_executor(self.pool, self.connector.close)
+        except Exception as e:
+            print(f"[WARN] Closing connection to {self.device_id} failed: {e}")
+
+
+class PollScheduler:
+    """Runs a DevicePoller per connector on one bounded worker pool and buffers the readings."""
+
+    def __init__(self, connectors: list[BaseConnector], workers: int = EDGE_POLL_WORKERS, **poller_options):
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="edge-poll")
+        self.workers = workers
+        self.devices = [DevicePoller(connector, self.pool, self._emit, **poller_options) for connector in connectors]
+        self.aggregator = WindowAggregator()
+        self._waveforms = {
+            device.device_id: {tag.name: tag.waveform for tag in device.connector.tags if tag.waveform}
+            for device in self.devices
+        }
+        self._cycle_markers = {
+            device.device_id: [tag.name for tag in device.connector.tags if tag.cycle_marker]
+            for device in self.devices
+        }
+        self._marker_values: dict[tuple[str, str], object] = {}
+        self._records: list[dict] = []
+
+    @classmethod
+    def from_configs(cls, configs: list[ConnectorConfig], **options) -> "PollScheduler":
+        return cls([connector_for(config) for config in configs], **options)
+
+    async def run(self) -> None:
+        try:
+            await asyncio.gather(*(device.run() for device in self.devices))
+        finally:
+            self.pool.shutdown(wait=False, cancel_futures=True)
+
+    def drain(self) -> list[dict]:
+        """Hand over everything read since the last call (the gateway's collect step)."""
+        records, self._records = self._records, []
+        return records + self.aggregator.drain(time.time())
+
+    def metrics(self) -> dict:
+        return {
+            "workers": self.workers,
+            "buffered_records": len(self._records),
+            "waveforms": self.aggregator.metrics(),
+            "devices": {device.device_id: device.metrics() for device in self.devices},
+        }
+
+    def _emit(self, device_id: str, values: dict, protocol: str) -> None:
+        now = time.time()
+        for name, spec in self._waveforms.get(device_id, {}).items():
+            samples = values.pop(name, None)
+            if samples is not None:
+                samples = samples if isinstance(samples, list) else [samples]
+                self.aggregator.add(device_id, name, samples, now - len(samples) / spec.sample_rate_hz, spec)
+        for name in self._cycle_markers.get(device_id, ()):
+            if name in values:
+                previous = self._marker_values.get((device_id, name))
+                self._marker_values[(device_id, name)] = values[name]
+                if previous is not None and values[name] != previous:
+                    self.aggregator.end_cycle(device_id)
+        if not values:
+            return
+        self._records.append({
+            "device_id": device_id,
+            "ts": datetime.utcnow().isoformat(timespec="milliseconds") + "Z",
+            "metrics": values,
+            "meta": {"protocol": protocol},
+        })
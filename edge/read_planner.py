@@ -0,0 +1,201 @@
+"""
+Block-read planning and typed decoding for register-based PLC protocols.
+
+Instead of one request per tag, the planner parses every tag address, groups
+tags by device area (D, M, X... for MC protocol; holding/input registers,
+coils, discrete inputs for Modbus), sorts them by offset and merges nearby
+tags into as few block reads as the protocol frame allows. Gaps of up to
+EDGE_READ_MAX_GAP unused words/bits are read through rather than starting a
+new request. Values are then decoded out of the block by tag type:
+
+    int16 / uint16 / int32 / uint32 / float32 / bit / string
+
+32-bit types span two words; ``word_order`` says which comes first ("low" =
+low word at the lower address, Mitsubishi's layout; "high" = Modbus's usual
+big-endian layout). A bit can address a bit device (``M10``, ``CO5``) or a
+bit inside a word (``D100.3``, ``HR40.0``). Strings take ``length`` bytes.
+A numeric tag with ``samples`` > 1 reads that many consecutive values (a PLC
+sample buffer) and decodes to a list.
+"""
+import os
+import re
+import struct
+from dataclasses import dataclass, field
+
+EDGE_READ_MAX_GAP = int(os.getenv("EDGE_READ_MAX_GAP", "8"))
+
+TYPE_WORDS = {"int16": 1, "uint16": 1, "int32": 2, "uint32": 2, "float32": 2, "bit": 1}
+WORD_ORDERS = ("low", "high")
+
+
+@dataclass(frozen=True)
+class Address:
+    area: str
+    offset: int
+    bit: int | None = None
+
+
+@dataclass(frozen=True)
+class ProtocolProfile:
+    name: str
+    word_areas: frozenset
+    bit_areas: frozenset
+    hex_areas: frozenset
+    max_words: int
+    max_bits: int
+    default_area: str | None
+    word_order: str
+    string_byte_order: str  # "<" low byte first, ">" high byte first
+
+
+MC_PROTOCOL = ProtocolProfile(
+    name="mitsubishi_mc",
+    word_areas=frozenset({"D", "W", "R", "ZR", "SD", "SW", "TN", "CN"}),
+    bit_areas=frozenset({"M", "X", "Y", "B", "L", "F", "SM", "SB"}),
+    hex_areas=frozenset({"X", "Y", "B", "W", "SB", "SW"}),
+    max_words=960,
+    max_bits=7168,
+    default_area=None,
+    word_order="low",
+    string_byte_order="<",
+)
+
+MODBUS = ProtocolProfile(
+    name="modbus_tcp",
+    word_areas=frozenset({"HR", "IR"}),
+    bit_areas=frozenset({"CO", "DI"}),
+    hex_areas=frozenset(),
+    max_words=125,
+    max_bits=2000,
+    default_area="HR",
+    word_order="high",
+    string_byte_order=">",
+)
+
+_ADDRESS = re.compile(r"^([A-Z]*)([0-9A-F]+)(?:\.([0-9A-F]))?$")
+
+
+def parse_address(address: str, profile: ProtocolProfile) -> Address:
+    """``D100`` / ``X1F`` / ``D100.3`` / ``HR40`` / ``40`` (bare = default area) → Address."""
+    match = _ADDRESS.match(str(address).strip().upper())
+    if not match:
+        raise ValueError(f"Invalid {profile.name} address: {address!r}")
+    area, number, bit = match.groups()
+    area = area or profile.default_area
+    if area not in profile.word_areas and area not in profile.bit_areas:
+        # Greedy letters may have swallowed hex digits (e.g. "XA0" for X0A0); retry with shorter prefixes.
+        for cut in range(len(area or "") - 1, 0, -1):
+            if area[:cut] in profile.hex_areas:
+                area, number = area[:cut], area[cut:] + number
+                break
+        else:
+            raise ValueError(f"Unknown {profile.name} device area in {address!r}")
+    try:
+        offset = int(number, 16 if area in profile.hex_areas else 10)
+    except ValueError as exc:
+        raise ValueError(f"Invalid {profile.name} address: {address!r}") from exc
+    if bit is not None:
+        if area in profile.bit_areas:
+            raise ValueError(f"{address!r} is already a bit device")
+        bit = int(bit, 16)
+    return Address(area, offset, bit)
+
+
+def format_address(area: str, offset: int, profile: ProtocolProfile) -> str:
+    return f"{area}{offset:X}" if area in profile.hex_areas else f"{area}{offset}"
+
+
+@dataclass
+class PlannedTag:
+    tag: object  # connectors.TagSpec
+    address: Address
+    width: int
+
+
+@dataclass
+class BlockRead:
+    area: str
+    start: int
+    count: int
+    bits: bool
+    tags: list[PlannedTag] = field(default_factory=list)
+
+    def head(self, profile: ProtocolProfile) -> str:
+        return format_address(self.area, self.start, profile)
+
+
+def tag_width(tag, address: Address, profile: ProtocolProfile) -> int:
+    """Words (or bits, for bit areas) a tag occupies."""
+    if address.area in profile.bit_areas:
+        if tag.dtype != "bit":
+            raise ValueError(f"Tag {tag.name!r} reads bit device {address.area}; its type must be bit")
+        return 1
+    if address.bit is not None and tag.dtype != "bit":
+        raise ValueError(f"Tag {tag.name!r} addresses a single bit; its type must be bit")
+    if tag.dtype == "string":
+        return max(1, (tag.length + 1) // 2)
+    return TYPE_WORDS[tag.dtype] * tag.samples
+
+
+def plan_reads(tags: list, profile: ProtocolProfile, max_gap: int = EDGE_READ_MAX_GAP) -> list[BlockRead]:
+    """Merge tags into the fewest block reads allowed by ``max_gap`` and the protocol frame size."""
+    by_area: dict[str, list[PlannedTag]] = {}
+    for tag in tags:
+        address = parse_address(tag.address, profile)
+        by_area.setdefault(address.area, []).append(PlannedTag(tag, address, tag_width(tag, address, profile)))
+
+    blocks = []
+    for area in sorted(by_area):
+        bits = area in profile.bit_areas
+        frame = profile.max_bits if bits else profile.max_words
+        block = None
+        for planned in sorted(by_area[area], key=lambda p: (p.address.offset, p.address.bit or 0)):
+            if planned.width > frame:
+                raise ValueError(f"Tag {planned.tag.name!r} is larger than one {profile.name} frame ({frame})")
+            offset, end = planned.address.offset, planned.address.offset + planned.width
+            if block is not None:
+                block_end = block.start + block.count
+                if offset - block_end <= max_gap and max(end, block_end) - block.start <= frame:
+                    block.count = max(end, block_end) - block.start
+                    block.tags.append(planned)
+                    continue
+            block = BlockRead(area, offset, planned.width, bits, [planned])
+            blocks.append(block)
+    return blocks
+
+
+def decode_block(block: BlockRead, values: list, profile: ProtocolProfile) -> dict:
+    """Pull each tag's typed value out of a block read result (words or bits, in address order)."""
+    decoded = {}
+    for planned in block.tags:
+        tag, address = planned.tag, planned.address
+        index = address.offset - block.start
+        if block.bits:
+            decoded[tag.name] = bool(values[index])
+            continue
+        words = [int(word) & 0xFFFF for word in values[index:index + planned.width]]
+        if tag.samples > 1:
+            step = TYPE_WORDS[tag.dtype]
+            decoded[tag.name] = [
+                _decode_words(tag, address, words[offset:offset + step], profile)
+                for offset in range(0, len(words), step)
+            ]
+        else:
+            decoded[tag.name] = _decode_words(tag, address, words, profile)
+    return decoded
+
+
+def _decode_words(tag, address: Address, words: list[int], profile: ProtocolProfile):
+    if tag.dtype == "bit":
+        return bool((words[0] >> (address.bit or 0)) & 1)
+    if tag.dtype == "int16":
+        return struct.unpack(">h", struct.pack(">H", words[0]))[0]
+    if tag.dtype == "uint16":
+        return words[0]
+    if tag.dtype == "string":
+        raw = b"".join(struct.pack(f"{profile.string_byte_order}H", word) for word in words)[:tag.length]
+        return raw.split(b"\x00", 1)[0].decode("ascii", errors="replace").strip()
+    word_order = tag.word_order or profile.word_order
+    ordered = words if word_order == "high" else list(reversed(words))
+    fmt = {"int32": ">i", "uint32": ">I", "float32": ">f"}[tag.dtype]
+    return struct.unpack(fmt, struct.pack(">HH", *ordered))[0]
@@ -0,0 +1,119 @@
+"""
+Report-by-exception filtering for edge telemetry.
+
+Only values that moved past their deadband since the value last sent
+upstream are forwarded; an unchanged value is re-sent once per
+``max_silence_ms`` as a heartbeat so the API (and anyone watching) can tell
+"unchanged" from "gateway gone". The API merges partial records into the
+device's latest state, so metrics left out of a record keep their last
+value there.
+
+Rules come from the tag map::
+
+    "mold_temp":  {"address": "D110", "deadband": 0.5}          # absolute units
+    "pressure":   {"address": "D112", "deadband_pct": 2}        # % of last sent value
+    "shot_count": {"address": "D200", "max_silence_ms": 300000}
+
+Tags without settings (and simulated devices) use EDGE_DEADBAND,
+EDGE_DEADBAND_PCT and EDGE_MAX_SILENCE_MS. Deadbands compare against the
+last *sent* value, so slow drift is still reported once it adds up.
+"""
+import math
+import os
+from dataclasses import dataclass
+from datetime import datetime
+
+EDGE_DEADBAND = float(os.getenv("EDGE_DEADBAND", "0"))
+EDGE_DEADBAND_PCT = float(os.getenv("EDGE_DEADBAND_PCT", "0"))
+EDGE_MAX_SILENCE_MS = int(os.getenv("EDGE_MAX_SILENCE_MS", "60000"))
+
+
+def _is_number(value) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+@dataclass(frozen=True)
+class ChangeRule:
+    deadband: float = EDGE_DEADBAND
+    deadband_pct: float = EDGE_DEADBAND_PCT
+    max_silence_ms: int = EDGE_MAX_SILENCE_MS
+
+    @classmethod
+    def for_tag(cls, tag) -> "ChangeRule":
+        return cls(
+            EDGE_DEADBAND if tag.deadband is None else tag.deadband,
+            EDGE_DEADBAND_PCT if tag.deadband_pct is None else tag.deadband_pct,
+            EDGE_MAX_SILENCE_MS if tag.max_silence_ms is None else tag.max_silence_ms,
+        )
+
+    def changed(self, previous, value) -> bool:
+        if _is_number(previous) and _is_number(value):
+            if math.isnan(previous) or math.isnan(value):
+                return math.isnan(previous) != math.isnan(value)
+            threshold = max(self.deadband, abs(previous) * self.deadband_pct / 100.0)
+            return abs(value - previous) > threshold if threshold > 0 else value != previous
+        if isinstance(previous, list) and isinstance(value, list) and len(previous) == len(value):
+            return any(self.changed(old, new) for old, new in zip(previous, value))
+        return value != previous
+
+
+DEFAULT_RULE = ChangeRule()
+
+
+class ChangeFilter:
+    """Drops unchanged values from telemetry records, per (device, metric)."""
+
+    def __init__(self, rules: dict[str, dict[str, ChangeRule]] | None = None, default: ChangeRule = DEFAULT_RULE):
+        self.rules = rules or {}
+        self.default = default
+        self._sent: dict[tuple[str, str], tuple[object, float]] = {}
+        self.values_in = 0
+        self.values_out = 0
+        self.heartbeats = 0
+
+    @classmethod
+    def from_connectors(cls, connectors, default: ChangeRule = DEFAULT_RULE) -> "ChangeFilter":
+        return cls(
+            {
+                connector.config.device_id or connector.config.name: {tag.name: ChangeRule.for_tag(tag) for tag in connector.tags}
+                for connector in connectors
+            },
+            default,
+        )
+
+    def rule(self, device_id: str, metric: str) -> ChangeRule:
+        return self.rules.get(device_id, {}).get(metric, self.default)
+
+    def filter_values(self, device_id: str, values: dict, at: float) -> dict:
+        """The subset of ``values`` to send at epoch time ``at``; remembers what was sent."""
+        changed = {}
+        for metric, value in values.items():
+            self.values_in += 1
+            rule = self.rule(device_id, metric)
+            last = self._sent.get((device_id, metric))
+            if last is not None and not rule.changed(last[0], value):
+                if rule.max_silence_ms <= 0 or (at - last[1]) * 1000 < rule.max_silence_ms:
+                    continue
+                self.heartbeats += 1
+            self._sent[(device_id, metric)] = (value, at)
+            changed[metric] = value
+        self.values_out += len(changed)
+        return changed
+
+    def filter(self, records: list[dict]) -> list[dict]:
+        """Filter a batch of telemetry records in order; records left with no metrics are dropped."""
+        kept = []
+        for record in records:
+            at = datetime.fromisoformat(record["ts"].replace("Z", "+00:00")).timestamp()
+            metrics = self.filter_values(record["device_id"], record.get("metrics") or {}, at)
+            if metrics:
+                kept.append({**record, "metrics": metrics})
+        return kept
+
+    def metrics(self) -> dict:
+        return {
+            "values_in": self.values_in,
+            "values_out": self.values_out,
+            "heartbeats": self.heartbeats,
+            "suppressed_ratio": round(1 - self.values_out / self.values_in, 3) if self.values_in else 0.0,
+        }
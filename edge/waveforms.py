@@ -0,0 +1,176 @@
+"""
+Windowed summaries for high-rate signals (vibration, injection pressure...).
+
+Signals sampled at 100 Hz-1 kHz are far too dense to ship sample by sample.
+WindowAggregator collects them per (device, signal) and, when a window
+closes, reduces it with NumPy to one summary:
+
+    count, mean, min, max, rms, peak (max |x|), std, p50, p95, p99
+
+Windows are either fixed-length (``window_ms``, aligned to the wall clock)
+or one machine cycle (``window_ms`` = None, closed by ``end_cycle``). The
+summary is uploaded as a dict-valued metric, which the API stores as
+``{signal}`` (the mean) plus ``{signal}.{stat}``. When a window's trigger
+fires (e.g. peak above a limit) the raw samples of that window go up too,
+as the ``{signal}.raw`` array.
+
+Tag map configuration (PLC buffer read as an array of ``samples`` values)::
+
+    "vibration": {"address": "D2000", "samples": 1000,
+                  "waveform": {"sample_rate_hz": 1000, "window_ms": 1000,
+                               "trigger": {"stat": "peak", "above": 800}}}
+"""
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+
+import numpy as np
+
+STATS = ("count", "mean", "min", "max", "rms", "peak", "std", "p50", "p95", "p99")
+PERCENTILES = (50, 95, 99)
+
+
+@dataclass(frozen=True)
+class WaveformSpec:
+    sample_rate_hz: float
+    window_ms: int | None = 1000
+    trigger_stat: str | None = None
+    trigger_above: float | None = None
+    trigger_below: float | None = None
+
+    @classmethod
+    def parse(cls, name: str, entry: dict) -> "WaveformSpec":
+        rate = float(entry.get("sample_rate_hz", 0))
+        if rate <= 0:
+            raise ValueError(f"Waveform tag {name!r} needs a positive sample_rate_hz")
+        window = entry.get("window_ms", 1000)
+        if window == "cycle":
+            window = None
+        elif int(window) <= 0:
+            raise ValueError(f"Waveform tag {name!r} window_ms must be positive or 'cycle'")
+        trigger = entry.get("trigger") or {}
+        stat = trigger.get("stat")
+        if trigger and (stat not in STATS or ("above" not in trigger and "below" not in trigger)):
+            raise ValueError(f"Waveform tag {name!r} trigger needs a stat from {STATS} and above/below")
+        return cls(
+            rate,
+            None if window is None else int(window),
+            stat,
+            float(trigger["above"]) if "above" in trigger else None,
+            float(trigger["below"]) if "below" in trigger else None,
+        )
+
+    def fires(self, summary: dict) -> bool:
+        if self.trigger_stat is None:
+            return False
+        value = summary[self.trigger_stat]
+        return (self.trigger_above is not None and value > self.trigger_above) or (
+            self.trigger_below is not None and value < self.trigger_below
+        )
+
+
+def summarize(samples: np.ndarray) -> dict:
+    """Reduce one window of samples to its summary stats."""
+    values = np.asarray(samples, dtype=np.float64)
+    p50, p95, p99 = np.percentile(values, PERCENTILES)
+    return {
+        "count": int(values.size),
+        "mean": float(values.mean()),
+        "min": float(values.min()),
+        "max": float(values.max()),
+        "rms": float(np.sqrt(np.mean(np.square(values)))),
+        "peak": float(np.abs(values).max()),
+        "std": float(values.std()),
+        "p50": float(p50),
+        "p95": float(p95),
+        "p99": float(p99),
+    }
+
+
+@dataclass
+class _Window:
+    spec: WaveformSpec
+    start: float | None = None  # epoch seconds: window boundary, or first sample of a cycle
+    window_id: int | None = None
+    chunks: list = field(default_factory=list)
+
+
+class WindowAggregator:
+    """Buffers high-rate samples and emits per-window summary records."""
+
+    def __init__(self):
+        self._windows: dict[tuple[str, str], _Window] = {}
+        self._closed: dict[tuple[str, float], dict] = {}
+        self.samples_in = 0
+        self.windows_closed = 0
+        self.bursts = 0
+
+    def add(self, device_id: str, signal: str, samples, start: float, spec: WaveformSpec) -> None:
+        """Append samples taken at ``spec.sample_rate_hz`` starting at epoch ``start``."""
+        values = np.asarray(samples, dtype=np.float64).ravel()
+        if not values.size:
+            return
+        self.samples_in += values.size
+        window = self._windows.setdefault((device_id, signal), _Window(spec))
+        if spec.window_ms is None:
+            if window.start is None:
+                window.start = start
+            window.chunks.append(values)
+            return
+        length = spec.window_ms / 1000.0
+        times = start + np.arange(values.size) / spec.sample_rate_hz
+        ids = np.floor(times / length).astype(np.int64)
+        cuts = np.flatnonzero(np.diff(ids)) + 1
+        for chunk_ids, chunk in zip(np.split(ids, cuts), np.split(values, cuts)):
+            window_id = int(chunk_ids[0])
+            if window.window_id is not None and window_id != window.window_id:
+                self._close(device_id, signal, window)
+            if window.window_id is None:
+                window.window_id = window_id
+                window.start = window_id * length
+            window.chunks.append(chunk)
+
+    def end_cycle(self, device_id: str) -> None:
+        """Close the per-cycle windows of a device (a machine cycle just finished)."""
+        for (window_device, signal), window in self._windows.items():
+            if window_device == device_id and window.spec.window_ms is None:
+                self._close(device_id, signal, window)
+
+    def drain(self, now: float | None = None) -> list[dict]:
+        """Close time windows that ended before ``now`` and return all finished summary records."""
+        if now is not None:
+            for (device_id, signal), window in self._windows.items():
+                if window.spec.window_ms is not None and window.window_id is not None:
+                    if (window.window_id + 1) * window.spec.window_ms / 1000.0 <= now:
+                        self._close(device_id, signal, window)
+        records, self._closed = list(self._closed.values()), {}
+        return records
+
+    def metrics(self) -> dict:
+        return {
+            "signals": len(self._windows),
+            "samples_in": self.samples_in,
+            "windows_closed": self.windows_closed,
+            "bursts": self.bursts,
+        }
+
+    def _close(self, device_id: str, signal: str, window: _Window) -> None:
+        if not window.chunks:
+            return
+        samples = np.concatenate(window.chunks)
+        summary = summarize(samples)
+        duration_ms = window.spec.window_ms or round(samples.size * 1000 / window.spec.sample_rate_hz)
+        record = self._closed.setdefault((device_id, window.start), {
+            "device_id": device_id,
+            "ts": datetime.fromtimestamp(window.start, timezone.utc).isoformat(timespec="milliseconds").replace("+00:00", "Z"),
+            "metrics": {},
+            "meta": {"window_ms": duration_ms, "sample_rate_hz": window.spec.sample_rate_hz},
+        })
+        record["metrics"][signal] = summary
+        if window.spec.fires(summary):
+            record["metrics"][f"{signal}.raw"] = samples.astype(np.float32).tolist()
+            record["meta"]["trigger"] = f"{signal}.{window.spec.trigger_stat}"
+            self.bursts += 1
+        self.windows_closed += 1
+        window.chunks = []
+        window.window_id = None
+        window.start = None
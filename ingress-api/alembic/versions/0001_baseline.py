@@ -0,0 +1,309 @@
+"""Baseline schema (tables as created by models.Base.metadata.create_all()).
+
+Databases that were created by create_all() before migrations existed should
+be stamped instead of upgraded: ``alembic stamp 0001``.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18 15:43:56.221019
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001'
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('alert_rules',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=150), nullable=False),
+    sa.Column('metric_name', sa.String(length=100), nullable=False),
+    sa.Column('condition', sa.String(length=20), nullable=False),
+    sa.Column('threshold', sa.Float(), nullable=False),
+    sa.Column('severity', sa.String(length=20), nullable=True),
+    sa.Column('escalation_minutes', sa.Integer(), nullable=True),
+    sa.Column('target_role', sa.String(length=50), nullable=True),
+    sa.Column('channels', sa.JSON(), nullable=True),
+    sa.Column('active', sa.Boolean(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('name')
+    )
+    op.create_table('companies',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=150), nullable=False),
+    sa.Column('active', sa.Boolean(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('name')
+    )
+    op.create_table('connector_configs',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=150), nullable=False),
+    sa.Column('protocol', sa.String(length=50), nullable=False),
+    sa.Column('endpoint', sa.String(length=255), nullable=False),
+    sa.Column('tag_map', sa.JSON(), nullable=True),
+    sa.Column('active', sa.Boolean(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('name')
+    )
+    op.create_table('mold_models',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('model_code', sa.String(length=80), nullable=False),
+    sa.Column('part_name', sa.String(length=150), nullable=False),
+    sa.Column('customer', sa.String(length=150), nullable=True),
+    sa.Column('standard_cycle_time', sa.Float(), nullable=False),
+    sa.Column('cavity_count', sa.Integer(), nullable=True),
+    sa.Column('shot_count', sa.Integer(), nullable=True),
+    sa.Column('active', sa.Boolean(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('model_code')
+    )
+    op.create_table('processes',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=150), nullable=False),
+    sa.Column('code', sa.String(length=50), nullable=False),
+    sa.Column('description', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('code'),
+    sa.UniqueConstraint('name')
+    )
+    op.create_table('telemetry_rollups',
+    sa.Column('bucket_width', sa.String(length=4), nullable=False),
+    sa.Column('equipment_id', sa.String(length=50), nullable=False),
+    sa.Column('metric_name', sa.String(length=100), nullable=False),
+    sa.Column('bucket', sa.DateTime(), nullable=False),
+    sa.Column('sample_count', sa.Integer(), nullable=False),
+    sa.Column('value_sum', sa.Float(), nullable=False),
+    sa.Column('value_sum_sq', sa.Float(), nullable=False),
+    sa.Column('value_min', sa.Float(), nullable=True),
+    sa.Column('value_max', sa.Float(), nullable=True),
+    sa.Column('value_last', sa.Float(), nullable=True),
+    sa.Column('last_time', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('bucket_width', 'equipment_id', 'metric_name', 'bucket')
+    )
+    op.create_index('ix_telemetry_rollups_width_metric_bucket', 'telemetry_rollups', ['bucket_width', 'metric_name', 'bucket'], unique=False)
+    op.create_table('users',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('username', sa.String(length=100), nullable=False),
+    sa.Column('email', sa.String(length=255), nullable=False),
+    sa.Column('password_hash', sa.String(length=255), nullable=False),
+    sa.Column('role', sa.String(length=50), nullable=False),
+    sa.Column('active', sa.Boolean(), nullable=True),
+    sa.Column('session_timeout_minutes', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('last_login', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('email'),
+    sa.UniqueConstraint('username')
+    )
+    op.create_table('audit_log',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.Column('action', sa.String(length=100), nullable=False),
+    sa.Column('resource', sa.String(length=100), nullable=True),
+    sa.Column('details', sa.JSON(), nullable=True),
+    sa.Column('ip_address', sa.String(length=50), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_audit_log_created_at'), 'audit_log', ['created_at'], unique=False)
+    op.create_table('plants',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('company_id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=150), nullable=False),
+    sa.Column('code', sa.String(length=50), nullable=False),
+    sa.Column('timezone', sa.String(length=80), nullable=True),
+    sa.Column('active', sa.Boolean(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['company_id'], ['companies.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('code')
+    )
+    op.create_table('lines',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('plant_id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=150), nullable=False),
+    sa.Column('code', sa.String(length=50), nullable=False),
+    sa.Column('active', sa.Boolean(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['plant_id'], ['plants.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('code')
+    )
+    op.create_table('shift_calendars',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('plant_id', sa.Integer(), nullable=False),
+    sa.Column('shift_name', sa.String(length=50), nullable=False),
+    sa.Column('starts_at', sa.String(length=5), nullable=False),
+    sa.Column('ends_at', sa.String(length=5), nullable=False),
+    sa.Column('planned_downtime_minutes', sa.Integer(), nullable=True),
+    sa.Column('active', sa.Boolean(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['plant_id'], ['plants.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('cells',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('line_id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=150), nullable=False),
+    sa.Column('code', sa.String(length=50), nullable=False),
+    sa.Column('active', sa.Boolean(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['line_id'], ['lines.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('code')
+    )
+    op.create_table('equipment',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('cell_id', sa.Integer(), nullable=True),
+    sa.Column('process_id', sa.Integer(), nullable=True),
+    sa.Column('mold_model_id', sa.Integer(), nullable=True),
+    sa.Column('equipment_id', sa.String(length=50), nullable=False),
+    sa.Column('equipment_type', sa.String(length=50), nullable=False),
+    sa.Column('description', sa.Text(), nullable=True),
+    sa.Column('location', sa.String(length=100), nullable=True),
+    sa.Column('plc_protocol', sa.String(length=50), nullable=True),
+    sa.Column('plc_address', sa.String(length=150), nullable=True),
+    sa.Column('cycle_time_standard', sa.Float(), nullable=True),
+    sa.Column('target_per_hour', sa.Integer(), nullable=True),
+    sa.Column('installation_date', sa.DateTime(), nullable=True),
+    sa.Column('active', sa.Boolean(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['cell_id'], ['cells.id'], ),
+    sa.ForeignKeyConstraint(['mold_model_id'], ['mold_models.id'], ),
+    sa.ForeignKeyConstraint(['process_id'], ['processes.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_equipment_equipment_id'), 'equipment', ['equipment_id'], unique=True)
+    op.create_table('alerts',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('equipment_id', sa.String(length=50), nullable=False),
+    sa.Column('alert_type', sa.String(length=50), nullable=False),
+    sa.Column('severity', sa.String(length=20), nullable=False),
+    sa.Column('message', sa.Text(), nullable=False),
+    sa.Column('acknowledged', sa.Boolean(), nullable=True),
+    sa.Column('acknowledged_by', sa.Integer(), nullable=True),
+    sa.Column('acknowledged_at', sa.DateTime(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['acknowledged_by'], ['users.id'], ),
+    sa.ForeignKeyConstraint(['equipment_id'], ['equipment.equipment_id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_alerts_created_at'), 'alerts', ['created_at'], unique=False)
+    op.create_table('downtime_events',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('equipment_id', sa.String(length=50), nullable=False),
+    sa.Column('reason_code', sa.String(length=80), nullable=False),
+    sa.Column('category', sa.String(length=80), nullable=False),
+    sa.Column('started_at', sa.DateTime(), nullable=False),
+    sa.Column('ended_at', sa.DateTime(), nullable=True),
+    sa.Column('minutes', sa.Float(), nullable=True),
+    sa.Column('comment', sa.Text(), nullable=True),
+    sa.Column('acknowledged_by', sa.Integer(), nullable=True),
+    sa.Column('resolved_by', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['acknowledged_by'], ['users.id'], ),
+    sa.ForeignKeyConstraint(['equipment_id'], ['equipment.equipment_id'], ),
+    sa.ForeignKeyConstraint(['resolved_by'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_downtime_events_created_at'), 'downtime_events', ['created_at'], unique=False)
+    op.create_table('target_standards',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('equipment_id', sa.String(length=50), nullable=False),
+    sa.Column('shift_name', sa.String(length=50), nullable=False),
+    sa.Column('target_parts', sa.Integer(), nullable=False),
+    sa.Column('standard_cycle_time', sa.Float(), nullable=False),
+    sa.Column('quality_target', sa.Float(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['equipment_id'], ['equipment.equipment_id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('telemetry',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('time', sa.DateTime(), nullable=False),
+    sa.Column('equipment_id', sa.String(length=50), nullable=False),
+    sa.Column('metric_name', sa.String(length=100), nullable=False),
+    sa.Column('metric_value', sa.Float(), nullable=True),
+    sa.Column('unit', sa.String(length=20), nullable=True),
+    sa.Column('status', sa.String(length=20), nullable=True),
+    sa.ForeignKeyConstraint(['equipment_id'], ['equipment.equipment_id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_telemetry_equipment_id'), 'telemetry', ['equipment_id'], unique=False)
+    op.create_index(op.f('ix_telemetry_metric_name'), 'telemetry', ['metric_name'], unique=False)
+    op.create_index(op.f('ix_telemetry_time'), 'telemetry', ['time'], unique=False)
+    op.create_table('telemetry_arrays',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('time', sa.DateTime(), nullable=False),
+    sa.Column('equipment_id', sa.String(length=50), nullable=False),
+    sa.Column('array_name', sa.String(length=100), nullable=False),
+    sa.Column('length', sa.Integer(), nullable=False),
+    sa.Column('array_values', sa.LargeBinary(), nullable=False),
+    sa.ForeignKeyConstraint(['equipment_id'], ['equipment.equipment_id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_telemetry_arrays_equipment_name_time', 'telemetry_arrays', ['equipment_id', 'array_name', 'time'], unique=False)
+    op.create_index('ix_telemetry_arrays_name_time', 'telemetry_arrays', ['array_name', 'time'], unique=False)
+    op.create_table('telemetry_samples',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('time', sa.DateTime(), nullable=False),
+    sa.Column('equipment_id', sa.String(length=50), nullable=False),
+    sa.Column('metric_schema', sa.String(length=50), nullable=True),
+    sa.Column('status', sa.String(length=20), nullable=True),
+    sa.Column('metric_values', sa.LargeBinary(), nullable=True),
+    sa.Column('extra', sa.JSON(), nullable=True),
+    sa.ForeignKeyConstraint(['equipment_id'], ['equipment.equipment_id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_telemetry_samples_equipment_time', 'telemetry_samples', ['equipment_id', 'time'], unique=False)
+    op.create_index('ix_telemetry_samples_time', 'telemetry_samples', ['time'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_telemetry_samples_time', table_name='telemetry_samples')
+    op.drop_index('ix_telemetry_samples_equipment_time', table_name='telemetry_samples')
+    op.drop_table('telemetry_samples')
+    op.drop_index('ix_telemetry_arrays_name_time', table_name='telemetry_arrays')
+    op.drop_index('ix_telemetry_arrays_equipment_name_time', table_name='telemetry_arrays')
+    op.drop_table('telemetry_arrays')
+    op.drop_index(op.f('ix_telemetry_time'), table_name='telemetry')
+    op.drop_index(op.f('ix_telemetry_metric_name'), table_name='telemetry')
+    op.drop_index(op.f('ix_telemetry_equipment_id'), table_name='telemetry')
+    op.drop_table('telemetry')
+    op.drop_table('target_standards')
+    op.drop_index(op.f('ix_downtime_events_created_at'), table_name='downtime_events')
+    op.drop_table('downtime_events')
+    op.drop_index(op.f('ix_alerts_created_at'), table_name='alerts')
+    op.drop_table('alerts')
+    op.drop_index(op.f('ix_equipment_equipment_id'), table_name='equipment')
+    op.drop_table('equipment')
+    op.drop_table('cells')
+    op.drop_table('shift_calendars')
+    op.drop_table('lines')
+    op.drop_table('plants')
+    op.drop_index(op.f('ix_audit_log_created_at'), table_name='audit_log')
+    op.drop_table('audit_log')
+    op.drop_table('users')
+    op.drop_index('ix_telemetry_rollups_width_metric_bucket', table_name='telemetry_rollups')
+    op.drop_table('telemetry_rollups')
+    op.drop_table('processes')
+    op.drop_table('mold_models')
+    op.drop_table('connector_configs')
+    op.drop_table('companies')
+    op.drop_table('alert_rules')
@@ -0,0 +1,42 @@
+"""Composite indexes for the hot telemetry and downtime query shapes.
+
+Telemetry reads filter ``equipment_id = ? AND metric_name = ? AND time >= ?``,
+so one (equipment_id, metric_name, time DESC) index replaces the separate
+equipment_id and metric_name indexes (the time index stays for time-only
+scans such as rollup backfill and retention). Downtime is read by
+(equipment_id, started_at) and by started_at alone for plant-wide windows.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 15:44:11.733748
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, Sequence[str], None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_downtime_events_equipment_started', 'downtime_events', ['equipment_id', 'started_at'], unique=False)
+    op.create_index('ix_downtime_events_started_at', 'downtime_events', ['started_at'], unique=False)
+    op.create_index('ix_telemetry_equipment_metric_time', 'telemetry', ['equipment_id', 'metric_name', sa.literal_column('time DESC')], unique=False)
+    op.drop_index(op.f('ix_telemetry_equipment_id'), table_name='telemetry', if_exists=True)
+    op.drop_index(op.f('ix_telemetry_metric_name'), table_name='telemetry', if_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_telemetry_equipment_metric_time', table_name='telemetry')
+    op.create_index(op.f('ix_telemetry_metric_name'), 'telemetry', ['metric_name'], unique=False)
+    op.create_index(op.f('ix_telemetry_equipment_id'), 'telemetry', ['equipment_id'], unique=False)
+    op.drop_index('ix_downtime_events_started_at', table_name='downtime_events')
+    op.drop_index('ix_downtime_events_equipment_started', table_name='downtime_events')
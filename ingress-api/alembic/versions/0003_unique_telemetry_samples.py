@@ -0,0 +1,38 @@
+"""Make (equipment_id, metric_name, time) unique on telemetry.
+
+Spool replay and retried batches insert with ON CONFLICT DO NOTHING on this
+key, so a sample written twice is stored once. Existing duplicates are
+removed first, keeping the earliest row.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 17:02:40.118204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, Sequence[str], None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute(
+        "DELETE FROM telemetry WHERE id NOT IN ("
+        "SELECT MIN(id) FROM telemetry GROUP BY equipment_id, metric_name, time)"
+    )
+    op.drop_index('ix_telemetry_equipment_metric_time', table_name='telemetry')
+    op.create_index('ix_telemetry_equipment_metric_time', 'telemetry', ['equipment_id', 'metric_name', sa.literal_column('time DESC')], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_telemetry_equipment_metric_time', table_name='telemetry')
+    op.create_index('ix_telemetry_equipment_metric_time', 'telemetry', ['equipment_id', 'metric_name', sa.literal_column('time DESC')], unique=False)
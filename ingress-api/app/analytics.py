@@ -5,31 +5,22 @@ from datetime import datetime, timedelta
 from sqlalchemy.orm import Session
 from sqlalchemy import func, and_
 from . import models
+from .equipment_registry import registry as equipment_registry
+from .rollups import series_stats
+from .telemetry_store import repository
 
 
 def get_oee_trend(db: Session, hours: int = 24, bucket_hours: int = 1):
-    """Return hourly OEE averages over the specified window."""
+    """Return hourly OEE averages over the specified window (served from 1h rollups)."""
     cutoff = datetime.utcnow() - timedelta(hours=hours)
-    telemetry = db.query(models.Telemetry).filter(
-        models.Telemetry.time >= cutoff,
-        models.Telemetry.metric_name == "cycle_time",
-    ).all()
-
-    # Bucket by hour
-    buckets = {}
-    for t in telemetry:
-        key = t.time.replace(minute=0, second=0, microsecond=0)
-        if key not in buckets:
-            buckets[key] = []
-        buckets[key].append(t.metric_value)
+    buckets = series_stats(db, cutoff, None, "1h", metric_name="cycle_time")
 
     trend = []
-    for ts in sorted(buckets.keys()):
-        values = buckets[ts]
-        avg_cycle = sum(values) / len(values) if values else 35.0
+    for ts, stats in buckets.items():
+        avg_cycle = stats.mean or 35.0
         perf = min(1.0, 35.0 / avg_cycle) if avg_cycle > 0 else 1.0
         oee = perf * 0.92 * 0.98 * 100  # simplified with avg avail and quality
-        trend.append({"time": ts.isoformat(), "oee": round(oee, 2), "samples": len(values)})
+        trend.append({"time": ts.isoformat(), "oee": round(oee, 2), "samples": stats.count})
 
     return trend
 
@@ -59,12 +50,9 @@ def get_downtime_summary(db: Session, hours: int = 24):
 
 def get_dashboard_stats(db: Session):
     """Consolidated stats for dashboard KPIs."""
-    equipment = db.query(models.Equipment).filter_by(active=True).all()
-    total = len(equipment)
+    total = len(equipment_registry.machines(db))
     cutoff = datetime.utcnow() - timedelta(hours=1)
-    recent = db.query(func.count(func.distinct(models.Telemetry.equipment_id))).filter(
-        models.Telemetry.time >= cutoff
-    ).scalar() or 0
+    recent = repository().active_equipment_count(db, cutoff)
 
     downtime_24h = db.query(func.sum(models.DowntimeEvent.minutes)).filter(
         models.DowntimeEvent.started_at >= datetime.utcnow() - timedelta(hours=24)
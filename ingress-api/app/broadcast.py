@@ -0,0 +1,327 @@
+"""
+WebSocket fan-out hub for live telemetry.
+
+Publishers (ingest routes, simulator) never await a socket: publish()
+serializes a frame once and drops it into every client's pending map, keyed
+by device, so a lagging client only ever holds the newest frame per device.
+Each client has its own sender task; clients whose oldest undelivered frame
+is older than the lag limit, or whose send stalls, are disconnected.
+
+Clients that send ``{"subscribe": {"devices": [...], "types": [...],
+"metrics": [...]}}`` get a filtered snapshot and then delta frames carrying
+only the metrics that moved beyond the deadband since they were last sent.
+Pending deltas for a device merge instead of replacing each other.
+
+Frames are encoded per client wire format (see frame_codec); full frames are
+still encoded once per format per publish.
+"""
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Hashable, Iterable
+
+from fastapi import WebSocket
+
+from . import frame_codec
+
+WS_MAX_PENDING_FRAMES = int(os.getenv("WS_MAX_PENDING_FRAMES", "256"))
+WS_MAX_LAG_SECONDS = float(os.getenv("WS_MAX_LAG_SECONDS", "10"))
+WS_SEND_TIMEOUT_SECONDS = float(os.getenv("WS_SEND_TIMEOUT_SECONDS", "5"))
+WS_DELTA_DEADBAND = float(os.getenv("WS_DELTA_DEADBAND", "0"))
+LAGGING_CLOSE_CODE = 1013  # "try again later"
+_MISSING = object()
+
+
+class SubscriptionError(ValueError):
+    """Raised for a malformed subscribe message."""
+
+
+def device_type(payload: dict) -> str:
+    """Equipment type from payload meta, falling back to the ID prefix (IMM-01 -> IMM)."""
+    meta_type = (payload.get("meta") or {}).get("type")
+    return meta_type or payload["device_id"].split("-", 1)[0]
+
+
+def _changed(old: Any, new: Any, deadband: float) -> bool:
+    if old is _MISSING:
+        return True
+    if isinstance(new, bool) or isinstance(old, bool):
+        return old != new
+    if isinstance(new, (int, float)) and isinstance(old, (int, float)):
+        return abs(new - old) > deadband if deadband > 0 else new != old
+    if isinstance(new, list) and isinstance(old, list) and len(new) == len(old):
+        return any(_changed(a, b, deadband) for a, b in zip(old, new))
+    return old != new
+
+
+@dataclass(frozen=True)
+class Subscription:
+    """Device / type / metric filter plus the deadband for delta frames; None means all."""
+
+    devices: frozenset[str] | None = None
+    types: frozenset[str] | None = None
+    metrics: frozenset[str] | None = None
+    deadband: float = WS_DELTA_DEADBAND
+
+    @classmethod
+    def parse(cls, body: Any) -> "Subscription":
+        if not isinstance(body, dict):
+            raise SubscriptionError("subscribe must be an object")
+        unknown = set(body) - {"devices", "types", "metrics", "deadband"}
+        if unknown:
+            raise SubscriptionError(f"Unknown subscribe keys: {', '.join(sorted(unknown))}")
+        filters = {}
+        for key in ("devices", "types", "metrics"):
+            values = body.get(key)
+            if values is None:
+                filters[key] = None
+            elif isinstance(values, list) and all(isinstance(value, str) for value in values):
+                filters[key] = frozenset(values) or None
+            else:
+                raise SubscriptionError(f"{key} must be a list of strings")
+        deadband = body.get("deadband", WS_DELTA_DEADBAND)
+        if isinstance(deadband, bool) or not isinstance(deadband, (int, float)) or deadband < 0:
+            raise SubscriptionError("deadband must be a non-negative number")
+        return cls(deadband=float(deadband), **filters)
+
+    def matches(self, payload: dict) -> bool:
+        if self.devices is not None and payload["device_id"] not in self.devices:
+            return False
+        return self.types is None or device_type(payload) in self.types
+
+    def select(self, metrics: dict) -> dict:
+        if self.metrics is None:
+            return dict(metrics)
+        return {name: value for name, value in metrics.items() if name in self.metrics}
+
+    def as_dict(self) -> dict:
+        return {
+            "devices": sorted(self.devices) if self.devices is not None else None,
+            "types": sorted(self.types) if self.types is not None else None,
+            "metrics": sorted(self.metrics) if self.metrics is not None else None,
+            "deadband": self.deadband,
+        }
+
+
+class Client:
+    """One connected socket with a coalescing outbound queue and a sender task."""
+
+    def __init__(self, hub: "BroadcastHub", websocket: WebSocket, encoding: str = "json"):
+        self.hub = hub
+        self.websocket = websocket
+        self.encoding = encoding
+        self.pending: OrderedDict[Hashable, tuple[str | bytes | dict, float]] = OrderedDict()
+        self.ready = asyncio.Event()
+        self.task: asyncio.Task | None = None
+        self.closed = False
+        self.subscription: Subscription | None = None
+        self.basis: dict[str, dict[str, Any]] = {}
+        self._reply_seq = 0
+
+    def enqueue(self, key: Hashable, frame: str | bytes | dict) -> None:
+        """Queue a frame; a newer frame for the same key replaces the undelivered one."""
+        if self.closed:
+            return
+        now = time.monotonic()
+        if key in self.pending:
+            queued_at = self.pending[key][1]
+            self.pending[key] = (frame, queued_at)
+            self.hub.coalesced_frames += 1
+        else:
+            if len(self.pending) >= self.hub.max_pending:
+                self.pending.popitem(last=False)
+                self.hub.dropped_frames += 1
+            self.pending[key] = (frame, now)
+        self.ready.set()
+
+    def reply(self, frame: str | dict) -> None:
+        """Queue a frame that must not be coalesced (protocol replies)."""
+        self._reply_seq += 1
+        self.enqueue(("reply", self._reply_seq), frame)
+
+    def subscribe(self, subscription: Subscription, snapshot: Iterable[dict]) -> None:
+        """Switch to filtered delta mode and queue a snapshot of the matching devices."""
+        self.subscription = subscription
+        self.basis = {}
+        self.pending.clear()
+        data = []
+        for payload in snapshot:
+            if not subscription.matches(payload):
+                continue
+            metrics = subscription.select(payload.get("metrics") or {})
+            self.basis[payload["device_id"]] = dict(metrics)
+            data.append({**payload, "metrics": metrics})
+        self.reply({"type": "snapshot", "subscription": subscription.as_dict(), "data": data})
+
+    def offer(self, payload: dict) -> None:
+        """Queue the metrics of ``payload`` that changed beyond the deadband for this client."""
+        subscription = self.subscription
+        if self.closed or not subscription.matches(payload):
+            return
+        device_id = payload["device_id"]
+        basis = self.basis.setdefault(device_id, {})
+        changed = {
+            name: value
+            for name, value in subscription.select(payload.get("metrics") or {}).items()
+            if _changed(basis.get(name, _MISSING), value, subscription.deadband)
+        }
+        if not changed:
+            self.hub.suppressed_updates += 1
+            return
+        basis.update(changed)
+        queued = self.pending.get(device_id)
+        if queued is not None:
+            queued[0]["data"]["metrics"].update(changed)
+            queued[0]["data"]["ts"] = payload.get("ts")
+            self.hub.coalesced_frames += 1
+            return
+        self.enqueue(device_id, {"type": "delta", "data": {"device_id": device_id, "ts": payload.get("ts"), "metrics": changed}})
+
+    @property
+    def lag_seconds(self) -> float:
+        if not self.pending:
+            return 0.0
+        return time.monotonic() - next(iter(self.pending.values()))[1]
+
+    async def run(self) -> None:
+        try:
+            while True:
+                await self.ready.wait()
+                self.ready.clear()
+                while self.pending:
+                    _, (frame, _) = self.pending.popitem(last=False)
+                    if isinstance(frame, dict):
+                        frame = frame_codec.encode(frame, self.encoding)
+                    started = time.perf_counter()
+                    if isinstance(frame, bytes):
+                        send = self.websocket.send_bytes(frame)
+                    else:
+                        send = self.websocket.send_text(frame)
+                    await asyncio.wait_for(send, timeout=self.hub.send_timeout)
+                    self.hub.record_send((time.perf_counter() - started) * 1000.0, len(frame))
+        except asyncio.CancelledError:
+            pass
+        except Exception:
+            self.hub.failed_clients += 1
+        finally:
+            self.closed = True
+            self.hub.unregister(self)
+
+    def drop(self) -> None:
+        """Disconnect a client that fell too far behind."""
+        if self.closed:
+            return
+        self.closed = True
+        self.hub.dropped_clients += 1
+        self.hub.dropped_frames += len(self.pending)
+        self.pending.clear()
+        if self.task is not None:
+            self.task.cancel()
+        asyncio.get_running_loop().create_task(self._close(LAGGING_CLOSE_CODE))
+
+    async def _close(self, code: int) -> None:
+        try:
+            await self.websocket.close(code=code)
+        except Exception:
+            pass
+
+
+class BroadcastHub:
+    """Registry of live clients plus fan-out counters."""
+
+    def __init__(
+        self,
+        max_pending: int = WS_MAX_PENDING_FRAMES,
+        max_lag: float = WS_MAX_LAG_SECONDS,
+        send_timeout: float = WS_SEND_TIMEOUT_SECONDS,
+    ):
+        self.max_pending = max_pending
+        self.max_lag = max_lag
+        self.send_timeout = send_timeout
+        self.clients: set[Client] = set()
+        self.published_frames = 0
+        self.sent_frames = 0
+        self.sent_bytes = 0
+        self.coalesced_frames = 0
+        self.dropped_frames = 0
+        self.dropped_clients = 0
+        self.suppressed_updates = 0
+        self.failed_clients = 0
+        self.last_send_ms = 0.0
+        self.max_send_ms = 0.0
+        self._total_send_ms = 0.0
+
+    def __len__(self) -> int:
+        return len(self.clients)
+
+    async def connect(self, websocket: WebSocket, subprotocol: str | None = None) -> Client:
+        await websocket.accept(subprotocol=subprotocol)
+        client = Client(self, websocket, frame_codec.ENCODINGS[subprotocol])
+        self.clients.add(client)
+        client.task = asyncio.create_task(client.run())
+        return client
+
+    def unregister(self, client: Client) -> None:
+        self.clients.discard(client)
+
+    def disconnect(self, client: Client) -> None:
+        client.closed = True
+        if client.task is not None:
+            client.task.cancel()
+        self.unregister(client)
+
+    def publish(self, payload: dict) -> int:
+        """Queue a telemetry payload for every client; returns the number of clients offered it.
+
+        Unsubscribed clients share one full frame, serialized once per wire
+        format; subscribed clients get their own filtered delta.
+        """
+        frames: dict[str, str | bytes] = {}
+        self.published_frames += 1
+        delivered = 0
+        for client in list(self.clients):
+            if client.lag_seconds > self.max_lag:
+                client.drop()
+                continue
+            if client.subscription is None:
+                frame = frames.get(client.encoding)
+                if frame is None:
+                    frame = frames[client.encoding] = frame_codec.encode({"type": "telemetry", "data": payload}, client.encoding)
+                client.enqueue(payload["device_id"], frame)
+            else:
+                client.offer(payload)
+            delivered += 1
+        return delivered
+
+    def record_send(self, elapsed_ms: float, size: int = 0) -> None:
+        self.sent_frames += 1
+        self.sent_bytes += size
+        self.last_send_ms = elapsed_ms
+        self.max_send_ms = max(self.max_send_ms, elapsed_ms)
+        self._total_send_ms += elapsed_ms
+
+    async def close(self) -> None:
+        for client in list(self.clients):
+            self.disconnect(client)
+            await client._close(1001)
+
+    def metrics(self) -> dict:
+        return {
+            "connected_clients": len(self.clients),
+            "subscribed_clients": sum(1 for client in self.clients if client.subscription is not None),
+            "published_frames": self.published_frames,
+            "sent_frames": self.sent_frames,
+            "sent_bytes": self.sent_bytes,
+            "binary_clients": sum(1 for client in self.clients if client.encoding != "json"),
+            "coalesced_frames": self.coalesced_frames,
+            "dropped_frames": self.dropped_frames,
+            "dropped_clients": self.dropped_clients,
+            "suppressed_updates": self.suppressed_updates,
+            "failed_clients": self.failed_clients,
+            "max_pending_per_client": max((len(client.pending) for client in self.clients), default=0),
+            "last_send_ms": round(self.last_send_ms, 3),
+            "max_send_ms": round(self.max_send_ms, 3),
+            "avg_send_ms": round(self._total_send_ms / self.sent_frames, 3) if self.sent_frames else 0.0,
+        }
@@ -0,0 +1,146 @@
+"""
+Database health monitor and circuit breaker.
+
+A background task probes the database (``SELECT 1``) every
+DB_HEALTH_INTERVAL_SECONDS with a DB_HEALTH_TIMEOUT_SECONDS budget and keeps
+the result, so health endpoints answer from memory instead of opening a
+connection per request.
+
+The breaker opens when a probe fails, or after DB_BREAKER_FAILURES
+failures reported by callers before the next successful probe (get_db,
+with_session and run_read report connect failures and dropped
+connections, see database.report_failure). While it is open, ``guard()``
+raises DatabaseUnavailableError immediately instead of waiting for a connect
+timeout, and the write-behind buffer keeps ingested rows in memory. The next
+successful probe closes it again and buffered rows are flushed.
+"""
+import asyncio
+import os
+import time
+from datetime import datetime
+from typing import Callable
+
+DB_HEALTH_INTERVAL_SECONDS = float(os.getenv("DB_HEALTH_INTERVAL_SECONDS", "5"))
+DB_HEALTH_TIMEOUT_SECONDS = float(os.getenv("DB_HEALTH_TIMEOUT_SECONDS", "3"))
+DB_BREAKER_FAILURES = int(os.getenv("DB_BREAKER_FAILURES", "3"))
+
+
+class DatabaseUnavailableError(RuntimeError):
+    """Raised instead of touching the database while the circuit breaker is open."""
+
+
+class DatabaseHealthMonitor:
+    """Cached database status from a background probe, plus a closed/open circuit breaker."""
+
+    def __init__(
+        self,
+        probe: Callable[[], None],
+        interval: float = DB_HEALTH_INTERVAL_SECONDS,
+        timeout: float = DB_HEALTH_TIMEOUT_SECONDS,
+        failure_threshold: int = DB_BREAKER_FAILURES,
+    ):
+        self.probe = probe
+        self.interval = interval
+        self.timeout = timeout
+        self.failure_threshold = max(failure_threshold, 1)
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self.last_checked: datetime | None = None
+        self.last_ok: datetime | None = None
+        self.last_error: str | None = None
+        self.latency_ms: float | None = None
+        self.opened_at: datetime | None = None
+        self.probes = 0
+        self.trips = 0
+        self.rejected = 0
+        self._task: asyncio.Task | None = None
+        self._probing = False
+
+    @property
+    def available(self) -> bool:
+        return self.state != "open"
+
+    def guard(self) -> None:
+        """Fail fast while the breaker is open."""
+        if self.state == "open":
+            self.rejected += 1
+            raise DatabaseUnavailableError(f"Database unavailable: {self.last_error}")
+
+    def record_success(self) -> None:
+        self.consecutive_failures = 0
+        self.last_ok = datetime.utcnow()
+        if self.state == "open":
+            down_for = (self.last_ok - self.opened_at).total_seconds() if self.opened_at else 0.0
+            print(f"[OK] Database reachable again after {down_for:.1f}s, circuit closed")
+            self.state = "closed"
+            self.opened_at = None
+
+    def record_failure(self, error: BaseException, trip: bool = False) -> None:
+        """Count a failed database call; ``trip`` opens the breaker right away."""
+        self.consecutive_failures += 1
+        self.last_error = str(error) or type(error).__name__
+        if self.state != "open" and (trip or self.consecutive_failures >= self.failure_threshold):
+            self.state = "open"
+            self.opened_at = datetime.utcnow()
+            self.trips += 1
+            print(f"[WARN] Database unreachable, circuit open: {self.last_error}")
+
+    def check(self) -> bool:
+        """Probe now (blocking); returns True when the database answered."""
+        started = time.perf_counter()
+        self.probes += 1
+        self.last_checked = datetime.utcnow()
+        try:
+            self.probe()
+        except Exception as e:
+            self.record_failure(e, trip=True)
+            return False
+        self.latency_ms = (time.perf_counter() - started) * 1000.0
+        self.record_success()
+        return True
+
+    async def check_async(self) -> bool:
+        """Probe on a worker thread within the timeout; overlapping calls share the last result."""
+        if self._probing:
+            return self.available
+        self._probing = True
+        try:
+            return await asyncio.wait_for(asyncio.to_thread(self.check), timeout=self.timeout)
+        except asyncio.TimeoutError:
+            self.record_failure(TimeoutError(f"probe exceeded {self.timeout:.1f}s"), trip=True)
+            return False
+        finally:
+            self._probing = False
+
+    async def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.check_async()
+
+    def status(self) -> dict:
+        return {
+            "status": "connected" if self.available else "disconnected",
+            "circuit": self.state,
+            "last_checked": self.last_checked.isoformat() + "Z" if self.last_checked else None,
+            "last_ok": self.last_ok.isoformat() + "Z" if self.last_ok else None,
+            "latency_ms": round(self.latency_ms, 2) if self.latency_ms is not None else None,
+            "consecutive_failures": self.consecutive_failures,
+            "last_error": self.last_error,
+            "opened_at": self.opened_at.isoformat() + "Z" if self.opened_at else None,
+            "probes": self.probes,
+            "trips": self.trips,
+            "rejected": self.rejected,
+        }
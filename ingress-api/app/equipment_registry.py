@@ -0,0 +1,155 @@
+"""
+In-memory equipment master registry.
+
+Endpoints used to re-query the equipment table on every request and then
+lazy-load cell -> line -> plant, process and mold per machine. The registry
+loads all of it once with eager joins into immutable records and serves
+them until the master data changes. Writers (machine upsert, target
+standards, seeding, demo reset) call ``invalidate()``, which bumps the
+version; the next read reloads. Other API workers learn about the change
+through the live-state backend, and EQUIPMENT_REGISTRY_TTL_SECONDS bounds
+staleness for edits made outside the API.
+
+Reads run on worker threads and, through run_read, in greenlets on the
+event-loop thread, so loading takes no lock: concurrent readers of a stale
+snapshot may each reload it, and each load swaps in a complete snapshot
+with a single assignment.
+"""
+import itertools
+import os
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable
+
+from sqlalchemy.orm import Session, joinedload
+
+from . import models
+
+EQUIPMENT_REGISTRY_TTL_SECONDS = float(os.getenv("EQUIPMENT_REGISTRY_TTL_SECONDS", "300"))
+
+
+@dataclass(frozen=True)
+class MachineRecord:
+    """Equipment row with its plant/line/cell/process/mold names resolved."""
+
+    id: int
+    equipment_id: str
+    equipment_type: str
+    description: str | None
+    location: str | None
+    plc_protocol: str | None
+    plc_address: str | None
+    cycle_time_standard: float | None
+    target_per_hour: int | None
+    active: bool
+    created_at: datetime | None
+    plant: str | None = None
+    plant_code: str | None = None
+    line: str | None = None
+    cell: str | None = None
+    process: str | None = None
+    mold_model: str | None = None
+    mold_part_name: str | None = None
+
+    @classmethod
+    def from_model(cls, item: models.Equipment) -> "MachineRecord":
+        cell = item.cell
+        line = cell.line if cell else None
+        plant = line.plant if line else None
+        return cls(
+            id=item.id,
+            equipment_id=item.equipment_id,
+            equipment_type=item.equipment_type,
+            description=item.description,
+            location=item.location,
+            plc_protocol=item.plc_protocol,
+            plc_address=item.plc_address,
+            cycle_time_standard=item.cycle_time_standard,
+            target_per_hour=item.target_per_hour,
+            active=bool(item.active),
+            created_at=item.created_at,
+            plant=plant.name if plant else None,
+            plant_code=plant.code if plant else None,
+            line=line.name if line else None,
+            cell=cell.name if cell else None,
+            process=item.process.name if item.process else None,
+            mold_model=item.mold_model.model_code if item.mold_model else None,
+            mold_part_name=item.mold_model.part_name if item.mold_model else None,
+        )
+
+
+@dataclass(frozen=True)
+class _Snapshot:
+    version: int
+    loaded_at: float
+    records: dict[str, MachineRecord]
+    active: tuple[MachineRecord, ...]
+
+
+class EquipmentRegistry:
+    """Versioned snapshot of the equipment master, reloaded lazily after invalidation."""
+
+    def __init__(self, ttl: float = EQUIPMENT_REGISTRY_TTL_SECONDS):
+        self.ttl = ttl
+        self.version = 0
+        self.listeners: list[Callable[[int], None]] = []
+        self._versions = itertools.count(1)
+        self._snapshot = _Snapshot(-1, 0.0, {}, ())
+        self.loads = 0
+        self.hits = 0
+
+    def machines(self, db: Session) -> tuple[MachineRecord, ...]:
+        """Active machines ordered by equipment_id."""
+        return self._ensure(db).active
+
+    def get(self, db: Session, equipment_id: str, active_only: bool = False) -> MachineRecord | None:
+        record = self._ensure(db).records.get(equipment_id)
+        if record is None or (active_only and not record.active):
+            return None
+        return record
+
+    def types(self, db: Session) -> dict[str, str]:
+        return {equipment_id: record.equipment_type for equipment_id, record in self._ensure(db).records.items()}
+
+    def invalidate(self, notify: bool = True) -> int:
+        """Mark the snapshot stale; listeners (other workers) are told unless ``notify`` is False."""
+        version = self.version = next(self._versions)
+        if notify:
+            for listener in self.listeners:
+                listener(version)
+        return version
+
+    def metrics(self) -> dict:
+        snapshot = self._snapshot
+        return {
+            "version": self.version,
+            "loaded_version": snapshot.version,
+            "machines": len(snapshot.records),
+            "active": len(snapshot.active),
+            "loads": self.loads,
+            "hits": self.hits,
+            "age_seconds": round(time.monotonic() - snapshot.loaded_at, 1) if self.loads else None,
+        }
+
+    def _ensure(self, db: Session) -> _Snapshot:
+        snapshot = self._snapshot
+        if snapshot.version == self.version and time.monotonic() - snapshot.loaded_at < self.ttl:
+            self.hits += 1
+            return snapshot
+        version = self.version
+        rows = db.query(models.Equipment).options(
+            joinedload(models.Equipment.cell).joinedload(models.Cell.line).joinedload(models.Line.plant),
+            joinedload(models.Equipment.process),
+            joinedload(models.Equipment.mold_model),
+        ).order_by(models.Equipment.equipment_id).all()
+        records = {row.equipment_id: MachineRecord.from_model(row) for row in rows}
+        snapshot = _Snapshot(version, time.monotonic(), records, tuple(record for record in records.values() if record.active))
+        # A slower concurrent load of an older version must not replace a newer snapshot.
+        if snapshot.version >= self._snapshot.version:
+            self._snapshot = snapshot
+        self.loads += 1
+        return snapshot
+
+
+registry = EquipmentRegistry()
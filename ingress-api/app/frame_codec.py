@@ -0,0 +1,62 @@
+"""
+Wire encodings for /ws/andons frames.
+
+JSON text is the default. Clients that offer the ``acron.msgpack.v1``
+subprotocol get binary MessagePack frames in which numeric lists such as
+``zone_temps`` travel as extension type 1: packed little-endian float32.
+msgpack is optional; without it the subprotocol is simply not negotiated.
+"""
+import json
+from typing import Any, Iterable
+
+import numpy as np
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - optional dependency
+    msgpack = None
+
+MSGPACK_SUBPROTOCOL = "acron.msgpack.v1"
+FLOAT32_ARRAY_EXT = 1
+ENCODINGS = {None: "json", MSGPACK_SUBPROTOCOL: "msgpack"}
+
+
+def negotiate(offered: Iterable[str]) -> str | None:
+    """Pick the subprotocol to accept from the client's offer (None = plain JSON)."""
+    if msgpack is not None and MSGPACK_SUBPROTOCOL in offered:
+        return MSGPACK_SUBPROTOCOL
+    return None
+
+
+def _is_numeric_list(value: list) -> bool:
+    return bool(value) and all(isinstance(item, (int, float)) and not isinstance(item, bool) for item in value)
+
+
+def _pack_arrays(value: Any) -> Any:
+    if isinstance(value, dict):
+        return {key: _pack_arrays(item) for key, item in value.items()}
+    if isinstance(value, list):
+        if _is_numeric_list(value):
+            return msgpack.ExtType(FLOAT32_ARRAY_EXT, np.asarray(value, dtype="<f4").tobytes())
+        return [_pack_arrays(item) for item in value]
+    return value
+
+
+def _unpack_ext(code: int, data: bytes) -> Any:
+    if code == FLOAT32_ARRAY_EXT:
+        return np.frombuffer(data, dtype="<f4").astype(float).tolist()
+    return msgpack.ExtType(code, data)
+
+
+def encode(message: dict, encoding: str = "json") -> str | bytes:
+    """Serialize a frame: str for JSON, bytes for MessagePack."""
+    if encoding == "msgpack":
+        return msgpack.packb(_pack_arrays(message), use_bin_type=True)
+    return json.dumps(message)
+
+
+def decode(frame: str | bytes) -> Any:
+    """Inverse of encode(); float32 arrays come back as lists of floats."""
+    if isinstance(frame, bytes):
+        return msgpack.unpackb(frame, raw=False, ext_hook=_unpack_ext)
+    return json.loads(frame)
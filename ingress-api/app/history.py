@@ -0,0 +1,231 @@
+"""
+Telemetry history reads — keyset pagination, NDJSON/CSV streaming and downsampling.
+
+Rows are read as projected (id, time, metric, value, status) tuples through the
+active telemetry storage layout rather than as ORM objects. Pages are addressed by an opaque cursor on (time, id), so deep
+pages cost the same as the first one and nothing is silently truncated.
+"""
+import base64
+import csv
+import io
+import json
+import re
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, Iterator
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from .rollups import BUCKETS, MetricStats, _rollup_source, bucket_floor
+from .telemetry_store import repository
+
+HISTORY_FIELDS = ("time", "metric", "value", "status")
+AGGREGATES = ("avg", "min", "max", "last")
+_BUCKET_PATTERN = re.compile(r"^(\d+)([smhd])$")
+_BUCKET_UNITS = {"s": "seconds", "m": "minutes", "h": "hours", "d": "days"}
+
+
+class HistoryQueryError(ValueError):
+    """Raised for malformed cursors, buckets or field lists."""
+
+
+def naive_utc(value: datetime | None) -> datetime | None:
+    if value is not None and value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def encode_cursor(time: datetime, row_id: int) -> str:
+    return base64.urlsafe_b64encode(f"{time.isoformat()}|{row_id}".encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        time_text, row_id = raw.split("|", 1)
+        return datetime.fromisoformat(time_text), int(row_id)
+    except Exception as exc:
+        raise HistoryQueryError("Invalid cursor") from exc
+
+
+def parse_bucket(value: str) -> timedelta:
+    match = _BUCKET_PATTERN.match(value.strip().lower())
+    if not match or int(match.group(1)) <= 0:
+        raise HistoryQueryError("Bucket must look like 30s, 1m, 15m, 1h or 1d")
+    return timedelta(**{_BUCKET_UNITS[match.group(2)]: int(match.group(1))})
+
+
+def parse_fields(value: str | None) -> tuple[str, ...]:
+    if not value:
+        return HISTORY_FIELDS
+    fields = tuple(item.strip() for item in value.split(",") if item.strip())
+    unknown = [item for item in fields if item not in HISTORY_FIELDS]
+    if unknown or not fields:
+        raise HistoryQueryError(f"Unknown fields: {', '.join(unknown)}. Use any of {', '.join(HISTORY_FIELDS)}")
+    return fields
+
+
+def iter_rows(
+    db: Session,
+    equipment_id: str,
+    start: datetime,
+    end: datetime | None = None,
+    metrics: list[str] | None = None,
+    cursor: str | None = None,
+    descending: bool = True,
+    limit: int | None = None,
+) -> Iterator:
+    """Yield (id, time, metric_name, metric_value, status) rows in (time, id) order."""
+    after = decode_cursor(cursor) if cursor else None
+    yield from repository().iter_rows(db, equipment_id, start, end, metrics, after, descending, limit)
+
+
+def row_dict(row, fields: tuple[str, ...] = HISTORY_FIELDS) -> dict:
+    values = {
+        "time": row.time.isoformat(),
+        "metric": row.metric_name,
+        "value": row.metric_value,
+        "status": row.status,
+    }
+    return {name: values[name] for name in fields}
+
+
+def fetch_page(db: Session, equipment_id: str, start: datetime, end: datetime | None, metrics: list[str] | None,
+               cursor: str | None, descending: bool, limit: int, fields: tuple[str, ...]) -> dict:
+    """One keyset page; ``next_cursor`` is None on the last page.
+
+    Pages end on a (time, id) boundary so a wide-layout sample is never split
+    across pages; a single sample larger than ``limit`` is returned whole.
+    """
+    fetched = list(iter_rows(db, equipment_id, start, end, metrics, cursor, descending, limit + 1))
+    has_more = len(fetched) > limit
+    rows = fetched[:limit]
+    if has_more:
+        boundary = (fetched[limit].time, fetched[limit].id)
+        rows = [row for row in rows if (row.time, row.id) != boundary] or [
+            row for row in fetched if (row.time, row.id) == boundary
+        ]
+    return {
+        "equipment_id": equipment_id,
+        "records": len(rows),
+        "data": [row_dict(row, fields) for row in rows],
+        "next_cursor": encode_cursor(rows[-1].time, rows[-1].id) if has_more and rows else None,
+    }
+
+
+def bucket_series(rows: Iterable, start: datetime, bucket: timedelta, agg: str) -> Iterator[dict]:
+    """Aggregate ascending rows into fixed buckets per metric, one bucket in memory per metric."""
+    current: dict[str, tuple[datetime, MetricStats]] = {}
+    for row in rows:
+        if row.metric_value is None:
+            continue
+        slot = start + ((row.time - start) // bucket) * bucket
+        entry = current.get(row.metric_name)
+        if entry is not None and entry[0] != slot:
+            yield _bucket_point(row.metric_name, entry[0], entry[1], agg)
+            entry = None
+        if entry is None:
+            entry = current[row.metric_name] = (slot, MetricStats())
+        entry[1].add(row.metric_value, row.time)
+    for metric_name, (slot, stats) in current.items():
+        yield _bucket_point(metric_name, slot, stats, agg)
+
+
+def _bucket_point(metric_name: str, slot: datetime, stats: MetricStats, agg: str) -> dict:
+    value = {"avg": stats.mean, "min": stats.min, "max": stats.max, "last": stats.last}[agg]
+    return {"time": slot.isoformat(), "metric": metric_name, "value": value, "samples": stats.count}
+
+
+def rollup_series(db: Session, equipment_id: str, start: datetime, end: datetime | None,
+                  metrics: list[str] | None, width: str, agg: str) -> list[dict]:
+    """Bucketed series straight from the rollup table when the bucket matches a rollup width."""
+    source, width_filter = _rollup_source(width)
+    c = source.c
+    conditions = [c.equipment_id == equipment_id, c.bucket >= bucket_floor(start, width)]
+    if width_filter is not None:
+        conditions.append(width_filter)
+    if end is not None:
+        conditions.append(c.bucket < end)
+    if metrics:
+        conditions.append(c.metric_name.in_(metrics))
+    query = select(c.bucket, c.metric_name, c.sample_count, c.value_sum, c.value_min, c.value_max, c.value_last).where(
+        *conditions
+    ).order_by(c.bucket, c.metric_name)
+    points = []
+    for row in db.execute(query).all():
+        value = {
+            "avg": (row.value_sum / row.sample_count) if row.sample_count else None,
+            "min": row.value_min,
+            "max": row.value_max,
+            "last": row.value_last,
+        }[agg]
+        points.append({"time": row.bucket.isoformat(), "metric": row.metric_name, "value": value, "samples": row.sample_count})
+    return points
+
+
+def lttb(points: list[tuple[float, float]], threshold: int) -> list[tuple[float, float]]:
+    """Largest-Triangle-Three-Buckets downsampling of (x, y) points to ``threshold`` points."""
+    if threshold >= len(points) or threshold < 3:
+        return list(points)
+    sampled = [points[0]]
+    every = (len(points) - 2) / (threshold - 2)
+    a = 0
+    for i in range(threshold - 2):
+        avg_start = int((i + 1) * every) + 1
+        avg_end = min(int((i + 2) * every) + 1, len(points))
+        avg_range = points[avg_start:avg_end] or [points[-1]]
+        avg_x = sum(p[0] for p in avg_range) / len(avg_range)
+        avg_y = sum(p[1] for p in avg_range) / len(avg_range)
+
+        range_start = int(i * every) + 1
+        range_end = int((i + 1) * every) + 1
+        ax, ay = points[a]
+        best_area, best_index = -1.0, range_start
+        for index in range(range_start, range_end):
+            px, py = points[index]
+            area = abs((ax - avg_x) * (py - ay) - (ax - px) * (avg_y - ay))
+            if area > best_area:
+                best_area, best_index = area, index
+        sampled.append(points[best_index])
+        a = best_index
+    sampled.append(points[-1])
+    return sampled
+
+
+def lttb_series(rows: Iterable, points: int) -> list[dict]:
+    """Downsample each metric in ascending rows to at most ``points`` points."""
+    by_metric: dict[str, list[tuple[float, float]]] = {}
+    for row in rows:
+        if row.metric_value is not None:
+            by_metric.setdefault(row.metric_name, []).append((row.time.replace(tzinfo=timezone.utc).timestamp(), row.metric_value))
+    result = []
+    for metric_name, series in by_metric.items():
+        for x, y in lttb(series, points):
+            at = datetime.fromtimestamp(x, tz=timezone.utc).replace(tzinfo=None)
+            result.append({"time": at.isoformat(), "metric": metric_name, "value": y})
+    return result
+
+
+def stream_records(records: Iterable[dict], fmt: str, fields: tuple[str, ...]) -> Iterator[str]:
+    """Encode dicts as NDJSON lines or CSV rows without materialising the whole result."""
+    if fmt == "ndjson":
+        for record in records:
+            yield json.dumps(record) + "\n"
+        return
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=list(fields), extrasaction="ignore")
+    writer.writeheader()
+    for count, record in enumerate(records, start=1):
+        writer.writerow(record)
+        if count % 500 == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def rollup_width(bucket: timedelta) -> str | None:
+    for width, size in BUCKETS.items():
+        if size == bucket:
+            return width
+    return None
@@ -0,0 +1,196 @@
+"""
+Telemetry ingest helpers — payload flattening, batch parsing and bulk row writes.
+"""
+import json
+import os
+import zlib
+from datetime import datetime, timezone
+
+from pydantic import ValidationError
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from . import rollups
+from .database import SessionLocal
+from .schemas import TelemetryInput
+from .telemetry_store import repository
+from .zone_arrays import insert_array_rows, is_array_row
+
+NDJSON_CONTENT_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl")
+INGEST_MAX_INFLATED_BYTES = int(float(os.getenv("INGEST_MAX_INFLATED_MB", "64")) * 1024 * 1024)
+RAW_BURST_SUFFIX = ".raw"
+
+
+class BatchParseError(ValueError):
+    """Raised when a batch body cannot be decoded into telemetry records."""
+
+
+def parse_timestamp(value: str) -> datetime:
+    """Parse an ISO-8601 timestamp into a naive UTC datetime."""
+    parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def payload_dict(t: TelemetryInput) -> dict:
+    return t.model_dump() if hasattr(t, "model_dump") else t.dict()
+
+
+def flatten_metrics(metrics: dict) -> dict:
+    """Expand window summaries sent by edge gateways into plain metrics.
+
+    ``{"vibration": {"mean": 0.12, "max": 0.4, "p95": 0.3}}`` becomes
+    ``vibration`` (the mean), ``vibration.max`` and ``vibration.p95``; other
+    metrics pass through unchanged.
+    """
+    flat = {}
+    for name, value in metrics.items():
+        if isinstance(value, dict):
+            for stat, stat_value in value.items():
+                flat[name if stat == "mean" else f"{name}.{stat}"] = stat_value
+        else:
+            flat[name] = value
+    return flat
+
+
+def latest_payload(t: TelemetryInput) -> dict:
+    """Payload for the last-value store: summaries flattened, raw bursts (``*.raw``) left to history."""
+    payload = payload_dict(t)
+    payload["metrics"] = {
+        name: value for name, value in flatten_metrics(t.metrics).items() if not name.endswith(RAW_BURST_SUFFIX)
+    }
+    return payload
+
+
+def telemetry_rows(t: TelemetryInput, status: str = "normal") -> list[dict]:
+    """Flatten one device payload into telemetry rows (one per metric).
+
+    Numeric lists such as ``zone_temps`` (and triggered raw bursts like
+    ``vibration.raw``) stay whole as one row whose value is a list of floats;
+    bulk_insert_telemetry routes those to the array table. Window summaries
+    are expanded by flatten_metrics.
+    """
+    timestamp = parse_timestamp(t.ts)
+    rows = []
+    for metric_name, metric_value in flatten_metrics(t.metrics).items():
+        if isinstance(metric_value, list):
+            if not metric_value or not all(_is_number(item) for item in metric_value):
+                continue
+            value = [float(item) for item in metric_value]
+        else:
+            value = float(metric_value) if _is_number(metric_value) else None
+        rows.append({
+            "time": timestamp,
+            "equipment_id": t.device_id,
+            "metric_name": metric_name,
+            "metric_value": value,
+            "unit": None,
+            "status": status,
+        })
+    return rows
+
+
+def _is_number(value) -> bool:
+    return isinstance(value, (int, float))
+
+
+def inflate_body(body: bytes, content_encoding: str | None) -> bytes:
+    """Undo a gzip/deflate Content-Encoding, refusing bodies that inflate past INGEST_MAX_INFLATED_BYTES."""
+    encoding = (content_encoding or "identity").strip().lower()
+    if encoding == "identity":
+        return body
+    if encoding not in ("gzip", "deflate"):
+        raise BatchParseError(f"Unsupported Content-Encoding: {content_encoding}")
+    inflater = zlib.decompressobj(zlib.MAX_WBITS | 32)  # auto-detects the gzip or zlib header
+    try:
+        data = inflater.decompress(body, INGEST_MAX_INFLATED_BYTES)
+    except zlib.error as exc:
+        raise BatchParseError(f"Invalid {encoding} body: {exc}") from exc
+    if inflater.unconsumed_tail:
+        raise BatchParseError(f"Decompressed body exceeds {INGEST_MAX_INFLATED_BYTES} bytes")
+    return data
+
+
+def parse_batch_body(body: bytes, content_type: str | None, content_encoding: str | None = None) -> list[TelemetryInput]:
+    """Decode a JSON array or NDJSON body (optionally gzip/deflate-encoded) into validated TelemetryInput records."""
+    content_type = (content_type or "").split(";", 1)[0].strip().lower()
+    body = inflate_body(body, content_encoding)
+    try:
+        text = body.decode("utf-8")
+    except UnicodeDecodeError as exc:
+        raise BatchParseError("Body must be UTF-8 encoded") from exc
+
+    try:
+        if content_type in NDJSON_CONTENT_TYPES:
+            items = [json.loads(line) for line in text.splitlines() if line.strip()]
+        else:
+            items = json.loads(text) if text.strip() else []
+            if isinstance(items, dict):
+                items = items.get("records", [items])
+    except json.JSONDecodeError as exc:
+        raise BatchParseError(f"Invalid JSON: {exc.msg} (line {exc.lineno})") from exc
+
+    if not isinstance(items, list):
+        raise BatchParseError("Body must be a JSON array or NDJSON stream of telemetry records")
+
+    records = []
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            raise BatchParseError(f"Record {index} is not an object")
+        try:
+            records.append(TelemetryInput(**item))
+        except ValidationError as exc:
+            raise BatchParseError(f"Record {index} is invalid: {exc.errors()[0].get('msg')}") from exc
+    return records
+
+
+def bulk_insert_telemetry(db, rows: list[dict], idempotent: bool = False) -> int:
+    """Write telemetry rows in the caller's transaction and return the row count.
+
+    Scalar rows go to the active storage layout (COPY or executemany for the
+    per-metric table, packed samples for the wide one) and list rows to the
+    float32 array table. Rollup buckets are updated in the same transaction.
+    ``idempotent`` skips scalar rows whose (equipment_id, metric_name, time)
+    is already stored, and leaves them out of the rollups. The caller owns
+    the commit.
+    """
+    if not rows:
+        return 0
+    connection = db.connection() if isinstance(db, Session) else db
+    scalar_rows = [row for row in rows if not is_array_row(row)]
+    if len(scalar_rows) != len(rows):
+        insert_array_rows(connection, [row for row in rows if is_array_row(row)])
+    if scalar_rows:
+        if idempotent:
+            new_rows = repository().insert_new_rows(connection, scalar_rows)
+            rollups.apply_rows(connection, new_rows)
+            return len(rows) - len(scalar_rows) + len(new_rows)
+        repository().insert_rows(connection, scalar_rows)
+        rollups.apply_rows(connection, scalar_rows)
+    return len(rows)
+
+
+def write_telemetry_rows(rows: list[dict], idempotent: bool = False) -> int:
+    """Bulk write rows in a dedicated session and commit (safe to call from a worker thread).
+
+    A batch that hits an already stored sample is retried once as an
+    idempotent insert, so duplicates are skipped instead of failing the batch.
+    """
+    db = SessionLocal()
+    try:
+        try:
+            written = bulk_insert_telemetry(db, rows, idempotent)
+            db.commit()
+        except IntegrityError:
+            if idempotent:
+                raise
+            db.rollback()
+            written = bulk_insert_telemetry(db, rows, idempotent=True)
+            db.commit()
+        return written
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
@@ -0,0 +1,104 @@
+"""
+Last-value store for live telemetry.
+
+Keeps the most recent value of every (equipment_id, metric_name) pair in
+memory. Ingest keeps it current; on cold start it is filled once from the
+database so /api/v1/telemetry/latest never has to query telemetry history.
+"""
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Any
+
+from sqlalchemy.orm import Session
+
+from .equipment_registry import registry as equipment_registry
+from .ingest import parse_timestamp
+from .telemetry_store import repository
+
+LAST_VALUE_LOOKBACK_HOURS = int(os.getenv("LAST_VALUE_LOOKBACK_HOURS", "168"))
+
+
+def _instant(ts: str) -> datetime:
+    """Timezone-aware UTC instant of an ISO-8601 timestamp (one without an offset is taken as UTC)."""
+    return parse_timestamp(ts).replace(tzinfo=timezone.utc)
+
+
+class LastValueStore:
+    """Dictionary of latest metric values keyed by (equipment_id, metric_name)."""
+
+    def __init__(self):
+        self._values: dict[tuple[str, str], tuple[datetime | None, Any]] = {}
+        self._devices: dict[str, dict[str, Any]] = {}
+        self.warmed = False
+
+    def __len__(self) -> int:
+        return len(self._devices)
+
+    def __contains__(self, device_id: str) -> bool:
+        return device_id in self._devices
+
+    def __getitem__(self, device_id: str) -> dict:
+        payload = self.get(device_id)
+        if payload is None:
+            raise KeyError(device_id)
+        return payload
+
+    def clear(self) -> None:
+        self._values.clear()
+        self._devices.clear()
+
+    def update(self, payload: dict) -> None:
+        """Merge a telemetry payload; metrics absent from the payload keep their last value."""
+        device_id = payload["device_id"]
+        ts = payload.get("ts")
+        # Order by instant, not by string: offsets ("Z" vs "+00:00") and precision vary between sources.
+        at = _instant(ts) if ts is not None else None
+        device = self._devices.setdefault(device_id, {"ts": ts, "at": at, "meta": {}, "metrics": set()})
+        if at is not None and (device["at"] is None or at >= device["at"]):
+            device["ts"], device["at"] = ts, at
+        if payload.get("meta"):
+            device["meta"] = {**device["meta"], **payload["meta"]}
+        for metric_name, value in (payload.get("metrics") or {}).items():
+            current = self._values.get((device_id, metric_name))
+            if current is not None and at is not None and current[0] is not None and at < current[0]:
+                continue
+            self._values[(device_id, metric_name)] = (at, value)
+            device["metrics"].add(metric_name)
+
+    def value(self, device_id: str, metric_name: str) -> Any:
+        entry = self._values.get((device_id, metric_name))
+        return entry[1] if entry else None
+
+    def get(self, device_id: str) -> dict | None:
+        device = self._devices.get(device_id)
+        if device is None:
+            return None
+        return {
+            "device_id": device_id,
+            "ts": device["ts"],
+            "metrics": {name: self._values[(device_id, name)][1] for name in device["metrics"]},
+            "meta": dict(device["meta"]),
+        }
+
+    def snapshot(self) -> dict[str, dict]:
+        return {device_id: self.get(device_id) for device_id in self._devices}
+
+    def warm(self, db: Session, lookback_hours: int = LAST_VALUE_LOOKBACK_HOURS) -> int:
+        """Fill the store from the database once; returns the number of values loaded."""
+        cutoff = datetime.utcnow() - timedelta(hours=lookback_hours)
+        rows = repository().latest_rows(db, cutoff)
+
+        types = equipment_registry.types(db)
+        loaded = 0
+        for row in rows:
+            if row.metric_value is None or (row.equipment_id, row.metric_name) in self._values:
+                continue
+            self.update({
+                "device_id": row.equipment_id,
+                "ts": row.time.isoformat() + "Z",
+                "metrics": {row.metric_name: row.metric_value},
+                "meta": {"type": types.get(row.equipment_id)},
+            })
+            loaded += 1
+        self.warmed = True
+        return loaded
@@ -0,0 +1,289 @@
+"""
+Telemetry storage lifecycle — hypertables, compression, retention and archiving.
+
+TimescaleDB deployments get idempotent hypertable conversion at startup, native
+compression segmented by series, and a chunk-dropping retention policy at the
+longest metric-class horizon. Metric classes with a shorter horizon, and every
+class on SQLite / plain PostgreSQL, are handled by the archive-and-delete job:
+expired rows are written to gzip CSV files and then deleted in batches.
+
+Rollup buckets expire per width (TELEMETRY_ROLLUP_RETENTION_DAYS): through
+retention policies on the continuous aggregates, or by the same job for the
+rollup table. They are derived from raw telemetry, so they are not archived.
+"""
+import csv
+import gzip
+import os
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from sqlalchemy import func, text
+from sqlalchemy.orm import Session
+
+from . import models, rollups
+from .database import timescaledb_enabled
+
+
+def parse_retention(value: str) -> dict[str, int]:
+    """Parse ``default:180,diagnostic:30`` into {class: days}."""
+    retention = {}
+    for item in value.split(","):
+        if ":" in item:
+            name, days = item.split(":", 1)
+            retention[name.strip()] = int(days)
+    retention.setdefault("default", 180)
+    return retention
+
+
+COMPRESS_AFTER_DAYS = int(os.getenv("TELEMETRY_COMPRESS_AFTER_DAYS", "7"))
+RETENTION_DAYS = parse_retention(os.getenv("TELEMETRY_RETENTION_DAYS", "default:180,process:180,diagnostic:30"))
+ARCHIVE_DIR = os.getenv("TELEMETRY_ARCHIVE_DIR", "archive")
+LIFECYCLE_INTERVAL_SECONDS = int(os.getenv("TELEMETRY_LIFECYCLE_INTERVAL_SECONDS", "3600"))
+DELETE_BATCH_ROWS = 10_000
+
+# Metric name -> retention class; anything unlisted uses "default".
+METRIC_CLASSES: dict[str, str] = {
+    **{name: "process" for name in (
+        "cycle_time", "mold_temp", "machine_temp", "clamping_pressure", "temp", "water_temp",
+        "inlet_temp", "outlet_temp", "flow_rate", "cut_pressure", "cycle_count", "weld_freq", "weld_time",
+    )},
+    **{name: "diagnostic" for name in ("vibration", "axis_x", "axis_y", "axis_z", "grip_pressure", "zone_temps")},
+}
+
+
+@dataclass(frozen=True)
+class ManagedTable:
+    """A time-partitioned telemetry table and how to segment / expire it."""
+
+    name: str
+    segment_by: str
+    class_column: str | None
+
+    @property
+    def model(self):
+        return {
+            "telemetry": models.Telemetry,
+            "telemetry_samples": models.TelemetrySample,
+            "telemetry_arrays": models.TelemetryArray,
+        }[self.name]
+
+
+MANAGED_TABLES = (
+    ManagedTable("telemetry", "equipment_id, metric_name", "metric_name"),
+    ManagedTable("telemetry_samples", "equipment_id", None),
+    ManagedTable("telemetry_arrays", "equipment_id, array_name", "array_name"),
+)
+
+_timescale = False
+
+
+def timescale_active() -> bool:
+    return _timescale
+
+
+def retention_horizon_days() -> int:
+    return max(RETENTION_DAYS.values())
+
+
+def setup_storage(engine) -> str:
+    """Convert telemetry tables to compressed hypertables with policies (idempotent).
+
+    create_all() builds ``telemetry`` with a single-column primary key, which
+    TimescaleDB rejects, so the key is widened to (id, time) before conversion.
+    Returns "timescale" or "plain".
+    """
+    global _timescale
+    with engine.connect() as connection:
+        if not timescaledb_enabled(connection):
+            _timescale = False
+            return "plain"
+        try:
+            existing = {row[0] for row in connection.execute(text(
+                "SELECT hypertable_name FROM timescaledb_information.hypertables"
+            ))}
+            for table in MANAGED_TABLES:
+                if table.name not in existing:
+                    _convert_to_hypertable(connection, table.name)
+                connection.execute(text(f"""
+                    ALTER TABLE {table.name} SET (
+                        timescaledb.compress,
+                        timescaledb.compress_segmentby = '{table.segment_by}',
+                        timescaledb.compress_orderby = 'time DESC'
+                    )
+                """))
+                connection.execute(text(
+                    f"SELECT add_compression_policy('{table.name}', INTERVAL '{COMPRESS_AFTER_DAYS} days', if_not_exists => true)"
+                ))
+                connection.execute(text(f"SELECT remove_retention_policy('{table.name}', if_exists => true)"))
+                connection.execute(text(
+                    f"SELECT add_retention_policy('{table.name}', INTERVAL '{retention_horizon_days()} days')"
+                ))
+            connection.commit()
+            _timescale = True
+        except Exception as e:
+            connection.rollback()
+            print(f"[WARN] Hypertable setup failed, telemetry stays in plain tables: {e}")
+            _timescale = False
+    return "timescale" if _timescale else "plain"
+
+
+def _convert_to_hypertable(connection, table_name: str) -> None:
+    primary_key = connection.execute(text("""
+        SELECT tc.constraint_name, array_agg(kcu.column_name::text)
+        FROM information_schema.table_constraints tc
+        JOIN information_schema.key_column_usage kcu ON tc.constraint_name = kcu.constraint_name
+        WHERE tc.table_name = :name AND tc.constraint_type = 'PRIMARY KEY'
+        GROUP BY tc.constraint_name
+    """), {"name": table_name}).first()
+    if primary_key is not None and "time" not in primary_key[1]:
+        connection.execute(text(f'ALTER TABLE {table_name} DROP CONSTRAINT "{primary_key[0]}"'))
+        connection.execute(text(f"ALTER TABLE {table_name} ADD PRIMARY KEY (id, time)"))
+    connection.execute(text(
+        f"SELECT create_hypertable('{table_name}', 'time', migrate_data => true, if_not_exists => true)"
+    ))
+
+
+def _expired_groups(table: ManagedTable, now: datetime) -> list[tuple[str, list[str] | None, datetime, bool]]:
+    """(class, names, cutoff, exclude) filters for rows past their class horizon.
+
+    With TimescaleDB only classes shorter than the chunk-dropping horizon need
+    row-level deletes; ``exclude=True`` selects every name not in an explicit class.
+    """
+    horizon = retention_horizon_days()
+    groups = []
+    if table.class_column is None:
+        if not _timescale:
+            groups.append(("all", None, now - timedelta(days=horizon), False))
+        return groups
+    for class_name, days in sorted(RETENTION_DAYS.items()):
+        if _timescale and days >= horizon:
+            continue
+        cutoff = now - timedelta(days=days)
+        if class_name == "default":
+            groups.append((class_name, list(METRIC_CLASSES), cutoff, True))
+        else:
+            names = [name for name, cls in METRIC_CLASSES.items() if cls == class_name]
+            if names:
+                groups.append((class_name, names, cutoff, False))
+    return groups
+
+
+def enforce_retention(db: Session, now: datetime | None = None, archive_dir: str | None = ARCHIVE_DIR) -> dict:
+    """Archive (gzip CSV) and delete telemetry rows past their metric-class retention."""
+    now = now or datetime.utcnow()
+    report = {"archived_files": [], "deleted_rows": {}}
+    for table in MANAGED_TABLES:
+        model = table.model
+        columns = [column.name for column in model.__table__.columns]
+        for class_name, names, cutoff, exclude in _expired_groups(table, now):
+            query = db.query(model).filter(model.time < cutoff)
+            if names is not None:
+                class_column = getattr(model, table.class_column)
+                query = query.filter(~class_column.in_(names) if exclude else class_column.in_(names))
+            deleted = 0
+            writer = handle = None
+            try:
+                while True:
+                    batch = query.order_by(model.time, model.id).limit(DELETE_BATCH_ROWS).all()
+                    if not batch:
+                        break
+                    if archive_dir:
+                        if writer is None:
+                            path = Path(archive_dir) / f"{table.name}-{class_name}-{now:%Y%m%dT%H%M%S}.csv.gz"
+                            path.parent.mkdir(parents=True, exist_ok=True)
+                            handle = gzip.open(path, "wt", newline="")
+                            writer = csv.writer(handle)
+                            writer.writerow(columns)
+                            report["archived_files"].append(str(path))
+                        for row in batch:
+                            writer.writerow([_archive_value(getattr(row, name)) for name in columns])
+                    db.query(model).filter(model.id.in_([row.id for row in batch])).delete(synchronize_session=False)
+                    db.commit()
+                    deleted += len(batch)
+            finally:
+                if handle is not None:
+                    handle.close()
+            if deleted:
+                report["deleted_rows"][f"{table.name}:{class_name}"] = deleted
+    if rollups.backend() == "table":
+        for width, days in sorted(rollups.ROLLUP_RETENTION_DAYS.items()):
+            deleted = db.query(models.TelemetryRollup).filter(
+                models.TelemetryRollup.bucket_width == width,
+                models.TelemetryRollup.bucket < now - timedelta(days=days),
+            ).delete(synchronize_session=False)
+            db.commit()
+            if deleted:
+                report["deleted_rows"][f"telemetry_rollups:{width}"] = deleted
+    return report
+
+
+def _archive_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, bytes):
+        return value.hex()
+    return "" if value is None else value
+
+
+def storage_report(db: Session) -> dict:
+    """Table and chunk sizes plus compression ratios for the telemetry tables."""
+    bind = db.get_bind()
+    tables = []
+    for table in MANAGED_TABLES:
+        model = table.model
+        oldest, newest, rows = db.query(
+            func.min(model.time), func.max(model.time), func.count(model.id)
+        ).one()
+        entry = {"table": table.name, "rows": rows, "oldest": oldest, "newest": newest}
+        if _timescale:
+            entry.update(_timescale_sizes(db, table.name))
+        elif bind.dialect.name == "sqlite":
+            entry["total_bytes"] = int(db.execute(text(
+                "SELECT COALESCE(SUM(pgsize), 0) FROM dbstat WHERE name IN "
+                "(SELECT name FROM sqlite_master WHERE tbl_name = :name)"
+            ), {"name": table.name}).scalar() or 0)
+        elif bind.dialect.name == "postgresql":
+            entry["total_bytes"] = int(db.execute(text("SELECT pg_total_relation_size(:name)"), {"name": table.name}).scalar() or 0)
+        tables.append(entry)
+    return {
+        "backend": "timescale" if _timescale else bind.dialect.name,
+        "compress_after_days": COMPRESS_AFTER_DAYS if _timescale else None,
+        "retention_days": RETENTION_DAYS,
+        "rollup_retention_days": rollups.ROLLUP_RETENTION_DAYS,
+        "archive_dir": ARCHIVE_DIR or None,
+        "tables": tables,
+    }
+
+
+def _timescale_sizes(db: Session, table_name: str) -> dict:
+    chunks = db.execute(text("""
+        SELECT c.chunk_name, c.range_start, c.range_end, c.is_compressed,
+               s.total_bytes,
+               cs.before_compression_total_bytes AS before_bytes,
+               cs.after_compression_total_bytes AS after_bytes
+        FROM timescaledb_information.chunks c
+        LEFT JOIN chunks_detailed_size(:name) s ON s.chunk_name = c.chunk_name
+        LEFT JOIN chunk_compression_stats(:name) cs ON cs.chunk_name = c.chunk_name
+        WHERE c.hypertable_name = :name
+        ORDER BY c.range_start
+    """), {"name": table_name}).all()
+    before = sum(chunk.before_bytes or 0 for chunk in chunks if chunk.is_compressed)
+    after = sum(chunk.after_bytes or 0 for chunk in chunks if chunk.is_compressed)
+    return {
+        "total_bytes": int(db.execute(text("SELECT hypertable_size(:name)"), {"name": table_name}).scalar() or 0),
+        "compressed_chunks": sum(1 for chunk in chunks if chunk.is_compressed),
+        "compression_ratio": round(before / after, 2) if after else None,
+        "chunks": [
+            {
+                "chunk": chunk.chunk_name,
+                "range_start": chunk.range_start,
+                "range_end": chunk.range_end,
+                "compressed": chunk.is_compressed,
+                "total_bytes": chunk.total_bytes,
+                "compression_ratio": round(chunk.before_bytes / chunk.after_bytes, 2)
+                if chunk.is_compressed and chunk.after_bytes else None,
+            }
+            for chunk in chunks
+        ],
+    }
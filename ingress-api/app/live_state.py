@@ -0,0 +1,404 @@
+"""
+Live-state backends — share last values and WebSocket fan-out across workers.
+
+Each API worker keeps its own LastValueStore and BroadcastHub. A backend
+forwards every locally ingested payload to the other workers, which merge it
+into their store and publish it to their own WebSocket clients, so any worker
+behind a load balancer serves the same live view.
+
+    memory    single process, nothing to share (default)
+    postgres  LISTEN/NOTIFY on the application database
+    redis     PUBLISH/SUBSCRIBE plus a hash of last payloads, over a minimal
+              RESP client (works with Redis, Valkey, KeyDB or any RESP server)
+
+Messages are JSON: {"origin": <worker id>, "payload": {...}},
+{"origin": ..., "clear": true} or {"origin": ..., "event": <name>} (e.g.
+"equipment" after a master-data change). Workers ignore their own messages.
+"""
+import asyncio
+import json
+import os
+import uuid
+from collections import deque
+from typing import Any, Callable
+from urllib.parse import unquote, urlparse
+
+from sqlalchemy.engine import make_url
+
+from .database import DATABASE_URL
+
+LIVE_STATE_BACKEND = os.getenv("LIVE_STATE_BACKEND", "memory").lower()
+LIVE_STATE_URL = os.getenv("LIVE_STATE_URL", os.getenv("REDIS_URL", "redis://localhost:6379/0"))
+LIVE_STATE_CHANNEL = os.getenv("LIVE_STATE_CHANNEL", "acron_telemetry")
+LIVE_STATE_OUTBOX_MAX = int(os.getenv("LIVE_STATE_OUTBOX_MAX", "10000"))
+LIVE_STATE_RETRY_SECONDS = float(os.getenv("LIVE_STATE_RETRY_SECONDS", "1"))
+LIVE_STATE_RETRY_MAX_SECONDS = float(os.getenv("LIVE_STATE_RETRY_MAX_SECONDS", "30"))
+PG_NOTIFY_MAX_BYTES = 7999
+
+
+class LiveStateBackend:
+    """In-process backend; also the base class holding the outbox and counters."""
+
+    name = "memory"
+
+    def __init__(self, channel: str = LIVE_STATE_CHANNEL):
+        self.channel = channel
+        self.origin = uuid.uuid4().hex
+        self.on_message: Callable[[dict], None] | None = None
+        self._outbox: deque[dict] = deque()
+        self._ready: asyncio.Event | None = None
+        self._tasks: list[asyncio.Task] = []
+        self.published = 0
+        self.received = 0
+        self.dropped = 0
+        self.errors = 0
+
+    async def start(self, on_message: Callable[[dict], None]) -> None:
+        self.on_message = on_message
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def publish(self, payload: dict) -> None:
+        """Share a merged device payload with the other workers (non-blocking)."""
+
+    def clear(self) -> None:
+        """Tell the other workers to drop their last values (demo reset)."""
+
+    def notify(self, event: str) -> None:
+        """Tell the other workers that ``event`` happened (e.g. "equipment" changed)."""
+
+    def metrics(self) -> dict:
+        return {
+            "backend": self.name,
+            "origin": self.origin,
+            "published": self.published,
+            "received": self.received,
+            "dropped": self.dropped,
+            "errors": self.errors,
+            "outbox": len(self._outbox),
+        }
+
+    def _deliver(self, raw: str | bytes) -> None:
+        try:
+            message = json.loads(raw)
+        except ValueError:
+            self.errors += 1
+            return
+        if message.get("origin") == self.origin or self.on_message is None:
+            return
+        self.received += 1
+        self.on_message(message)
+
+
+class _SharedBackend(LiveStateBackend):
+    """Backends that ship the outbox to other workers from a sender task."""
+
+    async def start(self, on_message: Callable[[dict], None]) -> None:
+        await super().start(on_message)
+        self._ready = asyncio.Event()
+        await self._open()
+        self._tasks.append(asyncio.create_task(self._send_loop()))
+
+    async def stop(self) -> None:
+        await super().stop()
+        await self._close()
+
+    def publish(self, payload: dict) -> None:
+        self._enqueue({"origin": self.origin, "payload": payload})
+
+    def clear(self) -> None:
+        self._enqueue({"origin": self.origin, "clear": True})
+
+    def notify(self, event: str) -> None:
+        self._enqueue({"origin": self.origin, "event": event})
+
+    def _enqueue(self, message: dict) -> None:
+        if self._ready is None:
+            return
+        if len(self._outbox) >= LIVE_STATE_OUTBOX_MAX:
+            self._outbox.popleft()
+            self.dropped += 1
+        self._outbox.append(message)
+        self._ready.set()
+
+    async def _send_loop(self) -> None:
+        while True:
+            await self._ready.wait()
+            self._ready.clear()
+            while self._outbox:
+                batch = list(self._outbox)
+                self._outbox.clear()
+                try:
+                    await self._send(batch)
+                    self.published += len(batch)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    self.errors += 1
+                    self.dropped += len(batch)
+                    print(f"[WARN] Live-state {self.name} publish failed, reconnecting: {e}")
+                    await asyncio.sleep(LIVE_STATE_RETRY_SECONDS)
+                    await self._reconnect_sender()
+
+    async def _open(self) -> None:
+        raise NotImplementedError
+
+    async def _close(self) -> None:
+        raise NotImplementedError
+
+    async def _send(self, batch: list[dict]) -> None:
+        raise NotImplementedError
+
+    async def _reconnect_sender(self) -> None:
+        pass
+
+
+class PostgresBackend(_SharedBackend):
+    """LISTEN/NOTIFY on the application database (payloads must fit in 8000 bytes).
+
+    A lost listener connection (database restart, network drop; TCP keepalives
+    surface silent ones) is reopened with capped exponential backoff and LISTEN
+    is issued again. Notifications sent while it was down are not replayed.
+    """
+
+    name = "postgres"
+
+    def __init__(self, url: str = DATABASE_URL, channel: str = LIVE_STATE_CHANNEL):
+        super().__init__(channel)
+        self.dsn = make_url(url).set(drivername="postgresql").render_as_string(hide_password=False)
+        self._listen_conn = None
+        self._notify_conn = None
+
+    def _connect(self):
+        import psycopg2
+
+        connection = psycopg2.connect(self.dsn, keepalives=1, keepalives_idle=30, keepalives_interval=10, keepalives_count=3)
+        connection.autocommit = True
+        return connection
+
+    def _connect_listener(self):
+        connection = self._connect()
+        with connection.cursor() as cursor:
+            cursor.execute(f'LISTEN "{self.channel}"')
+        return connection
+
+    async def _open(self) -> None:
+        await self._listen()
+        self._notify_conn = await asyncio.to_thread(self._connect)
+
+    async def _listen(self) -> None:
+        self._listen_conn = await asyncio.to_thread(self._connect_listener)
+        asyncio.get_running_loop().add_reader(self._listen_conn.fileno(), self._on_readable)
+
+    def _drop_listener(self) -> None:
+        connection, self._listen_conn = self._listen_conn, None
+        if connection is None:
+            return
+        try:
+            asyncio.get_running_loop().remove_reader(connection.fileno())
+        except Exception:
+            pass  # the socket is already gone
+        connection.close()
+
+    async def _close(self) -> None:
+        self._drop_listener()
+        if self._notify_conn is not None:
+            self._notify_conn.close()
+        self._notify_conn = None
+
+    async def _relisten(self) -> None:
+        delay = LIVE_STATE_RETRY_SECONDS
+        while True:
+            await asyncio.sleep(delay)
+            try:
+                await self._listen()
+            except Exception as e:
+                delay = min(delay * 2, LIVE_STATE_RETRY_MAX_SECONDS)
+                print(f"[WARN] Live-state postgres LISTEN failed, retrying in {delay:.0f}s: {e}")
+                continue
+            print("[OK] Live-state postgres listener reconnected")
+            return
+
+    def _on_readable(self) -> None:
+        try:
+            self._listen_conn.poll()
+        except Exception as e:
+            self.errors += 1
+            print(f"[WARN] Live-state postgres listener lost, reconnecting: {e}")
+            self._drop_listener()
+            self._tasks = [task for task in self._tasks if not task.done()]
+            self._tasks.append(asyncio.create_task(self._relisten()))
+            return
+        while self._listen_conn.notifies:
+            self._deliver(self._listen_conn.notifies.pop(0).payload)
+
+    def _notify(self, batch: list[dict]) -> None:
+        with self._notify_conn.cursor() as cursor:
+            for message in batch:
+                raw = json.dumps(message)
+                if len(raw.encode()) > PG_NOTIFY_MAX_BYTES:
+                    self.dropped += 1
+                    continue
+                cursor.execute("SELECT pg_notify(%s, %s)", (self.channel, raw))
+
+    async def _send(self, batch: list[dict]) -> None:
+        await asyncio.to_thread(self._notify, batch)
+
+    async def _reconnect_sender(self) -> None:
+        try:
+            if self._notify_conn is not None:
+                self._notify_conn.close()
+            self._notify_conn = await asyncio.to_thread(self._connect)
+        except Exception as e:
+            print(f"[WARN] Live-state postgres reconnect failed: {e}")
+
+
+class RespError(RuntimeError):
+    """Error reply (``-ERR ...``) from a RESP server."""
+
+
+class RespConnection:
+    """Minimal RESP2 client: enough for AUTH/SELECT, HSET/HGETALL/DEL, PUBLISH/SUBSCRIBE."""
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+
+    @classmethod
+    async def open(cls, url: str) -> "RespConnection":
+        parsed = urlparse(url)
+        reader, writer = await asyncio.open_connection(parsed.hostname or "localhost", parsed.port or 6379)
+        connection = cls(reader, writer)
+        if parsed.password:
+            auth = [unquote(parsed.username), unquote(parsed.password)] if parsed.username else [unquote(parsed.password)]
+            await connection.call("AUTH", *auth)
+        database = parsed.path.strip("/")
+        if database and database != "0":
+            await connection.call("SELECT", database)
+        return connection
+
+    @staticmethod
+    def encode(*args: Any) -> bytes:
+        parts = [b"*%d\r\n" % len(args)]
+        for arg in args:
+            data = arg if isinstance(arg, bytes) else str(arg).encode()
+            parts.append(b"$%d\r\n%s\r\n" % (len(data), data))
+        return b"".join(parts)
+
+    def send(self, *args: Any) -> None:
+        self.writer.write(self.encode(*args))
+
+    async def read(self) -> Any:
+        line = await self.reader.readuntil(b"\r\n")
+        kind, body = line[:1], line[1:-2]
+        if kind == b"+":
+            return body.decode()
+        if kind == b"-":
+            raise RespError(body.decode())
+        if kind == b":":
+            return int(body)
+        if kind == b"$":
+            length = int(body)
+            if length < 0:
+                return None
+            return (await self.reader.readexactly(length + 2))[:-2]
+        if kind == b"*":
+            length = int(body)
+            return None if length < 0 else [await self.read() for _ in range(length)]
+        raise RespError(f"Unexpected RESP reply: {line!r}")
+
+    async def call(self, *args: Any) -> Any:
+        self.send(*args)
+        await self.writer.drain()
+        return await self.read()
+
+    async def close(self) -> None:
+        self.writer.close()
+        try:
+            await self.writer.wait_closed()
+        except Exception:
+            pass
+
+
+class RedisBackend(_SharedBackend):
+    """PUBLISH/SUBSCRIBE fan-out plus a hash of the last payload per device."""
+
+    name = "redis"
+
+    def __init__(self, url: str = LIVE_STATE_URL, channel: str = LIVE_STATE_CHANNEL):
+        super().__init__(channel)
+        self.url = url
+        self.key = f"{channel}:latest"
+        self._commands: RespConnection | None = None
+        self._subscriber: RespConnection | None = None
+
+    async def _open(self) -> None:
+        self._commands = await RespConnection.open(self.url)
+        stored = await self._commands.call("HGETALL", self.key) or []
+        for raw in stored[1::2]:
+            self.on_message({"payload": json.loads(raw)})
+        await self._subscribe()
+        self._tasks.append(asyncio.create_task(self._listen()))
+
+    async def _subscribe(self) -> None:
+        self._subscriber = await RespConnection.open(self.url)
+        await self._subscriber.call("SUBSCRIBE", self.channel)
+
+    async def _close(self) -> None:
+        for connection in (self._commands, self._subscriber):
+            if connection is not None:
+                await connection.close()
+        self._commands = self._subscriber = None
+
+    async def _listen(self) -> None:
+        while True:
+            try:
+                reply = await self._subscriber.read()
+                if isinstance(reply, list) and len(reply) == 3 and reply[0] == b"message":
+                    self._deliver(reply[2])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.errors += 1
+                print(f"[WARN] Live-state redis subscriber lost, resubscribing: {e}")
+                await asyncio.sleep(LIVE_STATE_RETRY_SECONDS)
+                try:
+                    await self._subscriber.close()
+                    await self._subscribe()
+                except Exception as retry_error:
+                    print(f"[WARN] Live-state redis resubscribe failed: {retry_error}")
+
+    async def _send(self, batch: list[dict]) -> None:
+        replies = 0
+        for message in batch:
+            if message.get("clear"):
+                self._commands.send("DEL", self.key)
+                replies += 1
+            elif "payload" in message:
+                self._commands.send("HSET", self.key, message["payload"]["device_id"], json.dumps(message["payload"]))
+                replies += 1
+            self._commands.send("PUBLISH", self.channel, json.dumps(message))
+            replies += 1
+        await self._commands.writer.drain()
+        for _ in range(replies):
+            await self._commands.read()
+
+    async def _reconnect_sender(self) -> None:
+        try:
+            await self._commands.close()
+            self._commands = await RespConnection.open(self.url)
+        except Exception as e:
+            print(f"[WARN] Live-state redis reconnect failed: {e}")
+
+
+BACKENDS = {"memory": LiveStateBackend, "postgres": PostgresBackend, "redis": RedisBackend}
+
+
+def create_backend(name: str = LIVE_STATE_BACKEND) -> LiveStateBackend:
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown LIVE_STATE_BACKEND {name!r}; expected one of {', '.join(BACKENDS)}")
+    return BACKENDS[name]()
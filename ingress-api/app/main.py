@@ -1,5 +1,7 @@
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Depends, HTTPException, status
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Depends, Header, HTTPException, Query, Request, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 from .schemas import (
@@ -17,9 +19,18 @@ from .schemas import (
     ChatRequest,
     ChatResponse,
 )
-from . import models, auth
+from . import models, auth, frame_codec, history, lifecycle, live_state, rollups, sse, telemetry_store, zone_arrays
+from .response_cache import cache as response_cache
 from .phase2 import router as phase2_router
-from .database import DATABASE_URL, engine, get_db, init_db, check_db_connection, SessionLocal
+from .ingest import BatchParseError, latest_payload, parse_batch_body, telemetry_rows, write_telemetry_rows
+from .write_behind import QueueFullError, WriteBehindBuffer
+from .spool import DiskSpool, SpoolReplayer
+from .last_values import LastValueStore
+from .broadcast import BroadcastHub, Subscription, SubscriptionError
+from .oee_engine import compute_oee
+from .equipment_registry import registry as equipment_registry
+from .database import DATABASE_URL, async_engine, db_monitor, engine, get_db, init_db, check_db_connection, run_read, with_session, SessionLocal
+from .db_health import DatabaseUnavailableError
 from datetime import datetime, timedelta
 import json
 import asyncio
@@ -77,31 +88,53 @@ def generate_metrics(device):
         metrics = {"weld_freq": random.normalvariate(20000, 100), "weld_time": random.normalvariate(2.5, 0.1), "model": PROCESS_MODELS.get(device_id, "UNKNOWN")}
     return metrics
 
-latest_telemetry = {}
-
-class ConnectionManager:
-    def __init__(self):
-        self.active_connections: list[WebSocket] = []
-    async def connect(self, websocket: WebSocket):
-        await websocket.accept()
-        self.active_connections.append(websocket)
-    def disconnect(self, websocket: WebSocket):
-        if websocket in self.active_connections:
-            self.active_connections.remove(websocket)
-    async def broadcast(self, message: str):
-        for connection in self.active_connections:
-            try:
-                await connection.send_text(message)
-            except:
-                pass
+latest_telemetry = LastValueStore()
+
+hub = BroadcastHub()
+telemetry_events = sse.EventLog()
+live_backend = live_state.create_backend()
+equipment_registry.listeners.append(lambda version: live_backend.notify("equipment"))
+
+def _publish_local(payload: dict) -> None:
+    hub.publish(payload)
+    telemetry_events.append(payload)
+
+def publish_live(payload: dict) -> None:
+    """Fan a merged device payload out to local WebSocket/SSE clients and the other workers."""
+    _publish_local(payload)
+    live_backend.publish(payload)
+
+def apply_live_message(message: dict) -> None:
+    """Merge a payload ingested by another worker and push it to local clients."""
+    if message.get("clear"):
+        latest_telemetry.clear()
+        return
+    if message.get("event") == "equipment":
+        equipment_registry.invalidate(notify=False)
+        response_cache.clear()
+        return
+    payload = message["payload"]
+    latest_telemetry.update(payload)
+    _publish_local(latest_telemetry[payload["device_id"]])
+
+
+def store_telemetry_rows(rows: list[dict], idempotent: bool = False) -> int:
+    """Write telemetry rows, then drop cached closed-window responses they fall into."""
+    written = write_telemetry_rows(rows, idempotent)
+    response_cache.invalidate_rows(rows)
+    return written
 
-manager = ConnectionManager()
+def replay_telemetry_rows(rows: list[dict]) -> int:
+    return store_telemetry_rows(rows, idempotent=True)
+
+ingest_spool = DiskSpool.from_env()
+write_buffer = WriteBehindBuffer.from_env(store_telemetry_rows, breaker=db_monitor, spool=ingest_spool)
+spool_replayer = SpoolReplayer(ingest_spool, replay_telemetry_rows, db_monitor) if ingest_spool else None
 
 async def background_simulator_loop():
     while True:
         try:
             current_time = datetime.utcnow().isoformat() + "Z"
-            db = SessionLocal()
             for device in DEVICES:
                 metrics = generate_metrics(device)
                 
@@ -112,28 +145,14 @@ async def background_simulator_loop():
                     "meta": {"type": device["type"]}
                 }
                 
-                latest_telemetry[device["id"]] = payload
+                latest_telemetry.update(payload)
                 
-                await manager.broadcast(json.dumps({
-                    "type": "telemetry",
-                    "data": payload
-                }))
+                publish_live(latest_telemetry[device["id"]])
                 
-                timestamp = datetime.utcnow()
-                for metric_name, metric_value in metrics.items():
-                    if isinstance(metric_value, list):
-                        continue
-                    if isinstance(metric_value, (int, float)):
-                        telemetry_record = models.Telemetry(
-                            time=timestamp,
-                            equipment_id=device["id"],
-                            metric_name=metric_name,
-                            metric_value=float(metric_value),
-                            status="normal"
-                        )
-                        db.add(telemetry_record)
-            db.commit()
-            db.close()
+                rows = [row for row in telemetry_rows(TelemetryInput(**payload)) if row["metric_value"] is not None]
+                write_buffer.enqueue(rows)
+        except QueueFullError as e:
+            print(f"Simulator backpressure: {e}")
         except Exception as e:
             print(f"Simulator error: {e}")
         await asyncio.sleep(5.0)
@@ -159,6 +178,9 @@ def seed_database(reset: bool = False):
             db.query(models.AlertRule).delete()
             db.query(models.ConnectorConfig).delete()
             db.query(models.Telemetry).delete()
+            db.query(models.TelemetrySample).delete()
+            db.query(models.TelemetryArray).delete()
+            db.query(models.TelemetryRollup).delete()
             db.query(models.Alert).delete()
             db.query(models.Equipment).delete()
             db.query(models.MoldModel).delete()
@@ -298,29 +320,128 @@ def seed_database(reset: bool = False):
             )
 
         db.commit()
+        equipment_registry.invalidate()
         print("[INIT] Demo users, factory master, and equipment seeded successfully.")
     except Exception as e:
         print(f"Failed to seed DB: {e}")
     finally:
         db.close()
 
+def _backfill_rollups():
+    """Build the rollup table from existing telemetry the first time it is used."""
+    db = SessionLocal()
+    try:
+        if rollups.backend() == "table" and not db.query(models.TelemetryRollup).first() and db.query(models.Telemetry).first():
+            print(f"[OK] Backfilled {rollups.backfill(db)} telemetry rollup buckets")
+    except Exception as e:
+        print(f"[WARN] Rollup backfill failed: {e}")
+    finally:
+        db.close()
+
+def _warm_latest_telemetry():
+    if latest_telemetry.warmed:
+        return
+    db = SessionLocal()
+    try:
+        loaded = latest_telemetry.warm(db)
+        print(f"[OK] Last-value cache warmed with {loaded} metric values")
+    except Exception as e:
+        print(f"[WARN] Last-value cache warm-up failed: {e}")
+    finally:
+        db.close()
+
+lifecycle_task = None
+rollup_refresh_task = None
+
+def _run_retention():
+    db = SessionLocal()
+    try:
+        return lifecycle.enforce_retention(db)
+    finally:
+        db.close()
+
+async def storage_lifecycle_loop():
+    """Archive and delete expired telemetry every TELEMETRY_LIFECYCLE_INTERVAL_SECONDS."""
+    while True:
+        await asyncio.sleep(lifecycle.LIFECYCLE_INTERVAL_SECONDS)
+        try:
+            report = await run_in_threadpool(_run_retention)
+            if report["deleted_rows"]:
+                print(f"[OK] Telemetry retention removed {report['deleted_rows']}")
+        except Exception as e:
+            print(f"[WARN] Telemetry retention job failed: {e}")
+
+async def rollup_refresh_loop():
+    """Refresh continuous-aggregate buckets late telemetry landed in every TELEMETRY_ROLLUP_REFRESH_SECONDS."""
+    while True:
+        await asyncio.sleep(rollups.ROLLUP_REFRESH_SECONDS)
+        try:
+            refreshed = await run_in_threadpool(rollups.refresh_late_buckets, engine)
+            if refreshed:
+                print(f"[OK] Refreshed late telemetry rollups: {', '.join(sorted(refreshed))}")
+        except Exception as e:
+            print(f"[WARN] Telemetry rollup refresh failed: {e}")
+
 @app.on_event("startup")
 async def startup():
+    global lifecycle_task, rollup_refresh_task, live_backend
     try:
         if check_db_connection():
             models.Base.metadata.create_all(bind=engine)
             print("[OK] Database connection successful and schema created/verified")
+            print(f"[OK] Telemetry storage layout: {telemetry_store.repository().layout}")
+            print(f"[OK] Telemetry tables: {lifecycle.setup_storage(engine)}")
+            print(f"[OK] Telemetry rollups using {rollups.setup_rollups(engine)} backend")
             seed_database()
+            _backfill_rollups()
+            _warm_latest_telemetry()
         else:
             print("[WARN] Database not available - running in memory-only mode")
     except Exception as e:
         print(f"[WARN] Database initialization failed: {e}")
         print("[WARN] Running in memory-only mode (data will not persist)")
     
+    try:
+        await live_backend.start(apply_live_message)
+    except Exception as e:
+        print(f"[WARN] Live-state backend {live_backend.name} unavailable, serving this worker only: {e}")
+        live_backend = live_state.LiveStateBackend()
+        await live_backend.start(apply_live_message)
+    print(f"[OK] Live-state backend: {live_backend.name}")
+    await db_monitor.start()
+    await write_buffer.start()
+    if spool_replayer is not None:
+        await spool_replayer.start()
+    lifecycle_task = asyncio.create_task(storage_lifecycle_loop())
+    if rollups.backend() == "timescale":
+        rollup_refresh_task = asyncio.create_task(rollup_refresh_loop())
     if SIMULATOR_ENABLED:
         asyncio.create_task(background_simulator_loop())
         print("[OK] Internal Telemetry Simulator started")
 
+@app.on_event("shutdown")
+async def shutdown():
+    if lifecycle_task is not None:
+        lifecycle_task.cancel()
+    if rollup_refresh_task is not None:
+        rollup_refresh_task.cancel()
+    await hub.close()
+    await live_backend.stop()
+    await db_monitor.stop()
+    if async_engine is not None:
+        await async_engine.dispose()
+    await write_buffer.stop()
+    if spool_replayer is not None:
+        await spool_replayer.stop()
+
+@app.exception_handler(DatabaseUnavailableError)
+async def database_unavailable_handler(request: Request, exc: DatabaseUnavailableError):
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(max(int(db_monitor.interval), 1))},
+    )
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -329,99 +450,180 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-@app.post("/api/v1/telemetry")
-async def ingest_telemetry(t: TelemetryInput, db: Session = Depends(get_db)):
-    """Ingest telemetry data and store in database"""
+@app.post("/api/v1/telemetry", status_code=status.HTTP_202_ACCEPTED)
+async def ingest_telemetry(t: TelemetryInput):
+    """Validate telemetry, publish it live and queue it for the write-behind flusher"""
     try:
-        timestamp = datetime.fromisoformat(t.ts.replace('Z', '+00:00'))
-        for metric_name, metric_value in t.metrics.items():
-            if isinstance(metric_value, list):
-                continue
-            telemetry_record = models.Telemetry(
-                time=timestamp,
-                equipment_id=t.device_id,
-                metric_name=metric_name,
-                metric_value=float(metric_value) if isinstance(metric_value, (int, float)) else None,
-                status="normal"
-            )
-            db.add(telemetry_record)
-        db.commit()
-        latest_telemetry[t.device_id] = t.model_dump() if hasattr(t, 'model_dump') else t.dict()
-        await manager.broadcast(json.dumps({
-            "type": "telemetry",
-            "data": latest_telemetry[t.device_id]
-        }))
-        return {"status": "ok", "device_id": t.device_id, "stored": "database"}
-    except Exception as e:
-        print(f"Database error: {e}, falling back to memory")
-        latest_telemetry[t.device_id] = t.model_dump() if hasattr(t, 'model_dump') else t.dict()
-        return {"status": "ok", "device_id": t.device_id, "stored": "memory"}
+        rows = telemetry_rows(t)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=f"Invalid telemetry timestamp: {e}") from e
+    try:
+        write_buffer.enqueue(rows)
+    except QueueFullError as e:
+        raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail=str(e), headers={"Retry-After": "1"}) from e
+    latest_telemetry.update(latest_payload(t))
+    publish_live(latest_telemetry[t.device_id])
+    return {"status": "accepted", "device_id": t.device_id, "rows": len(rows), "stored": "queued"}
 
-@app.get("/api/v1/telemetry/latest")
-async def get_latest_telemetry(db: Session = Depends(get_db)):
-    """Get latest telemetry for all equipment"""
+@app.post("/api/v1/telemetry/batch")
+async def ingest_telemetry_batch(request: Request):
+    """Ingest an array (JSON) or stream (NDJSON) of telemetry records in one transaction; gzip bodies are accepted."""
     try:
-        if check_db_connection():
-            from sqlalchemy import func
-            latest_data = {}
-            equipment_list = db.query(models.Equipment).filter_by(active=True).all()
-            for equipment in equipment_list:
-                metrics_query = db.query(
-                    models.Telemetry.metric_name,
-                    models.Telemetry.metric_value,
-                    func.max(models.Telemetry.time).label('time')
-                ).filter(
-                    models.Telemetry.equipment_id == equipment.equipment_id
-                ).group_by(
-                    models.Telemetry.metric_name,
-                    models.Telemetry.metric_value
-                ).all()
-                if metrics_query:
-                    metrics_dict = {m.metric_name: m.metric_value for m in metrics_query}
-                    latest_data[equipment.equipment_id] = {
-                        "device_id": equipment.equipment_id,
-                        "ts": str(metrics_query[0].time) if metrics_query else str(datetime.now()),
-                        "metrics": metrics_dict,
-                        "meta": {"type": equipment.equipment_type}
-                    }
-            latest_data.update(latest_telemetry)
-            return latest_data
+        records = parse_batch_body(
+            await request.body(), request.headers.get("content-type"), request.headers.get("content-encoding")
+        )
+        rows = []
+        for t in records:
+            rows.extend(telemetry_rows(t))
+    except (BatchParseError, ValueError) as exc:
+        raise HTTPException(status_code=422, detail=str(exc)) from exc
+    stored = "database"
+    try:
+        db_monitor.guard()
+        await run_in_threadpool(store_telemetry_rows, rows)
     except Exception as e:
-        print(f"Database query error: {e}")
-    return latest_telemetry
+        if not isinstance(e, DatabaseUnavailableError):
+            print(f"[WARN] Batch insert failed, handing {len(rows)} rows to the ingest buffer: {e}")
+        try:
+            write_buffer.enqueue(rows)
+        except QueueFullError as full:
+            raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail=str(full), headers={"Retry-After": "1"}) from full
+        stored = "buffered"
+    for t in records:
+        latest_telemetry.update(latest_payload(t))
+        publish_live(latest_telemetry[t.device_id])
+    return {"status": "ok", "records": len(records), "rows": len(rows), "stored": stored}
+
+@app.get("/api/v1/telemetry/latest")
+async def get_latest_telemetry():
+    """Get latest telemetry for all equipment from the in-memory last-value store"""
+    return latest_telemetry.snapshot()
 
 @app.get("/api/v1/telemetry/history/{equipment_id}")
 async def get_telemetry_history(
     equipment_id: str,
     hours: int = 24,
-    db: Session = Depends(get_db)
+    start: datetime | None = None,
+    end: datetime | None = None,
+    metric: list[str] | None = Query(None),
+    cursor: str | None = None,
+    limit: int = Query(1000, ge=1, le=10000),
+    order: str = "desc",
+    format: str = "json",
+    fields: str | None = None,
+    bucket: str | None = None,
+    agg: str = "avg",
+    points: int | None = Query(None, ge=3, le=100000),
 ):
-    """Get historical telemetry for specific equipment"""
-    from datetime import timedelta
-    from sqlalchemy import and_
-    cutoff_time = datetime.now() - timedelta(hours=hours)
-    history = db.query(models.Telemetry).filter(
-        and_(
-            models.Telemetry.equipment_id == equipment_id,
-            models.Telemetry.time >= cutoff_time
-        )
-    ).order_by(models.Telemetry.time.desc()).limit(10000).all()
+    """Historical telemetry for one machine.
+
+    JSON responses are keyset pages (follow ``next_cursor``); ``format=ndjson``
+    or ``csv`` streams every matching row. ``bucket=1m&agg=max`` or
+    ``points=500`` (LTTB) return a downsampled series instead of raw rows.
+    """
+    start = history.naive_utc(start) or datetime.utcnow() - timedelta(hours=hours)
+    end = history.naive_utc(end)
+    if format not in ("json", "ndjson", "csv"):
+        raise HTTPException(status_code=422, detail="format must be json, ndjson or csv")
+    if order not in ("asc", "desc"):
+        raise HTTPException(status_code=422, detail="order must be asc or desc")
+    if agg not in history.AGGREGATES:
+        raise HTTPException(status_code=422, detail=f"agg must be one of {', '.join(history.AGGREGATES)}")
+    try:
+        bucket_size = history.parse_bucket(bucket) if bucket else None
+        selected = history.parse_fields(fields)
+        if cursor:
+            history.decode_cursor(cursor)
+    except history.HistoryQueryError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+    if bucket_size is not None or points is not None:
+        series = await run_read(_downsampled_series, equipment_id, start, end, metric, bucket_size, agg, points)
+        if format != "json":
+            columns = tuple(series[0].keys()) if series else ("time", "metric", "value")
+            return StreamingResponse(history.stream_records(series, format, columns), media_type=HISTORY_MEDIA_TYPES[format])
+        return {
+            "equipment_id": equipment_id,
+            "bucket": bucket,
+            "agg": agg if bucket else None,
+            "points": points if not bucket else None,
+            "records": len(series),
+            "data": series,
+        }
+
+    if format == "json":
+        return await run_read(history.fetch_page, equipment_id, start, end, metric, cursor, order == "desc", limit, selected)
+
+    db_monitor.guard()  # before the response starts; the generator opens its session lazily
+
+    def stream_rows():
+        db = SessionLocal()
+        try:
+            rows = history.iter_rows(db, equipment_id, start, end, metric, cursor, order == "desc")
+            yield from history.stream_records((history.row_dict(row, selected) for row in rows), format, selected)
+        finally:
+            db.close()
+
+    return StreamingResponse(stream_rows(), media_type=HISTORY_MEDIA_TYPES[format])
+
+
+HISTORY_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+def _downsampled_series(db, equipment_id, start, end, metrics, bucket_size, agg, points):
+    width = history.rollup_width(bucket_size) if bucket_size is not None else None
+    if width is not None:
+        return history.rollup_series(db, equipment_id, start, end, metrics, width, agg)
+    rows = history.iter_rows(db, equipment_id, start, end, metrics, descending=False)
+    if bucket_size is not None:
+        return sorted(history.bucket_series(rows, start, bucket_size, agg), key=lambda p: (p["time"], p["metric"]))
+    return history.lttb_series(rows, points)
+
+@app.get("/api/v1/telemetry/zones/out-of-range")
+async def get_zone_violations(
+    hours: int = 1,
+    start: datetime | None = None,
+    end: datetime | None = None,
+    low: float = zone_arrays.ZONE_TEMP_MIN,
+    high: float = zone_arrays.ZONE_TEMP_MAX,
+    equipment_id: str | None = None,
+    array: str = "zone_temps",
+):
+    """Machines and zones whose readings left [low, high] in the window."""
+    start = history.naive_utc(start) or datetime.utcnow() - timedelta(hours=hours)
+    end = history.naive_utc(end)
+
+    db_monitor.guard()
+    machines = await run_in_threadpool(with_session, zone_arrays.scan_out_of_range, start, end, low, high, equipment_id, array)
     return {
-        "equipment_id": equipment_id,
-        "records": len(history),
-        "data": [
-            {
-                "time": str(h.time),
-                "metric": h.metric_name,
-                "value": h.metric_value
-            } for h in history
-        ]
+        "array": array,
+        "low": low,
+        "high": high,
+        "start": start,
+        "end": end,
+        "machines": [item for item in machines if item["violating_samples"]],
+        "scanned_machines": len(machines),
     }
 
+@app.get("/api/v1/telemetry/zones/{equipment_id}")
+async def get_zone_stats(
+    equipment_id: str,
+    hours: int = 1,
+    start: datetime | None = None,
+    end: datetime | None = None,
+    array: str = "zone_temps",
+):
+    """Per-zone min/max/mean of an array metric for one machine."""
+    start = history.naive_utc(start) or datetime.utcnow() - timedelta(hours=hours)
+    end = history.naive_utc(end)
+    db_monitor.guard()
+    stats = await run_in_threadpool(with_session, zone_arrays.zone_stats, equipment_id, start, end, array)
+    return {"equipment_id": equipment_id, "array": array, **stats}
+
 @app.get("/health")
 async def health_check():
-    """Health check endpoint"""
-    db_status = check_db_connection()
+    """Health check endpoint (database status comes from the background monitor)"""
+    db_status = db_monitor.available
     return {
         "status": "healthy" if db_status else "degraded",
         "database": "connected" if db_status else "disconnected",
@@ -434,14 +636,19 @@ async def health_check():
 @app.get("/api/v1/health")
 async def platform_health():
     """Health checks for API, dashboard dependency, database, and simulator."""
-    db_status = check_db_connection()
+    db_status = db_monitor.available
     return {
         "status": "healthy" if db_status else "degraded",
         "checks": {
             "api": {"status": "up"},
-            "database": {"status": "connected" if db_status else "disconnected"},
+            "database": db_monitor.status(),
             "dashboard": {"status": "ready", "api_url": os.getenv("PUBLIC_API_URL", "local")},
             "simulator": {"status": "running" if SIMULATOR_ENABLED else "disabled", "latest_devices": len(latest_telemetry)},
+            "ingest_queue": {
+                "status": "holding" if write_buffer.paused else "running" if write_buffer.running else "stopped",
+                "depth": len(write_buffer),
+                "capacity": write_buffer.max_rows,
+            },
         },
         "timestamp": datetime.utcnow().isoformat() + "Z",
     }
@@ -459,10 +666,80 @@ async def simulator_health():
         "timestamp": datetime.utcnow().isoformat() + "Z",
     }
 
+@app.get("/api/v1/metrics/ingest")
+async def ingest_metrics():
+    """Write-behind queue depth, throughput and flush latency counters, plus the database breaker."""
+    return {
+        **write_buffer.metrics(),
+        "database": db_monitor.status(),
+        "spool": ingest_spool.metrics() if ingest_spool else None,
+        "timestamp": datetime.utcnow().isoformat() + "Z",
+    }
+
+@app.get("/api/v1/metrics/websocket")
+async def websocket_metrics():
+    """Live fan-out counters: connected clients, coalesced/dropped frames, send latency."""
+    return {**hub.metrics(), "live_state": live_backend.metrics(), "timestamp": datetime.utcnow().isoformat() + "Z"}
+
+@app.get("/api/v1/stream/telemetry")
+async def stream_telemetry(
+    request: Request,
+    device: list[str] | None = Query(None),
+    type: list[str] | None = Query(None),
+    metric: list[str] | None = Query(None),
+    last_event_id: str | None = Query(None, alias="lastEventId"),
+    last_event_id_header: str | None = Header(None, alias="Last-Event-ID"),
+):
+    """Server-Sent Events: a snapshot, then live telemetry for the matching devices.
+
+    Reconnecting clients resume from Last-Event-ID (header or ``lastEventId``)
+    while the event is still in the ring buffer; otherwise they get a new snapshot.
+    """
+    subscription = Subscription(
+        devices=frozenset(device) if device else None,
+        types=frozenset(type) if type else None,
+        metrics=frozenset(metric) if metric else None,
+    )
+    events = sse.stream_events(
+        telemetry_events,
+        subscription,
+        last_event_id_header or last_event_id,
+        lambda: latest_telemetry.snapshot().values(),
+        request.is_disconnected,
+    )
+    return StreamingResponse(events, media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.get("/api/v1/metrics/stream")
+async def stream_metrics():
+    """SSE stream count, ring-buffer depth and resume/snapshot counters."""
+    return {**telemetry_events.metrics(), "timestamp": datetime.utcnow().isoformat() + "Z"}
+
+@app.get("/api/v1/metrics/cache")
+async def cache_metrics():
+    """Response cache entries, memory, hit/miss/coalesced and invalidation counters."""
+    return {
+        **response_cache.metrics(),
+        "equipment_registry": equipment_registry.metrics(),
+        "timestamp": datetime.utcnow().isoformat() + "Z",
+    }
+
+@app.get("/api/v1/admin/storage")
+async def storage_status(
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(auth.require_roles("admin")),
+):
+    """Telemetry table/chunk sizes, compression ratios and retention settings."""
+    return lifecycle.storage_report(db)
+
+@app.post("/api/v1/admin/storage/retention")
+async def run_storage_retention(current_user: models.User = Depends(auth.require_roles("admin"))):
+    """Run the archive-and-delete retention job now."""
+    return await run_in_threadpool(_run_retention)
+
 @app.get("/api/v1/equipment")
 async def list_equipment(db: Session = Depends(get_db)):
     """List all equipment"""
-    equipment = db.query(models.Equipment).filter_by(active=True).all()
+    equipment = equipment_registry.machines(db)
     return [
         EquipmentResponse.from_orm(e) for e in equipment
     ]
@@ -470,18 +747,18 @@ async def list_equipment(db: Session = Depends(get_db)):
 @app.get("/api/v1/factory/machines")
 async def list_machine_master(db: Session = Depends(get_db)):
     """List machine master data with plant/line/cell/process/mold context."""
-    equipment = db.query(models.Equipment).filter_by(active=True).all()
+    equipment = equipment_registry.machines(db)
     result = []
     for item in equipment:
         result.append({
             "equipment_id": item.equipment_id,
             "equipment_type": item.equipment_type,
             "description": item.description,
-            "plant": item.cell.line.plant.name if item.cell and item.cell.line and item.cell.line.plant else None,
-            "line": item.cell.line.name if item.cell and item.cell.line else None,
-            "cell": item.cell.name if item.cell else None,
-            "process": item.process.name if item.process else None,
-            "mold_model": item.mold_model.model_code if item.mold_model else None,
+            "plant": item.plant,
+            "line": item.line,
+            "cell": item.cell,
+            "process": item.process,
+            "mold_model": item.mold_model,
             "plc_protocol": item.plc_protocol,
             "plc_address": item.plc_address,
             "cycle_time_standard": item.cycle_time_standard,
@@ -523,45 +800,30 @@ async def upsert_machine_master(
     equipment.target_per_hour = payload.target_per_hour
     equipment.active = True
     db.commit()
+    equipment_registry.invalidate()
+    response_cache.clear()
     return {"status": "ok", "equipment_id": equipment.equipment_id}
 
 @app.get("/api/v1/oee", response_model=list[OeeResponse])
-async def calculate_oee(hours: int = 8, db: Session = Depends(get_db)):
+async def calculate_oee(hours: int = 8):
     """Calculate Availability x Performance x Quality and a basic loss tree."""
     cutoff = datetime.utcnow() - timedelta(hours=hours)
-    equipment = db.query(models.Equipment).filter_by(active=True).all()
-    response = []
-    for item in equipment:
-        telemetry = db.query(models.Telemetry).filter(
-            models.Telemetry.equipment_id == item.equipment_id,
-            models.Telemetry.time >= cutoff,
-        ).all()
-        downtime_minutes = sum(
-            event.minutes for event in db.query(models.DowntimeEvent).filter(
-                models.DowntimeEvent.equipment_id == item.equipment_id,
-                models.DowntimeEvent.started_at >= cutoff,
-            ).all()
-        )
-        planned_minutes = max(hours * 60 - 30, 1)
-        availability = max(0.0, min(1.0, (planned_minutes - downtime_minutes) / planned_minutes))
-        cycle_values = [t.metric_value for t in telemetry if t.metric_name == "cycle_time" and t.metric_value]
-        avg_cycle = sum(cycle_values) / len(cycle_values) if cycle_values else item.cycle_time_standard
-        performance = max(0.0, min(1.0, item.cycle_time_standard / avg_cycle if avg_cycle else 1.0))
-        quality = 0.98
-        oee = availability * performance * quality
-        response.append({
+    results = await run_read(compute_oee, cutoff, None, planned_minutes=hours * 60 - 30)
+    return [
+        {
             "equipment_id": item.equipment_id,
-            "availability": round(availability * 100, 2),
-            "performance": round(performance * 100, 2),
-            "quality": round(quality * 100, 2),
-            "oee": round(oee * 100, 2),
+            "availability": round(item.availability * 100, 2),
+            "performance": round(item.performance * 100, 2),
+            "quality": round(item.quality * 100, 2),
+            "oee": round(item.oee * 100, 2),
             "loss_tree": {
-                "downtime_minutes": round(downtime_minutes, 2),
-                "performance_loss_percent": round((1 - performance) * 100, 2),
-                "quality_loss_percent": round((1 - quality) * 100, 2),
+                "downtime_minutes": round(item.downtime_minutes, 2),
+                "performance_loss_percent": round((1 - item.performance) * 100, 2),
+                "quality_loss_percent": round((1 - item.quality) * 100, 2),
             },
-        })
-    return response
+        }
+        for item in results
+    ]
 
 @app.post("/api/v1/downtime")
 async def create_downtime(
@@ -569,8 +831,7 @@ async def create_downtime(
     db: Session = Depends(get_db),
     current_user: models.User = Depends(auth.require_roles("admin", "manager", "supervisor", "maintenance", "operator")),
 ):
-    equipment = db.query(models.Equipment).filter_by(equipment_id=payload.equipment_id).first()
-    if not equipment:
+    if equipment_registry.get(db, payload.equipment_id) is None:
         raise HTTPException(status_code=404, detail="Equipment not found")
     event = models.DowntimeEvent(
         equipment_id=payload.equipment_id,
@@ -583,6 +844,7 @@ async def create_downtime(
     db.add(event)
     db.commit()
     db.refresh(event)
+    response_cache.clear()
     return {"status": "ok", "id": event.id}
 
 @app.get("/api/v1/downtime/reasons")
@@ -610,17 +872,34 @@ async def reset_demo_data(
 ):
     seed_database(reset=True)
     latest_telemetry.clear()
+    live_backend.clear()
+    response_cache.clear()
     return {"status": "ok", "message": "Demo factory data reset"}
 
 @app.websocket("/ws/andons")
 async def websocket_endpoint(websocket: WebSocket):
-    await manager.connect(websocket)
+    """Live telemetry. Send {"subscribe": {"devices", "types", "metrics", "deadband"}} for filtered deltas.
+
+    Clients offering the acron.msgpack.v1 subprotocol receive binary MessagePack
+    frames; control messages are always JSON text.
+    """
+    client = await hub.connect(websocket, frame_codec.negotiate(websocket.scope.get("subprotocols", [])))
     try:
         while True:
             data = await websocket.receive_text()
-            await websocket.send_text(f"Received: {data}")
+            try:
+                message = json.loads(data)
+                if not isinstance(message, dict) or "subscribe" not in message:
+                    raise SubscriptionError("Expected {\"subscribe\": {...}}")
+                subscription = Subscription.parse(message["subscribe"])
+            except ValueError as e:
+                client.reply({"type": "error", "detail": str(e)})
+                continue
+            client.subscribe(subscription, latest_telemetry.snapshot().values())
     except WebSocketDisconnect:
-        manager.disconnect(websocket)
+        pass
+    finally:
+        hub.disconnect(client)
 
 @app.post("/token", response_model=Token)
 async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
@@ -703,10 +982,11 @@ async def read_users_me(current_user: models.User = Depends(auth.get_current_act
 # â•â•â•â•â•â•â•â•â•â•â•â•â•â•â•â•â•â•â•â•â•â•â•â•â•â•â•â•â•â•â•â•â•â•â•â•â•â•â•â•â•â•â•
 
 @app.get("/api/v1/analytics/oee-trend")
-async def oee_trend(hours: int = 24, db: Session = Depends(get_db)):
+async def oee_trend(request: Request, hours: int = 24):
     """Hourly OEE trend data for the specified time window."""
     from .analytics import get_oee_trend
-    return get_oee_trend(db, hours=hours)
+    entry = await response_cache.fetch("oee_trend", {"hours": hours}, lambda: run_read(get_oee_trend, hours=hours))
+    return response_cache.respond(request, entry)
 
 
 @app.get("/api/v1/analytics/downtime-summary")
@@ -717,10 +997,11 @@ async def downtime_summary(hours: int = 24, db: Session = Depends(get_db)):
 
 
 @app.get("/api/v1/analytics/summary")
-async def analytics_summary(db: Session = Depends(get_db)):
+async def analytics_summary(request: Request):
     """Consolidated analytics summary for the dashboard."""
     from .analytics import get_dashboard_stats
-    return get_dashboard_stats(db)
+    entry = await response_cache.fetch("analytics_summary", {}, lambda: run_read(get_dashboard_stats))
+    return response_cache.respond(request, entry)
 
 
 # â•â•â•â•â•â•â•â•â•â•â•â•â•â•â•â•â•â•â•â•â•â•â•â•â•â•â•â•â•â•â•â•â•â•â•â•â•â•â•â•â•â•â•
@@ -728,17 +1009,19 @@ async def analytics_summary(db: Session = Depends(get_db)):
 # â•â•â•â•â•â•â•â•â•â•â•â•â•â•â•â•â•â•â•â•â•â•â•â•â•â•â•â•â•â•â•â•â•â•â•â•â•â•â•â•â•â•â•
 
 @app.get("/api/v1/ai/anomalies")
-async def ai_anomalies(hours: int = 4, db: Session = Depends(get_db)):
+async def ai_anomalies(request: Request, hours: int = 4):
     """Detect anomalous telemetry readings using statistical analysis."""
     from .ml.anomaly import detect_anomalies
-    return detect_anomalies(db, hours=hours)
+    entry = await response_cache.fetch("anomalies", {"hours": hours}, lambda: run_read(detect_anomalies, hours=hours))
+    return response_cache.respond(request, entry)
 
 
 @app.get("/api/v1/ai/health-scores")
-async def ai_health_scores(hours: int = 8, db: Session = Depends(get_db)):
+async def ai_health_scores(request: Request, hours: int = 8):
     """Compute composite health scores for all active equipment."""
     from .ml.health_score import compute_health_scores
-    return compute_health_scores(db, hours=hours)
+    entry = await response_cache.fetch("health_scores", {"hours": hours}, lambda: run_read(compute_health_scores, hours=hours))
+    return response_cache.respond(request, entry)
 
 
 @app.post("/api/v1/ai/chat", response_model=ChatResponse)
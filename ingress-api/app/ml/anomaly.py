@@ -9,49 +9,40 @@ def detect_anomalies(db, hours=4):
     """Detect anomalous telemetry readings using statistical thresholds.
     
     Falls back to z-score based detection if scikit-learn is not available.
+    Window mean/spread come from telemetry rollups, so the cost does not grow
+    with the number of raw samples in the window.
     """
-    from app import models
+    from app.equipment_registry import registry
+    from app.rollups import window_stats
 
     cutoff = datetime.utcnow() - timedelta(hours=hours)
-    equipment = db.query(models.Equipment).filter_by(active=True).all()
+    active = {eq.equipment_id for eq in registry.machines(db)}
+    stats = window_stats(db, cutoff, None, include_last=True)
     anomalies = []
 
-    for eq in equipment:
-        telemetry = db.query(models.Telemetry).filter(
-            models.Telemetry.equipment_id == eq.equipment_id,
-            models.Telemetry.time >= cutoff,
-        ).all()
-
-        # Group by metric
-        metric_values = {}
-        for t in telemetry:
-            if t.metric_value is not None:
-                metric_values.setdefault(t.metric_name, []).append(t.metric_value)
-
-        for metric_name, values in metric_values.items():
-            if len(values) < 5:
-                continue
-
-            mean = sum(values) / len(values)
-            variance = sum((v - mean) ** 2 for v in values) / len(values)
-            std = variance ** 0.5
-
-            if std < 0.001:
-                continue
-
-            latest = values[-1]
-            z_score = abs(latest - mean) / std
-
-            if z_score > 2.5:
-                severity = "critical" if z_score > 3.5 else "warning"
-                anomalies.append({
-                    "equipment_id": eq.equipment_id,
-                    "metric": metric_name,
-                    "value": round(latest, 3),
-                    "mean": round(mean, 3),
-                    "z_score": round(z_score, 2),
-                    "severity": severity,
-                    "detected_at": datetime.utcnow().isoformat() + "Z",
-                })
+    for (equipment_id, metric_name), item in sorted(stats.items()):
+        if equipment_id not in active or item.count < 5 or item.last is None:
+            continue
+
+        mean = item.mean
+        std = item.stddev
+
+        if std < 0.001:
+            continue
+
+        latest = item.last
+        z_score = abs(latest - mean) / std
+
+        if z_score > 2.5:
+            severity = "critical" if z_score > 3.5 else "warning"
+            anomalies.append({
+                "equipment_id": equipment_id,
+                "metric": metric_name,
+                "value": round(latest, 3),
+                "mean": round(mean, 3),
+                "z_score": round(z_score, 2),
+                "severity": severity,
+                "detected_at": datetime.utcnow().isoformat() + "Z",
+            })
 
     return anomalies
@@ -5,39 +5,24 @@ RAG-based intelligent assistant querying live database telemetry, OEE, downtime,
 import re
 from datetime import datetime, timedelta
 from app import models
+from app.equipment_registry import registry as equipment_registry
 from app.ml.health_score import compute_health_scores
 from app.ml.anomaly import detect_anomalies
+from app.oee_engine import compute_oee
+from app.telemetry_store import repository
 
 def get_oee_summary(db):
     cutoff = datetime.utcnow() - timedelta(hours=8)
-    equipment = db.query(models.Equipment).filter_by(active=True).all()
-    results = []
-    for item in equipment:
-        telemetry = db.query(models.Telemetry).filter(
-            models.Telemetry.equipment_id == item.equipment_id,
-            models.Telemetry.time >= cutoff,
-        ).all()
-        downtime_minutes = sum(
-            event.minutes for event in db.query(models.DowntimeEvent).filter(
-                models.DowntimeEvent.equipment_id == item.equipment_id,
-                models.DowntimeEvent.started_at >= cutoff,
-            ).all()
-        )
-        planned_minutes = max(8 * 60 - 30, 1)
-        availability = max(0.0, min(1.0, (planned_minutes - downtime_minutes) / planned_minutes))
-        cycle_values = [t.metric_value for t in telemetry if t.metric_name == "cycle_time" and t.metric_value]
-        avg_cycle = sum(cycle_values) / len(cycle_values) if cycle_values else item.cycle_time_standard
-        performance = max(0.0, min(1.0, item.cycle_time_standard / avg_cycle if avg_cycle else 1.0))
-        quality = 0.98
-        oee = availability * performance * quality
-        results.append({
+    return [
+        {
             "equipment_id": item.equipment_id,
-            "availability": availability * 100,
-            "performance": performance * 100,
-            "quality": quality * 100,
-            "oee": oee * 100
-        })
-    return results
+            "availability": item.availability * 100,
+            "performance": item.performance * 100,
+            "quality": item.quality * 100,
+            "oee": item.oee * 100
+        }
+        for item in compute_oee(db, cutoff, None, planned_minutes=8 * 60 - 30)
+    ]
 
 def generate_chat_response(query: str, db) -> dict:
     query_lower = query.lower()
@@ -53,12 +38,12 @@ def generate_chat_response(query: str, db) -> dict:
     if equipment_ids:
         eq_id = equipment_ids[0]
         context_used.append(f"Equipment Master for {eq_id}")
-        eq = db.query(models.Equipment).filter_by(equipment_id=eq_id, active=True).first()
+        eq = equipment_registry.get(db, eq_id, active_only=True)
         if not eq:
             response = f"I found a reference to **{eq_id}** in your query, but it doesn't appear to be active or configured in the factory database. Please check the Machine Master page."
         else:
             # Let's fetch latest telemetry
-            latest_telemetry = db.query(models.Telemetry).filter_by(equipment_id=eq_id).order_by(models.Telemetry.time.desc()).limit(20).all()
+            latest_telemetry = list(repository().iter_rows(db, eq_id, limit=20))
             # Let's calculate health score
             health_scores = compute_health_scores(db, hours=8)
             eq_health = next((h for h in health_scores if h["equipment_id"] == eq_id), None)
@@ -71,9 +56,9 @@ def generate_chat_response(query: str, db) -> dict:
             
             # Formulate response
             response = f"### 🤖 TechMate Diagnostics for **{eq_id}**\n\n"
-            response += f"**Description:** {eq.description or 'N/A'} | **Process:** {eq.process.name if eq.process else eq.equipment_type}\n"
+            response += f"**Description:** {eq.description or 'N/A'} | **Process:** {eq.process or eq.equipment_type}\n"
             if eq.mold_model:
-                response += f"**Current Mold:** `{eq.mold_model.model_code}` ({eq.mold_model.part_name})\n"
+                response += f"**Current Mold:** `{eq.mold_model}` ({eq.mold_part_name})\n"
             response += f"**PLC Connection:** {eq.plc_protocol.upper()} via `{eq.plc_address}`\n\n"
             
             if eq_health:
@@ -215,7 +200,7 @@ A **Short Shot** occurs when the mold cavity is not completely filled, resulting
 """
     elif any(kw in query_lower for kw in ["list machines", "list equipment", "all machines", "equipment list"]):
         context_used.append("Equipment list")
-        eqs = db.query(models.Equipment).filter_by(active=True).all()
+        eqs = equipment_registry.machines(db)
         response = "### 🤖 Factory Equipment List\n\n"
         response += f"There are **{len(eqs)} active machines** registered in the system:\n\n"
         
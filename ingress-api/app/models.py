@@ -2,7 +2,7 @@
 Database Models for Production Control System
 SQLAlchemy ORM models for equipment, telemetry, users, and alerts
 """
-from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, ForeignKey, Text, JSON
+from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, ForeignKey, Text, JSON, Index, LargeBinary
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from datetime import datetime
@@ -141,6 +141,10 @@ class DowntimeEvent(Base):
     resolved_by = Column(Integer, ForeignKey('users.id'))
     created_at = Column(DateTime, default=datetime.utcnow, index=True)
     equipment = relationship("Equipment", back_populates="downtime_events")
+    __table_args__ = (
+        Index('ix_downtime_events_equipment_started', 'equipment_id', 'started_at'),
+        Index('ix_downtime_events_started_at', 'started_at'),
+    )
 
 class AlertRule(Base):
     """Configurable alert and escalation rule."""
@@ -173,12 +177,62 @@ class Telemetry(Base):
     __tablename__ = 'telemetry'
     id = Column(Integer, primary_key=True)
     time = Column(DateTime, nullable=False, index=True)
-    equipment_id = Column(String(50), ForeignKey('equipment.equipment_id'), nullable=False, index=True)
-    metric_name = Column(String(100), nullable=False, index=True)
+    equipment_id = Column(String(50), ForeignKey('equipment.equipment_id'), nullable=False)
+    metric_name = Column(String(100), nullable=False)
     metric_value = Column(Float)
     unit = Column(String(20))
     status = Column(String(20))
     equipment = relationship("Equipment", back_populates="telemetry")
+    __table_args__ = (
+        Index('ix_telemetry_equipment_metric_time', equipment_id, metric_name, time.desc(), unique=True),
+    )
+
+class TelemetrySample(Base):
+    """Wide telemetry layout: one row per (equipment, timestamp) with packed metric values"""
+    __tablename__ = 'telemetry_samples'
+    id = Column(Integer, primary_key=True)
+    time = Column(DateTime, nullable=False)
+    equipment_id = Column(String(50), ForeignKey('equipment.equipment_id'), nullable=False)
+    metric_schema = Column(String(50))
+    status = Column(String(20))
+    metric_values = Column(LargeBinary)
+    extra = Column(JSON)
+    __table_args__ = (
+        Index('ix_telemetry_samples_equipment_time', 'equipment_id', 'time'),
+        Index('ix_telemetry_samples_time', 'time'),
+    )
+
+class TelemetryArray(Base):
+    """Array-valued telemetry (e.g. 48 zone temperatures) packed as little-endian float32"""
+    __tablename__ = 'telemetry_arrays'
+    id = Column(Integer, primary_key=True)
+    time = Column(DateTime, nullable=False)
+    equipment_id = Column(String(50), ForeignKey('equipment.equipment_id'), nullable=False)
+    array_name = Column(String(100), nullable=False)
+    length = Column(Integer, nullable=False)
+    array_values = Column(LargeBinary, nullable=False)
+    __table_args__ = (
+        Index('ix_telemetry_arrays_equipment_name_time', 'equipment_id', 'array_name', 'time'),
+        Index('ix_telemetry_arrays_name_time', 'array_name', 'time'),
+    )
+
+class TelemetryRollup(Base):
+    """Pre-aggregated telemetry statistics per 1m/1h/1d bucket (plain rollup table)"""
+    __tablename__ = 'telemetry_rollups'
+    bucket_width = Column(String(4), primary_key=True)
+    equipment_id = Column(String(50), primary_key=True)
+    metric_name = Column(String(100), primary_key=True)
+    bucket = Column(DateTime, primary_key=True)
+    sample_count = Column(Integer, nullable=False, default=0)
+    value_sum = Column(Float, nullable=False, default=0.0)
+    value_sum_sq = Column(Float, nullable=False, default=0.0)
+    value_min = Column(Float)
+    value_max = Column(Float)
+    value_last = Column(Float)
+    last_time = Column(DateTime)
+    __table_args__ = (
+        Index('ix_telemetry_rollups_width_metric_bucket', 'bucket_width', 'metric_name', 'bucket'),
+    )
 class User(Base):
     """User accounts for authentication"""
     __tablename__ = 'users'
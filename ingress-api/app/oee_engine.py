@@ -0,0 +1,144 @@
+"""
+Set-based OEE engine shared by /api/v1/oee, /api/v1/reports/oee, TechMate and health scores.
+
+Every machine is evaluated from grouped aggregates, so the query count is
+fixed no matter how many machines are active:
+
+* AVG/COUNT of cycle_time samples grouped by equipment_id (from telemetry rollups)
+* SUM(minutes) of downtime grouped by equipment_id and category
+"""
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Callable, Iterable
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from . import models
+from .equipment_registry import MachineRecord, registry as equipment_registry
+from .rollups import window_stats
+
+DEFAULT_STANDARD_CYCLE_TIME = 35.0
+DEFAULT_QUALITY = 0.98
+
+
+@dataclass
+class CycleStats:
+    """Cycle-time aggregate for one machine over a window."""
+
+    samples: int = 0
+    avg_cycle_time: float | None = None
+    stddev: float | None = None
+
+    @property
+    def coefficient_of_variation(self) -> float:
+        if not self.avg_cycle_time or self.stddev is None:
+            return 0.0
+        return self.stddev / self.avg_cycle_time
+
+
+@dataclass
+class MachineOee:
+    """OEE result for one machine over a window (ratios are 0..1)."""
+
+    equipment_id: str
+    equipment_type: str | None
+    standard_cycle_time: float
+    planned_minutes: float
+    cycle: CycleStats
+    loss_tree: dict[str, float] = field(default_factory=dict)
+    availability: float = 0.0
+    performance: float = 0.0
+    quality: float = DEFAULT_QUALITY
+
+    @property
+    def oee(self) -> float:
+        return self.availability * self.performance * self.quality
+
+    @property
+    def downtime_minutes(self) -> float:
+        return sum(self.loss_tree.values())
+
+    @property
+    def run_minutes(self) -> float:
+        return max(self.planned_minutes - self.downtime_minutes, 0.0)
+
+    @property
+    def avg_cycle_time(self) -> float:
+        """Observed average cycle time, falling back to the standard when no samples exist."""
+        return self.cycle.avg_cycle_time or self.standard_cycle_time
+
+    @property
+    def actual_parts(self) -> int:
+        return int((self.run_minutes * 60.0) / max(self.avg_cycle_time, 1.0)) if self.run_minutes > 0 else 0
+
+
+def cycle_time_stats(db: Session, start: datetime, end: datetime | None = None) -> dict[str, CycleStats]:
+    """AVG/COUNT (plus spread) of cycle_time per equipment_id, read from the coarsest rollups that fit."""
+    stats = {}
+    for (equipment_id, _), item in window_stats(db, start, end, metric_name="cycle_time").items():
+        if item.count:
+            stats[equipment_id] = CycleStats(samples=item.count, avg_cycle_time=item.mean, stddev=item.stddev)
+    return stats
+
+
+def downtime_by_category(db: Session, start: datetime, end: datetime | None = None) -> dict[str, dict[str, float]]:
+    """SUM(minutes) of downtime grouped by equipment_id and category."""
+    D = models.DowntimeEvent
+    query = db.query(
+        D.equipment_id,
+        D.category,
+        func.sum(D.minutes).label("minutes"),
+    ).filter(D.started_at >= start)
+    if end is not None:
+        query = query.filter(D.started_at < end)
+
+    losses: dict[str, dict[str, float]] = defaultdict(dict)
+    for row in query.group_by(D.equipment_id, D.category).all():
+        losses[row.equipment_id][row.category] = float(row.minutes or 0.0)
+    return losses
+
+
+def compute_oee(
+    db: Session,
+    start: datetime,
+    end: datetime | None,
+    planned_minutes: float,
+    machines: Iterable[MachineRecord] | None = None,
+    standards: dict[str, tuple[float, float]] | None = None,
+    quality_fn: Callable[[float, dict[str, float], float], float] | None = None,
+) -> list[MachineOee]:
+    """Evaluate Availability x Performance x Quality for every machine.
+
+    ``standards`` maps equipment_id to (standard_cycle_time, quality_target) and
+    overrides the machine master; ``quality_fn(quality_target, loss_tree,
+    planned_minutes)`` refines quality from the loss tree.
+    """
+    if machines is None:
+        machines = equipment_registry.machines(db)
+    standards = standards or {}
+    cycle_stats = cycle_time_stats(db, start, end)
+    losses = downtime_by_category(db, start, end)
+    planned_minutes = max(planned_minutes, 1.0)
+
+    results = []
+    for machine in machines:
+        standard_cycle_time, quality_target = standards.get(
+            machine.equipment_id,
+            (machine.cycle_time_standard or DEFAULT_STANDARD_CYCLE_TIME, DEFAULT_QUALITY),
+        )
+        result = MachineOee(
+            equipment_id=machine.equipment_id,
+            equipment_type=machine.equipment_type,
+            standard_cycle_time=standard_cycle_time,
+            planned_minutes=planned_minutes,
+            cycle=cycle_stats.get(machine.equipment_id, CycleStats()),
+            loss_tree=dict(losses.get(machine.equipment_id, {})),
+        )
+        result.availability = max(0.0, min(1.0, result.run_minutes / planned_minutes))
+        avg_cycle = result.avg_cycle_time
+        result.performance = max(0.0, min(1.0, standard_cycle_time / avg_cycle if avg_cycle else 1.0))
+        result.quality = quality_fn(quality_target, result.loss_tree, planned_minutes) if quality_fn else quality_target
+        results.append(result)
+    return results
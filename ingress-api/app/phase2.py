@@ -2,17 +2,19 @@ from __future__ import annotations
 
 """Phase 2 operational routes for Acron V2."""
 
-from collections import defaultdict
 from datetime import date, datetime, time, timedelta
 from pathlib import Path
 import sys
 from typing import Any
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from sqlalchemy.orm import Session
 
 from . import auth, models
-from .database import get_db
+from .database import get_db, run_read
+from .equipment_registry import registry as equipment_registry
+from .oee_engine import compute_oee
+from .response_cache import cache as response_cache
 from .schemas import (
     ConnectorTestRequest,
     ConnectorTestResponse,
@@ -152,14 +154,31 @@ def _build_oee_report(
 ) -> dict[str, Any]:
     plant = _resolve_plant(db, plant_code)
     start_dt, end_dt, context = _report_window(db, scope, plant, shift_name, reference_date)
-    machines = db.query(models.Equipment).join(models.Cell, isouter=True).join(models.Line, isouter=True).filter(
-        models.Equipment.active.is_(True)
-    ).all()
+    machines = equipment_registry.machines(db)
+    machine_map = {machine.equipment_id: machine for machine in machines}
 
     shift_key = context.get("shift_name")
     standards = db.query(models.TargetStandard).all()
     exact_standard_map = {(item.equipment_id, item.shift_name): item for item in standards}
     fallback_standard_map = {item.equipment_id: item for item in standards}
+    machine_standards = {}
+    for machine in machines:
+        standard = exact_standard_map.get((machine.equipment_id, shift_key)) or fallback_standard_map.get(machine.equipment_id)
+        if standard:
+            machine_standards[machine.equipment_id] = (standard.standard_cycle_time, standard.quality_target)
+
+    window_minutes = max((end_dt - start_dt).total_seconds() / 60.0, 1.0)
+    planned_minutes = max(window_minutes - float(context.get("planned_downtime_minutes", 0)), 1.0)
+    operating_hours = max(planned_minutes / 60.0, 1 / 60.0)
+    results = compute_oee(
+        db,
+        start_dt,
+        end_dt,
+        planned_minutes,
+        machines=machines,
+        standards=machine_standards,
+        quality_fn=_quality_from_losses,
+    )
 
     reports = []
     total_target = 0
@@ -167,69 +186,39 @@ def _build_oee_report(
     total_downtime = 0.0
     availability_sum = performance_sum = quality_sum = oee_sum = 0.0
 
-    for machine in machines:
-        telemetry = db.query(models.Telemetry).filter(
-            models.Telemetry.equipment_id == machine.equipment_id,
-            models.Telemetry.time >= start_dt,
-            models.Telemetry.time < end_dt,
-            models.Telemetry.metric_name == "cycle_time",
-        ).all()
-        events = db.query(models.DowntimeEvent).filter(
-            models.DowntimeEvent.equipment_id == machine.equipment_id,
-            models.DowntimeEvent.started_at >= start_dt,
-            models.DowntimeEvent.started_at < end_dt,
-        ).all()
-
+    for result in results:
+        machine = machine_map[result.equipment_id]
         standard = exact_standard_map.get((machine.equipment_id, shift_key)) or fallback_standard_map.get(machine.equipment_id)
-        standard_cycle_time = standard.standard_cycle_time if standard else (machine.cycle_time_standard or 35.0)
-        quality_target = standard.quality_target if standard else 0.98
-
-        window_minutes = max((end_dt - start_dt).total_seconds() / 60.0, 1.0)
-        planned_minutes = max(window_minutes - float(context.get("planned_downtime_minutes", 0)), 1.0)
-        loss_tree = defaultdict(float)
-        for event in events:
-            loss_tree[event.category] += float(event.minutes or 0)
-        downtime_minutes = sum(loss_tree.values())
-        run_minutes = max(planned_minutes - downtime_minutes, 0.0)
-        availability = max(0.0, min(1.0, run_minutes / planned_minutes))
-
-        cycle_samples = [row.metric_value for row in telemetry if row.metric_value]
-        avg_cycle = sum(cycle_samples) / len(cycle_samples) if cycle_samples else standard_cycle_time
-        performance = max(0.0, min(1.0, standard_cycle_time / avg_cycle if avg_cycle else 1.0))
-        quality = _quality_from_losses(quality_target, loss_tree, planned_minutes)
-        oee = availability * performance * quality
-
-        operating_hours = max(planned_minutes / 60.0, 1 / 60.0)
         target_parts = int(round(standard.target_parts if standard and context["scope"] == "shift" else (machine.target_per_hour or 0) * operating_hours))
-        actual_parts = int((run_minutes * 60.0) / max(avg_cycle, 1.0)) if run_minutes > 0 else 0
+        actual_parts = result.actual_parts
 
         reports.append(
             {
                 "equipment_id": machine.equipment_id,
-                "line": machine.cell.line.name if machine.cell and machine.cell.line else None,
-                "cell": machine.cell.name if machine.cell else None,
-                "process": machine.process.name if machine.process else None,
-                "availability": round(availability * 100, 2),
-                "performance": round(performance * 100, 2),
-                "quality": round(quality * 100, 2),
-                "oee": round(oee * 100, 2),
+                "line": machine.line,
+                "cell": machine.cell,
+                "process": machine.process,
+                "availability": round(result.availability * 100, 2),
+                "performance": round(result.performance * 100, 2),
+                "quality": round(result.quality * 100, 2),
+                "oee": round(result.oee * 100, 2),
                 "planned_minutes": round(planned_minutes, 2),
-                "downtime_minutes": round(downtime_minutes, 2),
+                "downtime_minutes": round(result.downtime_minutes, 2),
                 "target_parts": target_parts,
                 "actual_parts": actual_parts,
-                "standard_cycle_time": round(standard_cycle_time, 2),
-                "avg_cycle_time": round(avg_cycle, 2),
-                "loss_tree": {key: round(value, 2) for key, value in sorted(loss_tree.items())},
+                "standard_cycle_time": round(result.standard_cycle_time, 2),
+                "avg_cycle_time": round(result.avg_cycle_time, 2),
+                "loss_tree": {key: round(value, 2) for key, value in sorted(result.loss_tree.items())},
             }
         )
 
         total_target += target_parts
         total_actual += actual_parts
-        total_downtime += downtime_minutes
-        availability_sum += availability * 100
-        performance_sum += performance * 100
-        quality_sum += quality * 100
-        oee_sum += oee * 100
+        total_downtime += result.downtime_minutes
+        availability_sum += result.availability * 100
+        performance_sum += result.performance * 100
+        quality_sum += result.quality * 100
+        oee_sum += result.oee * 100
 
     count = max(len(reports), 1)
     reports.sort(key=lambda item: item["oee"])
@@ -295,6 +284,7 @@ async def upsert_shift_calendar(
     row.active = payload.active
     db.commit()
     db.refresh(row)
+    response_cache.clear()
     return {"status": "ok", "id": row.id}
 
 
@@ -337,6 +327,8 @@ async def upsert_target_standard(
     machine.target_per_hour = max(int(round(payload.target_parts / 8.0)), 1)
     db.commit()
     db.refresh(row)
+    equipment_registry.invalidate()
+    response_cache.clear()
     return {"status": "ok", "id": row.id}
 
 
@@ -412,12 +404,26 @@ async def test_connector(
         }
 
 
+def _report_window_of(report: dict[str, Any]) -> tuple[datetime, datetime]:
+    return datetime.fromisoformat(report["window_start"]), datetime.fromisoformat(report["window_end"])
+
+
 @router.get("/reports/oee")
 async def oee_reports(
+    request: Request,
     scope: str = Query("shift"),
     plant_code: str | None = Query(default=None),
     shift_name: str | None = Query(default=None),
     reference_date: date | None = Query(default=None),
-    db: Session = Depends(get_db),
 ):
-    return _build_oee_report(db, scope=scope, plant_code=plant_code, shift_name=shift_name, reference_date=reference_date)
+    # Key on the date the report resolves to, so a closed "today" window is not served again tomorrow.
+    reference_date = reference_date or datetime.utcnow().date()
+    params = {"scope": scope, "plant_code": plant_code, "shift_name": shift_name, "reference_date": reference_date}
+    entry = await response_cache.fetch(
+        "oee_report",
+        params,
+        lambda: run_read(_build_oee_report, **params),
+        window=_report_window_of,
+        equipment=lambda report: [item["equipment_id"] for item in report["machines"]],
+    )
+    return response_cache.respond(request, entry)
@@ -0,0 +1,311 @@
+"""
+Response cache for the analytics, report and AI read endpoints.
+
+Entries are keyed on endpoint + normalized query parameters and hold the
+rendered JSON body with a strong ETag, so hits cost neither recomputation
+nor re-serialization and unchanged results answer If-None-Match with 304.
+
+* TTL per endpoint (RESPONSE_CACHE_TTLS, "name:seconds,..."); results whose
+  window has already closed (past shifts, past months) use the much longer
+  RESPONSE_CACHE_CLOSED_TTL_SECONDS.
+* Single-flight: concurrent misses for the same key await one computation.
+* LRU eviction under a memory cap on the cached body bytes.
+* Ingest-aware: flushed telemetry drops closed-window entries whose window
+  (and machines, when the entry names them) overlaps the new rows (late or
+  backfilled data). Open windows already move with every flush and are
+  served only for their short TTL; configuration writes (downtime,
+  standards, shift calendars, machines) clear everything.
+* A closed-window result is not stored when a flush that overlaps it lands
+  while it is being computed; flushes elsewhere don't hold it back.
+"""
+import asyncio
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Iterable
+from urllib.parse import urlencode
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from .history import naive_utc
+
+
+def parse_ttls(value: str) -> dict[str, float]:
+    """Parse ``oee_trend:30,analytics_summary:10`` into {endpoint: seconds}."""
+    ttls = {}
+    for item in value.split(","):
+        if ":" in item:
+            name, seconds = item.split(":", 1)
+            ttls[name.strip()] = float(seconds)
+    return ttls
+
+
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() == "true"
+RESPONSE_CACHE_MAX_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_MB", "64")) * 1024 * 1024
+RESPONSE_CACHE_DEFAULT_TTL_SECONDS = float(os.getenv("RESPONSE_CACHE_DEFAULT_TTL_SECONDS", "15"))
+RESPONSE_CACHE_CLOSED_TTL_SECONDS = float(os.getenv("RESPONSE_CACHE_CLOSED_TTL_SECONDS", "86400"))
+RESPONSE_CACHE_TTLS = parse_ttls(os.getenv(
+    "RESPONSE_CACHE_TTLS",
+    "oee_report:30,oee_trend:30,analytics_summary:10,health_scores:60,anomalies:30",
+))
+
+Window = tuple[datetime | None, datetime | None]
+# Invalidated rows: (machines or None for all, start, end).
+Span = tuple[frozenset[str] | None, datetime | None, datetime | None]
+
+
+@dataclass
+class CachedResponse:
+    body: bytes
+    etag: str
+    expires_at: float
+    window: Window
+    closed: bool
+    equipment: frozenset[str] | None = None  # machines the result covers; None = all
+
+    def affected_by(self, span: Span) -> bool:
+        equipment, start, end = span
+        if equipment is not None and self.equipment is not None and not equipment & self.equipment:
+            return False
+        return _overlaps(self.window, start, end)
+
+    @property
+    def size(self) -> int:
+        return len(self.body)
+
+
+class ResponseCache:
+    """LRU of rendered JSON bodies with TTLs, single-flight and range invalidation."""
+
+    def __init__(
+        self,
+        max_bytes: int = RESPONSE_CACHE_MAX_BYTES,
+        ttls: dict[str, float] | None = None,
+        default_ttl: float = RESPONSE_CACHE_DEFAULT_TTL_SECONDS,
+        closed_ttl: float = RESPONSE_CACHE_CLOSED_TTL_SECONDS,
+        enabled: bool = RESPONSE_CACHE_ENABLED,
+    ):
+        self.max_bytes = max_bytes
+        self.ttls = RESPONSE_CACHE_TTLS if ttls is None else ttls
+        self.default_ttl = default_ttl
+        self.closed_ttl = closed_ttl
+        self.enabled = enabled
+        self._entries: OrderedDict[str, CachedResponse] = OrderedDict()
+        self._inflight: dict[str, asyncio.Future] = {}
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self._cleared = 0
+        # Spans invalidated while computations are in flight, numbered from _span_base.
+        self._spans: list[Span] = []
+        self._span_base = 0
+        self._span_marks: dict[str, int] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.not_modified = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def key(endpoint: str, params: dict[str, Any]) -> str:
+        normalized = sorted((name, str(value)) for name, value in params.items() if value is not None)
+        return f"{endpoint}?{urlencode(normalized)}"
+
+    def ttl_for(self, endpoint: str, closed: bool) -> float:
+        return self.closed_ttl if closed else self.ttls.get(endpoint, self.default_ttl)
+
+    async def fetch(
+        self,
+        endpoint: str,
+        params: dict[str, Any],
+        compute: Callable[[], Awaitable[Any]],
+        window: Callable[[Any], Window] | None = None,
+        equipment: Callable[[Any], Iterable[str]] | None = None,
+    ) -> CachedResponse:
+        """Return the cached response for (endpoint, params), computing it at most once.
+
+        ``window`` and ``equipment`` extract the time window and machines a result
+        covers, which decide its TTL and which ingested rows invalidate it.
+        """
+        key = self.key(endpoint, params)
+        entry = self._lookup(key)
+        if entry is not None:
+            return entry
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.coalesced += 1
+            return await asyncio.shield(inflight)
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        future.add_done_callback(lambda done: done.cancelled() or done.exception())
+        self._inflight[key] = future
+        with self._lock:
+            cleared = self._cleared
+            self._span_marks[key] = self._span_base + len(self._spans)
+        try:
+            value = await compute()
+            entry = self._render(
+                endpoint,
+                value,
+                window(value) if window else (None, None),
+                frozenset(equipment(value)) if equipment else None,
+            )
+            # Don't keep a result computed across a write that could have changed it.
+            if self._cleared == cleared and not (entry.closed and self._invalidated_since(key, entry)):
+                self._store(key, entry)
+            future.set_result(entry)
+            return entry
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as exc:
+            future.set_exception(exc)
+            raise
+        finally:
+            self._inflight.pop(key, None)
+            self._release_mark(key)
+
+    def respond(self, request: Request, entry: CachedResponse) -> Response:
+        headers = {"ETag": entry.etag, "Cache-Control": "no-cache"}
+        if _etag_matches(request.headers.get("if-none-match"), entry.etag):
+            self.not_modified += 1
+            return Response(status_code=304, headers=headers)
+        return Response(content=entry.body, media_type="application/json", headers=headers)
+
+    def invalidate(
+        self, start: datetime | None, end: datetime | None, equipment: Iterable[str] | None = None
+    ) -> int:
+        """Drop closed-window entries overlapping [start, end] (for ``equipment``, or all machines)."""
+        return self._invalidate([(
+            frozenset(equipment) if equipment is not None else None, naive_utc(start), naive_utc(end),
+        )])
+
+    def invalidate_rows(self, rows: Iterable[dict]) -> int:
+        """Invalidate the time span each machine's rows cover."""
+        spans: dict[str | None, tuple[datetime, datetime]] = {}
+        for row in rows:
+            at = row.get("time")
+            if at is None:
+                continue
+            equipment_id = row.get("equipment_id")
+            low, high = spans.get(equipment_id, (at, at))
+            spans[equipment_id] = (min(low, at), max(high, at))
+        return self._invalidate([
+            (frozenset([equipment_id]) if equipment_id is not None else None, naive_utc(low), naive_utc(high))
+            for equipment_id, (low, high) in spans.items()
+        ])
+
+    def _invalidate(self, spans: list[Span]) -> int:
+        if not spans:
+            return 0
+        with self._lock:
+            if self._span_marks:
+                self._spans.extend(spans)
+            stale = [
+                key for key, entry in self._entries.items()
+                if entry.closed and any(entry.affected_by(span) for span in spans)
+            ]
+            for key in stale:
+                self._bytes -= self._entries.pop(key).size
+            self.invalidations += len(stale)
+        return len(stale)
+
+    def _invalidated_since(self, key: str, entry: CachedResponse) -> bool:
+        with self._lock:
+            since = self._span_marks.get(key, self._span_base + len(self._spans)) - self._span_base
+            return any(entry.affected_by(span) for span in self._spans[since:])
+
+    def _release_mark(self, key: str) -> None:
+        with self._lock:
+            self._span_marks.pop(key, None)
+            oldest = min(self._span_marks.values(), default=self._span_base + len(self._spans))
+            del self._spans[:oldest - self._span_base]
+            self._span_base = oldest
+
+    def clear(self) -> None:
+        with self._lock:
+            self._cleared += 1
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+            self._bytes = 0
+
+    def metrics(self) -> dict:
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "hit_ratio": round((self.hits + self.coalesced) / lookups, 4) if lookups else 0.0,
+            "not_modified": self.not_modified,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+    def _lookup(self, key: str) -> CachedResponse | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry.expires_at <= time.monotonic():
+                self._bytes -= self._entries.pop(key).size
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def _render(self, endpoint: str, value: Any, window: Window, equipment: frozenset[str] | None = None) -> CachedResponse:
+        body = JSONResponse(jsonable_encoder(value)).body
+        window = (naive_utc(window[0]), naive_utc(window[1]))
+        closed = window[1] is not None and window[1] <= datetime.utcnow()
+        return CachedResponse(
+            body=body,
+            etag='"%s"' % hashlib.sha1(body).hexdigest(),
+            expires_at=time.monotonic() + self.ttl_for(endpoint, closed),
+            window=window,
+            closed=closed,
+            equipment=equipment,
+        )
+
+    def _store(self, key: str, entry: CachedResponse) -> None:
+        if not self.enabled or entry.size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous.size
+            self._entries[key] = entry
+            self._bytes += entry.size
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.size
+                self.evictions += 1
+
+
+def _overlaps(window: Window, start: datetime | None, end: datetime | None) -> bool:
+    window_start, window_end = window
+    if end is not None and window_start is not None and window_start > end:
+        return False
+    if start is not None and window_end is not None and window_end < start:
+        return False
+    return True
+
+
+def _etag_matches(header: str | None, etag: str) -> bool:
+    if not header:
+        return False
+    candidates = {item.strip().removeprefix("W/") for item in header.split(",")}
+    return "*" in candidates or etag in candidates
+
+
+cache = ResponseCache()
@@ -0,0 +1,463 @@
+"""
+Telemetry rollups — 1-minute, 1-hour and 1-day statistics per (equipment_id, metric_name).
+
+Each bucket keeps count/sum/sum_sq/min/max/last. TimescaleDB deployments use
+continuous aggregates (telemetry_rollup_1m/1h/1d); SQLite and vanilla
+PostgreSQL keep the telemetry_rollups table current from the ingest path.
+The aggregate policies only re-materialize the last few buckets, so rows
+that arrive later (spool replay, edge outbox drain, backfill) mark their
+buckets stale and refresh_late_buckets() refreshes them.
+
+Readers call window_stats()/series_stats(), which answer a window from the
+coarsest aligned buckets that fit and only read raw telemetry (through the
+active storage layout) for ragged edges shorter than one minute.
+"""
+import os
+import threading
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, case, column, func, or_, select, table, text
+from sqlalchemy.orm import Session
+
+from . import models
+from .database import timescaledb_enabled
+
+BUCKETS = {"1m": timedelta(minutes=1), "1h": timedelta(hours=1), "1d": timedelta(days=1)}
+WIDTHS_COARSE_TO_FINE = ("1d", "1h", "1m")
+# Continuous-aggregate policies refresh the last POLICY_BUCKETS buckets of each width.
+POLICY_BUCKETS = 3
+ROLLUP_REFRESH_SECONDS = float(os.getenv("TELEMETRY_ROLLUP_REFRESH_SECONDS", "30"))
+ROLLUP_COLUMNS = ("bucket", "equipment_id", "metric_name", "sample_count", "value_sum", "value_sum_sq", "value_min", "value_max", "value_last", "last_time")
+
+
+def parse_rollup_retention(value: str) -> dict[str, int]:
+    """Parse ``1m:180,1h:730`` into {width: days}; widths left out are kept forever."""
+    retention = {}
+    for item in value.split(","):
+        if ":" in item:
+            width, days = (part.strip() for part in item.split(":", 1))
+            if width not in BUCKETS:
+                raise ValueError(f"Unknown rollup width {width!r}; expected one of {', '.join(BUCKETS)}")
+            retention[width] = int(days)
+    return retention
+
+
+# 1m buckets live as long as raw telemetry by default, so windows with minute edges stay exact.
+ROLLUP_RETENTION_DAYS = parse_rollup_retention(os.getenv("TELEMETRY_ROLLUP_RETENTION_DAYS", "1m:180,1h:730,1d:3650"))
+
+_backend = "table"
+_late: dict[str, tuple[datetime, datetime]] = {}
+_late_lock = threading.Lock()
+
+
+@dataclass
+class MetricStats:
+    """Mergeable summary statistics for one series over a window."""
+
+    count: int = 0
+    total: float = 0.0
+    total_sq: float = 0.0
+    min: float | None = None
+    max: float | None = None
+    last: float | None = None
+    last_time: datetime | None = None
+
+    @property
+    def mean(self) -> float | None:
+        return self.total / self.count if self.count else None
+
+    @property
+    def stddev(self) -> float | None:
+        if not self.count:
+            return None
+        mean = self.total / self.count
+        return max(self.total_sq / self.count - mean * mean, 0.0) ** 0.5
+
+    def add(self, value: float, at: datetime | None = None) -> None:
+        self.merge(MetricStats(1, value, value * value, value, value, value, at))
+
+    def merge(self, other: "MetricStats") -> None:
+        if not other.count:
+            return
+        self.count += other.count
+        self.total += other.total
+        self.total_sq += other.total_sq
+        self.min = other.min if self.min is None or (other.min is not None and other.min < self.min) else self.min
+        self.max = other.max if self.max is None or (other.max is not None and other.max > self.max) else self.max
+        if other.last_time is not None and (self.last_time is None or other.last_time >= self.last_time):
+            self.last_time = other.last_time
+            self.last = other.last if other.last is not None else self.last
+
+
+def bucket_floor(ts: datetime, width: str) -> datetime:
+    if width == "1d":
+        return ts.replace(hour=0, minute=0, second=0, microsecond=0)
+    if width == "1h":
+        return ts.replace(minute=0, second=0, microsecond=0)
+    return ts.replace(second=0, microsecond=0)
+
+
+def bucket_ceil(ts: datetime, width: str) -> datetime:
+    floor = bucket_floor(ts, width)
+    return floor if floor == ts else floor + BUCKETS[width]
+
+
+def plan_window(start: datetime, end: datetime) -> list[tuple[str | None, datetime, datetime]]:
+    """Split [start, end) into (width, segment_start, segment_end) pieces.
+
+    The coarsest width with at least one whole aligned bucket covers the middle;
+    the edges are planned recursively with finer widths, and whatever is left
+    (under one minute) is read raw (width None).
+    """
+    if start >= end:
+        return []
+    for width in WIDTHS_COARSE_TO_FINE:
+        aligned_start = bucket_ceil(start, width)
+        aligned_end = bucket_floor(end, width)
+        if aligned_end - aligned_start >= BUCKETS[width]:
+            return plan_window(start, aligned_start) + [(width, aligned_start, aligned_end)] + plan_window(aligned_end, end)
+    return [(None, start, end)]
+
+
+def backend() -> str:
+    return _backend
+
+
+def _telemetry_repository():
+    # Imported lazily: the storage layouts reuse this module's aggregate helpers.
+    from .telemetry_store import repository
+    return repository()
+
+
+def setup_rollups(engine) -> str:
+    """Create TimescaleDB continuous aggregates when available; otherwise use the rollup table.
+
+    Continuous aggregates are defined over the per-metric ``telemetry`` table,
+    so the wide storage layout always uses the rollup table.
+    """
+    global _backend
+    with engine.connect() as connection:
+        if not timescaledb_enabled(connection) or _telemetry_repository().layout != "eav":
+            _backend = "table"
+            return _backend
+        try:
+            for width, interval in (("1m", "1 minute"), ("1h", "1 hour"), ("1d", "1 day")):
+                view = f"telemetry_rollup_{width}"
+                connection.execute(text(f"""
+                    CREATE MATERIALIZED VIEW IF NOT EXISTS {view}
+                    WITH (timescaledb.continuous, timescaledb.materialized_only = false) AS
+                    SELECT time_bucket(INTERVAL '{interval}', time) AS bucket,
+                           equipment_id,
+                           metric_name,
+                           count(metric_value) AS sample_count,
+                           coalesce(sum(metric_value), 0) AS value_sum,
+                           coalesce(sum(metric_value * metric_value), 0) AS value_sum_sq,
+                           min(metric_value) AS value_min,
+                           max(metric_value) AS value_max,
+                           last(metric_value, time) AS value_last,
+                           max(time) AS last_time
+                    FROM telemetry
+                    GROUP BY 1, 2, 3
+                    WITH NO DATA
+                """))
+                connection.execute(text(f"""
+                    SELECT add_continuous_aggregate_policy('{view}',
+                        start_offset => INTERVAL '{interval}' * {POLICY_BUCKETS},
+                        end_offset => INTERVAL '{interval}',
+                        schedule_interval => INTERVAL '{interval}',
+                        if_not_exists => true)
+                """))
+                connection.execute(text(f"SELECT remove_retention_policy('{view}', if_exists => true)"))
+                if width in ROLLUP_RETENTION_DAYS:
+                    connection.execute(text(
+                        f"SELECT add_retention_policy('{view}', INTERVAL '{ROLLUP_RETENTION_DAYS[width]} days')"
+                    ))
+            connection.commit()
+            _backend = "timescale"
+        except Exception as e:
+            connection.rollback()
+            print(f"[WARN] Continuous aggregates unavailable, using rollup table: {e}")
+            _backend = "table"
+    return _backend
+
+
+def _upsert_statement(dialect_name: str):
+    if dialect_name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect_name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        return None
+    target = models.TelemetryRollup.__table__
+    c = target.c
+    stmt = insert(target)
+    incoming = stmt.excluded
+    newer = or_(c.last_time.is_(None), incoming.last_time >= c.last_time)
+    return stmt.on_conflict_do_update(
+        index_elements=[c.bucket_width, c.equipment_id, c.metric_name, c.bucket],
+        set_={
+            "sample_count": c.sample_count + incoming.sample_count,
+            "value_sum": c.value_sum + incoming.value_sum,
+            "value_sum_sq": c.value_sum_sq + incoming.value_sum_sq,
+            "value_min": case((or_(c.value_min.is_(None), incoming.value_min < c.value_min), incoming.value_min), else_=c.value_min),
+            "value_max": case((or_(c.value_max.is_(None), incoming.value_max > c.value_max), incoming.value_max), else_=c.value_max),
+            "value_last": case((newer, incoming.value_last), else_=c.value_last),
+            "last_time": case((newer, incoming.last_time), else_=c.last_time),
+        },
+    )
+
+
+def mark_late_rows(rows: list[dict]) -> None:
+    """Remember buckets the aggregate policies have already passed, for refresh_late_buckets()."""
+    times = [row["time"] for row in rows]
+    oldest, newest = min(times), max(times)
+    now = datetime.utcnow()
+    with _late_lock:
+        for width, size in BUCKETS.items():
+            # A policy run within one more interval still covers rows up to this age.
+            if oldest >= now - size * (POLICY_BUCKETS - 1):
+                continue
+            start, end = bucket_floor(oldest, width), bucket_floor(newest, width) + size
+            if width in _late:
+                start, end = min(start, _late[width][0]), max(end, _late[width][1])
+            _late[width] = (start, end)
+
+
+def refresh_late_buckets(engine) -> dict[str, tuple[datetime, datetime]]:
+    """Refresh the continuous-aggregate ranges late rows landed in; returns {width: (start, end)}."""
+    global _late
+    with _late_lock:
+        pending, _late = _late, {}
+    if _backend != "timescale" or not pending:
+        return {}
+    try:
+        # refresh_continuous_aggregate cannot run inside a transaction block.
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+            for width, (start, end) in sorted(pending.items()):
+                connection.execute(
+                    text(f"CALL refresh_continuous_aggregate('telemetry_rollup_{width}', :start, :end)"),
+                    {"start": start, "end": end},
+                )
+    except Exception:
+        with _late_lock:
+            for width, (start, end) in pending.items():
+                if width in _late:
+                    start, end = min(start, _late[width][0]), max(end, _late[width][1])
+                _late[width] = (start, end)
+        raise
+    return pending
+
+
+def apply_rows(connection, rows: list[dict]) -> int:
+    """Fold raw telemetry rows into the rollup table; with continuous aggregates, mark late buckets stale."""
+    if _backend == "timescale" and rows:
+        mark_late_rows(rows)
+    if _backend != "table" or not rows:
+        return 0
+    stmt = _upsert_statement(connection.dialect.name)
+    if stmt is None:
+        return 0
+
+    buckets: dict[tuple, MetricStats] = defaultdict(MetricStats)
+    for row in rows:
+        value = row.get("metric_value")
+        if value is None:
+            continue
+        for width in BUCKETS:
+            key = (width, row["equipment_id"], row["metric_name"], bucket_floor(row["time"], width))
+            buckets[key].add(value, row["time"])
+
+    params = [
+        {
+            "bucket_width": width,
+            "equipment_id": equipment_id,
+            "metric_name": metric_name,
+            "bucket": bucket,
+            "sample_count": stats.count,
+            "value_sum": stats.total,
+            "value_sum_sq": stats.total_sq,
+            "value_min": stats.min,
+            "value_max": stats.max,
+            "value_last": stats.last,
+            "last_time": stats.last_time,
+        }
+        for (width, equipment_id, metric_name, bucket), stats in sorted(buckets.items(), key=lambda item: item[0])
+    ]
+    if params:
+        connection.execute(stmt, params)
+    return len(params)
+
+
+def backfill(db: Session, since: datetime | None = None) -> int:
+    """Rebuild rollup-table buckets from raw telemetry (periodic job / first start)."""
+    if _backend != "table":
+        return 0
+    rollup_query = db.query(models.TelemetryRollup)
+    if since is not None:
+        since = bucket_floor(since, "1d")
+        rollup_query = rollup_query.filter(models.TelemetryRollup.bucket >= since)
+    rollup_query.delete(synchronize_session=False)
+
+    connection = db.connection()
+    written = 0
+    batch = []
+    for row in _telemetry_repository().scan(db, since):
+        batch.append({"time": row.time, "equipment_id": row.equipment_id, "metric_name": row.metric_name, "metric_value": row.metric_value})
+        if len(batch) >= 10_000:
+            written += apply_rows(connection, batch)
+            batch = []
+    written += apply_rows(connection, batch)
+    db.commit()
+    return written
+
+
+def _rollup_source(width: str):
+    if _backend == "timescale":
+        return table(f"telemetry_rollup_{width}", *[column(name) for name in ROLLUP_COLUMNS]), None
+    source = models.TelemetryRollup.__table__
+    return source, source.c.bucket_width == width
+
+
+def _collect(db: Session, source, conditions, columns, into: dict) -> None:
+    """Run one grouped aggregate and merge it into ``into``."""
+    c = source.c
+    grouped = select(
+        c.equipment_id,
+        c.metric_name,
+        columns["count"].label("count"),
+        columns["sum"].label("total"),
+        columns["sum_sq"].label("total_sq"),
+        columns["min"].label("min"),
+        columns["max"].label("max"),
+        columns["last_time"].label("last_time"),
+    ).where(*conditions).group_by(c.equipment_id, c.metric_name)
+
+    for row in db.execute(grouped).all():
+        into[(row.equipment_id, row.metric_name)].merge(MetricStats(
+            count=int(row.count or 0),
+            total=float(row.total or 0.0),
+            total_sq=float(row.total_sq or 0.0),
+            min=row.min,
+            max=row.max,
+            last_time=row.last_time,
+        ))
+
+
+
+def window_stats(
+    db: Session,
+    start: datetime,
+    end: datetime | None = None,
+    metric_name: str | None = None,
+    equipment_id: str | None = None,
+    include_last: bool = False,
+) -> dict[tuple[str, str], MetricStats]:
+    """Statistics per (equipment_id, metric_name) over [start, end).
+
+    ``end=None`` means "up to now": the current bucket is read whole since it
+    cannot contain future samples.
+    """
+    if end is None:
+        end = bucket_ceil(datetime.utcnow(), "1m")
+    segments: dict[str | None, list[tuple[datetime, datetime]]] = defaultdict(list)
+    for width, seg_start, seg_end in plan_window(start, end):
+        segments[width].append((seg_start, seg_end))
+
+    results: dict[tuple[str, str], MetricStats] = defaultdict(MetricStats)
+    for width, ranges in segments.items():
+        if width is None:
+            _telemetry_repository().raw_stats(db, ranges, metric_name, equipment_id, include_last, results)
+            continue
+        source, width_filter = _rollup_source(width)
+        time_col = source.c.bucket
+        columns = {
+            "count": func.sum(source.c.sample_count),
+            "sum": func.sum(source.c.value_sum),
+            "sum_sq": func.sum(source.c.value_sum_sq),
+            "min": func.min(source.c.value_min),
+            "max": func.max(source.c.value_max),
+            "last_time": func.max(source.c.last_time),
+            "last": source.c.value_last,
+        }
+        conditions = [width_filter] if width_filter is not None else []
+        last_columns = dict(columns, last_time=source.c.last_time)
+        conditions.append(or_(*[and_(time_col >= seg_start, time_col < seg_end) for seg_start, seg_end in ranges]))
+        if metric_name is not None:
+            conditions.append(source.c.metric_name == metric_name)
+        if equipment_id is not None:
+            conditions.append(source.c.equipment_id == equipment_id)
+        _collect(db, source, conditions, columns, results)
+        if include_last:
+            _collect_last(db, source, conditions, time_col, last_columns, results)
+    return dict(results)
+
+
+def _collect_last(db: Session, source, conditions, time_col, columns, into: dict) -> None:
+    """Attach the newest value per series (joined on MAX(time) within the segment)."""
+    c = source.c
+    newest = select(
+        c.equipment_id.label("equipment_id"),
+        c.metric_name.label("metric_name"),
+        func.max(time_col).label("newest"),
+    ).where(*conditions).group_by(c.equipment_id, c.metric_name).subquery()
+    last_rows = select(c.equipment_id, c.metric_name, columns["last"].label("last"), columns["last_time"].label("last_time")).join(
+        newest,
+        and_(c.equipment_id == newest.c.equipment_id, c.metric_name == newest.c.metric_name, time_col == newest.c.newest),
+    ).where(*conditions)
+    for row in db.execute(last_rows).all():
+        stats = into[(row.equipment_id, row.metric_name)]
+        if row.last_time is not None and (stats.last_time is None or row.last_time >= stats.last_time):
+            stats.last = row.last
+
+
+def series_stats(
+    db: Session,
+    start: datetime,
+    end: datetime | None,
+    width: str,
+    metric_name: str | None = None,
+) -> dict[datetime, MetricStats]:
+    """Statistics per ``width`` bucket across all equipment; partial edge buckets are exact."""
+    if end is None:
+        end = bucket_ceil(datetime.utcnow(), "1m")
+    series: dict[datetime, MetricStats] = {}
+    bucket = bucket_floor(start, width)
+    while bucket < end:
+        seg_start, seg_end = max(bucket, start), min(bucket + BUCKETS[width], end)
+        if seg_start == bucket and seg_end == bucket + BUCKETS[width]:
+            break
+        _merge_bucket(series, bucket, window_stats(db, seg_start, seg_end, metric_name=metric_name))
+        bucket += BUCKETS[width]
+
+    full_start = bucket
+    full_end = bucket_floor(end, width)
+    if full_end > full_start:
+        source, width_filter = _rollup_source(width)
+        c = source.c
+        conditions = [c.bucket >= full_start, c.bucket < full_end]
+        if width_filter is not None:
+            conditions.append(width_filter)
+        if metric_name is not None:
+            conditions.append(c.metric_name == metric_name)
+        query = select(
+            c.bucket,
+            func.sum(c.sample_count).label("count"),
+            func.sum(c.value_sum).label("total"),
+            func.sum(c.value_sum_sq).label("total_sq"),
+            func.min(c.value_min).label("min"),
+            func.max(c.value_max).label("max"),
+        ).where(*conditions).group_by(c.bucket)
+        for row in db.execute(query).all():
+            stats = series.setdefault(row.bucket, MetricStats())
+            stats.merge(MetricStats(int(row.count or 0), float(row.total or 0.0), float(row.total_sq or 0.0), row.min, row.max))
+        if full_end < end:
+            _merge_bucket(series, full_end, window_stats(db, full_end, end, metric_name=metric_name))
+    return {key: series[key] for key in sorted(series) if series[key].count}
+
+
+def _merge_bucket(series: dict, bucket: datetime, stats: dict[tuple[str, str], MetricStats]) -> None:
+    target = series.setdefault(bucket, MetricStats())
+    for item in stats.values():
+        target.merge(item)
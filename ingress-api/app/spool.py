@@ -0,0 +1,447 @@
+"""
+Durable on-disk spool for telemetry the database cannot take right now.
+
+When the database circuit is open, a flush fails because the database is
+unreachable, or the write-behind queue is full, rows are appended to an
+append-only spool instead of being dropped. The SpoolReplayer drains it
+into the database in bulk once the database is healthy again; replayed rows
+use idempotent inserts keyed on (equipment_id, metric_name, time), so a
+segment replayed twice after a crash does not duplicate data.
+
+Each process spools into its own subdirectory of INGEST_SPOOL_DIR (named
+after the host and pid) and holds an exclusive lock on it, so workers of a
+multi-worker deployment never append to or delete each other's segments.
+A directory whose lock is free belongs to a process that is gone; it is
+adopted, replayed and removed by whichever worker takes its lock first.
+
+A spool directory holds numbered segment files. Each segment is a run of
+length-prefixed records:
+
+    >III header: payload length, CRC32 of payload, row count
+    payload:     JSON list of telemetry rows
+
+Appends go to the page cache immediately and are fsynced in batches every
+INGEST_SPOOL_FSYNC_MS (and on rotation), so a crash loses at most that
+window. Segments rotate at INGEST_SPOOL_SEGMENT_MB and each process's spool
+is capped at INGEST_SPOOL_MAX_MB. A torn or corrupt tail record (crash
+mid-write) ends that segment's replay. A batch the database rejects while
+it is reachable (a data error, not an outage) is moved to a segment under
+quarantine/ so it cannot hold up the rest of the spool. Directories left by previous
+processes are adopted when the replayer starts, so they are replayed and
+counted in the depth metrics right away, and again on every replay.
+"""
+import asyncio
+import json
+import os
+import socket
+import struct
+import threading
+import time
+import zlib
+from datetime import datetime
+from pathlib import Path
+from typing import BinaryIO, Callable, Iterator
+
+from .db_health import DatabaseHealthMonitor
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    import msvcrt
+
+    fcntl = None
+
+INGEST_SPOOL_ENABLED = os.getenv("INGEST_SPOOL_ENABLED", "true").lower() == "true"
+INGEST_SPOOL_DIR = os.getenv("INGEST_SPOOL_DIR", str(Path(__file__).resolve().parents[1] / "spool"))
+INGEST_SPOOL_SEGMENT_BYTES = int(float(os.getenv("INGEST_SPOOL_SEGMENT_MB", "16")) * 1024 * 1024)
+INGEST_SPOOL_MAX_BYTES = int(float(os.getenv("INGEST_SPOOL_MAX_MB", "2048")) * 1024 * 1024)
+INGEST_SPOOL_FSYNC_MS = int(os.getenv("INGEST_SPOOL_FSYNC_MS", "200"))
+INGEST_SPOOL_REPLAY_ROWS = int(os.getenv("INGEST_SPOOL_REPLAY_ROWS", "5000"))
+
+RECORD_HEADER = struct.Struct(">III")
+SEGMENT_SUFFIX = ".seg"
+LOCK_FILE = "LOCK"
+QUARANTINE_DIR = "quarantine"
+
+
+class SpoolFullError(RuntimeError):
+    """Raised when an append would push the spool past its size cap."""
+
+
+def encode_rows(rows: list[dict]) -> bytes:
+    """Serialize rows into one record (header + JSON payload)."""
+    payload = json.dumps(
+        [{**row, "time": row["time"].isoformat()} for row in rows],
+        separators=(",", ":"),
+    ).encode()
+    return RECORD_HEADER.pack(len(payload), zlib.crc32(payload), len(rows)) + payload
+
+
+def decode_rows(payload: bytes) -> list[dict]:
+    rows = json.loads(payload)
+    for row in rows:
+        row["time"] = datetime.fromisoformat(row["time"])
+    return rows
+
+
+def lock_directory(directory: Path) -> BinaryIO | None:
+    """Take a directory's spool lock without blocking; the open lock file, or None if another process holds it."""
+    try:
+        handle = open(directory / LOCK_FILE, "a+b")
+    except OSError:  # the directory was just removed by the process that drained it
+        return None
+    try:
+        if fcntl is not None:
+            fcntl.flock(handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            handle.seek(0)
+            msvcrt.locking(handle.fileno(), msvcrt.LK_NBLCK, 1)
+    except OSError:
+        handle.close()
+        return None
+    return handle
+
+
+def read_segment(path: Path) -> Iterator[tuple[int, bytes | None]]:
+    """Yield (row_count, payload) per record; payload is None for a torn/corrupt record, which ends the segment."""
+    with open(path, "rb") as f:
+        while True:
+            header = f.read(RECORD_HEADER.size)
+            if not header:
+                return
+            if len(header) < RECORD_HEADER.size:
+                yield 0, None
+                return
+            length, crc, count = RECORD_HEADER.unpack(header)
+            payload = f.read(length)
+            if len(payload) < length or zlib.crc32(payload) != crc:
+                yield count, None
+                return
+            yield count, payload
+
+
+class DiskSpool:
+    """Append-only, segment-rotated record log of telemetry rows."""
+
+    def __init__(
+        self,
+        directory: str | Path = INGEST_SPOOL_DIR,
+        segment_bytes: int = INGEST_SPOOL_SEGMENT_BYTES,
+        max_bytes: int = INGEST_SPOOL_MAX_BYTES,
+        fsync_interval: float = INGEST_SPOOL_FSYNC_MS / 1000.0,
+    ):
+        self.directory = Path(directory)
+        self.segment_bytes = segment_bytes
+        self.max_bytes = max_bytes
+        self.fsync_interval = fsync_interval
+        self._lock = threading.Lock()
+        self._opened = False
+        self._process_dir: Path | None = None
+        self._locks: dict[Path, BinaryIO] = {}
+        self._active = None
+        self._active_path: Path | None = None
+        self._active_size = 0
+        self._next_seq = 1
+        self._segment_rows: dict[Path, int] = {}
+        self._bytes = 0
+        self._dirty = False
+        self._last_fsync = time.monotonic()
+        self.appended_rows = 0
+        self.replayed_rows = 0
+        self.replayed_segments = 0
+        self.corrupt_records = 0
+        self.quarantined_rows = 0
+        self.fsyncs = 0
+        self.last_replay_rows_per_second = 0.0
+        self.last_replay_at: datetime | None = None
+
+    @property
+    def depth_rows(self) -> int:
+        return sum(self._segment_rows.values())
+
+    @property
+    def full(self) -> bool:
+        """Whether the size cap is reached (in-memory check, no disk I/O)."""
+        return self._bytes >= self.max_bytes
+
+    def append(self, rows: list[dict]) -> int:
+        """Append rows as one record; fsync happens in batches (see sync())."""
+        if not rows:
+            return 0
+        record = encode_rows(rows)
+        with self._lock:
+            self._open()
+            if self._bytes + len(record) > self.max_bytes:
+                raise SpoolFullError(f"Ingest spool full ({self._bytes}/{self.max_bytes} bytes)")
+            if self._active is None or (self._active_size and self._active_size + len(record) > self.segment_bytes):
+                self._rotate()
+            self._active.write(record)
+            self._active.flush()
+            self._active_size += len(record)
+            self._bytes += len(record)
+            self._segment_rows[self._active_path] += len(rows)
+            self._dirty = True
+            self.appended_rows += len(rows)
+            if time.monotonic() - self._last_fsync >= self.fsync_interval:
+                self._fsync()
+        return len(rows)
+
+    def open(self) -> None:
+        """Index segments left by a previous process (otherwise done on first append/replay)."""
+        with self._lock:
+            self._open()
+
+    def sync(self) -> None:
+        """fsync pending appends (called periodically by the replayer)."""
+        with self._lock:
+            if self._dirty:
+                self._fsync()
+
+    def replay(
+        self,
+        writer: Callable[[list[dict]], int],
+        batch_rows: int = INGEST_SPOOL_REPLAY_ROWS,
+        reachable: Callable[[], bool] | None = None,
+    ) -> int:
+        """Write every spooled row through ``writer`` in batches, oldest segment first.
+
+        A segment is deleted only after all of its rows were written; if the
+        writer raises, the segment stays and is replayed again later. When
+        ``reachable`` says the database is up after a failed write, the
+        database rejected the batch itself, so it is quarantined instead.
+        """
+        with self._lock:
+            self._open()
+            self._adopt()
+            if self._active is not None and self._active_size:
+                self._rotate(open_next=False)
+            segments = sorted(self._segment_rows)
+        started = time.perf_counter()
+        replayed = 0
+        for path in segments:
+            pending: list[dict] = []
+            for _, payload in read_segment(path):
+                if payload is None:
+                    self.corrupt_records += 1
+                    print(f"[WARN] Spool segment {path.name} has a torn or corrupt record, skipping the rest")
+                    break
+                pending.extend(decode_rows(payload))
+                if len(pending) >= batch_rows:
+                    replayed += self._replay_batch(writer, pending, reachable)
+                    pending = []
+            if pending:
+                replayed += self._replay_batch(writer, pending, reachable)
+            with self._lock:
+                self._bytes -= path.stat().st_size
+                self._segment_rows.pop(path, None)
+                path.unlink()
+            self.replayed_segments += 1
+        with self._lock:
+            self._release_drained()
+        if replayed:
+            elapsed = max(time.perf_counter() - started, 1e-6)
+            self.replayed_rows += replayed
+            self.last_replay_rows_per_second = replayed / elapsed
+            self.last_replay_at = datetime.utcnow()
+        return replayed
+
+    def close(self) -> None:
+        """Close the active segment and release this process's directory locks (reopened on next use)."""
+        with self._lock:
+            if self._active is not None:
+                self._fsync()
+                self._active.close()
+                self._active = None
+            if not self._opened:
+                return
+            self._release_drained()
+            if not any(path.parent == self._process_dir for path in self._segment_rows):
+                self._remove_directory(self._process_dir)
+            for handle in self._locks.values():
+                handle.close()
+            self._locks.clear()
+            self._segment_rows.clear()
+            self._bytes = 0
+            self._next_seq = 1
+            self._process_dir = None
+            self._opened = False
+
+    def metrics(self) -> dict:
+        return {
+            "directory": str(self.directory),
+            "process_directory": str(self._process_dir) if self._process_dir else None,
+            "segments": len(self._segment_rows),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "depth_rows": self.depth_rows,
+            "appended_rows": self.appended_rows,
+            "replayed_rows": self.replayed_rows,
+            "replayed_segments": self.replayed_segments,
+            "replay_rows_per_second": round(self.last_replay_rows_per_second, 1),
+            "last_replay_at": self.last_replay_at.isoformat() + "Z" if self.last_replay_at else None,
+            "corrupt_records": self.corrupt_records,
+            "quarantined_rows": self.quarantined_rows,
+            "fsyncs": self.fsyncs,
+        }
+
+    def _replay_batch(
+        self,
+        writer: Callable[[list[dict]], int],
+        rows: list[dict],
+        reachable: Callable[[], bool] | None,
+    ) -> int:
+        try:
+            writer(rows)
+            return len(rows)
+        except Exception as e:
+            if reachable is None or not reachable():
+                raise
+            self._quarantine(rows, e)
+            return 0
+
+    def _quarantine(self, rows: list[dict], error: Exception) -> None:
+        """Set aside rows the database rejected; an operator can move the segment back to replay it."""
+        directory = self.directory / QUARANTINE_DIR
+        directory.mkdir(exist_ok=True)
+        with open(directory / f"{self._process_dir.name}{SEGMENT_SUFFIX}", "ab") as f:
+            f.write(encode_rows(rows))
+            f.flush()
+            os.fsync(f.fileno())
+        self.quarantined_rows += len(rows)
+        print(f"[WARN] Quarantined {len(rows)} spooled rows the database rejected: {error}")
+
+    def _open(self) -> None:
+        """Lock this process's directory and index what is spooled; callers hold the lock."""
+        if self._opened:
+            return
+        self.directory.mkdir(parents=True, exist_ok=True)
+        name = f"{socket.gethostname()}-{os.getpid()}"
+        attempt = 0
+        while True:
+            directory = self.directory / (f"{name}-{attempt}" if attempt else name)
+            directory.mkdir(exist_ok=True)
+            handle = lock_directory(directory)
+            if handle is not None:
+                break
+            attempt += 1  # another spool in this process holds it
+        self._process_dir = directory
+        self._locks[directory] = handle
+        self._next_seq = self._index(directory) + 1
+        self._adopt()
+        if self._segment_rows:
+            print(f"[OK] Ingest spool has {self.depth_rows} rows in {len(self._segment_rows)} segments to replay")
+        self._opened = True
+
+    def _index(self, directory: Path) -> int:
+        """Count the rows and bytes of a directory's segments; returns its highest sequence number."""
+        last_seq = 0
+        for path in sorted(directory.glob(f"*{SEGMENT_SUFFIX}")):
+            self._segment_rows[path] = sum(count for count, payload in read_segment(path) if payload is not None)
+            self._bytes += path.stat().st_size
+            last_seq = max(last_seq, int(path.stem))
+        return last_seq
+
+    def _adopt(self) -> None:
+        """Take over directories whose process is gone (their lock is free), plus segments at the top level."""
+        candidates = [path for path in sorted(self.directory.iterdir()) if path.is_dir() and path.name != QUARANTINE_DIR]
+        if any(self.directory.glob(f"*{SEGMENT_SUFFIX}")):
+            candidates.append(self.directory)  # written before spools were split per process
+        for directory in candidates:
+            if directory in self._locks:
+                continue
+            handle = lock_directory(directory)
+            if handle is None:
+                continue
+            self._locks[directory] = handle
+            self._index(directory)
+        self._release_drained()
+
+    def _release_drained(self) -> None:
+        """Remove adopted directories with nothing left to replay and drop their locks."""
+        pending = {path.parent for path in self._segment_rows}
+        for directory in [d for d in self._locks if d != self._process_dir and d not in pending]:
+            self._remove_directory(directory)
+            self._locks.pop(directory).close()
+
+    def _remove_directory(self, directory: Path) -> None:
+        """Delete an empty spool directory while still holding its lock; a racing process may recreate it."""
+        try:
+            (directory / LOCK_FILE).unlink()
+            if directory != self.directory:
+                directory.rmdir()
+        except OSError:
+            pass
+
+    def _rotate(self, open_next: bool = True) -> None:
+        if self._active is not None:
+            self._fsync()
+            self._active.close()
+            self._active = None
+            self._active_size = 0
+        if open_next:
+            self._active_path = self._process_dir / f"{self._next_seq:012d}{SEGMENT_SUFFIX}"
+            self._next_seq += 1
+            self._active = open(self._active_path, "ab")
+            self._segment_rows[self._active_path] = 0
+
+    def _fsync(self) -> None:
+        if self._active is not None and self._dirty:
+            os.fsync(self._active.fileno())
+            self.fsyncs += 1
+        self._dirty = False
+        self._last_fsync = time.monotonic()
+
+    @classmethod
+    def from_env(cls) -> "DiskSpool | None":
+        return cls() if INGEST_SPOOL_ENABLED else None
+
+
+class SpoolReplayer:
+    """Background task: batch-fsync the spool and drain it while the database is healthy."""
+
+    def __init__(
+        self,
+        spool: DiskSpool,
+        writer: Callable[[list[dict]], int],
+        breaker: DatabaseHealthMonitor,
+        interval: float = INGEST_SPOOL_FSYNC_MS / 1000.0,
+    ):
+        self.spool = spool
+        self.writer = writer
+        self.breaker = breaker
+        self.interval = interval
+        self.failures = 0
+        self._task: asyncio.Task | None = None
+
+    async def start(self) -> None:
+        if self._task is None or self._task.done():
+            await asyncio.to_thread(self.spool.open)
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await asyncio.to_thread(self.spool.close)
+
+    async def drain(self) -> int:
+        """Replay everything spooled so far (no-op while the circuit is open)."""
+        if not self.breaker.available or not self.spool.depth_rows:
+            return 0
+        try:
+            return await asyncio.to_thread(self.spool.replay, self.writer, reachable=self.breaker.check)
+        except Exception as e:
+            self.failures += 1
+            print(f"[WARN] Spool replay interrupted, will retry: {e}")
+            await asyncio.to_thread(self.breaker.check)
+            return 0
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            await asyncio.to_thread(self.spool.sync)
+            await self.drain()
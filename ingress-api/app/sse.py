@@ -0,0 +1,141 @@
+"""
+Server-Sent Events for live telemetry.
+
+Every locally published payload is appended to one in-memory ring buffer of
+recent events. Each SSE stream keeps only a cursor into that buffer, so
+slow readers cost no extra memory, and a reconnecting EventSource resumes
+from its Last-Event-ID as long as the event is still in the buffer;
+otherwise it gets a fresh snapshot. Idle streams get comment heartbeats so
+proxies keep the connection open.
+"""
+import asyncio
+import json
+import os
+import time
+from collections import deque
+from itertools import islice
+from typing import AsyncIterator, Awaitable, Callable, Iterable
+
+from .broadcast import Subscription
+
+SSE_BUFFER_EVENTS = int(os.getenv("SSE_BUFFER_EVENTS", "2000"))
+SSE_HEARTBEAT_SECONDS = float(os.getenv("SSE_HEARTBEAT_SECONDS", "15"))
+SSE_RETRY_MS = int(os.getenv("SSE_RETRY_MS", "3000"))
+
+
+class EventLog:
+    """Ring buffer of (seq, payload, encoded payload) with waiters for new events."""
+
+    def __init__(self, max_events: int = SSE_BUFFER_EVENTS):
+        self.epoch = format(int(time.time() * 1000), "x")
+        self.events: deque[tuple[int, dict, str]] = deque(maxlen=max_events)
+        self.last_seq = 0
+        self.streams = 0
+        self.resumed = 0
+        self.snapshots = 0
+        self._waiters: set[asyncio.Future] = set()
+
+    def event_id(self, seq: int) -> str:
+        return f"{self.epoch}-{seq}"
+
+    def append(self, payload: dict) -> None:
+        self.last_seq += 1
+        self.events.append((self.last_seq, payload, json.dumps(payload)))
+        for waiter in self._waiters:
+            if not waiter.done():
+                waiter.set_result(None)
+        self._waiters.clear()
+
+    def resume_position(self, last_event_id: str | None) -> int | None:
+        """Sequence to resume after, or None when the ID is unknown or already evicted."""
+        if not last_event_id:
+            return None
+        epoch, _, seq = last_event_id.strip().partition("-")
+        if epoch != self.epoch or not seq.isdigit():
+            return None
+        seq = int(seq)
+        oldest = self.events[0][0] if self.events else self.last_seq + 1
+        if seq > self.last_seq or seq < oldest - 1:
+            return None
+        return seq
+
+    def since(self, seq: int) -> list[tuple[int, dict, str]] | None:
+        """Events after ``seq``; None if some of them were already evicted."""
+        if seq >= self.last_seq:
+            return []
+        oldest = self.events[0][0]
+        if seq < oldest - 1:
+            return None
+        return list(islice(self.events, seq - oldest + 1, None))
+
+    async def wait(self, seq: int, timeout: float) -> bool:
+        """Wait until an event after ``seq`` exists; False on timeout."""
+        if self.last_seq > seq:
+            return True
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.add(waiter)
+        try:
+            await asyncio.wait({waiter}, timeout=timeout)
+        finally:
+            self._waiters.discard(waiter)
+        return self.last_seq > seq
+
+    def metrics(self) -> dict:
+        return {
+            "streams": self.streams,
+            "buffered_events": len(self.events),
+            "last_event_id": self.event_id(self.last_seq),
+            "resumed": self.resumed,
+            "snapshots": self.snapshots,
+        }
+
+
+def format_event(event: str, data: str, event_id: str | None = None) -> str:
+    lines = [f"id: {event_id}"] if event_id else []
+    lines.append(f"event: {event}")
+    lines.extend(f"data: {line}" for line in data.splitlines() or [""])
+    return "\n".join(lines) + "\n\n"
+
+
+def _encode(subscription: Subscription, payload: dict, encoded: str) -> str:
+    if subscription.metrics is None:
+        return encoded
+    return json.dumps({**payload, "metrics": subscription.select(payload.get("metrics") or {})})
+
+
+async def stream_events(
+    log: EventLog,
+    subscription: Subscription,
+    last_event_id: str | None,
+    snapshot: Callable[[], Iterable[dict]],
+    is_disconnected: Callable[[], Awaitable[bool]],
+    heartbeat: float = SSE_HEARTBEAT_SECONDS,
+) -> AsyncIterator[str]:
+    """Yield SSE frames: a snapshot (unless resuming), then matching telemetry events."""
+    log.streams += 1
+    try:
+        yield f"retry: {SSE_RETRY_MS}\n\n"
+        cursor = log.resume_position(last_event_id)
+        if cursor is not None:
+            log.resumed += 1
+        while True:
+            events = log.since(cursor) if cursor is not None else None
+            if events is None:
+                log.snapshots += 1
+                cursor = log.last_seq
+                data = [
+                    {**payload, "metrics": subscription.select(payload.get("metrics") or {})}
+                    for payload in snapshot() if subscription.matches(payload)
+                ]
+                yield format_event("snapshot", json.dumps(data), log.event_id(cursor))
+                continue
+            for seq, payload, encoded in events:
+                cursor = seq
+                if subscription.matches(payload):
+                    yield format_event("telemetry", _encode(subscription, payload, encoded), log.event_id(seq))
+            if await is_disconnected():
+                break
+            if not events and not await log.wait(cursor, heartbeat):
+                yield ": heartbeat\n\n"
+    finally:
+        log.streams -= 1
@@ -0,0 +1,412 @@
+"""
+Telemetry storage layouts behind one repository interface.
+
+``TELEMETRY_STORAGE=eav`` (default) keeps one ``telemetry`` row per metric.
+``TELEMETRY_STORAGE=wide`` keeps one ``telemetry_samples`` row per
+(equipment_id, time): the metrics named in the equipment type's schema are
+packed into a float64 array, anything else goes into a small JSON ``extra``.
+
+Writers hand over the flattened per-metric rows produced by ingest; readers
+(history, rollup edges, last-value warm-up, TechMate) get the same per-metric
+row shape back whichever layout is active.
+"""
+import csv
+import io
+import math
+import os
+import sys
+from array import array
+from collections import namedtuple
+from datetime import datetime
+from typing import Iterator
+
+from sqlalchemy import and_, func, or_, select
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+
+from . import models
+from .rollups import _collect, _collect_last
+
+TELEMETRY_STORAGE = os.getenv("TELEMETRY_STORAGE", "eav").lower()
+TELEMETRY_COLUMNS = ("time", "equipment_id", "metric_name", "metric_value", "unit", "status")
+
+# Slot order is part of the stored format: only ever append to these tuples.
+METRIC_SCHEMAS: dict[str, tuple[str, ...]] = {
+    "IMM": ("cycle_time", "mold_temp", "machine_temp", "clamping_pressure", "vibration"),
+    "QMC": ("temp",),
+    "CHILLER": ("water_temp", "inlet_temp", "outlet_temp", "flow_rate"),
+    "ROBOT": ("axis_x", "axis_y", "axis_z", "grip_pressure"),
+    "TCM": ("cut_pressure", "cycle_count"),
+    "VWM": ("weld_freq", "weld_time"),
+}
+
+TelemetryRow = namedtuple("TelemetryRow", "id time equipment_id metric_name metric_value unit status")
+
+
+def pack_values(values: list[float]) -> bytes:
+    packed = array("d", values)
+    if sys.byteorder != "little":
+        packed.byteswap()
+    return packed.tobytes()
+
+
+def unpack_values(blob: bytes | None) -> array:
+    values = array("d")
+    if blob:
+        values.frombytes(blob)
+        if sys.byteorder != "little":
+            values.byteswap()
+    return values
+
+
+def _range_filter(time_col, ranges: list[tuple[datetime, datetime]]):
+    return or_(*[and_(time_col >= seg_start, time_col < seg_end) for seg_start, seg_end in ranges])
+
+
+class TelemetryRepository:
+    """Interface shared by the storage layouts."""
+
+    layout = ""
+    model = None
+
+    def insert_rows(self, connection, rows: list[dict]) -> int:
+        raise NotImplementedError
+
+    def insert_new_rows(self, connection, rows: list[dict]) -> list[dict]:
+        """Insert rows, skipping ones already stored; returns the rows actually written."""
+        self.insert_rows(connection, rows)
+        return rows
+
+    def iter_rows(
+        self,
+        db: Session,
+        equipment_id: str,
+        start: datetime | None = None,
+        end: datetime | None = None,
+        metrics: list[str] | None = None,
+        after: tuple[datetime, int] | None = None,
+        descending: bool = True,
+        limit: int | None = None,
+    ) -> Iterator:
+        """Yield per-metric rows in (time, id) order, strictly after the ``after`` key."""
+        raise NotImplementedError
+
+    def scan(self, db: Session, since: datetime | None = None) -> Iterator:
+        """Yield every numeric per-metric row (ascending time) for rollup backfills."""
+        raise NotImplementedError
+
+    def raw_stats(self, db: Session, ranges, metric_name: str | None, equipment_id: str | None,
+                  include_last: bool, into: dict) -> None:
+        """Merge exact per-series statistics over the raw rows in ``ranges`` into ``into``."""
+        raise NotImplementedError
+
+    def latest_rows(self, db: Session, since: datetime) -> list:
+        """Newest (equipment_id, metric_name, metric_value, time) per series since ``since``."""
+        raise NotImplementedError
+
+    def active_equipment_count(self, db: Session, since: datetime) -> int:
+        time_col = self.model.time
+        return db.query(func.count(func.distinct(self.model.equipment_id))).filter(time_col >= since).scalar() or 0
+
+    def delete_all(self, db: Session) -> None:
+        db.query(self.model).delete()
+
+    def _keyset(self, query, after, descending: bool):
+        M = self.model
+        if after is not None:
+            after_time, after_id = after
+            if descending:
+                query = query.filter(or_(M.time < after_time, and_(M.time == after_time, M.id < after_id)))
+            else:
+                query = query.filter(or_(M.time > after_time, and_(M.time == after_time, M.id > after_id)))
+        if descending:
+            return query.order_by(M.time.desc(), M.id.desc())
+        return query.order_by(M.time.asc(), M.id.asc())
+
+
+class EavRepository(TelemetryRepository):
+    """One ``telemetry`` row per metric (the original layout)."""
+
+    layout = "eav"
+    model = models.Telemetry
+
+    def insert_rows(self, connection, rows: list[dict]) -> int:
+        if connection.dialect.name == "postgresql" and connection.dialect.driver == "psycopg2":
+            _copy_rows(connection.connection.driver_connection, rows)
+        else:
+            connection.execute(models.Telemetry.__table__.insert(), rows)
+        return len(rows)
+
+    def insert_new_rows(self, connection, rows: list[dict]) -> list[dict]:
+        """INSERT ... ON CONFLICT DO NOTHING on the unique (equipment_id, metric_name, time) index."""
+        unique = {}
+        for row in rows:
+            unique.setdefault((row["equipment_id"], row["metric_name"], row["time"]), row)
+        dialect = connection.dialect.name
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        elif dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            return super().insert_new_rows(connection, list(unique.values()))
+        T = models.Telemetry.__table__
+        statement = insert(T).on_conflict_do_nothing(
+            index_elements=[T.c.equipment_id, T.c.metric_name, T.c.time]
+        ).returning(T.c.equipment_id, T.c.metric_name, T.c.time)
+        inserted = {tuple(row) for row in connection.execute(statement, list(unique.values()))}
+        return [row for key, row in unique.items() if key in inserted]
+
+    def iter_rows(self, db, equipment_id, start=None, end=None, metrics=None, after=None, descending=True, limit=None):
+        T = models.Telemetry
+        query = db.query(T.id, T.time, T.equipment_id, T.metric_name, T.metric_value, T.unit, T.status).filter(
+            T.equipment_id == equipment_id,
+        )
+        if start is not None:
+            query = query.filter(T.time >= start)
+        if end is not None:
+            query = query.filter(T.time < end)
+        if metrics:
+            query = query.filter(T.metric_name.in_(metrics))
+        query = self._keyset(query, after, descending)
+        if limit is not None:
+            query = query.limit(limit)
+        yield from query.yield_per(2_000)
+
+    def scan(self, db, since=None):
+        T = models.Telemetry
+        query = db.query(T.time, T.equipment_id, T.metric_name, T.metric_value).filter(T.metric_value.isnot(None))
+        if since is not None:
+            query = query.filter(T.time >= since)
+        yield from query.order_by(T.time).yield_per(10_000)
+
+    def raw_stats(self, db, ranges, metric_name, equipment_id, include_last, into):
+        source = models.Telemetry.__table__
+        c = source.c
+        columns = {
+            "count": func.count(c.metric_value),
+            "sum": func.sum(c.metric_value),
+            "sum_sq": func.sum(c.metric_value * c.metric_value),
+            "min": func.min(c.metric_value),
+            "max": func.max(c.metric_value),
+            "last_time": func.max(c.time),
+            "last": c.metric_value,
+        }
+        conditions = [c.metric_value.isnot(None), _range_filter(c.time, ranges)]
+        if metric_name is not None:
+            conditions.append(c.metric_name == metric_name)
+        if equipment_id is not None:
+            conditions.append(c.equipment_id == equipment_id)
+        _collect(db, source, conditions, columns, into)
+        if include_last:
+            _collect_last(db, source, conditions, c.time, dict(columns, last_time=c.time), into)
+
+    def latest_rows(self, db, since):
+        """DISTINCT ON (equipment_id, metric_name) on PostgreSQL (TimescaleDB SkipScan); a MAX(time) join elsewhere."""
+        T = models.Telemetry
+        if db.get_bind().dialect.name == "postgresql":
+            return db.query(T.equipment_id, T.metric_name, T.metric_value, T.time).filter(
+                T.time >= since,
+            ).distinct(T.equipment_id, T.metric_name).order_by(
+                T.equipment_id, T.metric_name, T.time.desc()
+            ).all()
+        newest = db.query(
+            T.equipment_id.label("equipment_id"),
+            T.metric_name.label("metric_name"),
+            func.max(T.time).label("time"),
+        ).filter(T.time >= since).group_by(T.equipment_id, T.metric_name).subquery()
+        return db.query(T.equipment_id, T.metric_name, T.metric_value, T.time).join(
+            newest,
+            and_(
+                T.equipment_id == newest.c.equipment_id,
+                T.metric_name == newest.c.metric_name,
+                T.time == newest.c.time,
+            ),
+        ).all()
+
+
+class WideRepository(TelemetryRepository):
+    """One ``telemetry_samples`` row per (equipment_id, time) with packed metric values."""
+
+    layout = "wide"
+    model = models.TelemetrySample
+
+    def __init__(self):
+        self._types: dict[str, str] = {}
+
+    def _equipment_types(self, connection, equipment_ids: set[str]) -> dict[str, str]:
+        missing = [equipment_id for equipment_id in equipment_ids if equipment_id not in self._types]
+        if missing:
+            E = models.Equipment
+            for equipment_id, equipment_type in connection.execute(
+                select(E.equipment_id, E.equipment_type).where(E.equipment_id.in_(missing))
+            ).all():
+                self._types[equipment_id] = equipment_type
+        return self._types
+
+    def pack_samples(self, connection, rows: list[dict]) -> list[dict]:
+        """Group per-metric rows into one packed sample per (equipment_id, time)."""
+        grouped: dict[tuple[str, datetime], dict] = {}
+        for row in rows:
+            key = (row["equipment_id"], row["time"])
+            sample = grouped.get(key)
+            if sample is None:
+                sample = grouped[key] = {"status": row.get("status"), "metrics": {}}
+            sample["metrics"][row["metric_name"]] = row["metric_value"]
+
+        types = self._equipment_types(connection, {equipment_id for equipment_id, _ in grouped})
+        samples = []
+        for (equipment_id, time), sample in grouped.items():
+            schema_name = types.get(equipment_id)
+            schema = METRIC_SCHEMAS.get(schema_name, ())
+            metrics = sample["metrics"]
+            values = [math.nan] * len(schema)
+            for slot, metric_name in enumerate(schema):
+                value = metrics.pop(metric_name, None)
+                if value is not None:
+                    values[slot] = value
+            while values and math.isnan(values[-1]):
+                values.pop()
+            samples.append({
+                "time": time,
+                "equipment_id": equipment_id,
+                "metric_schema": schema_name if schema else None,
+                "status": sample["status"],
+                "metric_values": pack_values(values) if values else None,
+                "extra": metrics or None,
+            })
+        return samples
+
+    def insert_rows(self, connection, rows: list[dict]) -> int:
+        samples = self.pack_samples(connection, rows)
+        if samples:
+            connection.execute(models.TelemetrySample.__table__.insert(), samples)
+        return len(rows)
+
+    def _explode(self, sample, metrics: list[str] | None = None) -> Iterator[TelemetryRow]:
+        schema = METRIC_SCHEMAS.get(sample.metric_schema, ())
+        for slot, value in enumerate(unpack_values(sample.metric_values)):
+            if math.isnan(value) or slot >= len(schema):
+                continue
+            if metrics and schema[slot] not in metrics:
+                continue
+            yield TelemetryRow(sample.id, sample.time, sample.equipment_id, schema[slot], value, None, sample.status)
+        for metric_name, value in (sample.extra or {}).items():
+            if metrics and metric_name not in metrics:
+                continue
+            yield TelemetryRow(sample.id, sample.time, sample.equipment_id, metric_name, value, None, sample.status)
+
+    def _samples(self, db, equipment_id=None, start=None, end=None):
+        S = models.TelemetrySample
+        query = db.query(S.id, S.time, S.equipment_id, S.metric_schema, S.status, S.metric_values, S.extra)
+        if equipment_id is not None:
+            query = query.filter(S.equipment_id == equipment_id)
+        if start is not None:
+            query = query.filter(S.time >= start)
+        if end is not None:
+            query = query.filter(S.time < end)
+        return query
+
+    def iter_rows(self, db, equipment_id, start=None, end=None, metrics=None, after=None, descending=True, limit=None):
+        """``limit`` counts metric rows but never splits a sample, so (time, id) cursors stay exact."""
+        query = self._keyset(self._samples(db, equipment_id, start, end), after, descending)
+        produced = 0
+        for sample in query.yield_per(1_000):
+            for row in self._explode(sample, metrics):
+                produced += 1
+                yield row
+            if limit is not None and produced >= limit:
+                return
+
+    def scan(self, db, since=None):
+        S = models.TelemetrySample
+        for sample in self._samples(db, start=since).order_by(S.time).yield_per(5_000):
+            for row in self._explode(sample):
+                if isinstance(row.metric_value, (int, float)):
+                    yield row
+
+    def raw_stats(self, db, ranges, metric_name, equipment_id, include_last, into):
+        S = models.TelemetrySample
+        query = self._samples(db, equipment_id).filter(_range_filter(S.time, ranges))
+        metrics = [metric_name] if metric_name else None
+        for sample in query.yield_per(5_000):
+            for row in self._explode(sample, metrics):
+                if isinstance(row.metric_value, (int, float)):
+                    into[(row.equipment_id, row.metric_name)].add(row.metric_value, row.time)
+
+    def latest_rows(self, db, since):
+        """Newest sample per device, walking back per device only for metrics it did not carry."""
+        S = models.TelemetrySample
+        newest = db.query(S.equipment_id.label("equipment_id"), func.max(S.time).label("time")).filter(
+            S.time >= since,
+        ).group_by(S.equipment_id).subquery()
+        heads = self._samples(db).join(
+            newest, and_(S.equipment_id == newest.c.equipment_id, S.time == newest.c.time)
+        ).all()
+
+        latest: dict[tuple[str, str], TelemetryRow] = {}
+        for sample in heads:
+            seen = set()
+            for row in self._explode(sample):
+                latest.setdefault((row.equipment_id, row.metric_name), row)
+                seen.add(row.metric_name)
+            wanted = set(METRIC_SCHEMAS.get(sample.metric_schema, ())) - seen
+            if not wanted:
+                continue
+            for older in self._samples(db, sample.equipment_id, since).order_by(S.time.desc()).yield_per(500):
+                for row in self._explode(older, list(wanted)):
+                    latest.setdefault((row.equipment_id, row.metric_name), row)
+                    wanted.discard(row.metric_name)
+                if not wanted:
+                    break
+        return list(latest.values())
+
+
+def _copy_rows(dbapi_connection, rows: list[dict]) -> None:
+    """Stream rows into PostgreSQL with COPY ... FROM STDIN (CSV)."""
+    import psycopg2
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow([
+            row["time"].isoformat(),
+            row["equipment_id"],
+            row["metric_name"],
+            "" if row["metric_value"] is None else repr(row["metric_value"]),
+            row["unit"] or "",
+            row["status"] or "",
+        ])
+    buffer.seek(0)
+    statement = f"COPY telemetry ({', '.join(TELEMETRY_COLUMNS)}) FROM STDIN WITH (FORMAT csv)"
+    with dbapi_connection.cursor() as cursor:
+        try:
+            cursor.copy_expert(statement, buffer)
+        except psycopg2.Error as e:
+            # The raw cursor skips SQLAlchemy's exception translation; raise what execute() would,
+            # so a duplicate surfaces as IntegrityError and gets the idempotent retry.
+            raise DBAPIError.instance(statement, None, e, psycopg2.Error) from e
+
+
+REPOSITORIES = {"eav": EavRepository, "wide": WideRepository}
+
+
+def _repository_class(layout: str) -> type[TelemetryRepository]:
+    if layout not in REPOSITORIES:
+        raise ValueError(f"Unknown telemetry storage layout {layout!r}; use one of {', '.join(REPOSITORIES)}")
+    return REPOSITORIES[layout]
+
+
+_repository: TelemetryRepository = _repository_class(TELEMETRY_STORAGE)()
+
+
+def repository() -> TelemetryRepository:
+    return _repository
+
+
+def configure_storage(layout: str) -> TelemetryRepository:
+    """Switch the active layout (startup, benchmarks and tests)."""
+    global _repository
+    repository_class = _repository_class(layout)
+    if _repository.layout != layout:
+        _repository = repository_class()
+    return _repository
@@ -0,0 +1,265 @@
+"""
+Write-behind buffer between the ingest routes and the database.
+
+Routes validate and enqueue telemetry rows without touching the database. A
+background flusher drains the queue by size or age and runs the inserts on a
+thread pool so a slow commit never blocks the event loop.
+
+With a ``breaker`` (db_health.DatabaseHealthMonitor) the buffer also rides
+out database outages: nothing is flushed while the circuit is open, and a
+flush that fails because the database is unreachable puts its rows back at
+the head of the queue. Rows are only dropped for errors the database itself
+reports while reachable. max_rows bounds the backlog; beyond it enqueue
+raises QueueFullError so producers back off.
+
+With a ``spool`` (spool.DiskSpool) those rows go to disk instead: queued
+rows are spilled while the circuit is open, failed flushes are spooled
+rather than requeued, and a full queue overflows into the spool. Overflow
+is handed to the flusher, which writes it on the thread pool, so enqueue
+never does disk I/O; a full spool, or more overflow than max_overflow_rows
+waiting to be spilled, makes enqueue raise QueueFullError.
+"""
+import asyncio
+import os
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+
+from .db_health import DatabaseHealthMonitor
+from .spool import DiskSpool, SpoolFullError
+
+
+class QueueFullError(RuntimeError):
+    """Raised when the buffer cannot accept more rows (caller should back off)."""
+
+
+class WriteBehindBuffer:
+    """Bounded in-memory row queue with a size/age triggered background flusher."""
+
+    def __init__(
+        self,
+        writer: Callable[[list[dict]], int],
+        max_rows: int = 200_000,
+        flush_rows: int = 5_000,
+        flush_interval: float = 0.25,
+        workers: int = 2,
+        breaker: DatabaseHealthMonitor | None = None,
+        spool: DiskSpool | None = None,
+        max_overflow_rows: int | None = None,
+    ):
+        self.writer = writer
+        self.breaker = breaker
+        self.spool = spool
+        self.max_rows = max_rows
+        self.flush_rows = flush_rows
+        self.flush_interval = flush_interval
+        self.workers = max(workers, 1)
+        self.max_overflow_rows = flush_rows * 4 if max_overflow_rows is None else max_overflow_rows
+        self._queue: deque[dict] = deque()
+        self._overflow: list[list[dict]] = []
+        self._overflow_rows = 0
+        self._oldest_enqueued_at: float | None = None
+        self._executor: ThreadPoolExecutor | None = None
+        self._task: asyncio.Task | None = None
+        self._wakeup: asyncio.Event | None = None
+        self._slots: asyncio.Semaphore | None = None
+        self._inflight: set[asyncio.Task] = set()
+        self.enqueued_rows = 0
+        self.flushed_rows = 0
+        self.failed_rows = 0
+        self.rejected_rows = 0
+        self.requeued_rows = 0
+        self.spooled_rows = 0
+        self.flushes = 0
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+        self._total_flush_ms = 0.0
+
+    @classmethod
+    def from_env(
+        cls,
+        writer: Callable[[list[dict]], int],
+        breaker: DatabaseHealthMonitor | None = None,
+        spool: DiskSpool | None = None,
+    ) -> "WriteBehindBuffer":
+        return cls(
+            writer,
+            breaker=breaker,
+            spool=spool,
+            max_rows=int(os.getenv("INGEST_QUEUE_MAX_ROWS", "200000")),
+            flush_rows=int(os.getenv("INGEST_FLUSH_ROWS", "5000")),
+            flush_interval=int(os.getenv("INGEST_FLUSH_INTERVAL_MS", "250")) / 1000.0,
+            workers=int(os.getenv("INGEST_FLUSH_WORKERS", "2")),
+        )
+
+    def __len__(self) -> int:
+        return len(self._queue)
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    @property
+    def paused(self) -> bool:
+        """True while the database circuit is open and rows are being held."""
+        return self.breaker is not None and not self.breaker.available
+
+    def enqueue(self, rows: list[dict]) -> int:
+        """Queue rows for the next flush. Raises QueueFullError when over capacity."""
+        if not rows:
+            return 0
+        if len(self._queue) + len(rows) > self.max_rows:
+            if (
+                self.spool is not None
+                and self._wakeup is not None
+                and not self.spool.full
+                and self._overflow_rows + len(rows) <= self.max_overflow_rows
+            ):
+                self._overflow.append(rows)
+                self._overflow_rows += len(rows)
+                self._wakeup.set()
+                return len(rows)
+            self.rejected_rows += len(rows)
+            raise QueueFullError(f"Ingest queue full ({len(self._queue)}/{self.max_rows} rows)")
+        if not self._queue:
+            self._oldest_enqueued_at = time.monotonic()
+        self._queue.extend(rows)
+        self.enqueued_rows += len(rows)
+        if self._wakeup is not None and len(self._queue) >= self.flush_rows:
+            self._wakeup.set()
+        return len(rows)
+
+    async def start(self) -> None:
+        if self.running:
+            return
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="ingest-flush")
+        self._wakeup = asyncio.Event()
+        self._slots = asyncio.Semaphore(self.workers)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the flusher after writing everything still queued."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._inflight:
+            await asyncio.gather(*self._inflight, return_exceptions=True)
+        if self._overflow and self._executor is not None:
+            await self._spill_overflow()
+        while self._queue and self._executor is not None and not self.paused:
+            await self._flush(self._drain())
+        if self._queue and self.spool is not None and self._executor is not None:
+            await self._spill(self._drain(len(self._queue)))
+        if self._queue:
+            print(f"[WARN] Stopping with {len(self._queue)} telemetry rows unflushed (database unavailable)")
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            if self._overflow:
+                await self._spill_overflow()
+            if self.paused and self.spool is not None and self._queue:
+                await self._spill(self._drain(len(self._queue)))
+            while self._should_flush():
+                await self._slots.acquire()
+                task = asyncio.create_task(self._flush(self._drain()))
+                self._inflight.add(task)
+                task.add_done_callback(self._flush_done)
+
+    def _flush_done(self, task: asyncio.Task) -> None:
+        self._inflight.discard(task)
+        self._slots.release()
+
+    def _should_flush(self) -> bool:
+        if not self._queue or self.paused:
+            return False
+        if len(self._queue) >= self.flush_rows:
+            return True
+        age = time.monotonic() - (self._oldest_enqueued_at or time.monotonic())
+        return age >= self.flush_interval
+
+    def _drain(self, limit: int | None = None) -> list[dict]:
+        count = min(len(self._queue), limit or self.flush_rows)
+        rows = [self._queue.popleft() for _ in range(count)]
+        self._oldest_enqueued_at = time.monotonic() if self._queue else None
+        return rows
+
+    async def _flush(self, rows: list[dict]) -> None:
+        if not rows:
+            return
+        started = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        try:
+            written = await loop.run_in_executor(self._executor, self.writer, rows)
+            self.flushed_rows += written
+        except Exception as e:
+            if self.breaker is not None and not await loop.run_in_executor(self._executor, self.breaker.check):
+                await self._spill(rows)
+            else:
+                self.failed_rows += len(rows)
+                print(f"[WARN] Telemetry flush of {len(rows)} rows failed: {e}")
+        elapsed_ms = (time.perf_counter() - started) * 1000.0
+        self.flushes += 1
+        self.last_flush_ms = elapsed_ms
+        self.max_flush_ms = max(self.max_flush_ms, elapsed_ms)
+        self._total_flush_ms += elapsed_ms
+
+    async def _spill(self, rows: list[dict]) -> None:
+        """Move rows that cannot reach the database to the spool, or back into memory without one."""
+        if self.spool is not None:
+            try:
+                loop = asyncio.get_running_loop()
+                self.spooled_rows += await loop.run_in_executor(self._executor, self.spool.append, rows)
+                return
+            except (SpoolFullError, OSError) as e:
+                print(f"[WARN] Spooling {len(rows)} rows failed ({e}), holding them in memory")
+        self._requeue(rows)
+
+    async def _spill_overflow(self) -> None:
+        batches, self._overflow, self._overflow_rows = self._overflow, [], 0
+        await self._spill([row for batch in batches for row in batch])
+
+    def _requeue(self, rows: list[dict]) -> None:
+        """Put rows from a flush that hit an unreachable database back at the head of the queue."""
+        room = max(self.max_rows - len(self._queue), 0)
+        kept = rows[:room]
+        self._queue.extendleft(reversed(kept))
+        self._oldest_enqueued_at = time.monotonic()
+        self.requeued_rows += len(kept)
+        if len(kept) < len(rows):
+            self.failed_rows += len(rows) - len(kept)
+            print(f"[WARN] Ingest buffer full during database outage, dropped {len(rows) - len(kept)} rows")
+
+    def metrics(self) -> dict:
+        return {
+            "running": self.running,
+            "paused": self.paused,
+            "queue_depth": len(self._queue),
+            "queue_capacity": self.max_rows,
+            "overflow_rows": self._overflow_rows,
+            "flush_rows": self.flush_rows,
+            "flush_interval_ms": round(self.flush_interval * 1000.0, 1),
+            "inflight_flushes": len(self._inflight),
+            "enqueued_rows": self.enqueued_rows,
+            "flushed_rows": self.flushed_rows,
+            "failed_rows": self.failed_rows,
+            "rejected_rows": self.rejected_rows,
+            "requeued_rows": self.requeued_rows,
+            "spooled_rows": self.spooled_rows,
+            "flushes": self.flushes,
+            "last_flush_ms": round(self.last_flush_ms, 2),
+            "max_flush_ms": round(self.max_flush_ms, 2),
+            "avg_flush_ms": round(self._total_flush_ms / self.flushes, 2) if self.flushes else 0.0,
+        }
@@ -0,0 +1,178 @@
+"""
+Array telemetry (48-zone barrel/heater temperatures) stored as packed float32.
+
+Ingest keeps list-valued metrics such as ``zone_temps`` as one
+``telemetry_arrays`` row per sample instead of dropping them. Window queries
+decode the blobs straight into a (samples x zones) numpy matrix, so per-zone
+statistics and the out-of-range scan are single vectorized passes.
+"""
+import os
+from dataclasses import dataclass
+from datetime import datetime
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from . import models
+
+ZONE_TEMP_MIN = float(os.getenv("ZONE_TEMP_MIN", "180"))
+ZONE_TEMP_MAX = float(os.getenv("ZONE_TEMP_MAX", "220"))
+ARRAY_DTYPE = np.dtype("<f4")
+SCAN_CHUNK_SAMPLES = 5_000
+
+
+def is_array_row(row: dict) -> bool:
+    return isinstance(row.get("metric_value"), list)
+
+
+def pack_array(values) -> bytes:
+    return np.asarray(values, dtype=ARRAY_DTYPE).tobytes()
+
+
+def unpack_array(blob: bytes) -> np.ndarray:
+    return np.frombuffer(blob, dtype=ARRAY_DTYPE)
+
+
+def insert_array_rows(connection, rows: list[dict]) -> int:
+    """Write list-valued telemetry rows as packed float32 arrays."""
+    params = [
+        {
+            "time": row["time"],
+            "equipment_id": row["equipment_id"],
+            "array_name": row["metric_name"],
+            "length": len(row["metric_value"]),
+            "array_values": pack_array(row["metric_value"]),
+        }
+        for row in rows
+    ]
+    if params:
+        connection.execute(models.TelemetryArray.__table__.insert(), params)
+    return len(params)
+
+
+def _matrix(blobs: list[bytes]) -> np.ndarray:
+    """Stack packed arrays into a float32 matrix; shorter arrays are NaN padded."""
+    lengths = {len(blob) for blob in blobs}
+    if len(lengths) == 1:
+        return np.frombuffer(b"".join(blobs), dtype=ARRAY_DTYPE).reshape(len(blobs), -1)
+    width = max(lengths) // ARRAY_DTYPE.itemsize
+    matrix = np.full((len(blobs), width), np.nan, dtype=ARRAY_DTYPE)
+    for index, blob in enumerate(blobs):
+        values = unpack_array(blob)
+        matrix[index, :values.size] = values
+    return matrix
+
+
+def _query(db: Session, array_name: str, start: datetime, end: datetime | None, equipment_id: str | None):
+    A = models.TelemetryArray
+    query = db.query(A.equipment_id, A.time, A.array_values).filter(A.array_name == array_name, A.time >= start)
+    if end is not None:
+        query = query.filter(A.time < end)
+    if equipment_id is not None:
+        query = query.filter(A.equipment_id == equipment_id)
+    return query.order_by(A.equipment_id, A.time)
+
+
+def zone_stats(db: Session, equipment_id: str, start: datetime, end: datetime | None = None,
+               array_name: str = "zone_temps") -> dict:
+    """Per-zone min/max/mean over a window for one machine."""
+    rows = _query(db, array_name, start, end, equipment_id).all()
+    if not rows:
+        return {"samples": 0, "zones": []}
+    matrix = _matrix([row.array_values for row in rows])
+    counts = np.sum(~np.isnan(matrix), axis=0)
+    with np.errstate(invalid="ignore"):
+        minimum = np.nanmin(matrix, axis=0)
+        maximum = np.nanmax(matrix, axis=0)
+        mean = np.nansum(matrix, axis=0, dtype=np.float64) / np.maximum(counts, 1)
+    return {
+        "samples": len(rows),
+        "first_time": rows[0].time,
+        "last_time": rows[-1].time,
+        "zones": [
+            {"zone": index + 1, "samples": int(counts[index]), "min": float(minimum[index]),
+             "max": float(maximum[index]), "mean": float(mean[index])}
+            for index in range(matrix.shape[1]) if counts[index]
+        ],
+    }
+
+
+@dataclass
+class ZoneViolations:
+    """Out-of-range tally for one machine, merged chunk by chunk."""
+
+    equipment_id: str
+    samples: int = 0
+    violating_samples: int = 0
+    counts: np.ndarray | None = None
+    lowest: np.ndarray | None = None
+    highest: np.ndarray | None = None
+    first_seen: datetime | None = None
+    last_seen: datetime | None = None
+
+    def add_chunk(self, times: list[datetime], matrix: np.ndarray, low: float, high: float) -> None:
+        mask = (matrix < low) | (matrix > high)
+        per_sample = mask.any(axis=1)
+        zones = matrix.shape[1]
+        if self.counts is None or self.counts.size < zones:
+            self.counts = _grow(self.counts, zones, 0, np.int64)
+            self.lowest = _grow(self.lowest, zones, np.inf, np.float64)
+            self.highest = _grow(self.highest, zones, -np.inf, np.float64)
+        self.samples += len(times)
+        self.violating_samples += int(per_sample.sum())
+        self.counts[:zones] += mask.sum(axis=0)
+        self.lowest[:zones] = np.fmin(self.lowest[:zones], np.nanmin(np.where(mask, matrix, np.inf), axis=0))
+        self.highest[:zones] = np.fmax(self.highest[:zones], np.nanmax(np.where(mask, matrix, -np.inf), axis=0))
+        hits = np.flatnonzero(per_sample)
+        if hits.size:
+            if self.first_seen is None:
+                self.first_seen = times[hits[0]]
+            self.last_seen = times[hits[-1]]
+
+    def as_dict(self) -> dict:
+        zones = []
+        if self.counts is not None:
+            for index in np.flatnonzero(self.counts):
+                zones.append({
+                    "zone": int(index) + 1,
+                    "count": int(self.counts[index]),
+                    "min": float(self.lowest[index]) if np.isfinite(self.lowest[index]) else None,
+                    "max": float(self.highest[index]) if np.isfinite(self.highest[index]) else None,
+                })
+        return {
+            "equipment_id": self.equipment_id,
+            "samples": self.samples,
+            "violating_samples": self.violating_samples,
+            "first_seen": self.first_seen,
+            "last_seen": self.last_seen,
+            "zones": zones,
+        }
+
+
+def _grow(current: np.ndarray | None, size: int, fill, dtype) -> np.ndarray:
+    grown = np.full(size, fill, dtype=dtype)
+    if current is not None:
+        grown[:current.size] = current
+    return grown
+
+
+def scan_out_of_range(db: Session, start: datetime, end: datetime | None = None, low: float = ZONE_TEMP_MIN,
+                      high: float = ZONE_TEMP_MAX, equipment_id: str | None = None,
+                      array_name: str = "zone_temps") -> list[dict]:
+    """Count out-of-range readings per machine and zone in one streamed pass over the window."""
+    results: dict[str, ZoneViolations] = {}
+    pending_id, times, blobs = None, [], []
+
+    def flush():
+        if blobs:
+            tally = results.setdefault(pending_id, ZoneViolations(pending_id))
+            tally.add_chunk(times, _matrix(blobs), low, high)
+
+    for row in _query(db, array_name, start, end, equipment_id).yield_per(SCAN_CHUNK_SAMPLES):
+        if row.equipment_id != pending_id or len(blobs) >= SCAN_CHUNK_SAMPLES:
+            flush()
+            pending_id, times, blobs = row.equipment_id, [], []
+        times.append(row.time)
+        blobs.append(row.array_values)
+    flush()
+    return [tally.as_dict() for tally in results.values()]
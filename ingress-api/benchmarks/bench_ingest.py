@@ -0,0 +1,94 @@
+"""
+Telemetry ingest benchmark — per-row ORM path vs. bulk batch path.
+
+Usage (from ingress-api/):
+    python benchmarks/bench_ingest.py --cycles 50
+    DATABASE_URL=postgresql://... python benchmarks/bench_ingest.py --cycles 200
+
+Without DATABASE_URL a throwaway SQLite file is used.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if "DATABASE_URL" not in os.environ:
+    os.environ["DATABASE_URL"] = f"sqlite:///{Path(tempfile.mkdtemp()) / 'bench_ingest.db'}"
+sys.path.insert(0, str(ROOT))
+
+from app import models  # noqa: E402
+from app.database import SessionLocal, engine  # noqa: E402
+from app.ingest import bulk_insert_telemetry, telemetry_rows  # noqa: E402
+from app.main import DEVICES, generate_metrics  # noqa: E402
+from app.schemas import TelemetryInput  # noqa: E402
+
+
+def build_payloads(cycles: int) -> list[TelemetryInput]:
+    start = datetime.utcnow() - timedelta(seconds=cycles * 5)
+    payloads = []
+    for cycle in range(cycles):
+        ts = (start + timedelta(seconds=cycle * 5)).isoformat() + "Z"
+        for device in DEVICES:
+            payloads.append(TelemetryInput(device_id=device["id"], ts=ts, metrics=generate_metrics(device), meta={"type": device["type"]}))
+    return payloads
+
+
+def per_row_path(payloads: list[TelemetryInput]) -> int:
+    """Mirror of the single-record route: ORM object per metric, commit per request."""
+    db = SessionLocal()
+    written = 0
+    try:
+        for t in payloads:
+            for row in telemetry_rows(t):
+                if isinstance(row["metric_value"], list):
+                    continue  # the per-row route never stored arrays
+                db.add(models.Telemetry(**row))
+                written += 1
+            db.commit()
+    finally:
+        db.close()
+    return written
+
+
+def batch_path(payloads: list[TelemetryInput], batch_size: int) -> int:
+    """Mirror of /api/v1/telemetry/batch: one bulk write and commit per batch."""
+    db = SessionLocal()
+    written = 0
+    try:
+        for offset in range(0, len(payloads), batch_size):
+            rows = []
+            for t in payloads[offset:offset + batch_size]:
+                rows.extend(telemetry_rows(t))
+            written += bulk_insert_telemetry(db, rows)
+            db.commit()
+    finally:
+        db.close()
+    return written
+
+
+def _run(label: str, fn, *args) -> None:
+    started = time.perf_counter()
+    rows = fn(*args)
+    elapsed = time.perf_counter() - started
+    print(f"{label:<28} {rows:>8} rows  {elapsed:8.3f} s  {rows / elapsed:>10.0f} rows/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cycles", type=int, default=50, help="5-second gateway cycles to simulate")
+    parser.add_argument("--batch-size", type=int, default=len(DEVICES), help="device records per batch request")
+    args = parser.parse_args()
+
+    models.Base.metadata.create_all(bind=engine)
+    payloads = build_payloads(args.cycles)
+    print(f"Backend: {engine.dialect.name}  payloads: {len(payloads)}  batch size: {args.batch_size}")
+    _run("per-row ORM + commit", per_row_path, payloads)
+    _run("bulk batch", batch_path, payloads, args.batch_size)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+OEE engine benchmark — query count and latency for an N-machine shift report.
+
+Usage (from ingress-api/):
+    python benchmarks/bench_oee.py --machines 500 --hours 8 --interval 30
+    DATABASE_URL=postgresql://... python benchmarks/bench_oee.py --machines 500
+
+Without DATABASE_URL a throwaway SQLite file is used.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if "DATABASE_URL" not in os.environ:
+    os.environ["DATABASE_URL"] = f"sqlite:///{Path(tempfile.mkdtemp()) / 'bench_oee.db'}"
+sys.path.insert(0, str(ROOT))
+
+from sqlalchemy import event  # noqa: E402
+
+from app import models  # noqa: E402
+from app.database import SessionLocal, engine  # noqa: E402
+from app.ingest import bulk_insert_telemetry  # noqa: E402
+from app.oee_engine import compute_oee  # noqa: E402
+
+
+def seed(machines: int, hours: int, interval: int) -> datetime:
+    models.Base.metadata.create_all(bind=engine)
+    now = datetime.utcnow().replace(microsecond=0)
+    db = SessionLocal()
+    try:
+        ids = [f"BENCH-{i:04d}" for i in range(machines)]
+        db.add_all([models.Equipment(equipment_id=eq, equipment_type="IMM", cycle_time_standard=35.0) for eq in ids])
+        db.commit()
+        samples = hours * 3600 // interval
+        for eq in ids:
+            rows = [
+                {"time": now - timedelta(seconds=s * interval), "equipment_id": eq, "metric_name": "cycle_time",
+                 "metric_value": random.uniform(28, 42), "unit": None, "status": "normal"}
+                for s in range(samples)
+            ]
+            bulk_insert_telemetry(db, rows)
+            db.add(models.DowntimeEvent(equipment_id=eq, reason_code="MACHINE_STOP", category="machine stop",
+                                        minutes=random.uniform(0, 30), started_at=now - timedelta(hours=1)))
+        db.commit()
+        print(f"Seeded {machines} machines x {samples} cycle samples")
+    finally:
+        db.close()
+    return now
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--machines", type=int, default=500)
+    parser.add_argument("--hours", type=int, default=8)
+    parser.add_argument("--interval", type=int, default=30, help="seconds between cycle_time samples")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    now = seed(args.machines, args.hours, args.interval)
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *a: statements.append(a[2]))
+
+    db = SessionLocal()
+    try:
+        timings = []
+        for _ in range(args.repeat):
+            statements.clear()
+            started = time.perf_counter()
+            results = compute_oee(db, now - timedelta(hours=args.hours), None, planned_minutes=args.hours * 60 - 30)
+            timings.append((time.perf_counter() - started) * 1000.0)
+    finally:
+        db.close()
+
+    print(f"Backend: {engine.dialect.name}  machines evaluated: {len(results)}  queries per report: {len(statements)}")
+    print(f"Latency ms  best {min(timings):.1f}  median {sorted(timings)[len(timings) // 2]:.1f}  worst {max(timings):.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Telemetry storage benchmark — per-metric (eav) vs. packed wide rows.
+
+Writes the same simulated gateway cycles through each layout and reports
+bytes per sample (table + indexes), write rate and read latency for a
+one-device history scan and a raw-edge statistics query.
+
+Usage (from ingress-api/):
+    python benchmarks/bench_storage.py --cycles 2000
+    DATABASE_URL=postgresql://... python benchmarks/bench_storage.py --cycles 2000
+
+Without DATABASE_URL a throwaway SQLite file is used.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if "DATABASE_URL" not in os.environ:
+    os.environ["DATABASE_URL"] = f"sqlite:///{Path(tempfile.mkdtemp()) / 'bench_storage.db'}"
+sys.path.insert(0, str(ROOT))
+
+from sqlalchemy import text  # noqa: E402
+
+from app import models, telemetry_store  # noqa: E402
+from app.database import SessionLocal, engine  # noqa: E402
+from app.ingest import bulk_insert_telemetry, telemetry_rows  # noqa: E402
+from app.main import DEVICES, generate_metrics  # noqa: E402
+from app.rollups import window_stats  # noqa: E402
+from app.schemas import TelemetryInput  # noqa: E402
+
+
+def seed_equipment() -> None:
+    db = SessionLocal()
+    try:
+        known = {eq for (eq,) in db.query(models.Equipment.equipment_id).all()}
+        db.add_all([
+            models.Equipment(equipment_id=device["id"], equipment_type=device["type"])
+            for device in DEVICES if device["id"] not in known
+        ])
+        db.commit()
+    finally:
+        db.close()
+
+
+def build_batches(cycles: int, start: datetime) -> list[list[dict]]:
+    batches = []
+    for cycle in range(cycles):
+        ts = (start + timedelta(seconds=cycle * 5)).isoformat() + "Z"
+        rows = []
+        for device in DEVICES:
+            payload = TelemetryInput(device_id=device["id"], ts=ts, metrics=generate_metrics(device), meta={"type": device["type"]})
+            rows.extend(telemetry_rows(payload))
+        batches.append(rows)
+    return batches
+
+
+def table_bytes(table_name: str) -> int:
+    with engine.connect() as connection:
+        if connection.dialect.name == "sqlite":
+            return int(connection.execute(text(
+                "SELECT COALESCE(SUM(pgsize), 0) FROM dbstat WHERE name IN "
+                "(SELECT name FROM sqlite_master WHERE tbl_name = :name)"
+            ), {"name": table_name}).scalar())
+        return int(connection.execute(text("SELECT pg_total_relation_size(:name)"), {"name": table_name}).scalar())
+
+
+def run_layout(layout: str, batches: list[list[dict]], start: datetime, end: datetime) -> None:
+    repository = telemetry_store.configure_storage(layout)
+    db = SessionLocal()
+    try:
+        repository.delete_all(db)
+        db.commit()
+        started = time.perf_counter()
+        rows = 0
+        for batch in batches:
+            rows += bulk_insert_telemetry(db, batch)
+            db.commit()
+        write_s = time.perf_counter() - started
+
+        samples = len(batches) * len(DEVICES)
+        size = table_bytes(repository.model.__tablename__)
+
+        started = time.perf_counter()
+        history_rows = sum(1 for _ in repository.iter_rows(db, "IMM-01", start, end, descending=True))
+        history_ms = (time.perf_counter() - started) * 1000.0
+
+        edge_end = start + timedelta(seconds=55)
+        started = time.perf_counter()
+        window_stats(db, start, edge_end)
+        edge_ms = (time.perf_counter() - started) * 1000.0
+    finally:
+        db.close()
+
+    print(f"{layout:<5} {rows:>9} rows {samples:>8} samples  {size / samples:8.1f} B/sample  "
+          f"write {rows / write_s:>9.0f} rows/s  history({history_rows} rows) {history_ms:8.1f} ms  "
+          f"edge stats {edge_ms:7.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cycles", type=int, default=500, help="5-second gateway cycles to simulate")
+    args = parser.parse_args()
+
+    models.Base.metadata.create_all(bind=engine)
+    seed_equipment()
+    start = datetime.utcnow().replace(microsecond=0) - timedelta(seconds=args.cycles * 5)
+    end = start + timedelta(seconds=args.cycles * 5)
+    batches = build_batches(args.cycles, start)
+    print(f"Backend: {engine.dialect.name}  devices: {len(DEVICES)}  cycles: {args.cycles}")
+    for layout in ("eav", "wide"):
+        run_layout(layout, batches, start, end)
+
+
+if __name__ == "__main__":
+    main()
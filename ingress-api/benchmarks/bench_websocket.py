@@ -0,0 +1,113 @@
+"""
+WebSocket fan-out benchmark — JSON vs. MessagePack frames, full vs. subscribed deltas.
+
+Publishes simulated gateway cycles through a BroadcastHub with N in-process
+clients whose sockets only count bytes, and reports bytes per frame and the
+server CPU time spent encoding and fanning out.
+
+Usage (from ingress-api/):
+    python benchmarks/bench_websocket.py --clients 100 --cycles 200
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if "DATABASE_URL" not in os.environ:
+    os.environ["DATABASE_URL"] = f"sqlite:///{Path(tempfile.mkdtemp()) / 'bench_websocket.db'}"
+sys.path.insert(0, str(ROOT))
+
+from app import frame_codec  # noqa: E402
+from app.broadcast import BroadcastHub, Subscription  # noqa: E402
+from app.main import DEVICES, generate_metrics  # noqa: E402
+
+
+class CountingSocket:
+    def __init__(self):
+        self.frames = 0
+        self.bytes = 0
+
+    async def accept(self, subprotocol=None):
+        pass
+
+    async def send_text(self, frame):
+        self.frames += 1
+        self.bytes += len(frame.encode())
+
+    async def send_bytes(self, frame):
+        self.frames += 1
+        self.bytes += len(frame)
+
+    async def close(self, code=1000):
+        pass
+
+
+def build_payloads(cycles: int) -> list[list[dict]]:
+    start = datetime.utcnow().replace(microsecond=0)
+    return [
+        [
+            {
+                "device_id": device["id"],
+                "ts": (start + timedelta(seconds=cycle * 5)).isoformat() + "Z",
+                "metrics": generate_metrics(device),
+                "meta": {"type": device["type"]},
+            }
+            for device in DEVICES
+        ]
+        for cycle in range(cycles)
+    ]
+
+
+async def run_case(label: str, subprotocol: str | None, subscription: Subscription | None, clients: int, cycles: list[list[dict]]) -> None:
+    hub = BroadcastHub(max_pending=len(DEVICES) * 2, max_lag=3600)
+    sockets = [CountingSocket() for _ in range(clients)]
+    for socket in sockets:
+        client = await hub.connect(socket, subprotocol)
+        if subscription is not None:
+            client.subscribe(subscription, [])
+    while any(client.pending for client in hub.clients):
+        await asyncio.sleep(0)
+    baseline = sum(socket.frames for socket in sockets), sum(socket.bytes for socket in sockets)
+
+    cpu_started = time.process_time()
+    for payloads in cycles:
+        for payload in payloads:
+            hub.publish(payload)
+        while any(client.pending for client in hub.clients):
+            await asyncio.sleep(0)
+    cpu_s = time.process_time() - cpu_started
+    await hub.close()
+
+    frames = sum(socket.frames for socket in sockets) - baseline[0]
+    sent = sum(socket.bytes for socket in sockets) - baseline[1]
+    published = sum(len(payloads) for payloads in cycles)
+    print(f"{label:<28} {sent / max(frames, 1):8.0f} B/frame  {sent / clients / len(cycles) / 1024:8.1f} KiB/client/cycle  "
+          f"cpu {cpu_s * 1000.0 / published:7.3f} ms/publish  ({frames} frames)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=100, help="connected WebSocket clients")
+    parser.add_argument("--cycles", type=int, default=200, help="5-second gateway cycles to publish")
+    args = parser.parse_args()
+
+    cycles = build_payloads(args.cycles)
+    line = Subscription(devices=frozenset(device["id"] for device in DEVICES[:2]), deadband=0.5)
+    print(f"devices: {len(DEVICES)}  clients: {args.clients}  cycles: {args.cycles}  msgpack: {frame_codec.msgpack is not None}")
+    cases = [("json full", None, None), ("json one-line delta", None, line)]
+    if frame_codec.msgpack is not None:
+        cases += [
+            ("msgpack full", frame_codec.MSGPACK_SUBPROTOCOL, None),
+            ("msgpack one-line delta", frame_codec.MSGPACK_SUBPROTOCOL, line),
+        ]
+    for label, subprotocol, subscription in cases:
+        asyncio.run(run_case(label, subprotocol, subscription, args.clients, cycles))
+
+
+if __name__ == "__main__":
+    main()
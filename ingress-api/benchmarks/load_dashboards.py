@@ -0,0 +1,168 @@
+"""
+Dashboard load test — p50/p95/p99 latency of the hot read endpoints under N concurrent clients.
+
+Usage (from ingress-api/):
+    python benchmarks/load_dashboards.py --clients 200 --seconds 20
+    python benchmarks/load_dashboards.py --modes async         # only the async engine
+    python benchmarks/load_dashboards.py --base-url http://localhost:8000   # an already running API
+
+Each mode starts its own uvicorn process against the same seeded database with
+the response cache disabled, so every request reaches the database:
+"sync" serves reads from blocking sessions (ASYNC_DB_ENABLED=false), "async"
+from the asyncpg/aiosqlite engine. Without DATABASE_URL a throwaway SQLite
+file is used.
+"""
+import argparse
+import asyncio
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import httpx
+
+ROOT = Path(__file__).resolve().parents[1]
+if "DATABASE_URL" not in os.environ:
+    os.environ["DATABASE_URL"] = f"sqlite:///{Path(tempfile.mkdtemp()) / 'load_dashboards.db'}"
+os.environ.setdefault("SIMULATOR_ENABLED", "false")
+sys.path.insert(0, str(ROOT))
+
+from app import models  # noqa: E402
+from app.database import SessionLocal, engine  # noqa: E402
+from app.ingest import bulk_insert_telemetry  # noqa: E402
+
+MODES = {"sync": "false", "async": "true"}
+
+
+def seed(machines: int, hours: int, interval: int) -> list[str]:
+    models.Base.metadata.create_all(bind=engine)
+    now = datetime.utcnow().replace(microsecond=0)
+    db = SessionLocal()
+    try:
+        ids = [f"LOAD-{i:03d}" for i in range(machines)]
+        if db.query(models.Equipment).filter(models.Equipment.equipment_id == ids[0]).first() is None:
+            db.add_all([models.Equipment(equipment_id=eq, equipment_type="IMM", cycle_time_standard=35.0) for eq in ids])
+            db.commit()
+            samples = hours * 3600 // interval
+            for eq in ids:
+                rows = [
+                    {"time": now - timedelta(seconds=s * interval), "equipment_id": eq, "metric_name": metric,
+                     "metric_value": random.uniform(28, 42), "unit": None, "status": "normal"}
+                    for s in range(samples) for metric in ("cycle_time", "temperature")
+                ]
+                bulk_insert_telemetry(db, rows)
+            db.commit()
+            print(f"Seeded {machines} machines x {samples} samples x 2 metrics")
+    finally:
+        db.close()
+    return ids
+
+
+def requests_for(ids: list[str]) -> list[tuple[str, str, dict]]:
+    """(label, path, params) mix a dashboard issues on every refresh."""
+    eq = random.choice(ids)
+    return [
+        ("latest", "/api/v1/telemetry/latest", {}),
+        ("history", f"/api/v1/telemetry/history/{eq}", {"hours": 2, "limit": 500}),
+        ("oee", "/api/v1/oee", {"hours": 8}),
+        ("reports", "/api/v1/reports/oee", {"scope": "shift"}),
+        ("analytics", "/api/v1/analytics/summary", {}),
+    ]
+
+
+async def dashboard(client: httpx.AsyncClient, ids: list[str], deadline: float, samples: dict, errors: list):
+    while time.perf_counter() < deadline:
+        for label, path, params in requests_for(ids):
+            started = time.perf_counter()
+            try:
+                response = await client.get(path, params=params)
+                response.raise_for_status()
+            except httpx.HTTPError as exc:
+                errors.append(f"{label}: {exc}")
+                continue
+            samples.setdefault(label, []).append(time.perf_counter() - started)
+
+
+def percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))] * 1000
+
+
+async def load(base_url: str, ids: list[str], clients: int, seconds: float) -> tuple[dict, list]:
+    samples: dict[str, list[float]] = {}
+    errors: list[str] = []
+    limits = httpx.Limits(max_connections=clients, max_keepalive_connections=clients)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        deadline = time.perf_counter() + seconds
+        await asyncio.gather(*(dashboard(client, ids, deadline, samples, errors) for _ in range(clients)))
+    return samples, errors
+
+
+def report(name: str, samples: dict, errors: list, seconds: float):
+    everything = [value for values in samples.values() for value in values]
+    print(f"\n[{name}] {len(everything)} requests in {seconds:.0f}s ({len(everything) / seconds:.0f} req/s), {len(errors)} errors")
+    print(f"  {'endpoint':<10} {'count':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for label, values in sorted(samples.items()) + [("all", everything)]:
+        if values:
+            print(f"  {label:<10} {len(values):>7} {percentile(values, 50):>9.1f} "
+                  f"{percentile(values, 95):>9.1f} {percentile(values, 99):>9.1f}")
+    if errors:
+        print(f"  first error: {errors[0]}")
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(mode: str) -> tuple[subprocess.Popen, str]:
+    port = free_port()
+    env = {**os.environ, "ASYNC_DB_ENABLED": MODES[mode], "RESPONSE_CACHE_ENABLED": "false"}
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT, env=env,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    for _ in range(300):
+        try:
+            if httpx.get(f"{base_url}/health", timeout=1).status_code < 500:
+                return process, base_url
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.1)
+    process.terminate()
+    raise RuntimeError(f"uvicorn ({mode}) did not start on port {port}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--seconds", type=float, default=20)
+    parser.add_argument("--machines", type=int, default=50)
+    parser.add_argument("--hours", type=int, default=8)
+    parser.add_argument("--interval", type=int, default=60)
+    parser.add_argument("--modes", default="sync,async", help="comma separated: sync, async")
+    parser.add_argument("--base-url", help="load an already running API instead of starting uvicorn")
+    args = parser.parse_args()
+
+    ids = seed(args.machines, args.hours, args.interval)
+    if args.base_url:
+        report(args.base_url, *asyncio.run(load(args.base_url, ids, args.clients, args.seconds)), args.seconds)
+        return
+    for mode in args.modes.split(","):
+        process, base_url = start_server(mode.strip())
+        try:
+            report(mode, *asyncio.run(load(base_url, ids, args.clients, args.seconds)), args.seconds)
+        finally:
+            process.terminate()
+            process.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+"""Tests for the WebSocket fan-out hub: coalescing, lag drops, subscriptions and delta frames."""
+import asyncio
+import json
+import os
+import sys
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+
+ROOT = Path(__file__).resolve().parents[1]
+TEST_DB = ROOT / "test_acron.db"
+if TEST_DB.exists():
+    TEST_DB.unlink()
+
+os.environ["DATABASE_URL"] = f"sqlite:///{TEST_DB}"
+os.environ["SIMULATOR_ENABLED"] = "false"
+os.environ["DEMO_MODE"] = "true"
+os.environ["SECRET_KEY"] = "test-secret"
+sys.path.insert(0, str(ROOT / "ingress-api"))
+
+from app import frame_codec  # noqa: E402
+from app.broadcast import LAGGING_CLOSE_CODE, BroadcastHub, Subscription, SubscriptionError  # noqa: E402
+from app.main import app  # noqa: E402
+
+
+class GatedSocket:
+    """Fake socket whose sends block until the test opens the gate."""
+
+    def __init__(self):
+        self.sent = []
+        self.closed_with = None
+        self.gate = asyncio.Event()
+
+    async def accept(self, subprotocol=None):
+        pass
+
+    async def send_text(self, frame):
+        await self.gate.wait()
+        self.sent.append(json.loads(frame))
+
+    async def close(self, code=1000):
+        self.closed_with = code
+
+
+def test_slow_client_gets_latest_frame_per_device():
+    async def scenario():
+        hub = BroadcastHub(max_pending=8, max_lag=60)
+        fast, slow = GatedSocket(), GatedSocket()
+        fast.gate.set()
+        await hub.connect(fast)
+        await hub.connect(slow)
+        for seq in range(5):
+            for device in ("IMM-01", "QMC-01"):
+                hub.publish({"device_id": device, "metrics": {"seq": seq}})
+                await asyncio.sleep(0.001)
+        await asyncio.sleep(0.01)
+        slow.gate.set()
+        await asyncio.sleep(0.01)
+        metrics = hub.metrics()
+        await hub.close()
+        return fast.sent, slow.sent, metrics
+
+    fast_frames, slow_frames, metrics = asyncio.run(scenario())
+    assert len(fast_frames) == 10
+    # The blocked client saw its first frame, then only the newest per device.
+    seen = [(frame["data"]["device_id"], frame["data"]["metrics"]["seq"]) for frame in slow_frames]
+    assert seen[0] == ("IMM-01", 0)
+    assert set(seen[1:]) == {("QMC-01", 4), ("IMM-01", 4)}
+    assert metrics["coalesced_frames"] >= 7
+    assert metrics["connected_clients"] == 2
+
+
+def test_client_lagging_past_threshold_is_dropped():
+    async def scenario():
+        hub = BroadcastHub(max_pending=8, max_lag=0.05)
+        stuck = GatedSocket()
+        await hub.connect(stuck)
+        hub.publish({"device_id": "IMM-01", "metrics": {"seq": 1}})
+        hub.publish({"device_id": "IMM-02", "metrics": {"seq": 1}})
+        await asyncio.sleep(0.1)
+        hub.publish({"device_id": "IMM-01", "metrics": {"seq": 2}})
+        await asyncio.sleep(0.01)
+        return stuck, hub.metrics()
+
+    stuck, metrics = asyncio.run(scenario())
+    assert stuck.closed_with == LAGGING_CLOSE_CODE
+    assert metrics["dropped_clients"] == 1
+    assert metrics["connected_clients"] == 0
+    assert metrics["dropped_frames"] >= 1
+
+
+def test_andon_socket_receives_ingested_telemetry():
+    with TestClient(app) as client:
+        with client.websocket_connect("/ws/andons") as socket:
+            response = client.post("/api/v1/telemetry", json={
+                "device_id": "CHILLER-01", "ts": "2026-01-05T08:00:00Z", "metrics": {"water_temp": 11.5},
+            })
+            assert response.status_code == 202
+            frame = socket.receive_json()
+            assert frame["type"] == "telemetry"
+            assert frame["data"]["device_id"] == "CHILLER-01"
+            assert frame["data"]["metrics"]["water_temp"] == 11.5
+
+            metrics = client.get("/api/v1/metrics/websocket").json()
+            assert metrics["connected_clients"] == 1
+            assert metrics["sent_frames"] >= 1
+
+
+def test_subscription_parsing():
+    subscription = Subscription.parse({"devices": ["IMM-01"], "metrics": ["mold_temp"], "deadband": 0.5})
+    assert subscription.matches({"device_id": "IMM-01", "meta": {"type": "IMM"}})
+    assert not subscription.matches({"device_id": "IMM-02"})
+    assert Subscription.parse({"types": ["TCM"]}).matches({"device_id": "TCM-01"})
+    for body in ([], {"devices": "IMM-01"}, {"deadband": -1}, {"machines": []}):
+        try:
+            Subscription.parse(body)
+        except SubscriptionError:
+            continue
+        raise AssertionError(f"accepted {body!r}")
+
+
+def test_subscribed_socket_gets_snapshot_then_deltas():
+    def post(metrics):
+        response = client.post("/api/v1/telemetry", json={
+            "device_id": "TCM-04", "ts": "2026-01-05T08:00:00Z", "metrics": metrics, "meta": {"type": "TCM"},
+        })
+        assert response.status_code == 202
+
+    with TestClient(app) as client:
+        post({"cut_pressure": 100.0, "cycle_count": 10, "model": "X1"})
+        with client.websocket_connect("/ws/andons") as socket:
+            socket.send_text("hello")
+            assert socket.receive_json()["type"] == "error"
+
+            socket.send_json({"subscribe": {"types": ["TCM"], "metrics": ["cut_pressure", "cycle_count"], "deadband": 0.5}})
+            snapshot = socket.receive_json()
+            assert snapshot["type"] == "snapshot"
+            assert snapshot["subscription"]["types"] == ["TCM"]
+            tcm = {item["device_id"]: item for item in snapshot["data"]}["TCM-04"]
+            assert tcm["metrics"] == {"cut_pressure": 100.0, "cycle_count": 10}
+
+            post({"cut_pressure": 100.2, "cycle_count": 10})          # inside deadband: nothing sent
+            post({"cut_pressure": 101.0, "cycle_count": 10})          # pressure moved
+            post({"water_temp": 3.0, "cycle_count": 11})              # unsubscribed metric ignored
+            client.post("/api/v1/telemetry", json={"device_id": "IMM-09", "ts": "2026-01-05T08:00:00Z", "metrics": {"cycle_time": 1.0}})
+
+            first = socket.receive_json()
+            assert first["type"] == "delta"
+            assert first["data"]["device_id"] == "TCM-04"
+            metrics = dict(first["data"]["metrics"])
+            if "cycle_count" not in metrics:
+                metrics.update(socket.receive_json()["data"]["metrics"])
+            assert metrics == {"cut_pressure": 101.0, "cycle_count": 11}
+
+            stats = client.get("/api/v1/metrics/websocket").json()
+            assert stats["subscribed_clients"] == 1
+            assert stats["suppressed_updates"] >= 1
+
+
+def test_msgpack_frames_pack_zone_arrays_as_float32():
+    message = {"type": "telemetry", "data": {"device_id": "IMM-01", "metrics": {"zone_temps": [200.25] * 48, "cycle_time": 33.1}}}
+    packed = frame_codec.encode(message, "msgpack")
+    assert len(packed) < len(frame_codec.encode(message))
+    assert b"\xc7\xc0\x01" in packed  # ext 8, 192 bytes, type 1: 48 x float32
+    decoded = frame_codec.decode(packed)
+    assert decoded["data"]["metrics"]["zone_temps"] == [200.25] * 48
+    assert decoded["data"]["metrics"]["cycle_time"] == 33.1
+
+
+def test_socket_negotiates_msgpack_subprotocol():
+    with TestClient(app) as client:
+        with client.websocket_connect("/ws/andons", subprotocols=[frame_codec.MSGPACK_SUBPROTOCOL]) as socket:
+            assert socket.accepted_subprotocol == frame_codec.MSGPACK_SUBPROTOCOL
+            client.post("/api/v1/telemetry", json={
+                "device_id": "IMM-11", "ts": "2026-01-05T08:00:00Z", "metrics": {"zone_temps": [201.5, 202.5, 203.5]},
+            })
+            frame = frame_codec.decode(socket.receive_bytes())
+            assert frame["data"]["device_id"] == "IMM-11"
+            assert frame["data"]["metrics"]["zone_temps"] == [201.5, 202.5, 203.5]
+
+        with client.websocket_connect("/ws/andons", subprotocols=["graphql-ws"]) as socket:
+            assert socket.accepted_subprotocol is None
+            client.post("/api/v1/telemetry", json={"device_id": "IMM-11", "ts": "2026-01-05T08:00:05Z", "metrics": {"cycle_time": 30.0}})
+            assert socket.receive_json()["data"]["device_id"] == "IMM-11"
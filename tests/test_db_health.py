@@ -0,0 +1,142 @@
+"""Tests for the database health monitor: cached status, circuit breaker and outage buffering."""
+import asyncio
+import os
+import sys
+import time
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+
+ROOT = Path(__file__).resolve().parents[1]
+TEST_DB = ROOT / "test_acron.db"
+if TEST_DB.exists():
+    TEST_DB.unlink()
+
+os.environ["DATABASE_URL"] = f"sqlite:///{TEST_DB}"
+os.environ["SIMULATOR_ENABLED"] = "false"
+os.environ["DEMO_MODE"] = "true"
+os.environ["SECRET_KEY"] = "test-secret"
+sys.path.insert(0, str(ROOT / "ingress-api"))
+
+from app.db_health import DatabaseHealthMonitor, DatabaseUnavailableError  # noqa: E402
+from app.main import app, db_monitor  # noqa: E402
+from app.write_behind import WriteBehindBuffer  # noqa: E402
+
+
+class FlakyDatabase:
+    def __init__(self):
+        self.up = True
+        self.rows = []
+
+    def probe(self):
+        if not self.up:
+            raise ConnectionError("connection refused")
+
+    def write(self, rows):
+        self.probe()
+        self.rows.extend(rows)
+        return len(rows)
+
+
+def test_breaker_opens_on_failed_probe_or_repeated_failures():
+    database = FlakyDatabase()
+    monitor = DatabaseHealthMonitor(database.probe, failure_threshold=2)
+    assert monitor.check() and monitor.available
+
+    monitor.record_failure(RuntimeError("timeout"))
+    assert monitor.available
+    monitor.record_failure(RuntimeError("timeout"))
+    assert monitor.state == "open"
+    try:
+        monitor.guard()
+        raise AssertionError("guard should fail fast while open")
+    except DatabaseUnavailableError as e:
+        assert "timeout" in str(e)
+
+    database.up = False
+    assert not monitor.check()
+    database.up = True
+    assert monitor.check()
+    status = monitor.status()
+    assert status["circuit"] == "closed" and status["trips"] == 1 and status["rejected"] == 1
+
+
+def test_session_helpers_report_unreachable_database_to_the_breaker():
+    from sqlalchemy.exc import IntegrityError
+
+    from app.database import with_session
+
+    def fails_with(error):
+        def query(db):
+            raise error
+        return query
+
+    try:
+        for _ in range(db_monitor.failure_threshold):
+            assert db_monitor.available
+            with pytest.raises(IntegrityError):  # reported by a reachable database: not counted
+                with_session(fails_with(IntegrityError("INSERT", None, Exception("duplicate key"))))
+            with pytest.raises(ConnectionRefusedError):
+                with_session(fails_with(ConnectionRefusedError("connection refused")))
+        assert db_monitor.state == "open"
+        assert db_monitor.consecutive_failures == db_monitor.failure_threshold
+    finally:
+        assert db_monitor.check()
+
+
+def test_buffer_holds_rows_during_outage_and_flushes_on_recovery():
+    database = FlakyDatabase()
+    monitor = DatabaseHealthMonitor(database.probe, interval=0.02)
+
+    async def scenario():
+        buffer = WriteBehindBuffer(database.write, max_rows=100, flush_rows=10, flush_interval=0.01, breaker=monitor)
+        await buffer.start()
+        await monitor.start()
+        database.up = False
+        buffer.enqueue([{"n": n} for n in range(15)])
+        await asyncio.sleep(0.1)
+        held = (buffer.paused, len(buffer), buffer.failed_rows)
+        database.up = True
+        await asyncio.sleep(0.1)
+        await monitor.stop()
+        await buffer.stop()
+        return buffer, held
+
+    buffer, (paused, depth, failed) = asyncio.run(scenario())
+    assert paused and depth == 15 and failed == 0
+    assert [row["n"] for row in database.rows] == list(range(15))
+    assert buffer.requeued_rows >= 10
+    assert not buffer.paused
+
+
+def test_health_is_cached_and_open_circuit_fails_fast():
+    with TestClient(app) as client:
+        probes = db_monitor.probes
+        started = time.perf_counter()
+        for _ in range(20):
+            assert client.get("/api/v1/health").json()["checks"]["database"]["circuit"] == "closed"
+        assert client.get("/health").json()["database"] == "connected"
+        assert db_monitor.probes == probes
+        assert time.perf_counter() - started < 2
+
+        db_monitor.record_failure(ConnectionError("connection refused"), trip=True)
+        try:
+            assert client.get("/health").json()["status"] == "degraded"
+            response = client.get("/api/v1/oee")
+            assert response.status_code == 503
+            assert response.headers["retry-after"]
+            for path in (
+                "/api/v1/telemetry/history/QMC-11?format=ndjson",
+                "/api/v1/telemetry/zones/out-of-range",
+                "/api/v1/telemetry/zones/QMC-11",
+            ):
+                assert client.get(path).status_code == 503
+            batch = client.post("/api/v1/telemetry/batch", json=[
+                {"device_id": "QMC-11", "ts": "2026-01-05T08:00:00Z", "metrics": {"clamp_force": 80.0}},
+            ])
+            assert batch.json()["stored"] == "buffered"
+            assert client.get("/api/v1/metrics/ingest").json()["paused"] is True
+        finally:
+            assert db_monitor.check()
+        assert client.get("/api/v1/oee").status_code == 200
@@ -0,0 +1,110 @@
+"""Tests for the async edge gateway: gzip batch ingest, the on-disk outbox and retry with backoff."""
+import asyncio
+import gzip
+import json
+import os
+import sys
+from pathlib import Path
+
+import httpx
+from fastapi.testclient import TestClient
+
+ROOT = Path(__file__).resolve().parents[1]
+TEST_DB = ROOT / "test_acron.db"
+if TEST_DB.exists():
+    TEST_DB.unlink()
+
+os.environ["DATABASE_URL"] = f"sqlite:///{TEST_DB}"
+os.environ["SIMULATOR_ENABLED"] = "false"
+os.environ["DEMO_MODE"] = "true"
+os.environ["SECRET_KEY"] = "test-secret"
+sys.path.insert(0, str(ROOT / "ingress-api"))
+sys.path.insert(0, str(ROOT))
+
+from app.main import app  # noqa: E402
+from edge.gateway import Backoff, GatewayRuntime, collect_records  # noqa: E402
+from edge.outbox import Outbox, encode_batch  # noqa: E402
+
+DEVICES = [{"id": "CHILLER-12", "type": "CHILLER", "state": "RUNNING"}, {"id": "ROBOT-12", "type": "ROBOT", "state": "RUNNING"}]
+
+
+def test_batch_route_accepts_gzip_bodies():
+    records = collect_records(DEVICES)
+    with TestClient(app) as client:
+        response = client.post(
+            "/api/v1/telemetry/batch",
+            content=encode_batch(records),
+            headers={"Content-Type": "application/json", "Content-Encoding": "gzip"},
+        )
+        assert response.status_code == 200
+        assert response.json()["records"] == 2
+        latest = client.get("/api/v1/telemetry/latest").json()
+        assert latest["CHILLER-12"]["metrics"]["flow_rate"] == records[0]["metrics"]["flow_rate"]
+
+        garbage = client.post("/api/v1/telemetry/batch", content=b"not gzip", headers={"Content-Encoding": "gzip"})
+        assert garbage.status_code == 422
+
+
+def test_outbox_survives_restart_drains_oldest_first_and_caps_disk(tmp_path):
+    path = tmp_path / "outbox.db"
+    outbox = Outbox(path)
+    for cycle in range(3):
+        outbox.put([{"device_id": "CHILLER-12", "ts": f"2026-03-01T00:00:0{cycle}Z", "metrics": {}}])
+    outbox.close()
+
+    reopened = Outbox(path)
+    assert reopened.depth == 3
+    (first_id, count, body), = reopened.peek()
+    assert count == 1 and json.loads(gzip.decompress(body))[0]["ts"].endswith("00Z")
+    reopened.ack(first_id)
+    assert [json.loads(gzip.decompress(b))[0]["ts"][-3:] for _, _, b in reopened.peek(5)] == ["01Z", "02Z"]
+
+    size = len(encode_batch([{"device_id": "CHILLER-12", "ts": "2026-03-01T00:00:09Z", "metrics": {}}]))
+    reopened.max_bytes = size * 2
+    reopened.put([{"device_id": "CHILLER-12", "ts": "2026-03-01T00:00:09Z", "metrics": {}}])
+    assert reopened.depth == 2 and reopened.evicted_records == 1
+    assert [json.loads(gzip.decompress(b))[0]["ts"][-3:] for _, _, b in reopened.peek(5)] == ["02Z", "09Z"]
+    reopened.close()
+
+
+def test_forwarder_backs_off_then_drains_in_order(tmp_path, monkeypatch):
+    attempts = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        assert request.headers["content-encoding"] == "gzip"
+        attempts.append(json.loads(gzip.decompress(request.content))[0]["ts"])
+        if len(attempts) <= 2:
+            return httpx.Response(503)
+        return httpx.Response(200, json={"status": "ok"})
+
+    delays = []
+    original_sleep = asyncio.sleep
+
+    async def fake_sleep(delay):
+        delays.append(delay)
+        await original_sleep(0)
+
+    async def scenario():
+        outbox = Outbox(tmp_path / "outbox.db")
+        cycle = iter(range(10))
+        runtime = GatewayRuntime(
+            outbox,
+            client=httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+            url="http://api/api/v1/telemetry/batch",
+            backoff=Backoff(base=1, cap=8),
+            collect=lambda: [{"device_id": "ROBOT-12", "ts": f"t{next(cycle)}", "metrics": {}}],
+        )
+        await runtime.collect_once()
+        await runtime.collect_once()
+        monkeypatch.setattr(asyncio, "sleep", fake_sleep)
+        while await runtime.forward_once():
+            pass
+        monkeypatch.undo()
+        await runtime.client.aclose()
+        return runtime
+
+    runtime = asyncio.run(scenario())
+    assert attempts == ["t0", "t0", "t0", "t1"]
+    assert len(delays) == 2 and 0 <= delays[0] <= 1 and 0 <= delays[1] <= 2
+    assert runtime.failed_uploads == 2 and runtime.sent_batches == 2
+    assert runtime.backoff.attempt == 0 and runtime.outbox.depth == 0
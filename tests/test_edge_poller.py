@@ -0,0 +1,113 @@
+"""Tests for the edge PLC poll scheduler: per-tag rates, persistent connections, reconnects and the worker pool."""
+import asyncio
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from edge.connectors import BaseConnector, ConnectorConfig, TagSpec, parse_tag_map  # noqa: E402
+from edge.poller import PollScheduler  # noqa: E402
+
+
+class FakePLC(BaseConnector):
+    active = 0
+    peak = 0
+    lock = threading.Lock()
+
+    def __init__(self, config, read_seconds=0.0, fail_on=()):
+        super().__init__(config)
+        self.read_seconds = read_seconds
+        self.fail_on = set(fail_on)
+        self.reads: list[list[str]] = []
+        self.open = False
+        self.opens = 0
+
+    @property
+    def connected(self):
+        return self.open
+
+    def connect(self):
+        self.open = True
+        self.opens += 1
+
+    def close(self):
+        self.open = False
+
+    def read(self, tags):
+        with FakePLC.lock:
+            FakePLC.active += 1
+            FakePLC.peak = max(FakePLC.peak, FakePLC.active)
+        try:
+            time.sleep(self.read_seconds)
+            self.reads.append([tag.name for tag in tags])
+            if len(self.reads) in self.fail_on:
+                raise ConnectionResetError("socket closed by PLC")
+            return {tag.name: len(self.reads) for tag in tags}
+        finally:
+            with FakePLC.lock:
+                FakePLC.active -= 1
+
+
+def _plc(name, tag_map, **options):
+    return FakePLC(ConnectorConfig(name, "mitsubishi_mc", "10.0.0.1:5007", tag_map, device_id=f"IMM-{name}"), **options)
+
+
+async def _run_for(scheduler, seconds):
+    task = asyncio.create_task(scheduler.run())
+    await asyncio.sleep(seconds)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+
+def test_tag_map_accepts_addresses_and_per_tag_rates():
+    tags = parse_tag_map({"cycle_time": {"address": "D100", "poll_ms": 1000}, "status": "D101"})
+    assert tags == [TagSpec("cycle_time", "D100", 1000), TagSpec("status", "D101", 5000)]
+    with pytest.raises(ValueError):
+        parse_tag_map({"bad": {"poll_ms": 100}})
+
+
+def test_tags_poll_at_their_own_rates_over_one_connection():
+    plc = _plc("21", {"cycle_time": {"address": "D100", "poll_ms": 50}, "shot_count": {"address": "D200", "poll_ms": 200}})
+    scheduler = PollScheduler([plc], workers=2)
+    asyncio.run(_run_for(scheduler, 0.48))
+
+    fast = sum("cycle_time" in read for read in plc.reads)
+    slow = sum("shot_count" in read for read in plc.reads)
+    assert 8 <= fast <= 11 and slow == 3
+    assert ["cycle_time", "shot_count"] in plc.reads  # due together, read together
+    assert plc.opens == 1 and not plc.open  # closed on shutdown
+
+    records = scheduler.drain()
+    assert len(records) == len(plc.reads) and scheduler.drain() == []
+    assert records[0]["device_id"] == "IMM-21" and records[0]["meta"] == {"protocol": "mitsubishi_mc"}
+    metrics = scheduler.metrics()["devices"]["IMM-21"]
+    assert metrics["polls"] == len(plc.reads) and metrics["poll_rates_ms"] == [50, 200]
+    assert metrics["latency_ms"]["p95"] is not None
+
+
+def test_failed_read_reconnects_with_backoff():
+    plc = _plc("22", {"cycle_time": {"address": "D100", "poll_ms": 20}}, fail_on={2})
+    scheduler = PollScheduler([plc], workers=1, reconnect_base=0.05)
+    asyncio.run(_run_for(scheduler, 0.2))
+
+    metrics = scheduler.metrics()["devices"]["IMM-22"]
+    assert plc.opens == 2
+    assert metrics["errors"] == 1 and metrics["consecutive_errors"] == 0
+    assert metrics["connects"] == 2 and metrics["last_error"].startswith("ConnectionResetError")
+    assert metrics["polls"] == len(plc.reads) - 1 >= 3
+
+
+def test_many_plcs_poll_in_parallel_on_a_bounded_pool():
+    FakePLC.peak = 0
+    plcs = [_plc(f"3{i}", {"cycle_time": {"address": "D100", "poll_ms": 1000}}, read_seconds=0.1) for i in range(8)]
+    scheduler = PollScheduler(plcs, workers=4)
+    asyncio.run(_run_for(scheduler, 0.45))  # serially these reads would take 0.8 s
+
+    assert all(len(plc.reads) == 1 for plc in plcs)
+    assert FakePLC.peak == 4
@@ -0,0 +1,117 @@
+"""Tests for PLC block-read planning and typed decoding."""
+import struct
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from edge.connectors import ConnectorConfig, MitsubishiMCConnector, ModbusTCPConnector, parse_tag_map  # noqa: E402
+from edge.read_planner import MC_PROTOCOL, MODBUS, Address, decode_block, parse_address, plan_reads  # noqa: E402
+
+
+def _words(fmt: str, value, word_order: str) -> list[int]:
+    high, low = struct.unpack(">HH", struct.pack(fmt, value))
+    return [high, low] if word_order == "high" else [low, high]
+
+
+def test_addresses_parse_per_protocol():
+    assert parse_address("D100", MC_PROTOCOL) == Address("D", 100)
+    assert parse_address("x1f", MC_PROTOCOL) == Address("X", 0x1F)
+    assert parse_address("XA0", MC_PROTOCOL) == Address("X", 0xA0)
+    assert parse_address("ZR2000", MC_PROTOCOL) == Address("ZR", 2000)
+    assert parse_address("D100.F", MC_PROTOCOL) == Address("D", 100, 15)
+    assert parse_address("40", MODBUS) == Address("HR", 40)
+    assert parse_address("CO7", MODBUS) == Address("CO", 7)
+    for bad in ("Q100", "DA", "M10.1"):
+        with pytest.raises(ValueError):
+            parse_address(bad, MC_PROTOCOL)
+
+
+def test_nearby_tags_merge_within_gap_and_frame():
+    tags = parse_tag_map({
+        "cycle_time": "D100",
+        "status": "D101",
+        "shot_weight": {"address": "D104", "type": "float32"},
+        "counter": {"address": "D200", "type": "int32"},
+        "running": {"address": "M10", "type": "bit"},
+        "alarm": {"address": "M12", "type": "bit"},
+    })
+    blocks = plan_reads(tags, MC_PROTOCOL, max_gap=8)
+    assert [(b.area, b.start, b.count, len(b.tags)) for b in blocks] == [
+        ("D", 100, 6, 3), ("D", 200, 2, 1), ("M", 10, 3, 2),
+    ]
+    assert blocks[0].head(MC_PROTOCOL) == "D100" and blocks[2].bits
+    assert len(plan_reads(tags, MC_PROTOCOL, max_gap=0)) == 5
+
+    # Modbus frames hold 125 registers, so a long spread-out map splits at the frame limit.
+    spread = parse_tag_map({f"t{i}": f"HR{i * 10}" for i in range(30)})
+    assert [b.count for b in plan_reads(spread, MODBUS, max_gap=10)] == [121, 121, 31]
+
+    with pytest.raises(ValueError):
+        plan_reads(parse_tag_map({"flag": {"address": "M1", "type": "int16"}}), MC_PROTOCOL)
+
+
+def test_typed_values_decode_out_of_a_block():
+    tags = parse_tag_map({
+        "temp": "D0",
+        "count": {"address": "D1", "type": "uint16"},
+        "total": {"address": "D2", "type": "int32"},
+        "pressure": {"address": "D4", "type": "float32"},
+        "pressure_be": {"address": "D6", "type": "float32", "word_order": "high"},
+        "door_open": {"address": "D8.3", "type": "bit"},
+        "mold_id": {"address": "D9", "type": "string", "length": 5},
+    })
+    (block,) = plan_reads(tags, MC_PROTOCOL)
+    text = b"AB-X1\x00"
+    words = (
+        [(-12) & 0xFFFF, 65000]
+        + _words(">i", -70000, "low")
+        + _words(">f", 1850.5, "low")
+        + _words(">f", 1850.5, "high")
+        + [0b1000]
+        + [int.from_bytes(text[i:i + 2], "little") for i in range(0, 6, 2)]
+    )
+    assert decode_block(block, words, MC_PROTOCOL) == {
+        "temp": -12, "count": 65000, "total": -70000, "pressure": 1850.5, "pressure_be": 1850.5,
+        "door_open": True, "mold_id": "AB-X1",
+    }
+
+    (modbus_block,) = plan_reads(parse_tag_map({"flow": {"address": "IR10", "type": "float32"}}), MODBUS)
+    assert decode_block(modbus_block, _words(">f", 49.75, "high"), MODBUS) == {"flow": 49.75}
+
+
+def test_connectors_read_many_tags_per_round_trip():
+    calls = []
+
+    def batchread_wordunits(head, size):
+        calls.append((head, size))
+        return list(range(size))
+
+    tag_map = {f"zone_{i}": f"D{100 + i}" for i in range(24)}
+    tag_map["cycle_time"] = {"address": "D130", "type": "float32"}
+    mc = MitsubishiMCConnector(ConnectorConfig("imm", "mitsubishi_mc", "10.0.0.5:5007", tag_map))
+    mc._plc = SimpleNamespace(batchread_wordunits=batchread_wordunits)
+    values = mc.read(mc.tags)
+    assert calls == [("D100", 32)]
+    assert values["zone_0"] == 0 and values["zone_23"] == 23
+    assert mc.round_trips == 1 and len(values) == 25
+
+    class FakeModbus:
+        def read_holding_registers(self, address, count):
+            calls.append(("HR", address, count))
+            return SimpleNamespace(isError=lambda: False, registers=[7] * count)
+
+        def read_coils(self, address, count):
+            calls.append(("CO", address, count))
+            return SimpleNamespace(isError=lambda: True)
+
+    modbus = ModbusTCPConnector(ConnectorConfig("chiller", "modbus_tcp", "10.0.0.6:502", {
+        "inlet_temp": "0", "outlet_temp": "1", "pump_on": {"address": "CO0", "type": "bit"},
+    }))
+    modbus._client = FakeModbus()
+    assert modbus.read(modbus.tags) == {"inlet_temp": 7, "outlet_temp": 7, "pump_on": None}
+    assert calls[-2:] == [("CO", 0, 1), ("HR", 0, 2)]
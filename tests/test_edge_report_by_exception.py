@@ -0,0 +1,87 @@
+"""Tests for edge report-by-exception: deadbands, heartbeats and partial records at the API."""
+import os
+import sys
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+
+ROOT = Path(__file__).resolve().parents[1]
+TEST_DB = ROOT / "test_acron.db"
+if TEST_DB.exists():
+    TEST_DB.unlink()
+
+os.environ["DATABASE_URL"] = f"sqlite:///{TEST_DB}"
+os.environ["SIMULATOR_ENABLED"] = "false"
+os.environ["DEMO_MODE"] = "true"
+os.environ["SECRET_KEY"] = "test-secret"
+sys.path.insert(0, str(ROOT / "ingress-api"))
+sys.path.insert(0, str(ROOT))
+
+from app.main import app  # noqa: E402
+from edge.connectors import ConnectorConfig, connector_for  # noqa: E402
+from edge.report_by_exception import ChangeFilter, ChangeRule  # noqa: E402
+
+
+def _record(device: str, second: int, **metrics) -> dict:
+    return {"device_id": device, "ts": f"2026-03-02T08:{second // 60:02d}:{second % 60:02d}Z", "metrics": metrics, "meta": {"type": "CHILLER"}}
+
+
+def test_deadbands_and_heartbeat_follow_tag_map_rules():
+    connector = connector_for(ConnectorConfig("chiller", "modbus_tcp", "10.0.0.6:502", {
+        "water_temp": {"address": "0", "deadband": 0.5, "max_silence_ms": 30000},
+        "flow_rate": {"address": "1", "deadband_pct": 5},
+        "mode": "2",
+    }, device_id="CHILLER-14"))
+    changes = ChangeFilter.from_connectors([connector], default=ChangeRule(0, 0, 0))
+    assert changes.rule("CHILLER-14", "water_temp") == ChangeRule(0.5, 0.0, 30000)
+
+    sent = [
+        changes.filter_values("CHILLER-14", values, at)
+        for at, values in [
+            (0, {"water_temp": 20.0, "flow_rate": 50.0, "mode": 1}),
+            (5, {"water_temp": 20.4, "flow_rate": 52.0, "mode": 1}),   # inside both deadbands
+            (10, {"water_temp": 20.6, "flow_rate": 52.6, "mode": 2}),  # drifted past the last *sent* value
+            (20, {"water_temp": 20.7, "flow_rate": 52.6, "mode": 2}),
+            (40, {"water_temp": 20.7, "flow_rate": 52.6, "mode": 2}),  # 30 s silence: heartbeat
+        ]
+    ]
+    assert sent == [
+        {"water_temp": 20.0, "flow_rate": 50.0, "mode": 1},
+        {},
+        {"water_temp": 20.6, "flow_rate": 52.6, "mode": 2},
+        {},
+        {"water_temp": 20.7},
+    ]
+    assert changes.heartbeats == 1
+    assert changes.metrics()["values_in"] == 15 and changes.metrics()["values_out"] == 7
+
+
+def test_steady_signals_shrink_the_upload_by_an_order_of_magnitude():
+    changes = ChangeFilter(default=ChangeRule(deadband=0.5, deadband_pct=0, max_silence_ms=60000))
+    records = [
+        _record("CHILLER-14", second, water_temp=20.0 + (0.2 if second % 2 else 0.0), flow_rate=50.0, zone_temps=[200.0, 201.0])
+        for second in range(0, 600, 5)
+    ]
+    kept = changes.filter(records)
+    assert kept[0]["metrics"].keys() == {"water_temp", "flow_rate", "zone_temps"}
+    assert len(kept) == 10  # the first record plus one heartbeat a minute
+    assert changes.metrics()["suppressed_ratio"] > 0.9
+
+    spike = changes.filter([_record("CHILLER-14", 596, water_temp=23.0, flow_rate=50.0, zone_temps=[200.0, 205.0])])
+    assert spike[0]["metrics"] == {"water_temp": 23.0, "zone_temps": [200.0, 205.0]}
+    assert spike[0]["meta"] == {"type": "CHILLER"}
+
+
+def test_api_keeps_unreported_metrics_in_latest_state():
+    changes = ChangeFilter(default=ChangeRule(0, 0, 0))
+    batches = [
+        changes.filter([_record("CHILLER-13", 0, water_temp=20.0, flow_rate=50.0)]),
+        changes.filter([_record("CHILLER-13", 5, water_temp=21.0, flow_rate=50.0)]),
+    ]
+    assert batches[1][0]["metrics"] == {"water_temp": 21.0}
+    with TestClient(app) as client:
+        for batch in batches:
+            assert client.post("/api/v1/telemetry/batch", json=batch).status_code == 200
+        latest = client.get("/api/v1/telemetry/latest").json()["CHILLER-13"]
+    assert latest["metrics"] == {"water_temp": 21.0, "flow_rate": 50.0}
+    assert latest["ts"] == "2026-03-02T08:00:05Z"
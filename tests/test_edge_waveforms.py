@@ -0,0 +1,130 @@
+"""Tests for edge windowed waveform summaries, triggered raw bursts and summary ingest at the API."""
+import asyncio
+import os
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+import numpy as np
+from fastapi.testclient import TestClient
+
+ROOT = Path(__file__).resolve().parents[1]
+TEST_DB = ROOT / "test_acron.db"
+if TEST_DB.exists():
+    TEST_DB.unlink()
+
+os.environ["DATABASE_URL"] = f"sqlite:///{TEST_DB}"
+os.environ["SIMULATOR_ENABLED"] = "false"
+os.environ["DEMO_MODE"] = "true"
+os.environ["SECRET_KEY"] = "test-secret"
+sys.path.insert(0, str(ROOT / "ingress-api"))
+sys.path.insert(0, str(ROOT))
+
+from app import models  # noqa: E402
+from app.database import SessionLocal  # noqa: E402
+from app.main import app  # noqa: E402
+from edge.connectors import ConnectorConfig, MitsubishiMCConnector  # noqa: E402
+from edge.poller import PollScheduler  # noqa: E402
+from edge.waveforms import WaveformSpec, WindowAggregator, summarize  # noqa: E402
+
+START = 1_780_000_000.0  # a whole second, so windows align with it
+
+
+def test_summary_stats_match_numpy():
+    samples = np.array([0.1, -0.4, 0.2, 0.3, -0.1])
+    summary = summarize(samples)
+    assert summary["count"] == 5 and summary["min"] == -0.4 and summary["max"] == 0.3
+    assert summary["peak"] == 0.4
+    assert np.isclose(summary["rms"], np.sqrt(np.mean(samples ** 2)))
+    assert np.isclose(summary["p95"], np.percentile(samples, 95))
+
+
+def test_time_windows_split_chunks_and_burst_on_trigger():
+    spec = WaveformSpec(sample_rate_hz=100, window_ms=1000, trigger_stat="peak", trigger_above=5.0)
+    aggregator = WindowAggregator()
+    rng = np.random.default_rng(7)
+    # 2.5 s of samples in uneven chunks; the second window contains a spike.
+    signal = rng.normal(1.0, 0.1, 250)
+    signal[130] = 9.0
+    for lo, hi in [(0, 70), (70, 160), (160, 250)]:
+        aggregator.add("IMM-15", "vibration", signal[lo:hi], START + lo / 100, spec)
+
+    records = aggregator.drain(START + 2.2)
+    assert [r["ts"] for r in records] == ["2026-05-28T20:26:40.000Z", "2026-05-28T20:26:41.000Z"]
+    first, second = records
+    assert first["metrics"]["vibration"]["count"] == 100 and "vibration.raw" not in first["metrics"]
+    assert np.isclose(first["metrics"]["vibration"]["mean"], signal[:100].mean())
+    assert second["metrics"]["vibration"]["peak"] == 9.0
+    assert len(second["metrics"]["vibration.raw"]) == 100
+    assert second["meta"] == {"window_ms": 1000, "sample_rate_hz": 100, "trigger": "vibration.peak"}
+
+    # The open third window closes once its end has passed.
+    assert aggregator.drain(START + 2.9) == []
+    (third,) = aggregator.drain(START + 3.0)
+    assert third["metrics"]["vibration"]["count"] == 50
+    assert aggregator.metrics() == {"signals": 1, "samples_in": 250, "windows_closed": 3, "bursts": 1}
+
+
+def test_plc_sample_buffers_summarize_per_machine_cycle():
+    buffer = [100 + (i % 10) for i in range(200)]
+    mc = MitsubishiMCConnector(ConnectorConfig("imm", "mitsubishi_mc", "10.0.0.9:5007", {
+        "injection_pressure": {
+            "address": "D2000", "samples": 200,
+            "waveform": {"sample_rate_hz": 1000, "window_ms": "cycle", "trigger": {"stat": "max", "above": 150}},
+        },
+        "cycle_count": {"address": "D100", "cycle_marker": True},
+    }, device_id="IMM-15"))
+    state = {"cycle": 41}
+
+    def batchread_wordunits(head, size):
+        return [state["cycle"]] + [0] * (size - 1) if head == "D100" else buffer[:size]
+
+    mc._plc = SimpleNamespace(batchread_wordunits=batchread_wordunits, close=lambda: None)
+    scheduler = PollScheduler([mc], workers=1)
+    device = scheduler.devices[0]
+
+    async def poll_cycle():
+        for _ in range(3):
+            await device.poll(mc.tags)
+        state["cycle"] += 1
+        await device.poll(mc.tags)
+
+    asyncio.run(poll_cycle())
+    records = scheduler.drain()
+    assert [r["metrics"] for r in records[:4]] == [{"cycle_count": 41}] * 3 + [{"cycle_count": 42}]
+    (summary,) = records[4:]
+    # Every buffer up to the poll that saw the counter move belongs to the finished cycle.
+    assert summary["metrics"]["injection_pressure"]["count"] == 800
+    assert summary["metrics"]["injection_pressure"]["max"] == 109 and "injection_pressure.raw" not in summary["metrics"]
+    assert summary["meta"]["window_ms"] == 800
+    assert scheduler.metrics()["waveforms"]["windows_closed"] == 1
+
+
+def test_api_stores_summaries_as_mean_plus_stat_rows_and_bursts_as_arrays():
+    record = {
+        "device_id": "IMM-15",
+        "ts": "2026-03-03T09:00:00.000Z",
+        "metrics": {
+            "vibration": {"count": 1000, "mean": 0.11, "max": 0.9, "rms": 0.12, "p95": 0.2},
+            "vibration.raw": [0.1, 0.9, 0.1],
+            "mold_temp": 61.0,
+        },
+        "meta": {"type": "IMM", "window_ms": 1000, "sample_rate_hz": 1000},
+    }
+    with TestClient(app) as client:
+        response = client.post("/api/v1/telemetry/batch", json=[record])
+        assert response.status_code == 200
+        assert response.json()["rows"] == 7
+        latest = client.get("/api/v1/telemetry/latest").json()["IMM-15"]["metrics"]
+        history = client.get("/api/v1/telemetry/history/IMM-15?start=2026-03-03T08:00:00&end=2026-03-03T10:00:00").json()
+
+    assert latest == {"vibration": 0.11, "vibration.count": 1000, "vibration.max": 0.9, "vibration.rms": 0.12,
+                      "vibration.p95": 0.2, "mold_temp": 61.0}
+    stored = {item["metric"]: item["value"] for item in history["data"]}
+    assert stored["vibration"] == 0.11 and stored["vibration.max"] == 0.9
+    db = SessionLocal()
+    try:
+        burst = db.query(models.TelemetryArray).filter_by(equipment_id="IMM-15", array_name="vibration.raw").one()
+    finally:
+        db.close()
+    assert burst.length == 3
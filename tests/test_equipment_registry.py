@@ -0,0 +1,99 @@
+"""Tests for the in-memory equipment registry: eager load, reuse across requests and invalidation."""
+import asyncio
+import os
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+ROOT = Path(__file__).resolve().parents[1]
+TEST_DB = ROOT / "test_acron.db"
+if TEST_DB.exists():
+    TEST_DB.unlink()
+
+os.environ["DATABASE_URL"] = f"sqlite:///{TEST_DB}"
+os.environ["SIMULATOR_ENABLED"] = "false"
+os.environ["DEMO_MODE"] = "true"
+os.environ["SECRET_KEY"] = "test-secret"
+sys.path.insert(0, str(ROOT / "ingress-api"))
+
+from app import main  # noqa: E402
+from app.database import engine, run_read  # noqa: E402
+from app.main import app, equipment_registry  # noqa: E402
+from app.oee_engine import compute_oee  # noqa: E402
+
+
+def _count_selects(fn) -> int:
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", capture)
+    try:
+        fn()
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+    return len(statements)
+
+
+def test_machine_master_loads_once_and_reloads_after_upsert():
+    with TestClient(app) as client:
+        token = client.post("/api/v1/auth/demo-login", json={"role": "manager"}).json()["access_token"]
+        equipment_registry.invalidate()
+
+        first = []
+        assert _count_selects(lambda: first.append(client.get("/api/v1/factory/machines").json())) == 1
+        assert _count_selects(lambda: client.get("/api/v1/factory/machines")) == 0
+        assert _count_selects(lambda: client.get("/api/v1/equipment")) == 0
+        imm = next(item for item in first[0] if item["equipment_id"] == "IMM-01")
+        assert imm["plant"] == "Pune Automotive Components Plant"
+        assert imm["line"] == "Molding Line A" and imm["mold_model"] == "AB-X100"
+
+        version = equipment_registry.version
+        response = client.post(
+            "/api/v1/factory/machines",
+            json={
+                "equipment_id": "VWM-12", "equipment_type": "VWM", "plant": "S7-PUNE-01",
+                "line": "LINE-B", "cell": "Cell 12", "process": "VWM",
+            },
+            headers={"Authorization": f"Bearer {token}"},
+        )
+        assert response.status_code == 200
+        assert equipment_registry.version == version + 1
+        machines = {item["equipment_id"]: item for item in client.get("/api/v1/factory/machines").json()}
+        assert machines["VWM-12"]["cell"] == "Cell 12"
+        assert machines["VWM-12"]["line"] == "Bumper Line B"
+        assert machines["VWM-12"]["process"] == "Vibration Welding"
+
+
+def test_change_from_another_worker_invalidates_without_echo():
+    sent = []
+    equipment_registry.listeners.append(sent.append)
+    try:
+        version = equipment_registry.version
+        main.apply_live_message({"origin": "other-worker", "event": "equipment"})
+        assert equipment_registry.version == version + 1
+        assert sent == []
+        equipment_registry.invalidate()
+        assert sent == [version + 2]
+    finally:
+        equipment_registry.listeners.remove(sent.append)
+
+
+def test_concurrent_reads_of_a_stale_registry_do_not_block_each_other():
+    async def concurrent_oee():
+        cutoff = datetime.utcnow() - timedelta(hours=1)
+        equipment_registry.invalidate(notify=False)
+        reads = [run_read(compute_oee, cutoff, None, planned_minutes=30) for _ in range(4)]
+        return await asyncio.wait_for(asyncio.gather(*reads), timeout=10)
+
+    with TestClient(app) as client:
+        loads = equipment_registry.loads
+        results = client.portal.call(concurrent_oee)
+    assert all(len(result) == len(results[0]) > 0 for result in results)
+    assert equipment_registry.metrics()["loaded_version"] == equipment_registry.version
+    assert 1 <= equipment_registry.loads - loads <= 4
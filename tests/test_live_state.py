@@ -0,0 +1,195 @@
+"""Tests for the cross-worker live-state backends against an in-process RESP stand-in."""
+import asyncio
+import os
+import socket
+import sys
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+
+ROOT = Path(__file__).resolve().parents[1]
+TEST_DB = ROOT / "test_acron.db"
+if TEST_DB.exists():
+    TEST_DB.unlink()
+
+os.environ["DATABASE_URL"] = f"sqlite:///{TEST_DB}"
+os.environ["SIMULATOR_ENABLED"] = "false"
+os.environ["DEMO_MODE"] = "true"
+os.environ["SECRET_KEY"] = "test-secret"
+sys.path.insert(0, str(ROOT / "ingress-api"))
+
+from app import main  # noqa: E402
+from app import live_state  # noqa: E402
+from app.live_state import PostgresBackend, RedisBackend, RespConnection, create_backend  # noqa: E402
+
+
+class RespStandIn:
+    """Just enough of a Redis server: HSET/HGETALL/DEL, PUBLISH/SUBSCRIBE."""
+
+    def __init__(self):
+        self.hashes: dict[bytes, dict[bytes, bytes]] = {}
+        self.subscribers: dict[bytes, list[asyncio.StreamWriter]] = {}
+        self.server = None
+        self.connections: set[asyncio.Task] = set()
+
+    async def start(self) -> str:
+        self.server = await asyncio.start_server(self._serve, "127.0.0.1", 0)
+        return f"redis://127.0.0.1:{self.server.sockets[0].getsockname()[1]}/0"
+
+    async def stop(self):
+        self.server.close()
+        for task in self.connections:
+            task.cancel()
+        await asyncio.gather(*self.connections, return_exceptions=True)
+
+    async def _serve(self, reader, writer):
+        self.connections.add(asyncio.current_task())
+        connection = RespConnection(reader, writer)
+        try:
+            while True:
+                command = await connection.read()
+                writer.write(self._execute(command, writer))
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    def _execute(self, command, writer) -> bytes:
+        name, args = command[0].upper(), command[1:]
+        if name == b"HSET":
+            self.hashes.setdefault(args[0], {})[args[1]] = args[2]
+            return b":1\r\n"
+        if name == b"HGETALL":
+            flat = [item for pair in self.hashes.get(args[0], {}).items() for item in pair]
+            return RespConnection.encode(*flat)
+        if name == b"DEL":
+            return b":%d\r\n" % (self.hashes.pop(args[0], None) is not None)
+        if name == b"PUBLISH":
+            writers = self.subscribers.get(args[0], [])
+            for subscriber in writers:
+                subscriber.write(RespConnection.encode(b"message", args[0], args[1]))
+            return b":%d\r\n" % len(writers)
+        if name == b"SUBSCRIBE":
+            self.subscribers.setdefault(args[0], []).append(writer)
+            return RespConnection.encode(b"subscribe", args[0], 1).replace(b"$1\r\n1\r\n", b":1\r\n")
+        return b"-ERR unknown command\r\n"
+
+
+class PgConnectionStandIn:
+    """psycopg2 connection surface used by PostgresBackend, over a socketpair."""
+
+    def __init__(self):
+        self.sock, self.peer = socket.socketpair()
+        self.notifies = []
+        self.statements = []
+        self.broken = False
+
+    def fileno(self):
+        return self.sock.fileno()
+
+    def cursor(self):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, statement, params=None):
+        self.statements.append(statement)
+
+    def notify(self, payload: str):
+        self.notifies.append(type("Notify", (), {"payload": payload})())
+        self.peer.send(b"!")
+
+    def poll(self):
+        self.sock.recv(64)
+        if self.broken:
+            raise ConnectionError("server closed the connection unexpectedly")
+
+    def close(self):
+        self.sock.close()
+        self.peer.close()
+
+
+async def _settle(condition, timeout=2.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        assert asyncio.get_running_loop().time() < deadline, "timed out"
+        await asyncio.sleep(0.01)
+
+
+def test_redis_backend_shares_last_values_and_fans_out():
+    async def scenario():
+        stand_in = RespStandIn()
+        url = await stand_in.start()
+        seen_a, seen_b = [], []
+        worker_a, worker_b = RedisBackend(url), RedisBackend(url)
+        await worker_a.start(seen_a.append)
+        try:
+            worker_a.publish({"device_id": "IMM-01", "ts": "2026-01-05T08:00:00Z", "metrics": {"cycle_time": 31.0}})
+            await _settle(lambda: worker_a.published == 1)
+
+            # A worker that starts later loads the last values first ...
+            await worker_b.start(seen_b.append)
+            assert seen_b == [{"payload": {"device_id": "IMM-01", "ts": "2026-01-05T08:00:00Z", "metrics": {"cycle_time": 31.0}}}]
+
+            # ... then receives live updates; nobody receives their own messages.
+            worker_a.publish({"device_id": "IMM-02", "ts": "2026-01-05T08:00:05Z", "metrics": {"cycle_time": 29.5}})
+            await _settle(lambda: len(seen_b) == 2)
+            assert seen_b[1]["payload"]["device_id"] == "IMM-02"
+            worker_b.clear()
+            await _settle(lambda: len(seen_a) == 1)
+            assert seen_a[0]["clear"] is True
+            assert stand_in.hashes == {}
+            assert worker_b.metrics()["received"] == 1
+        finally:
+            await worker_a.stop()
+            await worker_b.stop()
+            await stand_in.stop()
+
+    asyncio.run(scenario())
+
+
+def test_remote_payloads_reach_latest_and_local_sockets():
+    assert create_backend("memory").name == "memory"
+    with TestClient(main.app) as client:
+        with client.websocket_connect("/ws/andons") as socket:
+            client.portal.call(main.apply_live_message, {"origin": "other-worker", "payload": {
+                "device_id": "VWM-07", "ts": "2026-01-05T08:00:00Z", "metrics": {"weld_freq": 20010.0}, "meta": {"type": "VWM"},
+            }})
+            assert socket.receive_json()["data"]["metrics"] == {"weld_freq": 20010.0}
+        assert client.get("/api/v1/telemetry/latest").json()["VWM-07"]["metrics"]["weld_freq"] == 20010.0
+        assert client.get("/api/v1/metrics/websocket").json()["live_state"]["backend"] == "memory"
+
+
+def test_postgres_listener_reconnects_and_listens_again(monkeypatch):
+    monkeypatch.setattr(live_state, "LIVE_STATE_RETRY_SECONDS", 0.01)
+
+    async def scenario():
+        connections = []
+        seen = []
+        backend = PostgresBackend("postgresql://acron@localhost/acron")
+        backend._connect = lambda: connections.append(PgConnectionStandIn()) or connections[-1]
+        await backend.start(seen.append)
+        try:
+            listener = connections[0]
+            assert listener.statements == ['LISTEN "acron_telemetry"']
+            listener.notify('{"origin": "other", "clear": true}')
+            await _settle(lambda: len(seen) == 1)
+
+            # The database restarts: the listener is reopened and LISTEN issued again.
+            listener.broken = True
+            listener.peer.send(b"!")
+            await _settle(lambda: len(connections) == 3)
+            relistened = connections[2]
+            assert relistened.statements == ['LISTEN "acron_telemetry"'] and backend.errors == 1
+            relistened.notify('{"origin": "other", "event": "equipment"}')
+            await _settle(lambda: len(seen) == 2)
+            assert seen[1] == {"origin": "other", "event": "equipment"}
+        finally:
+            await backend.stop()
+
+    asyncio.run(scenario())
@@ -0,0 +1,63 @@
+"""Tests for the set-based OEE engine."""
+import os
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+ROOT = Path(__file__).resolve().parents[1]
+TEST_DB = ROOT / "test_acron.db"
+if TEST_DB.exists():
+    TEST_DB.unlink()
+
+os.environ["DATABASE_URL"] = f"sqlite:///{TEST_DB}"
+os.environ["SIMULATOR_ENABLED"] = "false"
+os.environ["DEMO_MODE"] = "true"
+os.environ["SECRET_KEY"] = "test-secret"
+sys.path.insert(0, str(ROOT / "ingress-api"))
+
+from app import models  # noqa: E402
+from app.database import SessionLocal, engine  # noqa: E402
+from app.ingest import write_telemetry_rows  # noqa: E402
+from app.main import app  # noqa: E402
+from app.oee_engine import compute_oee  # noqa: E402
+
+
+def test_compute_oee_uses_fixed_query_count():
+    with TestClient(app):
+        pass  # startup seeds the machine master
+
+    now = datetime.utcnow()
+    db = SessionLocal()
+    try:
+        write_telemetry_rows([
+            {"time": now - timedelta(minutes=m), "equipment_id": "TCM-02", "metric_name": "cycle_time",
+             "metric_value": value, "unit": None, "status": "normal"}
+            for m, value in enumerate([30.0, 40.0, 50.0])
+        ])
+        db.add(models.DowntimeEvent(equipment_id="TCM-02", reason_code="MAINTENANCE", category="maintenance", minutes=45, started_at=now))
+        db.commit()
+        machines = db.query(models.Equipment).filter_by(active=True).all()
+
+        statements = []
+        listener = lambda *args: statements.append(args[2])  # noqa: E731
+        event.listen(engine, "before_cursor_execute", listener)
+        try:
+            results = compute_oee(db, now - timedelta(hours=1), None, planned_minutes=450, machines=machines)
+        finally:
+            event.remove(engine, "before_cursor_execute", listener)
+    finally:
+        db.close()
+
+    # One grouped aggregate per rollup width/raw edge plus one for downtime, independent of fleet size.
+    assert len(statements) <= 5
+    assert len(results) == len(machines)
+    tcm = next(item for item in results if item.equipment_id == "TCM-02")
+    assert tcm.cycle.samples == 3
+    assert tcm.avg_cycle_time == 40.0
+    assert round(tcm.cycle.stddev, 3) == 8.165
+    assert tcm.loss_tree == {"maintenance": 45.0}
+    assert tcm.availability == (450 - 45) / 450
+    assert tcm.performance == 30.0 / 40.0
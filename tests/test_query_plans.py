@@ -0,0 +1,78 @@
+"""EXPLAIN QUERY PLAN checks: the hot analytics queries must be served by indexes."""
+import os
+import re
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event, text
+
+ROOT = Path(__file__).resolve().parents[1]
+TEST_DB = ROOT / "test_acron.db"
+if TEST_DB.exists():
+    TEST_DB.unlink()
+
+os.environ["DATABASE_URL"] = f"sqlite:///{TEST_DB}"
+os.environ["SIMULATOR_ENABLED"] = "false"
+os.environ["DEMO_MODE"] = "true"
+os.environ["SECRET_KEY"] = "test-secret"
+sys.path.insert(0, str(ROOT / "ingress-api"))
+
+from app import history  # noqa: E402
+from app.database import SessionLocal, engine  # noqa: E402
+from app.main import app  # noqa: E402
+from app.oee_engine import compute_oee  # noqa: E402
+
+HOT_TABLES = ("telemetry", "downtime_events")
+
+
+def _plans_for(fn) -> list[tuple[str, list[str]]]:
+    """Run ``fn`` and return (sql, plan lines) for every SELECT it issued."""
+    captured = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            captured.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", capture)
+    try:
+        fn()
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+
+    plans = []
+    with engine.connect() as connection:
+        for statement, parameters in captured:
+            rows = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).all()
+            plans.append((statement, [row[-1] for row in rows]))
+    return plans
+
+
+def _full_scans(plans) -> list[str]:
+    pattern = re.compile(r"^SCAN (%s)\b(?!.*USING)" % "|".join(HOT_TABLES))
+    return [f"{detail}  <-  {sql}" for sql, details in plans for detail in details if pattern.search(detail)]
+
+
+def test_hot_queries_use_indexes():
+    with TestClient(app):
+        indexes = {row[0] for row in SessionLocal().execute(text("SELECT name FROM sqlite_master WHERE type = 'index'"))}
+        assert "ix_telemetry_equipment_metric_time" in indexes
+        assert "ix_downtime_events_equipment_started" in indexes
+        assert not {"ix_telemetry_equipment_id", "ix_telemetry_metric_name"} & indexes
+
+        now = datetime.utcnow()
+        start = now - timedelta(hours=8, seconds=17)
+
+        def run():
+            db = SessionLocal()
+            try:
+                compute_oee(db, start, now, planned_minutes=450)
+                history.fetch_page(db, "IMM-01", start, None, ["cycle_time"], None, True, 100, history.HISTORY_FIELDS)
+            finally:
+                db.close()
+
+        plans = _plans_for(run)
+        touched = {table for _, details in plans for detail in details for table in HOT_TABLES if f" {table} " in f"{detail} "}
+        assert touched == set(HOT_TABLES)
+        assert _full_scans(plans) == []
@@ -0,0 +1,148 @@
+"""Tests for the response cache: single-flight, LRU memory cap, windows/invalidation and ETags."""
+import asyncio
+import os
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+
+ROOT = Path(__file__).resolve().parents[1]
+TEST_DB = ROOT / "test_acron.db"
+if TEST_DB.exists():
+    TEST_DB.unlink()
+
+os.environ["DATABASE_URL"] = f"sqlite:///{TEST_DB}"
+os.environ["SIMULATOR_ENABLED"] = "false"
+os.environ["DEMO_MODE"] = "true"
+os.environ["SECRET_KEY"] = "test-secret"
+sys.path.insert(0, str(ROOT / "ingress-api"))
+
+from app.main import app, response_cache  # noqa: E402
+from app.response_cache import ResponseCache, parse_ttls  # noqa: E402
+
+
+async def _value(value):
+    return value
+
+
+def test_concurrent_misses_share_one_computation():
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return {"value": 42}
+
+    async def scenario():
+        cache = ResponseCache(ttls={"report": 30})
+        entries = await asyncio.gather(*(cache.fetch("report", {"hours": 8}, compute) for _ in range(10)))
+        again = await cache.fetch("report", {"hours": 8, "unused": None}, compute)
+        return cache, entries, again
+
+    cache, entries, again = asyncio.run(scenario())
+    assert len(calls) == 1
+    assert {entry.body for entry in entries} == {b'{"value":42}'}
+    assert again is entries[0]
+    assert cache.metrics()["misses"] == 1
+    assert cache.metrics()["coalesced"] == 9
+    assert cache.metrics()["hits"] == 1
+
+
+def test_lru_eviction_respects_memory_cap():
+    async def scenario():
+        cache = ResponseCache(max_bytes=60)
+        for name in ("a", "b", "c"):
+            await cache.fetch("report", {"name": name}, lambda: _value({"payload": "x" * 10}))
+        await cache.fetch("report", {"name": "a"}, lambda: _value({"payload": "x" * 10}))  # "a" is evicted, recomputed
+        return cache
+
+    cache = asyncio.run(scenario())
+    metrics = cache.metrics()
+    assert metrics["bytes"] <= 60
+    assert metrics["evictions"] >= 1
+    assert metrics["misses"] == 4
+
+
+def test_closed_windows_live_long_and_drop_on_overlapping_ingest():
+    yesterday = datetime.utcnow() - timedelta(days=1)
+    closed_window = (yesterday, yesterday + timedelta(hours=8))
+    open_window = (datetime.utcnow() - timedelta(hours=8), datetime.utcnow() + timedelta(hours=1))
+
+    async def scenario():
+        cache = ResponseCache(ttls={"report": 5}, closed_ttl=3600)
+        closed = await cache.fetch("report", {"day": "past"}, lambda: _value({"n": 1}), window=lambda _: closed_window)
+        opened = await cache.fetch("report", {"day": "today"}, lambda: _value({"n": 2}), window=lambda _: open_window)
+        untouched = cache.invalidate(datetime.utcnow() - timedelta(minutes=1), datetime.utcnow())
+        late = cache.invalidate(yesterday + timedelta(hours=2), yesterday + timedelta(hours=2))
+        return cache, closed, opened, untouched, late
+
+    cache, closed, opened, untouched, late = asyncio.run(scenario())
+    assert closed.closed and not opened.closed
+    assert closed.expires_at - opened.expires_at > 3000
+    assert untouched == 0
+    assert late == 1
+    assert cache.metrics()["entries"] == 1
+    assert parse_ttls("oee_trend:30, anomalies:5") == {"oee_trend": 30.0, "anomalies": 5.0}
+
+
+def test_closed_window_is_stored_unless_an_overlapping_flush_lands_mid_computation():
+    last_month = datetime.utcnow() - timedelta(days=30)
+    earlier = last_month - timedelta(days=30)
+
+    def row(equipment_id, at):
+        return {"equipment_id": equipment_id, "time": at, "metric_name": "cycle_time", "metric_value": 30.0}
+
+    async def compute_across(cache, name, start, rows):
+        async def slow():
+            await asyncio.sleep(0.01)
+            cache.invalidate_rows(rows)  # a write-behind flush during the computation
+            return {"machines": [{"equipment_id": "IMM-01"}]}
+
+        return await cache.fetch(
+            "report", {"month": name}, slow, window=lambda _: (start, start + timedelta(days=1)),
+            equipment=lambda report: [item["equipment_id"] for item in report["machines"]],
+        )
+
+    async def scenario():
+        cache = ResponseCache(closed_ttl=3600)
+        await compute_across(cache, "live-ingest", last_month, [row("IMM-01", datetime.utcnow())])
+        await compute_across(cache, "other-machine", last_month, [row("IMM-02", last_month + timedelta(hours=3))])
+        await compute_across(cache, "backfill", earlier, [row("IMM-01", earlier + timedelta(hours=3))])
+        return cache
+
+    cache = asyncio.run(scenario())
+    assert sorted(cache._entries) == ["report?month=live-ingest", "report?month=other-machine"]
+    assert cache._spans == [] and cache._span_marks == {}
+    assert cache.invalidate(last_month, last_month, equipment=["IMM-02"]) == 0
+    assert cache.invalidate(last_month, last_month) == 2
+
+
+def test_cached_endpoint_serves_etag_and_not_modified():
+    with TestClient(app) as client:
+        response_cache.clear()
+        before = response_cache.metrics()
+        first = client.get("/api/v1/analytics/oee-trend", params={"hours": 3})
+        second = client.get("/api/v1/analytics/oee-trend", params={"hours": 3})
+        assert first.status_code == second.status_code == 200
+        assert first.content == second.content
+        etag = first.headers["etag"]
+        assert second.headers["etag"] == etag
+
+        revalidated = client.get("/api/v1/analytics/oee-trend", params={"hours": 3}, headers={"If-None-Match": etag})
+        assert revalidated.status_code == 304
+        assert revalidated.content == b""
+
+        report = client.get("/api/v1/reports/oee", params={"scope": "shift", "reference_date": "2020-01-06"})
+        assert report.status_code == 200
+        assert client.get("/api/v1/reports/oee", params={"scope": "shift", "reference_date": "2020-01-06"}).headers["etag"] == report.headers["etag"]
+
+        # Without a reference date the report is keyed on the day it resolved to.
+        assert client.get("/api/v1/reports/oee", params={"scope": "shift", "shift_name": "A"}).status_code == 200
+        today = datetime.utcnow().date().isoformat()
+        assert f"oee_report?reference_date={today}&scope=shift&shift_name=A" in response_cache._entries
+
+        metrics = client.get("/api/v1/metrics/cache").json()
+        assert metrics["hits"] - before["hits"] >= 3
+        assert metrics["not_modified"] - before["not_modified"] == 1
+        assert metrics["entries"] >= 2
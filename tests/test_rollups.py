@@ -0,0 +1,110 @@
+"""Tests for telemetry rollups and bucket planning."""
+import os
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+
+ROOT = Path(__file__).resolve().parents[1]
+TEST_DB = ROOT / "test_acron.db"
+if TEST_DB.exists():
+    TEST_DB.unlink()
+
+os.environ["DATABASE_URL"] = f"sqlite:///{TEST_DB}"
+os.environ["SIMULATOR_ENABLED"] = "false"
+os.environ["DEMO_MODE"] = "true"
+os.environ["SECRET_KEY"] = "test-secret"
+sys.path.insert(0, str(ROOT / "ingress-api"))
+
+from app.database import SessionLocal  # noqa: E402
+from app.ingest import write_telemetry_rows  # noqa: E402
+from app.main import app  # noqa: E402
+from app.rollups import plan_window, series_stats, window_stats  # noqa: E402
+
+
+def test_plan_window_uses_coarsest_aligned_buckets():
+    start = datetime(2025, 3, 1, 22, 59, 30)
+    end = datetime(2025, 3, 3, 1, 2, 15)
+    plan = plan_window(start, end)
+    assert plan == [
+        (None, datetime(2025, 3, 1, 22, 59, 30), datetime(2025, 3, 1, 23, 0)),
+        ("1h", datetime(2025, 3, 1, 23, 0), datetime(2025, 3, 2, 0, 0)),
+        ("1d", datetime(2025, 3, 2, 0, 0), datetime(2025, 3, 3, 0, 0)),
+        ("1h", datetime(2025, 3, 3, 0, 0), datetime(2025, 3, 3, 1, 0)),
+        ("1m", datetime(2025, 3, 3, 1, 0), datetime(2025, 3, 3, 1, 2)),
+        (None, datetime(2025, 3, 3, 1, 2), datetime(2025, 3, 3, 1, 2, 15)),
+    ]
+
+
+def test_window_and_series_stats_match_raw_samples():
+    with TestClient(app):
+        pass
+
+    origin = datetime(2025, 3, 1, 22, 0)
+    samples = [(origin + timedelta(minutes=7 * i, seconds=13 * i), 30.0 + (i % 11)) for i in range(600)]
+    write_telemetry_rows([
+        {"time": at, "equipment_id": "RLP-01", "metric_name": "cycle_time", "metric_value": value, "unit": None, "status": "normal"}
+        for at, value in samples
+    ])
+
+    start = datetime(2025, 3, 1, 22, 59, 30)
+    end = datetime(2025, 3, 3, 1, 2, 15)
+    expected = [value for at, value in samples if start <= at < end]
+    db = SessionLocal()
+    try:
+        stats = window_stats(db, start, end, metric_name="cycle_time", include_last=True)[("RLP-01", "cycle_time")]
+        hourly = series_stats(db, start, end, "1h", metric_name="cycle_time")
+    finally:
+        db.close()
+
+    assert stats.count == len(expected)
+    assert abs(stats.mean - sum(expected) / len(expected)) < 1e-9
+    assert stats.min == min(expected) and stats.max == max(expected)
+    assert stats.last == [value for at, value in samples if start <= at < end][-1]
+    assert sum(item.count for item in hourly.values()) == len(expected)
+    assert all(bucket.minute == 0 and bucket.second == 0 for bucket in hourly)
+
+
+def test_late_rows_refresh_the_continuous_aggregate_buckets_they_land_in(monkeypatch):
+    from app import rollups
+
+    class RecordingEngine:
+        calls = []
+
+        def connect(self):
+            return self
+
+        def execution_options(self, **options):
+            self.calls.append(options)
+            return self
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            return False
+
+        def execute(self, statement, params):
+            self.calls.append((str(statement), params))
+
+    monkeypatch.setattr(rollups, "_backend", "timescale")
+    monkeypatch.setattr(rollups, "_late", {})
+    now = datetime.utcnow()
+    row = {"equipment_id": "RLP-02", "metric_name": "cycle_time", "metric_value": 31.0, "unit": None, "status": "normal"}
+    assert rollups.apply_rows(None, [dict(row, time=now)]) == 0
+    assert rollups._late == {}  # the aggregate policy still covers fresh rows
+
+    replayed = now - timedelta(minutes=90)
+    rollups.apply_rows(None, [dict(row, time=replayed), dict(row, time=replayed + timedelta(minutes=5))])
+    minute = rollups.bucket_floor(replayed, "1m")
+    assert rollups._late == {"1m": (minute, minute + timedelta(minutes=6))}
+
+    engine = RecordingEngine()
+    assert rollups.refresh_late_buckets(engine) == {"1m": (minute, minute + timedelta(minutes=6))}
+    assert engine.calls == [
+        {"isolation_level": "AUTOCOMMIT"},
+        ("CALL refresh_continuous_aggregate('telemetry_rollup_1m', :start, :end)",
+         {"start": minute, "end": minute + timedelta(minutes=6)}),
+    ]
+    assert rollups.refresh_late_buckets(engine) == {}
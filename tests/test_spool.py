@@ -0,0 +1,251 @@
+"""Tests for the on-disk ingest spool: segments, torn tails, idempotent replay and outage spill."""
+import asyncio
+import os
+import sys
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+
+ROOT = Path(__file__).resolve().parents[1]
+TEST_DB = ROOT / "test_acron.db"
+if TEST_DB.exists():
+    TEST_DB.unlink()
+
+os.environ["DATABASE_URL"] = f"sqlite:///{TEST_DB}"
+os.environ["SIMULATOR_ENABLED"] = "false"
+os.environ["DEMO_MODE"] = "true"
+os.environ["SECRET_KEY"] = "test-secret"
+sys.path.insert(0, str(ROOT / "ingress-api"))
+
+from app import models  # noqa: E402
+from app.database import SessionLocal  # noqa: E402
+from app.db_health import DatabaseHealthMonitor  # noqa: E402
+from app.ingest import write_telemetry_rows  # noqa: E402
+from app.main import app  # noqa: E402
+from app.spool import DiskSpool, SpoolReplayer, encode_rows, read_segment  # noqa: E402
+from app.telemetry_store import _copy_rows, repository  # noqa: E402
+from app.write_behind import QueueFullError, WriteBehindBuffer  # noqa: E402
+
+START = datetime(2026, 2, 2, 6, 0, 0)
+
+
+def _rows(device: str, count: int, offset: int = 0) -> list[dict]:
+    return [
+        {"time": START + timedelta(seconds=offset + i), "equipment_id": device, "metric_name": "cut_pressure",
+         "metric_value": float(offset + i), "unit": None, "status": "normal"}
+        for i in range(count)
+    ]
+
+
+def test_segments_rotate_survive_restart_and_stop_at_torn_tail(tmp_path):
+    spool = DiskSpool(tmp_path, segment_bytes=600, fsync_interval=0)
+    for batch in range(6):
+        spool.append(_rows("TCM-12", 3, batch * 3))
+    spool.close()
+    segments = sorted(tmp_path.rglob("*.seg"))
+    assert len(segments) > 1
+    assert spool.fsyncs >= len(segments)
+    with open(segments[-1], "ab") as f:
+        f.write(b"\x00\x00\x01\x00torn")
+
+    restarted = DiskSpool(tmp_path)
+    written = []
+    assert restarted.replay(written.extend, batch_rows=4) == 18
+    assert [row["metric_value"] for row in written] == [float(n) for n in range(18)]
+    assert written[0]["time"] == START
+    assert restarted.corrupt_records == 1
+    assert list(tmp_path.rglob("*.seg")) == []
+    metrics = restarted.metrics()
+    assert metrics["depth_rows"] == 0 and metrics["replayed_rows"] == 18
+
+
+def test_restarted_process_replays_segments_left_on_disk(tmp_path):
+    crashed = DiskSpool(tmp_path, fsync_interval=0)
+    crashed.append(_rows("TCM-14", 3))
+    crashed.close()  # the process dies here; its segment stays behind
+    written = []
+
+    def writer(rows):
+        written.extend(rows)
+        return len(rows)
+
+    async def scenario():
+        restarted = DiskSpool(tmp_path)
+        replayer = SpoolReplayer(restarted, writer, DatabaseHealthMonitor(lambda: None), interval=0.01)
+        await replayer.start()
+        depth_at_start = restarted.metrics()["depth_rows"]
+        await asyncio.sleep(0.1)
+        await replayer.stop()
+        return restarted, depth_at_start
+
+    restarted, depth_at_start = asyncio.run(scenario())
+    assert depth_at_start == 3
+    assert [row["metric_value"] for row in written] == [0.0, 1.0, 2.0]
+    assert restarted.metrics()["depth_rows"] == 0 and list(tmp_path.rglob("*.seg")) == []
+
+
+def test_workers_spool_into_their_own_directories_and_adopt_dead_ones(tmp_path):
+    (tmp_path / "000000000007.seg").write_bytes(encode_rows(_rows("TCM-16", 1, 6)))  # pre-per-process layout
+    first, second = DiskSpool(tmp_path, fsync_interval=0), DiskSpool(tmp_path, fsync_interval=0)
+    first.append(_rows("TCM-16", 2))
+    second.append(_rows("TCM-16", 3, 2))
+    assert first.metrics()["process_directory"] != second.metrics()["process_directory"]
+
+    written = []
+    assert first.replay(written.extend) == 3  # the second worker is alive, its segment is left alone
+    second.append(_rows("TCM-16", 1, 5))
+    assert second.depth_rows == 4
+
+    second.close()  # the second worker exits with rows still spooled
+    assert first.replay(written.extend) == 4
+    assert sorted(row["metric_value"] for row in written) == [float(n) for n in range(7)]
+    first.close()
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_batch_rejected_by_a_reachable_database_is_quarantined(tmp_path):
+    spool = DiskSpool(tmp_path, segment_bytes=200, fsync_interval=0)
+    spool.append(_rows("TCM-17", 2))
+    spool.append(_rows("TCM-17", 2, 2))
+    written = []
+
+    def writer(rows):
+        if any(row["metric_value"] == 1.0 for row in rows):
+            raise ValueError("invalid input value for metric_value")
+        written.extend(rows)
+        return len(rows)
+
+    replayer = SpoolReplayer(spool, writer, DatabaseHealthMonitor(lambda: None))
+    assert asyncio.run(replayer.drain()) == 2
+    assert [row["metric_value"] for row in written] == [2.0, 3.0]
+    assert spool.metrics()["quarantined_rows"] == 2 and spool.depth_rows == 0 and replayer.failures == 0
+    (quarantined,) = (tmp_path / "quarantine").glob("*.seg")
+    spool.close()
+    assert [count for count, _ in read_segment(quarantined)] == [2]
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["quarantine"]
+
+
+def test_replay_is_idempotent_on_equipment_metric_time():
+    with TestClient(app):
+        rows = _rows("TCM-12", 5)
+        assert write_telemetry_rows(rows) == 5
+        assert write_telemetry_rows(rows + _rows("TCM-12", 2, 5), idempotent=True) == 2
+        assert write_telemetry_rows(_rows("TCM-12", 8)) == 1  # duplicate batch is retried idempotently
+
+        db = SessionLocal()
+        try:
+            stored = db.query(models.Telemetry).filter_by(equipment_id="TCM-12").count()
+            samples = db.query(models.TelemetryRollup.sample_count).filter_by(
+                equipment_id="TCM-12", bucket_width="1h"
+            ).scalar()
+        finally:
+            db.close()
+        assert stored == 8
+        assert samples == 8
+
+
+def test_duplicate_rejected_by_copy_is_retried_idempotently(monkeypatch):
+    import psycopg2.errors
+
+    class DuplicateOnCopy:
+        """psycopg2 connection whose COPY hits the (equipment_id, metric_name, time) unique index."""
+
+        def cursor(self):
+            return self
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            return False
+
+        def copy_expert(self, statement, buffer):
+            raise psycopg2.errors.UniqueViolation('duplicate key value violates unique constraint "uq_telemetry_series_time"')
+
+    with TestClient(app):
+        assert write_telemetry_rows(_rows("TCM-15", 2), idempotent=True) == 2
+        monkeypatch.setattr(repository(), "insert_rows", lambda connection, rows: _copy_rows(DuplicateOnCopy(), rows))
+        assert write_telemetry_rows(_rows("TCM-15", 3)) == 1  # the gateway re-sent a batch it had uploaded
+
+        db = SessionLocal()
+        try:
+            assert db.query(models.Telemetry).filter_by(equipment_id="TCM-15").count() == 3
+        finally:
+            db.close()
+
+
+def test_outage_spills_to_disk_and_replays_after_recovery(tmp_path):
+    state = {"up": True}
+    written = []
+
+    def probe():
+        if not state["up"]:
+            raise ConnectionError("connection refused")
+
+    def writer(rows):
+        probe()
+        written.extend(rows)
+        return len(rows)
+
+    monitor = DatabaseHealthMonitor(probe, interval=0.02)
+    spool = DiskSpool(tmp_path, fsync_interval=0.01)
+
+    async def scenario():
+        buffer = WriteBehindBuffer(writer, max_rows=5, flush_rows=5, flush_interval=0.01, breaker=monitor, spool=spool)
+        replayer = SpoolReplayer(spool, writer, monitor, interval=0.02)
+        await buffer.start()
+        await monitor.start()
+        await replayer.start()
+        state["up"] = False
+        buffer.enqueue(_rows("TCM-12", 4))
+        buffer.enqueue(_rows("TCM-12", 4, 4))  # over max_rows: straight to the spool
+        await asyncio.sleep(0.15)
+        during = (spool.depth_rows, len(buffer), len(written))
+        state["up"] = True
+        await asyncio.sleep(0.2)
+        await replayer.stop()
+        await monitor.stop()
+        await buffer.stop()
+        return buffer, during
+
+    buffer, (depth, queued, stored) = asyncio.run(scenario())
+    assert (depth, queued, stored) == (8, 0, 0)
+    assert sorted(row["metric_value"] for row in written) == [float(n) for n in range(8)]
+    assert buffer.spooled_rows == 8 and buffer.failed_rows == 0
+    assert spool.metrics()["replayed_rows"] == 8
+
+
+def test_full_queue_overflow_is_spooled_off_the_event_loop(tmp_path):
+    appended_on = []
+
+    class RecordingSpool(DiskSpool):
+        def append(self, rows):
+            appended_on.append(threading.current_thread().name)
+            return super().append(rows)
+
+    spool = RecordingSpool(tmp_path, fsync_interval=0)
+    monitor = DatabaseHealthMonitor(lambda: None)
+    monitor.record_failure(ConnectionError("connection refused"), trip=True)  # hold the queue
+
+    async def scenario():
+        buffer = WriteBehindBuffer(lambda rows: len(rows), max_rows=4, flush_rows=4, flush_interval=0.01,
+                                   breaker=monitor, spool=spool, max_overflow_rows=6)
+        await buffer.start()
+        buffer.enqueue(_rows("TCM-13", 4))
+        accepted = buffer.enqueue(_rows("TCM-13", 4, 4))  # over max_rows: handed to the flusher
+        in_request = (list(appended_on), buffer.metrics()["overflow_rows"])
+        try:
+            buffer.enqueue(_rows("TCM-13", 4, 8))  # overflow cap reached before the flusher ran
+            rejected = False
+        except QueueFullError:
+            rejected = True
+        await asyncio.sleep(0.05)
+        await buffer.stop()
+        return buffer, accepted, in_request, rejected
+
+    buffer, accepted, (appends_in_request, overflow), rejected = asyncio.run(scenario())
+    assert accepted == 4 and appends_in_request == [] and overflow == 4 and rejected
+    assert appended_on and all(name.startswith("ingest-flush") for name in appended_on)
+    assert spool.depth_rows == 8 and buffer.spooled_rows == 8
@@ -0,0 +1,101 @@
+"""Tests for the SSE telemetry stream: filters, Last-Event-ID resume and heartbeats."""
+import asyncio
+import json
+import os
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+TEST_DB = ROOT / "test_acron.db"
+if TEST_DB.exists():
+    TEST_DB.unlink()
+
+os.environ["DATABASE_URL"] = f"sqlite:///{TEST_DB}"
+os.environ["SIMULATOR_ENABLED"] = "false"
+os.environ["DEMO_MODE"] = "true"
+os.environ["SECRET_KEY"] = "test-secret"
+sys.path.insert(0, str(ROOT / "ingress-api"))
+
+from app import main  # noqa: E402
+from app.broadcast import Subscription  # noqa: E402
+from app.sse import EventLog, stream_events  # noqa: E402
+
+
+def _payload(device_id, value):
+    return {"device_id": device_id, "ts": "2026-01-05T08:00:00Z", "metrics": {"temp": value, "status": "RUN"}, "meta": {}}
+
+
+def _parse(frame: str) -> dict:
+    fields = {}
+    for line in frame.strip().splitlines():
+        name, _, value = line.partition(": ")
+        fields[name] = value
+    return fields
+
+
+async def _collect(log, subscription, last_event_id, count, snapshot=(), heartbeat=5.0):
+    async def connected():
+        return False
+
+    frames = []
+    stream = stream_events(log, subscription, last_event_id, lambda: snapshot, connected, heartbeat)
+    async for frame in stream:
+        frames.append(frame)
+        if len(frames) == count:
+            break
+    await stream.aclose()
+    return frames
+
+
+def test_stream_sends_filtered_snapshot_then_events():
+    async def scenario():
+        log = EventLog()
+        subscription = Subscription(types=frozenset({"QMC"}), metrics=frozenset({"temp"}))
+        task = asyncio.create_task(_collect(log, subscription, None, 4, snapshot=[_payload("QMC-01", 1.0), _payload("IMM-01", 2.0)]))
+        await asyncio.sleep(0.01)
+        log.append(_payload("IMM-01", 3.0))
+        log.append(_payload("QMC-02", 4.0))
+        log.append(_payload("QMC-01", 5.0))
+        return log, await asyncio.wait_for(task, 2)
+
+    log, frames = asyncio.run(scenario())
+    assert frames[0] == "retry: 3000\n\n"
+    snapshot = _parse(frames[1])
+    assert snapshot["event"] == "snapshot"
+    assert json.loads(snapshot["data"]) == [{**_payload("QMC-01", 1.0), "metrics": {"temp": 1.0}}]
+    events = [_parse(frame) for frame in frames[2:]]
+    assert [event["event"] for event in events] == ["telemetry", "telemetry"]
+    assert [json.loads(event["data"])["device_id"] for event in events] == ["QMC-02", "QMC-01"]
+    assert json.loads(events[0]["data"])["metrics"] == {"temp": 4.0}
+    assert events[1]["id"] == log.event_id(3)
+
+
+def test_stream_resumes_from_last_event_id_or_falls_back_to_snapshot():
+    async def scenario():
+        log = EventLog(max_events=3)
+        for value in range(5):
+            log.append(_payload("TCM-01", float(value)))
+        resumed = await _collect(log, Subscription(), log.event_id(3), 3)
+        evicted = await _collect(log, Subscription(), log.event_id(1), 2, snapshot=[_payload("TCM-01", 4.0)])
+        foreign = await _collect(log, Subscription(), "0-4", 2)
+        return log, resumed, evicted, foreign
+
+    log, resumed, evicted, foreign = asyncio.run(scenario())
+    assert [_parse(frame)["id"] for frame in resumed[1:]] == [log.event_id(4), log.event_id(5)]
+    assert _parse(evicted[1])["event"] == "snapshot"
+    assert _parse(foreign[1])["event"] == "snapshot"
+    assert log.resumed == 1
+    assert log.snapshots == 2
+
+
+def test_idle_stream_sends_heartbeats():
+    frames = asyncio.run(_collect(EventLog(), Subscription(), None, 4, heartbeat=0.01))
+    assert frames[2:] == [": heartbeat\n\n", ": heartbeat\n\n"]
+
+
+def test_published_telemetry_reaches_event_log():
+    before = main.telemetry_events.last_seq
+    main.publish_live(_payload("CHILLER-09", 7.0))
+    seq, payload, _ = main.telemetry_events.events[-1]
+    assert seq == before + 1
+    assert payload["device_id"] == "CHILLER-09"
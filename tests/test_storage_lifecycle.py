@@ -0,0 +1,100 @@
+"""Tests for telemetry retention (archive-and-delete) and the storage admin report."""
+import csv
+import gzip
+import os
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+
+ROOT = Path(__file__).resolve().parents[1]
+TEST_DB = ROOT / "test_acron.db"
+if TEST_DB.exists():
+    TEST_DB.unlink()
+
+os.environ["DATABASE_URL"] = f"sqlite:///{TEST_DB}"
+os.environ["SIMULATOR_ENABLED"] = "false"
+os.environ["DEMO_MODE"] = "true"
+os.environ["SECRET_KEY"] = "test-secret"
+sys.path.insert(0, str(ROOT / "ingress-api"))
+
+from app import lifecycle, models  # noqa: E402
+from app.database import SessionLocal  # noqa: E402
+from app.ingest import write_telemetry_rows  # noqa: E402
+from app.main import app  # noqa: E402
+
+
+def _row(at: datetime, metric_name, value):
+    return {"time": at, "equipment_id": "ROBOT-06", "metric_name": metric_name,
+            "metric_value": value, "unit": None, "status": "normal"}
+
+
+def test_parse_retention_defaults():
+    assert lifecycle.parse_retention("diagnostic:30, process:365") == {"diagnostic": 30, "process": 365, "default": 180}
+
+
+def test_retention_archives_and_deletes_per_metric_class(tmp_path):
+    with TestClient(app) as client:
+        now = datetime.utcnow().replace(microsecond=0)
+        write_telemetry_rows([
+            _row(now - timedelta(days=45), "axis_x", 1.0),         # diagnostic, expired
+            _row(now - timedelta(days=45), "grip_pressure", 5.0),  # diagnostic, expired
+            _row(now - timedelta(days=45), "cycle_time", 33.0),    # process, kept
+            _row(now - timedelta(days=200), "cycle_time", 34.0),   # process, expired
+            _row(now - timedelta(days=200), "robot_mode", 2.0),    # default class, expired
+            _row(now - timedelta(days=1), "axis_x", 3.0),          # fresh
+        ])
+
+        db = SessionLocal()
+        try:
+            report = lifecycle.enforce_retention(db, now=now, archive_dir=str(tmp_path))
+            remaining = sorted(
+                (row.metric_name, row.metric_value)
+                for row in db.query(models.Telemetry).filter_by(equipment_id="ROBOT-06").all()
+            )
+        finally:
+            db.close()
+
+        assert remaining == [("axis_x", 3.0), ("cycle_time", 33.0)]
+        assert report["deleted_rows"]["telemetry:diagnostic"] >= 2
+        archived = []
+        for path in report["archived_files"]:
+            with gzip.open(path, "rt", newline="") as handle:
+                archived.extend(row for row in csv.DictReader(handle) if row["equipment_id"] == "ROBOT-06")
+        assert sorted(row["metric_name"] for row in archived) == ["axis_x", "cycle_time", "grip_pressure", "robot_mode"]
+
+        token = client.post("/api/v1/auth/demo-login", json={"role": "admin"}).json()["access_token"]
+        storage = client.get("/api/v1/admin/storage", headers={"Authorization": f"Bearer {token}"}).json()
+        assert storage["backend"] == "sqlite"
+        assert {table["table"] for table in storage["tables"]} == {"telemetry", "telemetry_samples", "telemetry_arrays"}
+        assert all(table["total_bytes"] > 0 for table in storage["tables"])
+
+        viewer = client.post("/api/v1/auth/demo-login", json={"role": "operator"}).json()["access_token"]
+        assert client.get("/api/v1/admin/storage", headers={"Authorization": f"Bearer {viewer}"}).status_code == 403
+
+
+def test_retention_expires_rollup_buckets_per_width(tmp_path, monkeypatch):
+    monkeypatch.setattr(lifecycle.rollups, "ROLLUP_RETENTION_DAYS", {"1m": 30, "1h": 365})
+    with TestClient(app):
+        now = datetime.utcnow().replace(microsecond=0)
+        rows = [_row(now - timedelta(days=days), "robot_mode", 1.0) for days in (1, 45, 400)]
+        write_telemetry_rows([{**row, "equipment_id": "ROBOT-13"} for row in rows])
+
+        db = SessionLocal()
+        try:
+            report = lifecycle.enforce_retention(db, now=now, archive_dir=str(tmp_path))
+            kept = db.query(models.TelemetryRollup.bucket_width, models.TelemetryRollup.bucket).filter_by(
+                equipment_id="ROBOT-13"
+            ).all()
+        finally:
+            db.close()
+
+    ages = {}
+    for width, bucket in kept:
+        ages.setdefault(width, []).append((now - bucket).days)
+    assert sorted(ages["1m"]) == [1]
+    assert sorted(ages["1h"]) == [1, 45]
+    assert sorted(ages["1d"]) == [1, 45, 400]  # no 1d horizon configured: kept
+    assert report["deleted_rows"]["telemetry_rollups:1m"] >= 2
+    assert report["deleted_rows"]["telemetry_rollups:1h"] >= 1
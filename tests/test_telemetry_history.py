@@ -0,0 +1,122 @@
+"""Tests for the paginated, streaming and downsampled telemetry history API."""
+import asyncio
+import csv
+import io
+import json
+import os
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+
+ROOT = Path(__file__).resolve().parents[1]
+TEST_DB = ROOT / "test_acron.db"
+if TEST_DB.exists():
+    TEST_DB.unlink()
+
+os.environ["DATABASE_URL"] = f"sqlite:///{TEST_DB}"
+os.environ["SIMULATOR_ENABLED"] = "false"
+os.environ["DEMO_MODE"] = "true"
+os.environ["SECRET_KEY"] = "test-secret"
+sys.path.insert(0, str(ROOT / "ingress-api"))
+
+from app import database  # noqa: E402
+from app.history import HISTORY_FIELDS, fetch_page, lttb  # noqa: E402
+from app.ingest import write_telemetry_rows  # noqa: E402
+from app.main import app  # noqa: E402
+
+DEVICE = "HISTORY-01"
+
+
+def _seed(start: datetime, minutes: int = 30) -> None:
+    rows = []
+    for i in range(minutes * 6):
+        at = start + timedelta(seconds=10 * i)
+        for metric_name, value in (("cycle_time", 30.0 + (i % 6)), ("mold_temp", 200.0 + i * 0.1)):
+            rows.append({
+                "time": at, "equipment_id": DEVICE, "metric_name": metric_name,
+                "metric_value": value, "unit": None, "status": "normal",
+            })
+    write_telemetry_rows(rows)
+
+
+def test_history_pages_streams_and_downsamples():
+    with TestClient(app) as client:
+        start = datetime.utcnow().replace(second=0, microsecond=0) - timedelta(hours=1)
+        _seed(start)
+        window = {"start": start.isoformat(), "end": (start + timedelta(minutes=30)).isoformat()}
+
+        seen, cursor = [], None
+        while True:
+            params = {**window, "metric": "cycle_time", "limit": 70}
+            if cursor:
+                params["cursor"] = cursor
+            page = client.get(f"/api/v1/telemetry/history/{DEVICE}", params=params).json()
+            seen.extend(page["data"])
+            cursor = page["next_cursor"]
+            if not cursor:
+                break
+        assert len(seen) == 180
+        assert {item["metric"] for item in seen} == {"cycle_time"}
+        assert seen[0]["time"] > seen[-1]["time"]
+
+        response = client.get(f"/api/v1/telemetry/history/{DEVICE}", params={**window, "format": "ndjson", "order": "asc"})
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        lines = [json.loads(line) for line in response.text.splitlines()]
+        assert len(lines) == 360
+        assert lines[0]["time"] <= lines[-1]["time"]
+
+        response = client.get(
+            f"/api/v1/telemetry/history/{DEVICE}",
+            params={**window, "format": "csv", "fields": "time,value", "metric": "mold_temp"},
+        )
+        records = list(csv.DictReader(io.StringIO(response.text)))
+        assert len(records) == 180
+        assert set(records[0]) == {"time", "value"}
+
+        hourly_minutes = client.get(
+            f"/api/v1/telemetry/history/{DEVICE}",
+            params={**window, "metric": "cycle_time", "bucket": "1m", "agg": "max"},
+        ).json()
+        assert hourly_minutes["records"] == 30
+        assert all(point["value"] == 35.0 and point["samples"] == 6 for point in hourly_minutes["data"])
+
+        five_minute = client.get(
+            f"/api/v1/telemetry/history/{DEVICE}",
+            params={**window, "metric": "cycle_time", "bucket": "5m", "agg": "avg"},
+        ).json()
+        assert five_minute["records"] == 6
+        assert all(point["value"] == 32.5 for point in five_minute["data"])
+
+        reduced = client.get(f"/api/v1/telemetry/history/{DEVICE}", params={**window, "points": 50}).json()
+        assert reduced["records"] == 100
+
+        assert client.get(f"/api/v1/telemetry/history/{DEVICE}", params={"cursor": "not-a-cursor!"}).status_code == 422
+        assert client.get(f"/api/v1/telemetry/history/{DEVICE}", params={"bucket": "5 weeks"}).status_code == 422
+
+
+def test_lttb_keeps_endpoints_and_peaks():
+    points = [(float(x), 0.0) for x in range(1000)]
+    points[500] = (500.0, 100.0)
+    sampled = lttb(points, 20)
+    assert len(sampled) == 20
+    assert sampled[0] == points[0] and sampled[-1] == points[-1]
+    assert (500.0, 100.0) in sampled
+
+
+def test_reads_run_on_the_async_engine():
+    assert database.async_database_url("postgresql://u:p@db:5432/acron") == "postgresql+asyncpg://u:p@db:5432/acron"
+    assert database.async_database_url("sqlite:///x.db") == "sqlite+aiosqlite:///x.db"
+    assert database.async_database_url("mysql://db/acron") is None
+    assert database.async_engine is not None and database.async_engine.dialect.is_async
+
+    _seed(datetime.utcnow() - timedelta(minutes=5), minutes=1)
+
+    async def read():
+        page = await database.run_read(fetch_page, DEVICE, datetime.utcnow() - timedelta(minutes=10), None, None, None, True, 5, HISTORY_FIELDS)
+        await database.async_engine.dispose()
+        return page
+
+    page = asyncio.run(read())
+    assert len(page["data"]) == 5
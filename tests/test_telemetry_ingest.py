@@ -0,0 +1,136 @@
+"""Tests for single, batch and write-behind telemetry ingestion."""
+import json
+import os
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+
+ROOT = Path(__file__).resolve().parents[1]
+TEST_DB = ROOT / "test_acron.db"
+if TEST_DB.exists():
+    TEST_DB.unlink()
+
+os.environ["DATABASE_URL"] = f"sqlite:///{TEST_DB}"
+os.environ["SIMULATOR_ENABLED"] = "false"
+os.environ["DEMO_MODE"] = "true"
+os.environ["SECRET_KEY"] = "test-secret"
+sys.path.insert(0, str(ROOT / "ingress-api"))
+
+from app.main import app, write_buffer  # noqa: E402
+
+
+def _records(count: int = 3):
+    ts = datetime.utcnow().isoformat() + "Z"
+    return [
+        {
+            "device_id": f"IMM-0{i + 1}",
+            "ts": ts,
+            "metrics": {"cycle_time": 33.0 + i, "mold_temp": 60.0, "zone_temps": [200.0] * 48, "mold_model": "AB-X100"},
+            "meta": {"type": "IMM"},
+        }
+        for i in range(count)
+    ]
+
+
+def test_batch_ingest_json_and_ndjson():
+    with TestClient(app) as client:
+        response = client.post("/api/v1/telemetry/batch", json=_records(3))
+        assert response.status_code == 200
+        body = response.json()
+        assert body["records"] == 3
+        assert body["rows"] == 12  # cycle_time, mold_temp, mold_model and the zone_temps array per record
+        assert body["stored"] == "database"
+
+        ndjson = "\n".join(json.dumps(item) for item in _records(2)) + "\n"
+        response = client.post(
+            "/api/v1/telemetry/batch",
+            content=ndjson,
+            headers={"Content-Type": "application/x-ndjson"},
+        )
+        assert response.status_code == 200
+        assert response.json()["records"] == 2
+
+        latest = client.get("/api/v1/telemetry/latest").json()
+        assert latest["IMM-01"]["metrics"]["cycle_time"] == 33.0
+
+
+def test_batch_ingest_rejects_invalid_records():
+    with TestClient(app) as client:
+        response = client.post("/api/v1/telemetry/batch", json=[{"device_id": "IMM-01"}])
+        assert response.status_code == 422
+        assert "Record 0" in response.json()["detail"]
+
+
+def test_single_ingest_is_queued_and_flushed():
+    record = _records(1)[0]
+    record["device_id"] = "ROBOT-01"
+    record["metrics"] = {"grip_pressure": 5.2}
+    with TestClient(app) as client:
+        response = client.post("/api/v1/telemetry", json=record)
+        assert response.status_code == 202
+        assert response.json()["stored"] == "queued"
+        assert client.get("/api/v1/telemetry/latest").json()["ROBOT-01"]["metrics"]["grip_pressure"] == 5.2
+
+    # Shutdown drains the queue before the flusher stops.
+    assert len(write_buffer) == 0
+    with TestClient(app) as client:
+        history = client.get("/api/v1/telemetry/history/ROBOT-01?hours=1").json()
+        assert any(item["metric"] == "grip_pressure" for item in history["data"])
+        metrics = client.get("/api/v1/metrics/ingest").json()
+        assert metrics["queue_depth"] == 0
+        assert metrics["flushed_rows"] >= 1
+
+
+def test_single_ingest_backpressure_returns_429():
+    original, spool = write_buffer.max_rows, write_buffer.spool
+    write_buffer.max_rows = 0
+    try:
+        with TestClient(app) as client:
+            spooled = write_buffer.spooled_rows
+            assert client.post("/api/v1/telemetry", json=_records(1)[0]).status_code == 202
+            deadline = time.monotonic() + 2
+            while write_buffer.spooled_rows == spooled and time.monotonic() < deadline:
+                time.sleep(0.01)  # the flusher spills overflow on its thread pool
+            assert write_buffer.spooled_rows > spooled
+
+            write_buffer.spool = None
+            response = client.post("/api/v1/telemetry", json=_records(1)[0])
+            assert response.status_code == 429
+            assert response.headers["retry-after"] == "1"
+    finally:
+        write_buffer.max_rows, write_buffer.spool = original, spool
+
+
+def test_last_value_store_warms_from_database():
+    from app.database import SessionLocal
+    from app.last_values import LastValueStore
+
+    older = _records(1)[0]
+    older.update({"device_id": "VWM-01", "ts": "2026-01-01T08:00:00Z", "metrics": {"weld_time": 2.4}})
+    newer = dict(older, ts="2026-01-01T08:00:05Z", metrics={"weld_time": 2.6})
+    with TestClient(app) as client:
+        assert client.post("/api/v1/telemetry/batch", json=[older, newer]).status_code == 200
+
+    store = LastValueStore()
+    db = SessionLocal()
+    try:
+        store.warm(db, lookback_hours=24 * 3650)
+    finally:
+        db.close()
+    assert store.value("VWM-01", "weld_time") == 2.6
+    assert store["VWM-01"]["meta"]["type"] == "VWM"
+
+    # Partial updates merge into the device view; out-of-order samples are ignored.
+    store.update({"device_id": "VWM-01", "ts": "2026-01-01T08:00:10Z", "metrics": {"weld_freq": 20010.0}})
+    store.update({"device_id": "VWM-01", "ts": "2026-01-01T07:59:00Z", "metrics": {"weld_time": 9.9}})
+    assert store["VWM-01"]["metrics"] == {"weld_time": 2.6, "weld_freq": 20010.0}
+
+    # Samples are ordered by instant whatever the offset notation or precision.
+    store.update({"device_id": "VWM-02", "ts": "2026-01-01T08:00:00.500+00:00", "metrics": {"weld_time": 2.7}})
+    store.update({"device_id": "VWM-02", "ts": "2026-01-01T08:00:00Z", "metrics": {"weld_time": 9.9}})
+    store.update({"device_id": "VWM-02", "ts": "2026-01-01T09:00:00.250+01:00", "metrics": {"weld_time": 9.8}})
+    assert store.value("VWM-02", "weld_time") == 2.7
+    assert store["VWM-02"]["ts"] == "2026-01-01T08:00:00.500+00:00"
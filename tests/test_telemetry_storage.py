@@ -0,0 +1,101 @@
+"""Tests for the wide-row telemetry storage layout behind the repository interface."""
+import os
+import subprocess
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+
+ROOT = Path(__file__).resolve().parents[1]
+TEST_DB = ROOT / "test_acron.db"
+if TEST_DB.exists():
+    TEST_DB.unlink()
+
+os.environ["DATABASE_URL"] = f"sqlite:///{TEST_DB}"
+os.environ["SIMULATOR_ENABLED"] = "false"
+os.environ["DEMO_MODE"] = "true"
+os.environ["SECRET_KEY"] = "test-secret"
+sys.path.insert(0, str(ROOT / "ingress-api"))
+
+from app import models, telemetry_store  # noqa: E402
+from app.database import SessionLocal  # noqa: E402
+from app.ingest import write_telemetry_rows  # noqa: E402
+from app.last_values import LastValueStore  # noqa: E402
+from app.main import app  # noqa: E402
+from app.rollups import window_stats  # noqa: E402
+
+
+def _rows(start: datetime, count: int) -> list[dict]:
+    rows = []
+    for i in range(count):
+        at = start + timedelta(seconds=5 * i)
+        metrics = {"cycle_time": 30.0 + i % 4, "mold_temp": 60.0 + i * 0.01, "vibration": 0.1, "shot_weight": 12.5}
+        for metric_name, value in metrics.items():
+            rows.append({"time": at, "equipment_id": "IMM-07", "metric_name": metric_name,
+                         "metric_value": value, "unit": None, "status": "normal"})
+    return rows
+
+
+def test_pack_roundtrip():
+    values = [1.5, float("nan"), -2.25]
+    unpacked = telemetry_store.unpack_values(telemetry_store.pack_values(values))
+    assert unpacked[0] == 1.5 and unpacked[2] == -2.25 and unpacked[1] != unpacked[1]
+
+
+def test_wide_layout_serves_history_stats_and_warmup():
+    repository = telemetry_store.configure_storage("wide")
+    try:
+        with TestClient(app) as client:
+            start = datetime.utcnow().replace(second=0, microsecond=0) - timedelta(minutes=30)
+            write_telemetry_rows(_rows(start, 120))
+
+            db = SessionLocal()
+            try:
+                assert db.query(models.TelemetrySample).filter_by(equipment_id="IMM-07").count() == 120
+                assert db.query(models.Telemetry).filter_by(equipment_id="IMM-07").count() == 0
+                sample = db.query(models.TelemetrySample).first()
+                assert sample.metric_schema == "IMM"
+                assert sample.extra == {"shot_weight": 12.5}
+
+                stats = window_stats(db, start + timedelta(seconds=30), start + timedelta(minutes=10, seconds=2),
+                                     metric_name="cycle_time", equipment_id="IMM-07")
+                expected = [30.0 + i % 4 for i in range(6, 120)]
+                assert stats[("IMM-07", "cycle_time")].count == len(expected)
+                assert abs(stats[("IMM-07", "cycle_time")].total - sum(expected)) < 1e-6
+
+                store = LastValueStore()
+                store.warm(db)
+                assert store.value("IMM-07", "shot_weight") == 12.5
+                assert store.value("IMM-07", "cycle_time") == 30.0 + 119 % 4
+            finally:
+                db.close()
+
+            window = {"start": start.isoformat(), "end": (start + timedelta(hours=1)).isoformat()}
+            seen, cursor = [], None
+            while True:
+                params = {**window, "limit": 10}
+                if cursor:
+                    params["cursor"] = cursor
+                page = client.get("/api/v1/telemetry/history/IMM-07", params=params).json()
+                assert page["records"] <= 10
+                seen.extend((item["time"], item["metric"]) for item in page["data"])
+                cursor = page["next_cursor"]
+                if not cursor:
+                    break
+            assert len(seen) == len(set(seen)) == 480
+            assert repository.layout == "wide"
+    finally:
+        telemetry_store.configure_storage("eav")
+
+
+def test_unknown_layout_is_rejected_at_startup():
+    env = dict(os.environ, TELEMETRY_STORAGE="wide ")
+    result = subprocess.run([sys.executable, "-c", "import app.telemetry_store"], cwd=ROOT / "ingress-api",
+                            env=env, capture_output=True, text=True)
+    assert result.returncode != 0
+    assert "Unknown telemetry storage layout 'wide '" in result.stderr
+    with pytest.raises(ValueError):
+        telemetry_store.configure_storage("wide ")
+    assert telemetry_store.repository().layout == "eav"
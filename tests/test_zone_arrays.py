@@ -0,0 +1,57 @@
+"""Tests for packed zone-temperature arrays and the vectorized zone queries."""
+import os
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+
+ROOT = Path(__file__).resolve().parents[1]
+TEST_DB = ROOT / "test_acron.db"
+if TEST_DB.exists():
+    TEST_DB.unlink()
+
+os.environ["DATABASE_URL"] = f"sqlite:///{TEST_DB}"
+os.environ["SIMULATOR_ENABLED"] = "false"
+os.environ["DEMO_MODE"] = "true"
+os.environ["SECRET_KEY"] = "test-secret"
+sys.path.insert(0, str(ROOT / "ingress-api"))
+
+from app.main import app  # noqa: E402
+
+
+def test_zone_arrays_are_stored_and_scanned():
+    with TestClient(app) as client:
+        start = datetime.utcnow().replace(microsecond=0) - timedelta(minutes=10)
+        records = []
+        for i in range(20):
+            zones = [200.0 + zone * 0.25 for zone in range(48)]
+            if i in (5, 6):
+                zones[11] = 231.5
+            if i == 9:
+                zones[40] = 170.0
+            records.append({
+                "device_id": "QMC-05",
+                "ts": (start + timedelta(seconds=5 * i)).isoformat() + "Z",
+                "metrics": {"temp": 200.0, "zone_temps": zones},
+            })
+        response = client.post("/api/v1/telemetry/batch", json=records)
+        assert response.status_code == 200
+        assert response.json()["rows"] == 40
+
+        window = {"start": start.isoformat(), "end": (start + timedelta(minutes=5)).isoformat()}
+        stats = client.get("/api/v1/telemetry/zones/QMC-05", params=window).json()
+        assert stats["samples"] == 20
+        assert len(stats["zones"]) == 48
+        zone_12 = stats["zones"][11]
+        assert zone_12["max"] == 231.5
+        assert zone_12["min"] == 202.75
+        assert abs(zone_12["mean"] - (18 * 202.75 + 2 * 231.5) / 20) < 1e-4
+
+        scan = client.get("/api/v1/telemetry/zones/out-of-range", params={**window, "low": 180, "high": 220}).json()
+        machines = {item["equipment_id"]: item for item in scan["machines"]}
+        assert set(machines) == {"QMC-05"}
+        qmc = machines["QMC-05"]
+        assert qmc["violating_samples"] == 3
+        assert {zone["zone"]: zone["count"] for zone in qmc["zones"]} == {12: 2, 41: 1}
+        assert {zone["zone"]: (zone["min"], zone["max"]) for zone in qmc["zones"]}[41] == (170.0, 170.0)